@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+import threading
+
+from sqlalchemy import update, case
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 1000  # user ids per UPDATE statement
+
+
+class ActivityBuffer:
+    """Coalesces "user X seen at T" writes from authenticated requests.
+
+    Requests only record the timestamp in memory; a background thread writes the
+    latest timestamp per user every ACTIVITY_FLUSH_INTERVAL_SECONDS with one
+    UPDATE per table (users.last_login and active user_sessions.last_activity)
+    per batch of users. Pending activity is flushed at shutdown. A crash loses
+    at most one interval of last-seen times, which are informational only.
+    """
+
+    def __init__(self, flush_interval: int = None):
+        self.flush_interval = flush_interval or settings.ACTIVITY_FLUSH_INTERVAL_SECONDS
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, user_id: int, seen_at: Optional[datetime] = None) -> None:
+        """Remember that a user was active; never touches the database"""
+        seen_at = seen_at or datetime.utcnow()
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None or seen_at > previous:
+                self._pending[user_id] = seen_at
+
+    def flush(self) -> int:
+        """Write all pending activity and return the number of users flushed"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        # Imported here so the buffer can be constructed before the engine exists
+        from app.db.session import engine
+        from app.models.user import User
+        from app.models.admin import UserSession
+
+        items = list(pending.items())
+        try:
+            with engine.begin() as conn:
+                for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                    batch = dict(items[start:start + FLUSH_BATCH_SIZE])
+                    conn.execute(
+                        update(User)
+                        .where(User.id.in_(batch.keys()))
+                        .values(last_login=case(batch, value=User.id))
+                    )
+                    conn.execute(
+                        update(UserSession)
+                        .where(UserSession.user_id.in_(batch.keys()), UserSession.is_active == True)
+                        .values(last_activity=case(batch, value=UserSession.user_id))
+                    )
+        except Exception as e:
+            # Put the timestamps back (unless newer ones arrived) and retry next interval
+            logger.warning(f"Failed to flush activity for {len(items)} users: {e}")
+            for user_id, seen_at in items:
+                self.record(user_id, seen_at)
+            return 0
+        return len(items)
+
+    def start(self) -> None:
+        """Start the periodic flush thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and write whatever is still pending"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+activity_buffer = ActivityBuffer()
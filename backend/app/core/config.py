@@ -9,11 +9,27 @@ class Settings(BaseSettings):
     DATABASE_USER: str = "root"
     DATABASE_PASSWORD: str = "password"
     DATABASE_NAME: str = "rta_system"
+    DATABASE_POOL_SIZE: int = 10  # connections kept open per engine and process
+    DATABASE_MAX_OVERFLOW: int = 20  # extra connections opened under load
 
     # JWT Configuration
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: int = 30  # how often last-seen times are written
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # max staleness of a cached authenticated user
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+
+    # Login Protection
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt threads per process; at most the CPU count
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # hashes allowed to wait for a thread; more are refused with 503
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_STORE: str = "memory"  # "memory" (per process) or "database" (shared by all workers)
+    LOGIN_RATE_LIMIT_IP_BURST: int = 30  # attempts a client IP can make back to back
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 30.0  # sustained attempts per client IP
+    LOGIN_RATE_LIMIT_ACCOUNT_BURST: int = 5  # attempts on one account back to back
+    LOGIN_RATE_LIMIT_ACCOUNT_PER_MINUTE: float = 2.0  # sustained attempts per account
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100000  # buckets kept by the memory store, least recent evicted
 
     # API Configuration
     API_V1_STR: str = "/api/v1"
@@ -22,17 +38,68 @@ class Settings(BaseSettings):
     # File Upload Configuration
     UPLOAD_DIRECTORY: str = "uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024  # documents are hashed and written to disk this many bytes at a time
+    NAV_UPLOAD_DIRECTORY: str = "uploads/nav"  # NAV files kept for the job that loads them
+    RECONCILIATION_UPLOAD_DIRECTORY: str = "uploads/reconciliation"  # AMC/bank feed files
+
+    # List Pagination
+    PAGINATION_MAX_OFFSET_ROWS: int = 10000  # deeper pages must follow next_cursor instead of page=
+    PAGINATION_COUNT_CACHE_TTL_SECONDS: int = 30  # how long a list total is reused for the same filters
+    PAGINATION_COUNT_CACHE_MAX_ENTRIES: int = 1000
+
+    # Reconciliation
+    RECONCILIATION_PARTITION_ROWS: int = 50000  # RTA rows held in memory per hash-join partition
+    RECONCILIATION_WORK_DIRECTORY: Optional[str] = None  # partition spill files; system temp dir if unset
+
+    # Background Jobs
+    JOB_WORKER_POLL_SECONDS: float = 5.0  # idle wait between queue polls per worker
+    JOB_WORKER_PROCESSES: int = 2  # worker processes started by run_job_worker.py
+    JOB_CLAIM_TIMEOUT_SECONDS: int = 900  # running jobs without a heartbeat this long (worker died) are claimed again
+
+    # Statement Generation
+    CAS_SPOOL_DIRECTORY: str = "uploads/cas"  # one sub-directory per CAS batch job
+    CAS_RENDER_WORKERS: int = 4  # renderer processes per CAS batch job
+
+    # Dashboard Rollups
+    ROLLUP_REBUILD_DAYS: int = 35  # trailing window recomputed by the nightly rollup rebuild
 
     # Transaction Limits
     MAX_TRANSACTION_AMOUNT: float = 1000000.0  # ₹10 lakhs
     MIN_TRANSACTION_AMOUNT: float = 100.0  # ₹100
 
+    # ID Sequence Allocation
+    ID_SEQUENCE_BLOCK_SIZE: int = 1000  # IDs reserved per process per round trip
+
     # Email Configuration
     SMTP_SERVER: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
     SMTP_USERNAME: str = ""  # Set via environment variable
     SMTP_PASSWORD: str = ""  # Set via environment variable
     EMAIL_FROM: str = ""  # Set via environment variable
+    SMTP_USE_TLS: bool = True  # STARTTLS after connecting; off for a local test server
+    EMAIL_SMTP_CONNECTIONS: int = 4  # authenticated connections kept open by each email sender
+    EMAIL_SMTP_MESSAGES_PER_CONNECTION: int = 100  # reconnect after this many messages (provider limits)
+    EMAIL_SMTP_IDLE_SECONDS: int = 60  # a connection idle longer than this is checked with NOOP before use
+    EMAIL_BATCH_SIZE: int = 200  # outbox rows claimed per batch
+    EMAIL_MAX_ATTEMPTS: int = 5  # after this many failed attempts an email is marked failed
+    EMAIL_RETRY_BASE_SECONDS: int = 60  # first retry delay, doubled after each further failure
+    EMAIL_CLAIM_TIMEOUT_SECONDS: int = 600  # emails left sending this long (sender died) are claimed again
+    EMAIL_SENDER_POLL_SECONDS: float = 2.0  # idle wait between outbox polls
+
+    # Notifications
+    NOTIFICATION_FANOUT_CHUNK_SIZE: int = 5000  # investors notified per INSERT ... SELECT and commit
+    NOTIFICATION_RETENTION_DAYS: int = 180  # older notifications are deleted by prune_notifications.py
+    NOTIFICATION_PRUNE_BATCH_SIZE: int = 5000  # rows deleted per statement and commit when pruning
+
+    # Metrics & Health
+    METRICS_ENABLED: bool = True  # serve /metrics and time every request
+    METRICS_DB_REFRESH_SECONDS: int = 30  # batch/transaction totals are re-read at most this often
+    HEALTH_POOL_SATURATION_LIMIT: float = 0.9  # /health reports not ready above this share of the pool in use
+
+    # SQL Profiling (per-request query counts, served at /admin/perf/queries)
+    SQL_PROFILING_ENABLED: bool = False  # opt-in; adds a little overhead to every statement
+    SQL_SLOW_QUERY_MS: float = 200.0  # statements at least this slow are logged with their route
+    SQL_PROFILE_WINDOW: int = 1000  # most recent requests kept per route
 
     # Debug Mode
     DEBUG_MODE: bool = True  # Set to False in production
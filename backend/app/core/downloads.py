@@ -0,0 +1,111 @@
+from typing import Optional, Tuple
+import os
+
+import anyio
+from fastapi import Request
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """The (first, last) byte of a single "bytes=" range, or None to send the whole file.
+
+    Malformed and multi-range headers are ignored, as RFC 9110 allows; a
+    range that starts past the end of the file raises RangeNotSatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names `etag` (weak comparison)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+class PartialFileResponse(FileResponse):
+    """206 response with bytes start..end (inclusive) of a file"""
+
+    def __init__(self, path: str, start: int, end: int, stat_result: os.stat_result, **kwargs):
+        self.start = start
+        self.end = end
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        headers["content-length"] = str(end - start + 1)
+        super().__init__(path, status_code=206, headers=headers, stat_result=stat_result, **kwargs)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining:
+                # The file shrank under us; close the body rather than leave it open
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_download_response(
+    request: Request,
+    path: str,
+    stat_result: os.stat_result,
+    filename: str,
+    media_type: str,
+    checksum: Optional[str] = None
+) -> Response:
+    """Serve a stored file with Range and, when its checksum is known, ETag support.
+
+    The ETag is the content's SHA-256, so it is stable across servers and
+    re-uploads of the same file: a client holding it gets 304 without a body,
+    and a resumed download (Range with a matching If-Range) gets 206.
+    """
+    headers = {"accept-ranges": "bytes", "cache-control": "private, no-cache"}
+    etag = f'"{checksum}"' if checksum else None
+    if etag:
+        headers["etag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or (etag and if_range.strip() == etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+        except RangeNotSatisfiable:
+            headers["content-range"] = f"bytes */{stat_result.st_size}"
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        return FileResponse(path, headers=headers, media_type=media_type, filename=filename,
+                            stat_result=stat_result)
+    return PartialFileResponse(path, byte_range[0], byte_range[1], stat_result, headers=headers,
+                               media_type=media_type, filename=filename)
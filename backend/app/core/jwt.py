@@ -1,12 +1,14 @@
-from datetime import datetime
 from typing import Optional
 import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
 from app.models.user import User
 from .security import verify_token
+from .activity import activity_buffer
+from .principal import Principal, principal_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +18,13 @@ security = HTTPBearer()
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Get current authenticated user from JWT token.
+
+    The user row is loaded once per token and cached as a Principal; later calls
+    with the same token are served without touching the database.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -35,9 +41,15 @@ async def get_current_user(
     if email is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email, User.is_active == True).first()
+    cache_key = payload.get("jti") or token
+    user = principal_cache.get(cache_key)
     if user is None:
-        raise credentials_exception
+        result = await db.execute(select(User).where(User.email == email, User.is_active == True))
+        db_user = result.scalars().first()
+        if db_user is None:
+            raise credentials_exception
+        user = Principal(db_user)
+        principal_cache.put(cache_key, user, payload.get("exp"))
 
     # Check if account is locked
     if user.is_account_locked:
@@ -46,14 +58,8 @@ async def get_current_user(
             detail="Account is locked. Please contact support."
         )
 
-    # Update last login (skip if database issues)
-    try:
-        user.last_login = datetime.utcnow()
-        db.commit()
-    except Exception as e:
-        # Log but don't fail - last login update is not critical
-        logger.warning(f"Failed to update last login for {email}: {e}")
-        db.rollback()
+    # Last-seen time is buffered and written in batches, not committed per request
+    activity_buffer.record(user.id)
 
     return user
 
@@ -0,0 +1,352 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_total(self, values: Dict[LabelValues, float]) -> None:
+        """Replace all series with values read from elsewhere (the database)"""
+        with self._lock:
+            self._values = dict(values)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[LabelValues, List[float]] = {}  # bucket counts, then sum
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 1)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _label_text(self.labelnames, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_number(cumulative)}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_number(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of this process in the Prometheus text exposition format.
+
+    Collectors registered with add_collector() run before each render to
+    refresh gauges whose values live elsewhere (pool state, database totals).
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                # Collectors may be callable objects (_DatabaseTotals) without a __name__
+                name = getattr(collector, "__name__", type(collector).__name__)
+                logger.warning(f"Metrics collector {name} failed: {e}")
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "rta_http_request_duration_seconds", "HTTP request latency by route template and status",
+    ["method", "route", "status"]
+)
+http_requests_in_flight = registry.gauge(
+    "rta_http_requests_in_flight", "HTTP requests currently being served"
+)
+db_pool_connections = registry.gauge(
+    "rta_db_pool_connections", "Connections of the database pool by state", ["pool", "state"]
+)
+db_pool_wait = registry.histogram(
+    "rta_db_pool_wait_seconds", "Time taken to obtain a connection from the pool", ["pool"],
+    buckets=POOL_WAIT_BUCKETS
+)
+# Sums over rows that can be rerun, deleted or change status, so these are gauges, not counters
+batch_records_processed = registry.gauge(
+    "rta_batch_records_processed", "Records processed by the batch jobs on record, by job type", ["job_type"]
+)
+batch_records_rate = registry.gauge(
+    "rta_batch_records_per_second", "Throughput of running batch jobs, by job type", ["job_type"]
+)
+batch_jobs = registry.gauge(
+    "rta_batch_jobs", "Batch jobs by type and status", ["job_type", "status"]
+)
+transactions_completed = registry.gauge(
+    "rta_transactions_completed", "Transactions currently completed, by transaction type", ["transaction_type"]
+)
+
+
+# ----------------------------------------------------------------------
+# Connection pools
+# ----------------------------------------------------------------------
+
+class _TimedGet:
+    """Records how long each checkout waited in db_pool_wait (including opening a new connection)"""
+
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.observe(time.perf_counter() - started, pool=self.metrics_label)
+
+
+class TimedQueuePool(_TimedGet, QueuePool):
+    metrics_label = "sync"
+
+
+class TimedAsyncQueuePool(_TimedGet, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def pool_stats(pool) -> Dict[str, int]:
+    """Current pool usage; capacity is pool_size plus max_overflow"""
+    capacity = settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0
+    }
+
+
+def _collect_pools() -> None:
+    from app.db.session import engine, async_engine
+
+    for label, pool in (("sync", engine.pool), ("async", async_engine.pool)):
+        stats = pool_stats(pool)
+        for state in ("checked_out", "checked_in", "overflow"):
+            db_pool_connections.set(stats[state], pool=label, state=state)
+
+
+registry.add_collector(_collect_pools)
+
+
+# ----------------------------------------------------------------------
+# Batch jobs and transactions (read from the database)
+# ----------------------------------------------------------------------
+
+class _DatabaseTotals:
+    """Batch and transaction figures shared by every API and job worker process.
+
+    Jobs run in run_job_worker.py processes, so in-process counters would not
+    see them. Instead the totals are read from batch_jobs (records_processed is
+    checkpointed per chunk) and daily_txn_rollup, at most once every
+    METRICS_DB_REFRESH_SECONDS so frequent scrapes do not add load.
+    """
+
+    def __init__(self):
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._refreshed_at < settings.METRICS_DB_REFRESH_SECONDS:
+                return
+            self._refreshed_at = time.monotonic()
+
+        from datetime import datetime
+        from sqlalchemy import func
+        from app.db.session import SessionLocal
+        from app.models.admin import BatchJob, BatchJobStatus
+        from app.models.transaction import DailyTxnRollup, TransactionStatus
+
+        db = SessionLocal()
+        try:
+            jobs = db.query(
+                BatchJob.job_type, BatchJob.status, func.count(BatchJob.id),
+                func.coalesce(func.sum(BatchJob.records_processed), 0)
+            ).group_by(BatchJob.job_type, BatchJob.status).all()
+
+            processed: Dict[LabelValues, float] = {}
+            counts: Dict[LabelValues, float] = {}
+            for job_type, status, count, records in jobs:
+                processed[(job_type.value,)] = processed.get((job_type.value,), 0) + int(records)
+                counts[(job_type.value, status.value)] = count
+            batch_records_processed.set_total(processed)
+            batch_jobs.set_total(counts)
+
+            now = datetime.now()
+            rates: Dict[LabelValues, float] = {}
+            running = db.query(BatchJob.job_type, BatchJob.records_processed, BatchJob.started_at).filter(
+                BatchJob.status == BatchJobStatus.running
+            ).all()
+            for job_type, records, started_at in running:
+                elapsed = (now - started_at).total_seconds() if started_at else 0
+                if elapsed > 0:
+                    rates[(job_type.value,)] = rates.get((job_type.value,), 0) + (records or 0) / elapsed
+            batch_records_rate.set_total(rates)
+
+            completed = db.query(
+                DailyTxnRollup.transaction_type, func.sum(DailyTxnRollup.txn_count)
+            ).filter(
+                DailyTxnRollup.status == TransactionStatus.completed
+            ).group_by(DailyTxnRollup.transaction_type).all()
+            transactions_completed.set_total({(tx_type.value,): int(total or 0) for tx_type, total in completed})
+        finally:
+            db.close()
+
+
+registry.add_collector(_DatabaseTotals())
+
+
+# ----------------------------------------------------------------------
+# Requests
+# ----------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route: Optional[Any] = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "(unmatched)"),
+                status=status["code"]
+            )
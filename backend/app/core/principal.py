@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+import threading
+import time
+
+from app.core.config import settings
+from app.core.roles import ROLE_PERMISSIONS
+from app.models.user import User, UserStatus
+
+
+class Principal:
+    """Read-only snapshot of an authenticated user, safe to share across requests.
+
+    Exposes the User attributes routes read from current_user, plus the resolved
+    permission sets so permission checks need no further lookups. It is not
+    attached to any session; routes that modify the user must load the ORM row.
+    """
+
+    __slots__ = (
+        "id", "email", "full_name", "role", "sub_role", "permissions",
+        "investor_id", "amc_id", "distributor_id", "phone_number",
+        "is_active", "status", "account_locked_until",
+        "custom_permissions", "role_permissions"
+    )
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.email = user.email
+        self.full_name = user.full_name
+        self.role = user.role
+        self.sub_role = user.sub_role
+        self.permissions = user.permissions
+        self.investor_id = user.investor_id
+        self.amc_id = user.amc_id
+        self.distributor_id = user.distributor_id
+        self.phone_number = user.phone_number
+        self.is_active = user.is_active
+        self.status = user.status
+        self.account_locked_until = user.account_locked_until
+
+        # Custom grants are only honoured when stored as a plain list
+        custom = user.permissions if isinstance(user.permissions, list) else []
+        self.custom_permissions: FrozenSet[str] = frozenset(custom)
+        self.role_permissions: FrozenSet[str] = frozenset(ROLE_PERMISSIONS.get(user.sub_role, []))
+
+    @property
+    def is_account_locked(self) -> bool:
+        if self.status == UserStatus.locked:
+            return True
+        if self.account_locked_until and self.account_locked_until > datetime.utcnow():
+            return True
+        return False
+
+    def __repr__(self):
+        return f"<Principal(id={self.id}, email={self.email}, role={self.role.value})>"
+
+
+class PrincipalCache:
+    """LRU cache of principals keyed by token (jti, or the token itself for legacy tokens).
+
+    Entries live for PRINCIPAL_CACHE_TTL_SECONDS or until the token expires,
+    whichever is sooner. Writes that change a user's status, role or permissions
+    must call invalidate_user(); other worker processes pick the change up when
+    their entry expires.
+    """
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.PRINCIPAL_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.PRINCIPAL_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, key: str, principal: Principal, token_exp: Optional[Any] = None) -> None:
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, float(token_exp) - time.time())
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, principal)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached principal of a user (status, role or permission change)"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[1].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[1].id]
+
+
+principal_cache = PrincipalCache()
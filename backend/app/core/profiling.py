@@ -0,0 +1,219 @@
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import logging
+import re
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+MAX_SLOW_QUERIES = 200  # most recent slow statements kept for /admin/perf/queries
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|\?|:\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement with literals and placeholders as ?, IN lists collapsed and whitespace squeezed.
+
+    Statements that differ only in their values (or IN-list length) normalise
+    to the same text, so an N+1 loop shows up as one statement repeated.
+    """
+    sql = _LITERAL.sub("?", statement)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RequestStats:
+    """Queries and database time of the request being served"""
+
+    __slots__ = ("scope", "queries", "db_seconds")
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # The router records the matched route in the shared scope; charge its
+        # template (/admin/transactions/{transaction_id}) rather than the raw path
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', '(unmatched)')}"
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("sql_profile_request", default=None)
+
+
+class QueryProfiler:
+    """Counts SQL statements and their time per request, per route.
+
+    install() hooks before/after_cursor_execute on the given engines. Statements
+    run while a profiled request is active are charged to it; sync routes see
+    the same RequestStats because the threadpool copies the request context.
+    Each route keeps its last SQL_PROFILE_WINDOW requests, and statements
+    slower than SQL_SLOW_QUERY_MS are logged and kept with their route. Figures
+    are per process; with several uvicorn workers each reports its own share.
+    """
+
+    def __init__(self, window: int = None, slow_query_ms: float = None):
+        self.window = window or settings.SQL_PROFILE_WINDOW
+        self.slow_query_seconds = (slow_query_ms if slow_query_ms is not None else settings.SQL_SLOW_QUERY_MS) / 1000
+        self.installed = False
+        self._routes: Dict[str, Deque[tuple]] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=MAX_SLOW_QUERIES)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Engine hooks
+    # ------------------------------------------------------------------
+
+    def install(self, *engines: Engine) -> None:
+        for engine in engines:
+            if not event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+                event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        self.installed = True
+
+    # The start time lives on the statement's execution context, so a statement
+    # that raises (and never reaches after_cursor_execute) leaves nothing behind
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.sql_profile_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "sql_profile_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+        if elapsed >= self.slow_query_seconds:
+            route = stats.route if stats is not None else "(background)"
+            sql = normalize_sql(statement)
+            logger.warning(f"Slow query {elapsed * 1000:.1f} ms on {route}: {sql}")
+            with self._lock:
+                self._slow.append({
+                    "route": route,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "sql": sql,
+                    "at": time.time()
+                })
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def begin(self, scope: Dict[str, Any]) -> Tuple[RequestStats, Token]:
+        """Start charging statements to a new request; pass both values to finish()"""
+        stats = RequestStats(scope)
+        return stats, _current.set(stats)
+
+    def finish(self, stats: RequestStats, token: Token, elapsed_seconds: float) -> None:
+        _current.reset(token)
+        route = stats.route
+        with self._lock:
+            samples = self._routes.get(route)
+            if samples is None:
+                samples = self._routes[route] = deque(maxlen=self.window)
+            samples.append((stats.queries, stats.db_seconds, elapsed_seconds))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._slow.clear()
+
+    def report(self) -> Dict[str, Any]:
+        """Per-route summary over each route's window, most database time first"""
+        with self._lock:
+            routes = {route: list(samples) for route, samples in self._routes.items()}
+            slow = list(self._slow)
+
+        summaries = []
+        for route, samples in routes.items():
+            queries = [s[0] for s in samples]
+            db_ms = [s[1] * 1000 for s in samples]
+            total_ms = [s[2] * 1000 for s in samples]
+            histogram = {f"<={bound}": 0 for bound in QUERY_COUNT_BUCKETS}
+            histogram[f">{QUERY_COUNT_BUCKETS[-1]}"] = 0
+            for count in queries:
+                bucket = next((f"<={b}" for b in QUERY_COUNT_BUCKETS if count <= b), f">{QUERY_COUNT_BUCKETS[-1]}")
+                histogram[bucket] += 1
+            summaries.append({
+                "route": route,
+                "requests": len(samples),
+                "queries_avg": round(sum(queries) / len(queries), 2),
+                "queries_p95": _percentile(queries, 0.95),
+                "queries_max": max(queries),
+                "queries_histogram": histogram,
+                "db_ms_total": round(sum(db_ms), 2),
+                "db_ms_p50": round(_percentile(db_ms, 0.5), 2),
+                "db_ms_p95": round(_percentile(db_ms, 0.95), 2),
+                "response_ms_p95": round(_percentile(total_ms, 0.95), 2)
+            })
+        summaries.sort(key=lambda s: s["db_ms_total"], reverse=True)
+
+        return {
+            "enabled": self.installed,
+            "window": self.window,
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "routes": summaries,
+            "slow_queries": list(reversed(slow))
+        }
+
+
+query_profiler = QueryProfiler()
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware that profiles each HTTP request with query_profiler.
+
+    Adds X-DB-Queries and a Server-Timing "db" entry to every response. The
+    figures cover statements run before the response starts, which for the
+    JSON routes here is all of them.
+    """
+
+    def __init__(self, app, profiler: QueryProfiler = None):
+        self.app = app
+        self.profiler = profiler or query_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = self.profiler.begin(scope)
+        started = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.queries).encode()))
+                headers.append((b"server-timing", f"db;dur={stats.db_seconds * 1000:.1f};desc=\"{stats.queries} queries\"".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            self.profiler.finish(stats, token, time.perf_counter() - started)
@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import logging
+import math
+import threading
+import time
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.rate_limit import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY_ATTEMPTS = 1000  # database store: delete idle buckets once per this many attempts
+PRUNE_IDLE_SECONDS = 3600  # ... that have not been touched for this long (they would be full again)
+
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+
+def _take(tokens: float, refilled_at: float, now: float, capacity: float,
+          refill_per_second: float, cost: float) -> Tuple[float, float]:
+    """Refill a bucket up to `now` and take `cost` tokens.
+
+    Returns the new level and 0, or the unchanged (refilled) level and the
+    seconds until enough tokens will be available.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - refilled_at) * refill_per_second)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / refill_per_second
+
+
+class MemoryBucketStore:
+    """Buckets of this process only; the least recently used are evicted beyond max_keys.
+
+    An evicted bucket comes back full, so eviction only ever errs on the side
+    of letting a request through.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys: int = None):
+        self.max_keys = max_keys or settings.LOGIN_RATE_LIMIT_MAX_KEYS
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            bucket[0], retry_after = _take(bucket[0], bucket[1], now, capacity, refill_per_second, cost)
+            bucket[1] = now
+            return retry_after
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBucketStore:
+    """Buckets in rate_limit_buckets, shared by every worker process and host.
+
+    Each attempt updates its bucket row under a row lock in a short transaction
+    on its own connection, like ID sequence reservations. If the database is
+    unavailable the attempt is allowed: the limiter must not take logins down.
+    """
+
+    blocking = True
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._attempts = 0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.db.session import engine
+            self._engine = engine
+        return self._engine
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = time.time()
+        try:
+            retry_after = self._take(key, capacity, refill_per_second, cost, now)
+        except SQLAlchemyError as e:
+            logger.warning(f"Rate limit store unavailable, allowing {key}: {e}")
+            return 0.0
+
+        self._attempts += 1
+        if self._attempts % PRUNE_EVERY_ATTEMPTS == 0:
+            self.prune(now - PRUNE_IDLE_SECONDS)
+        return retry_after
+
+    def _take(self, key: str, capacity: float, refill_per_second: float, cost: float, now: float) -> float:
+        for _ in range(3):
+            try:
+                with self.engine.begin() as conn:
+                    row = conn.execute(
+                        select(RateLimitBucket.tokens, RateLimitBucket.refilled_at)
+                        .where(RateLimitBucket.bucket_key == key)
+                        .with_for_update()
+                    ).first()
+
+                    if row is None:
+                        tokens, retry_after = _take(capacity, now, now, capacity, refill_per_second, cost)
+                        conn.execute(insert(RateLimitBucket).values(bucket_key=key, tokens=tokens, refilled_at=now))
+                        return retry_after
+
+                    tokens, retry_after = _take(row.tokens, row.refilled_at, now, capacity, refill_per_second, cost)
+                    conn.execute(
+                        update(RateLimitBucket)
+                        .where(RateLimitBucket.bucket_key == key)
+                        .values(tokens=tokens, refilled_at=now)
+                    )
+                    return retry_after
+            except IntegrityError:
+                # Another worker created the bucket row first; retry against it
+                continue
+        raise RuntimeError(f"Could not update rate limit bucket {key}")
+
+    def prune(self, idle_before: float) -> None:
+        """Delete buckets untouched since idle_before; they would have refilled completely"""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(delete(RateLimitBucket).where(RateLimitBucket.refilled_at < idle_before))
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not prune rate limit buckets: {e}")
+
+
+class TokenBucket:
+    """One family of buckets (e.g. per client IP): `burst` attempts at once, refilled at per_minute"""
+
+    def __init__(self, name: str, burst: float, per_minute: float, store):
+        self.name = name
+        self.burst = burst
+        self.refill_per_second = per_minute / 60.0
+        self.store = store
+
+    async def hit(self, key: str, cost: float = 1.0) -> float:
+        """Take `cost` tokens from the bucket for `key`; returns 0, or seconds to wait when empty"""
+        bucket_key = f"{self.name}:{key}"
+        if self.store.blocking:
+            return await run_in_threadpool(self.store.take, bucket_key, self.burst, self.refill_per_second, cost)
+        return self.store.take(bucket_key, self.burst, self.refill_per_second, cost)
+
+
+def client_ip(request: Request) -> str:
+    """Address of the client; behind a proxy run uvicorn with --proxy-headers so this is the real client"""
+    return request.client.host if request.client else "unknown"
+
+
+class LoginRateLimiter:
+    """Token buckets per client IP and per account, checked before any password work.
+
+    The IP bucket absorbs a burst from one client (or NAT) and the account
+    bucket stops a distributed guess against one login; both are refilled
+    continuously rather than reset per window. State is per process unless
+    LOGIN_RATE_LIMIT_STORE is "database".
+    """
+
+    def __init__(self, store=None):
+        if store is None:
+            store = DatabaseBucketStore() if settings.LOGIN_RATE_LIMIT_STORE == "database" else MemoryBucketStore()
+        self.store = store
+        self.by_ip = TokenBucket(
+            "login:ip", settings.LOGIN_RATE_LIMIT_IP_BURST, settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE, store
+        )
+        self.by_account = TokenBucket(
+            "login:account", settings.LOGIN_RATE_LIMIT_ACCOUNT_BURST, settings.LOGIN_RATE_LIMIT_ACCOUNT_PER_MINUTE, store
+        )
+
+    async def check(self, request: Request, account: Optional[str] = None) -> None:
+        """Raise RateLimitExceeded (429 with Retry-After) when either bucket is empty"""
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+
+        ip = client_ip(request)
+        account = account.strip().lower() if account else None
+        retry_after = await self.by_ip.hit(ip)
+        if not retry_after and account:
+            retry_after = await self.by_account.hit(account)
+        if retry_after:
+            logger.warning(f"Login rate limit hit for {account or '-'} from {ip}; retry in {retry_after:.1f}s")
+            raise RateLimitExceeded(retry_after)
+
+
+login_rate_limiter = LoginRateLimiter()
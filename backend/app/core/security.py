@@ -1,5 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
+import threading
+import uuid
 from typing import Optional, Dict, Any
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -17,6 +22,7 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire, "iat": datetime.utcnow()})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -40,6 +46,63 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasherBusy(HTTPException):
+    """More password hashes are waiting than PASSWORD_HASH_MAX_QUEUE allows"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool instead of the event loop.
+
+    A bcrypt hash or verify takes ~250 ms of CPU. The bcrypt extension releases
+    the GIL, so PASSWORD_HASH_WORKERS threads hash in parallel while the event
+    loop keeps serving other requests. Calls beyond the workers queue up; once
+    PASSWORD_HASH_MAX_QUEUE are waiting, new ones fail fast with
+    PasswordHasherBusy instead of queueing for seconds behind a login burst.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_queue = max_queue if max_queue is not None else settings.PASSWORD_HASH_MAX_QUEUE
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Hashes running or waiting for a thread"""
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                raise PasswordHasherBusy()
+            self._pending += 1
+            if self._executor is None:
+                # Created on first use so forked uvicorn workers each get their own threads
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+password_hasher = PasswordHasher()
+
+
 def generate_transaction_id() -> str:
     """Generate unique transaction ID (T001, T002, etc.)"""
     # This will be implemented in the service layer with database sequence
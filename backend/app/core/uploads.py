@@ -0,0 +1,133 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Protocol, Tuple
+
+import multipart
+from multipart.multipart import parse_options_header
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+
+MAX_FORM_OVERHEAD = 64 * 1024  # boundaries, part headers and the text fields sent with the file
+MAX_FORM_FIELDS = 20
+
+
+class UploadTooLarge(ValueError):
+    """The uploaded file (or the request body carrying it) is over the size limit"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"File size exceeds maximum allowed size of {max_size / (1024*1024)}MB")
+
+
+class FileSink(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+
+class ReceivedForm(NamedTuple):
+    fields: Dict[str, str]
+    filename: Optional[str]  # None when the form had no file part
+    content_type: Optional[str]
+
+
+async def receive_file_upload(
+    request: Request,
+    open_file: Callable[[str, Optional[str]], FileSink],
+    max_file_size: int
+) -> ReceivedForm:
+    """Parse a multipart/form-data body with a single file part as it arrives.
+
+    open_file(filename, content_type) is called in the threadpool once the
+    file part's headers are in and may raise ValueError to refuse the file.
+    The part's content is then written to the returned sink chunk by chunk,
+    also in the threadpool; text fields are collected. Nothing is spooled:
+    a Content-Length over max_file_size plus MAX_FORM_OVERHEAD is refused
+    before the body is read, and reading stops as soon as more than that has
+    arrived. Raises UploadTooLarge for those, ValueError for a malformed form.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data body")
+    charset = params.get(b"charset", b"utf-8").decode("latin-1")
+
+    max_body_size = max_file_size + MAX_FORM_OVERHEAD
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_body_size:
+        raise UploadTooLarge(max_file_size)
+
+    fields: Dict[str, str] = {}
+    file_info: List[Tuple[str, Optional[str]]] = []
+    # Parser callbacks cannot await; file events are queued and handled after each chunk
+    events: List[Tuple[str, object]] = []
+    part: Dict[str, object] = {}
+    header = [b"", b""]
+
+    def on_part_begin() -> None:
+        part.clear()
+        part.update(headers={}, data=bytearray(), is_file=False)
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header[0] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header[1] += data[start:end]
+
+    def on_header_end() -> None:
+        part["headers"][header[0].lower()] = header[1]
+        header[0], header[1] = b"", b""
+
+    def on_headers_finished() -> None:
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise ValueError('Form part without a Content-Disposition "name"')
+        part["name"] = options[b"name"].decode(charset, "replace")
+        if b"filename" in options:
+            if file_info:
+                raise ValueError("Only one file can be uploaded at a time")
+            part["is_file"] = True
+            file_content_type = part["headers"].get(b"content-type")
+            file_info.append((
+                options[b"filename"].decode(charset, "replace"),
+                file_content_type.decode("latin-1") if file_content_type else None
+            ))
+            events.append(("open", file_info[0]))
+        elif len(fields) >= MAX_FORM_FIELDS:
+            raise ValueError(f"Too many form fields (at most {MAX_FORM_FIELDS})")
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if part["is_file"]:
+            events.append(("data", data[start:end]))
+        else:
+            part["data"] += data[start:end]
+
+    def on_part_end() -> None:
+        if not part["is_file"]:
+            fields[part["name"]] = part["data"].decode(charset, "replace")
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+
+    sink: Optional[FileSink] = None
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_body_size:
+            raise UploadTooLarge(max_file_size)
+        parser.write(chunk)
+
+        pending: List[bytes] = []
+        for kind, value in events:
+            if kind == "open":
+                sink = await run_in_threadpool(open_file, *value)
+            else:
+                pending.append(value)
+        events.clear()
+        if pending:
+            await run_in_threadpool(sink.write, b"".join(pending))
+    parser.finalize()
+
+    filename, file_content_type = file_info[0] if file_info else (None, None)
+    return ReceivedForm(fields, filename, file_content_type)
@@ -0,0 +1,49 @@
+from typing import Any, Dict, List, Sequence, Union
+from sqlalchemy import Table
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+
+def upsert(
+    db: Union[Session, Connection],
+    table: Table,
+    rows: List[Dict[str, Any]],
+    key_columns: Sequence[str],
+    update_columns: Sequence[str] = (),
+    increment_columns: Sequence[str] = ()
+) -> None:
+    """Multi-row INSERT ... ON DUPLICATE KEY UPDATE for a chunk of rows.
+
+    key_columns must be covered by a unique index on the table. update_columns are
+    overwritten with the incoming value; increment_columns are added to the stored
+    value (for counters). On MySQL this is a single INSERT ... ON DUPLICATE KEY
+    UPDATE; other dialects (SQLite for local runs) use the equivalent ON CONFLICT
+    DO UPDATE.
+    """
+    if not rows:
+        return
+
+    bind = db.get_bind() if isinstance(db, Session) else db
+    dialect = bind.dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table).values(rows)
+        incoming = stmt.inserted
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        stmt = pg_insert(table).values(rows)
+        incoming = stmt.excluded
+    else:
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(table).values(rows)
+        incoming = stmt.excluded
+
+    values = {col: incoming[col] for col in update_columns}
+    values.update({col: table.c[col] + incoming[col] for col in increment_columns})
+
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update(values)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_=values)
+
+    db.execute(stmt)
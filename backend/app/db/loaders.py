@@ -0,0 +1,28 @@
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy.orm import Session
+
+# Keys per IN (...) list; keeps statements well under max_allowed_packet
+IN_LIST_CHUNK_SIZE = 1000
+
+
+def load_map(db: Session, column, keys: Iterable[Any], *options) -> Dict[Any, Any]:
+    """Rows of column's model whose column value is in keys, keyed by that value.
+
+    Replaces a per-item .filter(Model.key == item.key).first() inside a loop
+    with one IN query per IN_LIST_CHUNK_SIZE distinct keys. column should be
+    unique (a business ID or primary key); None keys are skipped and missing
+    ones are simply absent, so callers keep their "if row else None" fallbacks.
+    options (e.g. selectinload(...)) are applied to the query.
+    """
+    wanted: List[Any] = list({key for key in keys if key is not None})
+    model = column.class_
+    rows: Dict[Any, Any] = {}
+    for start in range(0, len(wanted), IN_LIST_CHUNK_SIZE):
+        chunk = wanted[start:start + IN_LIST_CHUNK_SIZE]
+        query = db.query(model).filter(column.in_(chunk))
+        if options:
+            query = query.options(*options)
+        for row in query:
+            rows[getattr(row, column.key)] = row
+    return rows
@@ -0,0 +1,256 @@
+import base64
+import binascii
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Values accepted by the count= query parameter of paginated lists
+COUNT_MODES = ("exact", "approximate", "none")
+COUNT_MODE_PATTERN = "^(exact|approximate|none)$"
+
+
+class CountCache:
+    """LRU cache of list totals keyed by the filtered statement and its parameters.
+
+    Paging through a large filtered list otherwise repeats the same COUNT(*) on
+    every page. Entries live for PAGINATION_COUNT_CACHE_TTL_SECONDS, so a total
+    may lag new rows by that long; the rows of each page are always current.
+    """
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.PAGINATION_COUNT_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.PAGINATION_COUNT_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, total = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return total
+
+    def put(self, key: str, total: int) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache()
+
+
+# ----------------------------------------------------------------------
+# Cursors
+# ----------------------------------------------------------------------
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(column, value: Any) -> Any:
+    python_type = column.type.python_type
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(columns: Sequence, row: Any, direction: str) -> str:
+    """Opaque token for the position of row; "n" continues after it, "p" before it"""
+    payload = {"d": direction, "k": [_to_json(getattr(row, col.key)) for col in columns]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(columns: Sequence, cursor: str) -> Tuple[str, List[Any]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload["d"]
+        keys = payload["k"]
+        if direction not in ("n", "p") or len(keys) != len(columns):
+            raise ValueError
+        return direction, [_from_json(col, value) for col, value in zip(columns, keys)]
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        raise ValueError("Invalid pagination cursor")
+
+
+def _after(columns: Sequence, keys: List[Any], descending: bool):
+    """Row-value comparison (a, b) < (x, y), spelled out so MySQL uses a range scan"""
+    clauses = []
+    for position, column in enumerate(columns):
+        bound = column < keys[position] if descending else column > keys[position]
+        clauses.append(and_(*[c == k for c, k in zip(columns[:position], keys[:position])], bound))
+    return or_(*clauses)
+
+
+# ----------------------------------------------------------------------
+# Totals
+# ----------------------------------------------------------------------
+
+def _statement_key(query: Query) -> str:
+    compiled = query.statement.compile()
+    params = sorted((name, repr(value)) for name, value in compiled.params.items())
+    return f"{compiled}|{params}"
+
+
+def _exact_total(query: Query) -> int:
+    key = _statement_key(query)
+    total = count_cache.get(key)
+    if total is None:
+        total = query.count()
+        count_cache.put(key, total)
+    return total
+
+
+def _estimated_total(query: Query) -> Optional[int]:
+    """Optimizer row estimate for the filtered list (MySQL only), without counting"""
+    bind = query.session.get_bind()
+    if bind.dialect.name != "mysql":
+        return None
+    try:
+        sql = query.statement.compile(bind=bind, compile_kwargs={"literal_binds": True})
+        plan = query.session.execute(text(f"EXPLAIN {sql}")).mappings().first()
+    except Exception as e:
+        logger.warning(f"Row estimate unavailable, counting instead: {e}")
+        return None
+    if not plan or plan.get("rows") is None:
+        return None
+    return int(plan["rows"] * float(plan.get("filtered") or 100) / 100)
+
+
+# ----------------------------------------------------------------------
+# Paging
+# ----------------------------------------------------------------------
+
+class Page:
+    """One page of a keyset-paginated list plus the cursors around it"""
+
+    def __init__(self, items: list, page: Optional[int], page_size: int,
+                 next_cursor: Optional[str], prev_cursor: Optional[str],
+                 total: Optional[int], total_is_estimate: bool):
+        self.items = items
+        self.page = page
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+    def meta(self) -> Dict[str, Any]:
+        """Paging fields of the list response; total_pages stays for page-number clients"""
+        total_pages = None
+        if self.total is not None:
+            total_pages = (self.total + self.page_size - 1) // self.page_size
+        return {
+            "total": self.total,
+            "total_is_estimate": self.total_is_estimate,
+            "page": self.page,
+            "page_size": self.page_size,
+            "total_pages": total_pages,
+            "next_cursor": self.next_cursor,
+            "prev_cursor": self.prev_cursor
+        }
+
+
+def paginate(
+    query: Query,
+    order_columns: Sequence,
+    page_size: int,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    count: str = "exact"
+) -> Page:
+    """Newest-first page of query, ordered by order_columns descending.
+
+    order_columns must be NOT NULL and end in a unique column (the primary key),
+    e.g. (Transaction.transaction_date, Transaction.id). With a cursor the page
+    is read with a range condition on those columns, so its cost does not grow
+    with depth; the indexes on (filter column, sort column) serve it because
+    InnoDB secondary indexes end in the primary key. Without a cursor, page is
+    read with OFFSET as before, up to PAGINATION_MAX_OFFSET_ROWS rows deep.
+
+    count is "exact" (COUNT(*), reused per filter set for a short TTL),
+    "approximate" (optimizer estimate on MySQL, exact elsewhere) or "none".
+    Raises ValueError for a bad cursor or a page too deep for OFFSET.
+    """
+    if count not in COUNT_MODES:
+        raise ValueError(f"count must be one of {', '.join(COUNT_MODES)}")
+
+    total = None
+    total_is_estimate = False
+    if count == "approximate":
+        total = _estimated_total(query)
+        total_is_estimate = total is not None
+    if count != "none" and total is None:
+        total = _exact_total(query)
+
+    descending = [col.desc() for col in order_columns]
+
+    if cursor is None:
+        offset = (page - 1) * page_size
+        if offset > settings.PAGINATION_MAX_OFFSET_ROWS:
+            raise ValueError(
+                f"Page {page} is beyond {settings.PAGINATION_MAX_OFFSET_ROWS} rows; "
+                "follow next_cursor to page further"
+            )
+        rows = query.order_by(*descending).offset(offset).limit(page_size + 1).all()
+        items = rows[:page_size]
+        has_more = len(rows) > page_size
+        return Page(
+            items, page, page_size,
+            next_cursor=encode_cursor(order_columns, items[-1], "n") if has_more else None,
+            prev_cursor=encode_cursor(order_columns, items[0], "p") if page > 1 and items else None,
+            total=total, total_is_estimate=total_is_estimate
+        )
+
+    direction, keys = decode_cursor(order_columns, cursor)
+    if direction == "n":
+        rows = query.filter(_after(order_columns, keys, descending=True)).order_by(
+            *descending
+        ).limit(page_size + 1).all()
+        items = rows[:page_size]
+        has_newer, has_older = True, len(rows) > page_size
+    else:
+        # Walk back towards the newest rows, then restore newest-first order
+        rows = query.filter(_after(order_columns, keys, descending=False)).order_by(
+            *[col.asc() for col in order_columns]
+        ).limit(page_size + 1).all()
+        items = list(reversed(rows[:page_size]))
+        has_newer, has_older = len(rows) > page_size, True
+
+    return Page(
+        items, None, page_size,
+        next_cursor=encode_cursor(order_columns, items[-1], "n") if items and has_older else None,
+        prev_cursor=encode_cursor(order_columns, items[0], "p") if items and has_newer else None,
+        total=total, total_is_estimate=total_is_estimate
+    )
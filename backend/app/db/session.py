@@ -1,24 +1,44 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.core.metrics import TimedQueuePool, TimedAsyncQueuePool
 
 # Create database URL
 DATABASE_URL = f"mysql+pymysql://{settings.DATABASE_USER}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOST}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}"
 
+# Same database through the asyncio driver, for async def routes
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{settings.DATABASE_USER}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOST}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}"
+
 # Create engine with connection pooling for production performance
 engine = create_engine(
     DATABASE_URL,
+    poolclass=TimedQueuePool,  # QueuePool that reports checkout wait to /metrics
     pool_pre_ping=True,  # Test connections before using them
     pool_recycle=300,    # Recycle connections after 5 minutes
-    pool_size=10,        # Maintain 10 connections in pool
-    max_overflow=20,     # Allow up to 20 additional connections (corrected parameter name)
+    pool_size=settings.DATABASE_POOL_SIZE,        # Connections kept open in the pool
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,  # Additional connections allowed under load
     echo=False          # Set to True for SQL query logging in development
 )
 
+# Async engine with its own pool, sized like the sync one
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    echo=False
+)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Objects stay usable after commit; async sessions cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class for all models
 Base = declarative_base()
 
@@ -28,4 +48,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Dependency to get an async database session (for async def routes)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
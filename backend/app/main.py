@@ -1,6 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.session import engine
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import text
+from app.db.session import engine, async_engine
+from app.core.activity import activity_buffer
+from app.core.config import settings
+from app.core.profiling import query_profiler, QueryProfilerMiddleware
+from app.core.metrics import registry, pool_stats, MetricsMiddleware
 from app.db.base import BaseModel
 from app.routers import admin
 from app.routers import investor
@@ -27,6 +33,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in SQL profiling: per-request query counts in response headers and /admin/perf/queries
+if settings.SQL_PROFILING_ENABLED:
+    query_profiler.install(engine, async_engine.sync_engine)
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Request latency and in-flight gauges for /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 # app.include_router(auth_router, prefix="/api", tags=["authentication"])
 
@@ -52,6 +67,7 @@ app.include_router(admin.kyc_verification.router, tags=["admin"])
 app.include_router(admin.mandate_approvals.router, tags=["admin"])
 app.include_router(admin.regulatory_filings.router, tags=["admin"])
 app.include_router(admin.investor_management.router, tags=["admin"])
+app.include_router(admin.perf.router, tags=["admin"])
 
 # Include other routers
 app.include_router(investor.router, prefix="/api/investor", tags=["investor"])
@@ -60,6 +76,21 @@ app.include_router(distributor.router, prefix="/api/distributor", tags=["distrib
 app.include_router(sebi.router, prefix="/api/sebi", tags=["sebi"])
 
 
+@app.on_event("startup")
+async def start_activity_buffer():
+    activity_buffer.start()
+
+
+@app.on_event("shutdown")
+async def flush_activity_buffer():
+    activity_buffer.stop()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     return {
@@ -70,5 +101,30 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+def health_check(response: Response):
+    """Readiness: the database answers and the connection pool has headroom"""
+    pool = pool_stats(engine.pool)
+    checks = {"pool": pool}
+    ready = pool["saturation"] < settings.HEALTH_POOL_SATURATION_LIMIT
+    if ready:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            checks["database"] = "ok"
+        except Exception as e:
+            checks["database"] = f"unavailable: {e.__class__.__name__}"
+            ready = False
+    else:
+        # A check connection would queue behind the requests already waiting
+        checks["database"] = "skipped: pool saturated"
+
+    response.status_code = 200 if ready else 503
+    return {"status": "healthy" if ready else "unhealthy", "checks": checks}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("", status_code=404)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -5,27 +5,30 @@ from .amc import AMC
 from .scheme import Scheme, NAVHistory
 from .investor import Investor
 from .mandate import BankAccount, Nominee, SIPRegistration, SWPRegistration, STPRegistration
-from .folio import Folio
-from .transaction import Transaction
-from .document import Document
+from .folio import Folio, FolioUnitSnapshot, UnitLot, UnitLotConsumption
+from .transaction import Transaction, DailyTxnRollup
+from .document import Document, DocumentBlob
 from .unclaimed import UnclaimedAmount
 from .service_request import ServiceRequest, ServiceRequestType, ServiceRequestStatus, ServiceRequestPriority
-from .notification import Notification, NotificationType, NotificationPriority
+from .notification import Notification, NotificationCounter, NotificationType, NotificationPriority
 from .complaint import Complaint, ComplaintStatus, ComplaintCategory
 from .support import SupportTicket, TicketStatus, TicketPriority
 from .disclosure import Disclosure, DisclosureCategory
 from .distributor import Distributor, investor_agents
 from .admin import (
-    AdminUser, Approval, AuditLog, SystemAlert, BatchJob, Reconciliation,
+    AdminUser, Approval, AuditLog, SystemAlert, BatchJob, Reconciliation, ReconciliationResult,
     Exception, UserSession, SystemSetting, RegulatoryFiling
 )
+from .sequence import IdSequence
+from .rate_limit import RateLimitBucket
+from .email_outbox import EmailOutbox, EmailStatus
 
 # Import all models into the namespace
 __all__ = [
     "User", "AMC", "Scheme", "NAVHistory", "Investor",
     "BankAccount", "Nominee", "SIPRegistration", "SWPRegistration", "STPRegistration",
-    "Folio", "Transaction", "Document", "UnclaimedAmount", "ServiceRequest",
-    "Notification",    "NotificationType",
+    "Folio", "FolioUnitSnapshot", "UnitLot", "UnitLotConsumption", "Transaction", "DailyTxnRollup", "Document", "DocumentBlob", "UnclaimedAmount", "ServiceRequest",
+    "Notification",    "NotificationCounter",    "NotificationType",
     "NotificationPriority",
     "Complaint",
     "ComplaintStatus",
@@ -37,6 +40,7 @@ __all__ = [
     "DisclosureCategory",
     "Distributor",
     "investor_agents",
-    "AdminUser", "Approval", "AuditLog", "SystemAlert", "BatchJob", "Reconciliation",
-    "Exception", "UserSession", "SystemSetting", "RegulatoryFiling"
+    "AdminUser", "Approval", "AuditLog", "SystemAlert", "BatchJob", "Reconciliation", "ReconciliationResult",
+    "Exception", "UserSession", "SystemSetting", "RegulatoryFiling",
+    "IdSequence", "RateLimitBucket", "EmailOutbox", "EmailStatus"
 ]
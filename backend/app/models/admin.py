@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, DateTime, ForeignKey, Enum, JSON
+from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, DateTime, ForeignKey, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.db.base import BaseModel
@@ -42,6 +42,13 @@ class BatchJobStatus(enum.Enum):
     cancelled = "cancelled"
 
 
+class ReconciliationMatchStatus(enum.Enum):
+    matched = "matched"
+    amount_mismatch = "amount_mismatch"  # same transaction, different amount or units
+    missing_in_rta = "missing_in_rta"  # feed row with no RTA transaction
+    missing_in_feed = "missing_in_feed"  # RTA transaction absent from the feed
+
+
 class BatchJobType(enum.Enum):
     nav_upload = "nav_upload"
     idcw_processing = "idcw_processing"
@@ -230,6 +237,8 @@ class BatchJob(BaseModel):
     scheduled_at = Column(DateTime, nullable=False, index=True)
     started_at = Column(DateTime)
     completed_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # set by the running worker after every chunk
+    claim_token = Column(String(32))  # new on every claim; fences off a reclaimed job's previous worker
     
     # Status
     status = Column(Enum(BatchJobStatus), default=BatchJobStatus.pending, nullable=False, index=True)
@@ -292,6 +301,32 @@ class Reconciliation(BaseModel):
         return f"<Reconciliation(reconciliation_id={self.reconciliation_id}, date={self.reconciliation_date}, status={self.status})>"
 
 
+class ReconciliationResult(BaseModel):
+    """One matched or unmatched row of a reconciliation run"""
+    
+    __tablename__ = "reconciliation_results"
+    
+    reconciliation_id = Column(String(20), ForeignKey("reconciliations.reconciliation_id"), nullable=False)
+    match_status = Column(Enum(ReconciliationMatchStatus), nullable=False)
+    
+    # Feed side (null for missing_in_feed)
+    feed_line = Column(Integer)  # line number in the uploaded feed file
+    payment_reference = Column(String(100))
+    feed_amount = Column(DECIMAL(15, 2))
+    feed_units = Column(DECIMAL(15, 4))
+    
+    # RTA side (null for missing_in_rta); transaction_id is the one quoted by the feed there,
+    # so it is wider than transaction_history's IDs (longer values are clipped, see exception_data)
+    transaction_id = Column(String(50))
+    rta_amount = Column(DECIMAL(15, 2))
+    rta_units = Column(DECIMAL(15, 4))
+    
+    exception_id = Column(String(20))  # EXC raised for an unmatched row
+    
+    def __repr__(self):
+        return f"<ReconciliationResult(reconciliation_id={self.reconciliation_id}, status={self.match_status.value})>"
+
+
 class Exception(BaseModel):
     """Exception tracking for failed transactions and errors"""
     
@@ -408,3 +443,9 @@ class RegulatoryFiling(BaseModel):
         return f"<RegulatoryFiling(filing_id={self.filing_id}, type={self.filing_type}, status={self.status})>"
 
 
+# Create indexes for performance
+Index('idx_reconciliation_results_status', ReconciliationResult.reconciliation_id, ReconciliationResult.match_status)
+Index('idx_reconciliation_results_transaction', ReconciliationResult.reconciliation_id, ReconciliationResult.transaction_id)
+Index('idx_approvals_created', Approval.created_at)
+Index('idx_approvals_status_created', Approval.status, Approval.created_at)
+Index('idx_exceptions_status_occurred', Exception.status, Exception.occurred_at)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, ForeignKey, Enum
+from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.db.base import BaseModel
@@ -59,3 +59,24 @@ class Document(BaseModel):
         return f"<Document(id={self.id}, type={self.document_type.value}, name={self.document_name}, status={self.status.value})>"
 
 
+class DocumentBlob(BaseModel):
+    """A file of the content-addressed document store and the number of documents using it.
+
+    Storing and releasing a file lock its row (SELECT ... FOR UPDATE), so an
+    upload of identical content and the delete of its last document cannot
+    interleave between the reference count check and the file operation.
+    """
+
+    __tablename__ = "document_blobs"
+
+    checksum = Column(String(64), unique=True, nullable=False)  # SHA-256 of the content, also the file name
+    file_path = Column(String(500), nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)  # document rows pointing at the file
+
+    def __repr__(self):
+        return f"<DocumentBlob(checksum={self.checksum}, ref_count={self.ref_count})>"
+
+
+# Create indexes for performance
+Index('idx_document_checksum', Document.checksum)
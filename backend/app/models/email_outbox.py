@@ -0,0 +1,39 @@
+import enum
+from sqlalchemy import Column, String, Text, Integer, DateTime, Enum, JSON, Index
+from app.db.base import BaseModel
+
+
+class EmailStatus(enum.Enum):
+    pending = "pending"  # waiting for its first attempt or a retry
+    sending = "sending"  # claimed by a sender
+    sent = "sent"
+    failed = "failed"  # rejected permanently or out of attempts
+
+
+class EmailOutbox(BaseModel):
+    """Emails waiting for (or done with) delivery by run_email_sender.py
+
+    Requests only insert rows here, in the same transaction as the change
+    that triggers the email; the sender renders the template and delivers
+    them over pooled SMTP connections.
+    """
+
+    __tablename__ = "email_outbox"
+
+    template = Column(String(50), nullable=False)  # key of EMAIL_TEMPLATES
+    recipient_email = Column(String(255), nullable=False)
+    context = Column(JSON(none_as_null=True))  # template values; cleared once sent
+    status = Column(Enum(EmailStatus), default=EmailStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=False)
+    claimed_by = Column(String(100))  # sender that holds a sending row
+    claimed_at = Column(DateTime)
+    sent_at = Column(DateTime)
+    last_error = Column(Text)
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, template={self.template}, to={self.recipient_email}, status={self.status.value})>"
+
+
+# Create indexes for performance
+Index('idx_email_outbox_due', EmailOutbox.status, EmailOutbox.next_attempt_at)
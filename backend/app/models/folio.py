@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, ForeignKey, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.db.base import BaseModel
@@ -76,4 +76,78 @@ class Folio(BaseModel):
         return 0.00
 
     def __repr__(self):
-        return f"<Folio(folio_number={self.folio_number}, investor_id={self.investor_id}, scheme_id={self.scheme_id}, units={self.total_units}, value={self.total_value})>"
\ No newline at end of file
+        return f"<Folio(folio_number={self.folio_number}, investor_id={self.investor_id}, scheme_id={self.scheme_id}, units={self.total_units}, value={self.total_value})>"
+
+
+class FolioUnitSnapshot(BaseModel):
+    """Checkpointed unit balance of a folio as of a date (typically month-end)
+
+    Built from completed transaction_history rows. Units as of any date D are the
+    latest snapshot on or before D plus the transactions after it, so point-in-time
+    AUM never has to replay a folio's full history.
+    """
+
+    __tablename__ = "folio_unit_snapshots"
+    __table_args__ = (
+        UniqueConstraint('snapshot_date', 'folio_number', name='uq_unit_snapshot_date_folio'),
+    )
+
+    snapshot_date = Column(Date, nullable=False, index=True)
+    folio_number = Column(String(15), ForeignKey("folio_holdings.folio_number"), nullable=False)
+    scheme_id = Column(String(10), ForeignKey("scheme_master.scheme_id"), nullable=False)
+    amc_id = Column(String(10), ForeignKey("amc_master.amc_id"), nullable=False)
+    total_units = Column(DECIMAL(15, 4), default=0.0000, nullable=False)
+
+    def __repr__(self):
+        return f"<FolioUnitSnapshot(date={self.snapshot_date}, folio_number={self.folio_number}, units={self.total_units})>"
+
+
+class UnitLot(BaseModel):
+    """Units acquired by one purchase-side transaction, consumed FIFO by redemptions
+
+    One lot per purchase, SIP, switch-in, STP-in or IDCW reinvestment. open_units is
+    what is still held; a lot with open_units = 0 is fully consumed.
+    """
+
+    __tablename__ = "unit_lots"
+
+    transaction_id = Column(String(15), ForeignKey("transaction_history.transaction_id"), unique=True, nullable=False)
+    folio_number = Column(String(15), ForeignKey("folio_holdings.folio_number"), nullable=False)
+    investor_id = Column(String(10), ForeignKey("investor_master.investor_id"), nullable=False, index=True)
+    scheme_id = Column(String(10), ForeignKey("scheme_master.scheme_id"), nullable=False)
+
+    acquisition_date = Column(Date, nullable=False)
+    cost_nav = Column(DECIMAL(10, 4), nullable=False)
+    original_units = Column(DECIMAL(15, 4), nullable=False)
+    open_units = Column(DECIMAL(15, 4), nullable=False)
+
+    def __repr__(self):
+        return f"<UnitLot(transaction_id={self.transaction_id}, folio_number={self.folio_number}, open_units={self.open_units})>"
+
+
+class UnitLotConsumption(BaseModel):
+    """Units of a lot matched against a redemption-side transaction (realized gain row)"""
+
+    __tablename__ = "unit_lot_consumptions"
+
+    transaction_id = Column(String(15), ForeignKey("transaction_history.transaction_id"), nullable=False, index=True)
+    lot_transaction_id = Column(String(15), ForeignKey("unit_lots.transaction_id"), nullable=False, index=True)
+    folio_number = Column(String(15), ForeignKey("folio_holdings.folio_number"), nullable=False)
+    investor_id = Column(String(10), ForeignKey("investor_master.investor_id"), nullable=False)
+    scheme_id = Column(String(10), ForeignKey("scheme_master.scheme_id"), nullable=False)
+
+    units = Column(DECIMAL(15, 4), nullable=False)
+    acquisition_date = Column(Date, nullable=False)
+    cost_nav = Column(DECIMAL(10, 4), nullable=False)
+    redemption_date = Column(Date, nullable=False)
+    redemption_nav = Column(DECIMAL(10, 4), nullable=False)
+
+    def __repr__(self):
+        return f"<UnitLotConsumption(transaction_id={self.transaction_id}, lot={self.lot_transaction_id}, units={self.units})>"
+
+
+# Create indexes for performance
+Index('idx_unit_snapshot_date_amc_scheme', FolioUnitSnapshot.snapshot_date, FolioUnitSnapshot.amc_id, FolioUnitSnapshot.scheme_id)
+Index('idx_unit_lot_folio_fifo', UnitLot.folio_number, UnitLot.acquisition_date, UnitLot.id)
+Index('idx_unit_lot_consumption_investor_date', UnitLotConsumption.investor_id, UnitLotConsumption.redemption_date)
+Index('idx_unit_lot_consumption_folio_date', UnitLotConsumption.folio_number, UnitLotConsumption.redemption_date)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, ForeignKey, Enum
+from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.db.base import BaseModel
@@ -126,4 +126,11 @@ class Investor(BaseModel):
     support_tickets = relationship("SupportTicket", back_populates="investor", cascade="all, delete-orphan")
 
     def __repr__(self):
-        return f"<Investor(id={self.id}, investor_id={self.investor_id}, name={self.full_name}, kyc_status={self.kyc_status.value})>"
\ No newline at end of file
+        return f"<Investor(id={self.id}, investor_id={self.investor_id}, name={self.full_name}, kyc_status={self.kyc_status.value})>"
+
+
+# Create indexes for performance
+Index('idx_investor_mobile', Investor.mobile_number)
+Index('idx_investor_kyc_status_submitted', Investor.kyc_status, Investor.kyc_submitted_date)
+# Name search (InvestorSearchService); a plain index on databases without FULLTEXT
+Index('ftx_investor_full_name', Investor.full_name, mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
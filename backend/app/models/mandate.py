@@ -251,4 +251,8 @@ class STPRegistration(SQLAlchemyBaseModel):
     investor = relationship("Investor", back_populates="stp_registrations")
 
     def __repr__(self):
-        return f"<STPRegistration(id={self.registration_id}, investor_id={self.investor_id}, amount={self.amount}, status={self.status.value})>"
\ No newline at end of file
+        return f"<STPRegistration(id={self.registration_id}, investor_id={self.investor_id}, amount={self.amount}, status={self.status.value})>"
+
+# Create indexes for performance
+from sqlalchemy import Index
+Index('idx_sip_status_next_installment', SIPRegistration.status, SIPRegistration.next_installment_date)
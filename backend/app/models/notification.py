@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, Enum, DateTime
+from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, Enum, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import BaseModel as SQLAlchemyBaseModel
@@ -41,3 +41,23 @@ class Notification(SQLAlchemyBaseModel):
 
     def __repr__(self):
         return f"<Notification(id={self.id}, type={self.notification_type.value}, read={self.is_read})>"
+
+
+class NotificationCounter(SQLAlchemyBaseModel):
+    """Unread notifications per investor, kept in step with notifications by NotificationService
+
+    Read by the bell icon instead of counting rows; rebuilt from notifications
+    by prune_notifications.py --rebuild-counters.
+    """
+    __tablename__ = "notification_counters"
+
+    investor_id = Column(String(10), ForeignKey("investor_master.investor_id"), unique=True, nullable=False)
+    unread_count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<NotificationCounter(investor_id={self.investor_id}, unread={self.unread_count})>"
+
+
+# Create indexes for performance
+Index('idx_notifications_investor_read', Notification.investor_id, Notification.is_read)
+Index('idx_notifications_created', Notification.created_at)
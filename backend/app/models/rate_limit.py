@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Float
+from app.db.base import BaseModel
+
+
+class RateLimitBucket(BaseModel):
+    """Token bucket state shared by all workers (LOGIN_RATE_LIMIT_STORE = "database")
+
+    tokens is the bucket level as of refilled_at (epoch seconds); the refill since
+    then is computed on each attempt under a row lock.
+    """
+
+    __tablename__ = "rate_limit_buckets"
+
+    bucket_key = Column(String(255), unique=True, nullable=False, index=True)  # login:ip:10.0.0.1, login:account:...
+    tokens = Column(Float, nullable=False)
+    refilled_at = Column(Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RateLimitBucket(key={self.bucket_key}, tokens={self.tokens})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, ForeignKey, Date, Enum
+from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, ForeignKey, Date, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 import enum
 from datetime import date
@@ -79,6 +79,9 @@ class NAVHistory(BaseModel):
     """Historical NAV data for schemes"""
 
     __tablename__ = "nav_history"
+    __table_args__ = (
+        UniqueConstraint('scheme_id', 'nav_date', name='uq_nav_history_scheme_date'),
+    )
 
     scheme_id = Column(String(10), ForeignKey("scheme_master.scheme_id"), nullable=False, index=True)
     nav_date = Column(Date, nullable=False, index=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, BigInteger
+from app.db.base import BaseModel
+
+
+class IdSequence(BaseModel):
+    """Counter row backing block-allocated business IDs (T001, F001, I001, SIP001, etc.)
+
+    next_value is the first number not yet handed out to any process. Allocators
+    reserve a whole block by advancing it under a row lock, then issue numbers from
+    memory, so IDs are unique across workers but may contain gaps.
+    """
+
+    __tablename__ = "id_sequences"
+
+    sequence_name = Column(String(50), unique=True, nullable=False, index=True)  # transaction, folio, etc.
+    next_value = Column(BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<IdSequence(name={self.sequence_name}, next_value={self.next_value})>"
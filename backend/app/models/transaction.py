@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, DateTime, ForeignKey, Enum, Index
+from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, DateTime, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 import enum
 from app.db.base import BaseModel
@@ -89,7 +89,7 @@ class Transaction(BaseModel):
     # STP/Switch Related Fields
     parent_transaction_id = Column(String(15))  # References transaction_history.transaction_id (no FK constraint for self-reference)
     linked_transaction_id = Column(String(15))  # For STP/Switch pairs
-    transfer_request_id = Column(String(20))  # STP001, SWI001, etc.
+    transfer_request_id = Column(String(20))  # STP001, SWI001, etc.; IDCW batch job_id for IDCW rows
 
     # IDCW Related Fields
     idcw_rate = Column(DECIMAL(5, 2))  # IDCW percentage
@@ -152,9 +152,41 @@ class Transaction(BaseModel):
         return f"<Transaction(id={self.transaction_id}, type={self.transaction_type.value}, amount={self.amount}, status={self.status.value})>"
 
 
+class DailyTxnRollup(BaseModel):
+    """Pre-aggregated transaction counts and totals per day, scheme, AMC, type and status
+
+    Maintained incrementally whenever transaction rows are written and rebuilt
+    nightly for backfills, so dashboards never aggregate transaction_history.
+    """
+
+    __tablename__ = "daily_txn_rollup"
+    __table_args__ = (
+        UniqueConstraint(
+            'rollup_date', 'scheme_id', 'amc_id', 'transaction_type', 'status',
+            name='uq_daily_txn_rollup_bucket'
+        ),
+    )
+
+    rollup_date = Column(Date, nullable=False)  # transaction_date
+    scheme_id = Column(String(10), nullable=False)
+    amc_id = Column(String(10), nullable=False)
+    transaction_type = Column(Enum(TransactionType), nullable=False)
+    status = Column(Enum(TransactionStatus), nullable=False)
+
+    txn_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(DECIMAL(20, 2), default=0.00, nullable=False)
+    total_units = Column(DECIMAL(20, 4), default=0.0000, nullable=False)
+
+    def __repr__(self):
+        return f"<DailyTxnRollup(date={self.rollup_date}, scheme_id={self.scheme_id}, type={self.transaction_type.value}, status={self.status.value}, count={self.txn_count})>"
+
+
 # Create indexes for performance
 Index('idx_transaction_investor_date', Transaction.investor_id, Transaction.transaction_date)
 Index('idx_transaction_folio_date', Transaction.folio_number, Transaction.transaction_date)
 Index('idx_transaction_scheme_date', Transaction.scheme_id, Transaction.transaction_date)
 Index('idx_transaction_status_date', Transaction.status, Transaction.transaction_date)
-Index('idx_transaction_type_date', Transaction.transaction_type, Transaction.transaction_date)
\ No newline at end of file
+Index('idx_transaction_status_completion', Transaction.status, Transaction.completion_date)
+Index('idx_transaction_type_date', Transaction.transaction_type, Transaction.transaction_date)
+Index('idx_transaction_transfer_request_folio', Transaction.transfer_request_id, Transaction.folio_number)
+Index('idx_daily_txn_rollup_status_date', DailyTxnRollup.status, DailyTxnRollup.rollup_date)
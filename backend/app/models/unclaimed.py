@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DECIMAL, Date, ForeignKey, Integer, Boolean
+from sqlalchemy import Column, String, DECIMAL, Date, ForeignKey, Integer, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.base import BaseModel
 
@@ -49,3 +49,7 @@ class UnclaimedAmount(BaseModel):
     
     def __repr__(self):
         return f"<UnclaimedAmount(id={self.id}, amount={self.amount}, claimed={self.claimed})>"
+
+
+# Create indexes for performance
+Index('idx_unclaimed_date', UnclaimedAmount.unclaimed_date)
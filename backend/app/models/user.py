@@ -1,5 +1,6 @@
 from sqlalchemy import Column, String, Text, Boolean, Integer, DECIMAL, Date, DateTime, ForeignKey, Enum, JSON
 from sqlalchemy.orm import relationship
+from datetime import datetime
 import enum
 from app.db.base import BaseModel
 from passlib.context import CryptContext
@@ -88,7 +89,7 @@ class User(BaseModel):
         """Check if account is currently locked"""
         if self.status == UserStatus.locked:
             return True
-        if self.account_locked_until and self.account_locked_until > DateTime.utcnow():
+        if self.account_locked_until and self.account_locked_until > datetime.utcnow():
             return True
         return False
 
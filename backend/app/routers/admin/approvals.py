@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import and_, or_, desc
 from datetime import datetime
 from typing import Optional
@@ -11,6 +11,8 @@ from app.models.user import User
 from app.core.jwt import get_current_user
 from app.core.permissions import has_permission
 from app.core.roles import AdminPermissions
+from app.db.pagination import paginate, COUNT_MODE_PATTERN
+from app.db.loaders import load_map
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin/approvals", tags=["admin"])
@@ -25,6 +27,8 @@ class ApprovalAction(BaseModel):
 async def get_approvals(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_MODE_PATTERN),
     status: Optional[str] = None,
     approval_type: Optional[str] = None,
     priority: Optional[str] = None,
@@ -54,19 +58,22 @@ async def get_approvals(
     if priority:
         query = query.filter(Approval.priority == priority)
     
-    # Get total count
-    total = query.count()
+    try:
+        result = paginate(
+            query, (Approval.created_at, Approval.id),
+            page_size=page_size, page=page, cursor=cursor, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Apply pagination
-    approvals = query.order_by(desc(Approval.created_at)).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+    approvers = load_map(
+        db, AdminUser.admin_id, (approval.approver_id for approval in result.items),
+        selectinload(AdminUser.user)
+    )
     
     approval_list = []
-    for approval in approvals:
-        approver = db.query(AdminUser).filter(
-            AdminUser.admin_id == approval.approver_id
-        ).first()
+    for approval in result.items:
+        approver = approvers.get(approval.approver_id)
         
         approval_list.append({
             "approval_id": approval.approval_id,
@@ -85,10 +92,7 @@ async def get_approvals(
     
     return {
         "approvals": approval_list,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        **result.meta()
     }
 
 
@@ -9,6 +9,7 @@ from app.core.jwt import get_current_user
 from app.core.permissions import has_permission
 from app.core.roles import AdminPermissions
 from app.models.user import User
+from app.db.pagination import paginate, COUNT_MODE_PATTERN
 
 router = APIRouter(prefix="/admin/audit", tags=["admin"])
 
@@ -17,6 +18,8 @@ router = APIRouter(prefix="/admin/audit", tags=["admin"])
 async def get_audit_logs(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_MODE_PATTERN),
     action: Optional[str] = None,
     user_id: Optional[int] = None,
     entity_type: Optional[str] = None,
@@ -49,16 +52,16 @@ async def get_audit_logs(
     if end_date:
         query = query.filter(AuditLog.timestamp <= end_date)
     
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination
-    logs = query.order_by(desc(AuditLog.timestamp)).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+    try:
+        result = paginate(
+            query, (AuditLog.timestamp, AuditLog.id),
+            page_size=page_size, page=page, cursor=cursor, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     log_list = []
-    for log in logs:
+    for log in result.items:
         log_list.append({
             "log_id": log.log_id,
             "action": log.action.value,
@@ -75,10 +78,7 @@ async def get_audit_logs(
     
     return {
         "logs": log_list,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        **result.meta()
     }
 
 
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.user import User, UserRole
 from app.schemas.admin_auth import AdminLoginRequest, AdminRegisterRequest, AdminUserResponse, AdminRole
-from app.core.security import create_access_token
+from app.core.security import create_access_token, password_hasher
 from app.core.jwt import get_current_user
+from app.core.principal import principal_cache
+from app.core.rate_limit import login_rate_limiter
 from datetime import timedelta
 from typing import Any
+import anyio
 import os
 
 router = APIRouter(prefix="/admin/auth", tags=["admin-auth"])
@@ -14,21 +17,30 @@ router = APIRouter(prefix="/admin/auth", tags=["admin-auth"])
 # THIS SHOULD BE IN ENV
 ADMIN_REGISTRATION_SECRET = "rta_admin_secret_2024" 
 
+# These routes use the blocking Session, so they are plain def and run in the
+# threadpool; the rate limiter and password hasher are async and are called
+# back on the event loop with anyio.from_thread.run.
+
 @router.post("/login", response_model=dict)
 def login_admin(
     login_data: AdminLoginRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ) -> Any:
     """
     Admin Login
     """
+    anyio.from_thread.run(login_rate_limiter.check, request, login_data.email)
+
     user = db.query(User).filter(User.email == login_data.email).first()
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
-    if not user.verify_password(login_data.password):
+    if not anyio.from_thread.run(password_hasher.verify, login_data.password, user.hashed_password):
         user.increment_failed_attempts()
         db.commit()
+        if user.is_account_locked:
+            principal_cache.invalidate_user(user.id)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
         
     if user.status.value == "locked":
@@ -66,11 +78,14 @@ def login_admin(
 @router.post("/register", response_model=AdminUserResponse)
 def register_admin(
     reg_data: AdminRegisterRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ) -> Any:
     """
     Register a new Admin User (Protected by Secret Key)
     """
+    anyio.from_thread.run(login_rate_limiter.check, request)
+
     if reg_data.secret_key != ADMIN_REGISTRATION_SECRET:
         raise HTTPException(status_code=403, detail="Invalid registration secret")
 
@@ -88,13 +103,13 @@ def register_admin(
 
     user = User(
         email=reg_data.email,
+        hashed_password=anyio.from_thread.run(password_hasher.hash, reg_data.password),
         full_name=reg_data.full_name,
         role=UserRole.admin,
         sub_role=reg_data.sub_role.value,
         admin_employee_id=reg_data.employee_id,
         is_active=True,
     )
-    user.set_password(reg_data.password)
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional
 from app.db.session import get_db
-from app.models.admin import BatchJob, BatchJobType, BatchJobStatus
+from app.models.admin import AdminUser, BatchJob, BatchJobType, BatchJobStatus
+from app.services.sip_batch_service import SIPBatchService, DEFAULT_CHUNK_SIZE
+from app.services.cas_service import CASService, DEFAULT_CHUNK_SIZE as CAS_CHUNK_SIZE
+from app.services.job_service import JobService
 from app.core.jwt import get_current_user
 from app.models.user import User
 
@@ -119,7 +122,11 @@ async def cancel_batch_job(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Cancel a running batch job"""
+    """Cancel a pending or running batch job.
+
+    A running job stops at its next chunk boundary; the chunks it already
+    committed are kept and the job can be re-queued to continue.
+    """
     
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -131,17 +138,139 @@ async def cancel_batch_job(
     if not job:
         raise HTTPException(status_code=404, detail="Batch job not found")
     
-    if job.status != BatchJobStatus.running:
-        raise HTTPException(status_code=400, detail="Only running jobs can be cancelled")
+    try:
+        job = JobService(db).cancel(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    job.status = BatchJobStatus.cancelled
-    job.completed_at = datetime.now()
+    return {
+        "message": "Batch job cancelled successfully",
+        "job_id": job_id,
+        "status": job.status.value
+    }
+
+
+@router.post("/{job_id}/requeue", status_code=202)
+async def requeue_batch_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a failed or cancelled job again; it continues from its last checkpoint"""
+    
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    db.commit()
+    try:
+        job = JobService(db).requeue(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
-        "message": "Batch job cancelled successfully",
-        "job_id": job_id
+        "message": "Batch job queued",
+        "job_id": job.job_id,
+        "status": job.status.value
     }
 
 
+@router.post("/sip/run", status_code=202)
+async def run_sip_batch(
+    run_date: Optional[date] = None,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=100, le=10000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a batch job processing every SIP installment due on or before run_date"""
+    
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    admin_rec = db.query(AdminUser).filter(AdminUser.user_id == current_user.id).first()
+    
+    service = SIPBatchService(db, chunk_size=chunk_size)
+    job = service.create_job(run_date or date.today(), executed_by=admin_rec.admin_id if admin_rec else None)
+    
+    return {
+        "message": "SIP batch run queued",
+        "job_id": job.job_id,
+        "status": job.status.value
+    }
+
+
+@router.post("/sip/{job_id}/resume", status_code=202)
+async def resume_sip_batch(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a failed SIP batch job again from its last committed checkpoint"""
+    
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        job = JobService(db).requeue(job_id, BatchJobType.sip_processing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "message": "SIP batch run queued",
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "records_processed": job.records_processed
+    }
+
+
+@router.post("/cas/run", status_code=202)
+async def run_cas_batch(
+    from_date: date,
+    to_date: date,
+    format: str = Query("json", pattern="^(json|csv)$"),
+    chunk_size: int = Query(CAS_CHUNK_SIZE, ge=50, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue CAS generation for every investor into the job's spool directory"""
+    
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date must be on or before to_date")
+    
+    admin_rec = db.query(AdminUser).filter(AdminUser.user_id == current_user.id).first()
+    
+    service = CASService(db, chunk_size=chunk_size)
+    job = service.create_job(from_date, to_date, format, executed_by=admin_rec.admin_id if admin_rec else None)
+    
+    return {
+        "message": "CAS batch run queued",
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "output_file_path": job.output_file_path
+    }
+
+
+@router.post("/cas/{job_id}/resume", status_code=202)
+async def resume_cas_batch(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a failed CAS batch job again after its last fully rendered chunk"""
+    
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        job = JobService(db).requeue(job_id, BatchJobType.statement_generation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "message": "CAS batch run queued",
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "records_processed": job.records_processed,
+        "output_file_path": job.output_file_path
+    }
@@ -11,6 +11,7 @@ from app.models.admin import SystemAlert, SystemAlertType, AuditLog, BatchJob, B
 from app.models.scheme import Scheme
 from app.models.amc import AMC
 from app.models.unclaimed import UnclaimedAmount
+from app.services.rollup_service import RollupService
 from app.core.jwt import get_current_user
 from app.core.permissions import has_permission
 from app.core.roles import AdminPermissions
@@ -31,16 +32,15 @@ async def get_admin_dashboard(
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     
-    # Transaction Statistics
-    total_transactions = db.query(func.count(Transaction.id)).scalar() or 0
-    pending_transactions = db.query(func.count(Transaction.id)).filter(
-        Transaction.status == TransactionStatus.pending
-    ).scalar() or 0
+    # Transaction Statistics (from the daily rollup, never a scan of transaction_history)
+    rollup = RollupService(db)
+    total_transactions = rollup.count()
+    pending_transactions = rollup.count(status=TransactionStatus.pending)
+    # The rollup is keyed by transaction date; this counts by completion date, which
+    # idx_transaction_status_completion narrows to today's completions
     completed_today = db.query(func.count(Transaction.id)).filter(
-        and_(
-            Transaction.status == TransactionStatus.completed,
-            func.date(Transaction.completion_date) == today
-        )
+        Transaction.status == TransactionStatus.completed,
+        Transaction.completion_date == today
     ).scalar() or 0
     
     # Financial Metrics
@@ -53,39 +53,7 @@ async def get_admin_dashboard(
     ).scalar() or 0
     
     # Fund Flow (Last 7 days)
-    fund_flow_data = []
-    for i in range(7):
-        date = today - timedelta(days=i)
-        inflows = db.query(func.sum(Transaction.amount)).filter(
-            and_(
-                func.date(Transaction.transaction_date) == date,
-                Transaction.transaction_type.in_([
-                    TransactionType.fresh_purchase,
-                    TransactionType.additional_purchase,
-                    TransactionType.sip
-                ]),
-                Transaction.status == TransactionStatus.completed
-            )
-        ).scalar() or 0
-        
-        outflows = db.query(func.sum(Transaction.amount)).filter(
-            and_(
-                func.date(Transaction.transaction_date) == date,
-                Transaction.transaction_type.in_([
-                    TransactionType.redemption,
-                    TransactionType.swp
-                ]),
-                Transaction.status == TransactionStatus.completed
-            )
-        ).scalar() or 0
-        
-        fund_flow_data.append({
-            "day": date.strftime("%Y-%m-%d"),
-            "inflow": float(inflows),
-            "outflow": float(outflows)
-        })
-    
-    fund_flow_data.reverse()
+    fund_flow_data = rollup.fund_flow(today - timedelta(days=6), today)
     
     # Reconciliation Status
     reconciliation_data = [
@@ -95,7 +63,7 @@ async def get_admin_dashboard(
     
     # Recent Activity (Last 10 transactions)
     recent_activity = db.query(Transaction).order_by(
-        Transaction.created_at.desc()
+        Transaction.id.desc()
     ).limit(10).all()
     
     activity_list = []
@@ -177,41 +145,18 @@ async def get_detailed_metrics(
     days = days_map.get(period, 7)
     start_date = datetime.now().date() - timedelta(days=days)
     
+    rollup = RollupService(db)
+
     # Transaction volume over time
-    transaction_volume = db.query(
-        func.date(Transaction.transaction_date).label("date"),
-        func.count(Transaction.id).label("count"),
-        func.sum(Transaction.amount).label("amount")
-    ).filter(
-        and_(
-            Transaction.transaction_date >= start_date,
-            Transaction.status == TransactionStatus.completed
-        )
-    ).group_by(func.date(Transaction.transaction_date)).all()
-    
-    volume_data = [
-        {
-            "date": row.date.strftime("%Y-%m-%d"),
-            "count": row.count,
-            "amount": float(row.amount or 0)
-        }
-        for row in transaction_volume
-    ]
+    volume_data = rollup.daily_volume(start_date)
     
     # Transaction type distribution
-    type_distribution = db.query(
-        Transaction.transaction_type,
-        func.count(Transaction.id).label("count")
-    ).filter(
-        Transaction.transaction_date >= start_date
-    ).group_by(Transaction.transaction_type).all()
-    
     type_data = [
         {
             "type": tx_type.value.replace("_", " ").title(),
             "count": count
         }
-        for tx_type, count in type_distribution
+        for tx_type, count in rollup.type_distribution(start_date)
     ]
     
     # Scheme performance
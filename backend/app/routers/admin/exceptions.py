@@ -8,6 +8,7 @@ from app.models.admin import Exception as ExceptionModel
 from app.core.jwt import get_current_user
 from app.models.user import User
 from app.models.admin import AdminUser
+from app.db.pagination import paginate, COUNT_MODE_PATTERN
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin/exceptions", tags=["admin"])
@@ -21,6 +22,8 @@ class ExceptionResolution(BaseModel):
 async def get_exceptions(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_MODE_PATTERN),
     status: Optional[str] = None,
     exception_type: Optional[str] = None,
     priority: Optional[str] = None,
@@ -41,14 +44,16 @@ async def get_exceptions(
     if priority:
         query = query.filter(ExceptionModel.priority == priority)
     
-    total = query.count()
-    
-    exceptions = query.order_by(desc(ExceptionModel.occurred_at)).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+    try:
+        result = paginate(
+            query, (ExceptionModel.occurred_at, ExceptionModel.id),
+            page_size=page_size, page=page, cursor=cursor, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     exception_list = []
-    for exc in exceptions:
+    for exc in result.items:
         exception_list.append({
             "exception_id": exc.exception_id,
             "exception_type": exc.exception_type,
@@ -67,10 +72,7 @@ async def get_exceptions(
     
     return {
         "exceptions": exception_list,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        **result.meta()
     }
 
 
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, func
 from datetime import datetime, date
+from decimal import Decimal
 from typing import Optional, List
 from app.db.session import get_db
 from app.models.transaction import Transaction, TransactionType, TransactionStatus
@@ -9,7 +10,12 @@ from app.models.folio import Folio
 from app.models.investor import Investor
 from app.models.scheme import Scheme
 from app.models.amc import AMC
-from app.models.admin import BatchJob, BatchJobType, BatchJobStatus
+from app.models.admin import AdminUser, BatchJob, BatchJobType, BatchJobStatus
+from app.services.lot_service import LotService
+from app.services.idcw_service import IDCWService, DEFAULT_CHUNK_SIZE as IDCW_CHUNK_SIZE
+from app.services.job_service import JobService
+from app.db.pagination import paginate, COUNT_MODE_PATTERN
+from app.db.loaders import load_map
 from app.core.jwt import get_current_user
 from app.models.user import User
 from pydantic import BaseModel
@@ -28,13 +34,18 @@ class IDCWDeclaration(BaseModel):
     description: Optional[str] = None
 
 
-@router.post("/declare")
+@router.post("/declare", status_code=202)
 async def declare_idcw(
     declaration: IDCWDeclaration,
+    chunk_size: int = Query(IDCW_CHUNK_SIZE, ge=100, le=50000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Declare IDCW (dividend) for a scheme"""
+    """Declare IDCW (dividend) for a scheme.
+
+    Queues a batch job that gives every folio holding units on the record date
+    a pending payout or reinvestment transaction, written in resumable chunks.
+    """
     
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -47,113 +58,115 @@ async def declare_idcw(
     if not scheme:
         raise HTTPException(status_code=404, detail="Scheme not found")
     
-    # Get all folios for this scheme
-    folios = db.query(Folio).filter(
-        and_(
-            Folio.scheme_id == declaration.scheme_id,
-            Folio.status == "active",
-            Folio.total_units > 0
+    admin_rec = db.query(AdminUser).filter(AdminUser.user_id == current_user.id).first()
+    service = IDCWService(db, chunk_size=chunk_size)
+    try:
+        batch_job = service.create_job(
+            scheme_id=declaration.scheme_id,
+            amc_id=declaration.amc_id,
+            idcw_rate=Decimal(str(declaration.idcw_rate)),
+            idcw_amount_per_unit=Decimal(str(declaration.idcw_amount_per_unit)),
+            declaration_date=declaration.declaration_date,
+            record_date=declaration.record_date,
+            payment_date=declaration.payment_date,
+            description=declaration.description,
+            executed_by=admin_rec.admin_id if admin_rec else None
         )
-    ).all()
-    
-    # Create batch job for IDCW processing
-    batch_job = BatchJob(
-        job_id=f"IDCW{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        job_type=BatchJobType.idcw_processing,
-        job_name=f"IDCW Declaration - {scheme.scheme_name}",
-        scheduled_at=datetime.now(),
-        started_at=datetime.now(),
-        status=BatchJobStatus.pending,
-        parameters={
-            "scheme_id": declaration.scheme_id,
-            "idcw_rate": declaration.idcw_rate,
-            "idcw_amount_per_unit": declaration.idcw_amount_per_unit,
-            "declaration_date": declaration.declaration_date.isoformat(),
-            "record_date": declaration.record_date.isoformat(),
-            "payment_date": declaration.payment_date.isoformat()
-        },
-        executed_by=current_user.email
-    )
-    db.add(batch_job)
-    db.flush()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Process IDCW for each folio
-    records_processed = 0
-    records_successful = 0
-    records_failed = 0
+    return {
+        "message": "IDCW declaration queued",
+        "job_id": batch_job.job_id,
+        "status": batch_job.status.value,
+        "scheme_id": declaration.scheme_id,
+        "scheme_name": scheme.scheme_name
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_idcw_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Progress and totals of an IDCW declaration and its processing"""
     
-    for folio in folios:
-        try:
-            records_processed += 1
-            
-            # Calculate IDCW amount
-            idcw_amount = folio.total_units * declaration.idcw_amount_per_unit
-            
-            # Determine transaction type based on folio option
-            if folio.idcw_option == "reinvestment":
-                tx_type = TransactionType.idcw_reinvestment
-                # Create reinvestment transaction
-                transaction = Transaction(
-                    transaction_id=f"IDCW{datetime.now().strftime('%Y%m%d%H%M%S')}{records_processed:04d}",
-                    investor_id=folio.investor_id,
-                    folio_number=folio.folio_number,
-                    scheme_id=folio.scheme_id,
-                    amc_id=folio.amc_id,
-                    transaction_type=tx_type,
-                    transaction_date=declaration.payment_date,
-                    amount=idcw_amount,
-                    units=idcw_amount / scheme.current_nav,  # Units to be added
-                    nav_per_unit=scheme.current_nav,
-                    status=TransactionStatus.pending,
-                    idcw_rate=declaration.idcw_rate,
-                    idcw_amount_per_unit=declaration.idcw_amount_per_unit,
-                    remarks=declaration.description or f"IDCW Reinvestment - {declaration.declaration_date}"
-                )
-                db.add(transaction)
-            else:
-                tx_type = TransactionType.idcw_payout
-                # Create payout transaction
-                transaction = Transaction(
-                    transaction_id=f"IDCW{datetime.now().strftime('%Y%m%d%H%M%S')}{records_processed:04d}",
-                    investor_id=folio.investor_id,
-                    folio_number=folio.folio_number,
-                    scheme_id=folio.scheme_id,
-                    amc_id=folio.amc_id,
-                    transaction_type=tx_type,
-                    transaction_date=declaration.payment_date,
-                    amount=idcw_amount,
-                    units=0,  # No units change for payout
-                    nav_per_unit=scheme.current_nav,
-                    status=TransactionStatus.pending,
-                    idcw_rate=declaration.idcw_rate,
-                    idcw_amount_per_unit=declaration.idcw_amount_per_unit,
-                    remarks=declaration.description or f"IDCW Payout - {declaration.declaration_date}"
-                )
-                db.add(transaction)
-            
-            records_successful += 1
-        except Exception as e:
-            records_failed += 1
-            continue
-    
-    # Update batch job
-    batch_job.records_processed = records_processed
-    batch_job.records_successful = records_successful
-    batch_job.records_failed = records_failed
-    batch_job.status = BatchJobStatus.completed if records_failed == 0 else BatchJobStatus.failed
-    batch_job.completed_at = datetime.now()
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    db.commit()
+    service = IDCWService(db)
+    try:
+        batch_job = service.get_job(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    totals = service.declaration_totals(batch_job.job_id)
     
     return {
-        "message": "IDCW declared successfully",
         "job_id": batch_job.job_id,
-        "scheme_id": declaration.scheme_id,
-        "scheme_name": scheme.scheme_name,
-        "records_processed": records_processed,
-        "records_successful": records_successful,
-        "records_failed": records_failed,
-        "total_amount": sum(f.total_units * declaration.idcw_amount_per_unit for f in folios)
+        "status": batch_job.status.value,
+        "records_processed": batch_job.records_processed,
+        "processing": (batch_job.parameters or {}).get("processing"),
+        "payout_count": totals["payout_count"],
+        "reinvestment_count": totals["reinvestment_count"],
+        "reinvestment_units": float(totals["reinvestment_units"]),
+        "total_amount": float(totals["total_amount"]),
+        "pending_count": totals["pending_count"],
+        "error_log": batch_job.error_log
+    }
+
+
+@router.post("/jobs/{job_id}/resume", status_code=202)
+async def resume_idcw_declaration(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a failed IDCW job again after its last committed chunk"""
+    
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        batch_job = JobService(db).requeue(job_id, BatchJobType.idcw_processing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "message": "IDCW job queued",
+        "job_id": batch_job.job_id,
+        "status": batch_job.status.value,
+        "records_processed": batch_job.records_processed
+    }
+
+
+@router.post("/jobs/{job_id}/process", status_code=202)
+async def process_idcw_declaration(
+    job_id: str,
+    chunk_size: int = Query(IDCW_CHUNK_SIZE, ge=100, le=50000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue completion of all pending transactions of an IDCW declaration.
+
+    Reinvestments are credited to their folios in chunks with set-based
+    updates. Progress is under processing on GET /jobs/{job_id} (and
+    parameters.processing on the batch job).
+    """
+
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    try:
+        batch_job = IDCWService(db, chunk_size=chunk_size).queue_processing(job_id, processed_by=current_user.email)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "message": "IDCW processing queued",
+        "job_id": batch_job.job_id,
+        "status": batch_job.status.value
     }
 
 
@@ -161,6 +174,8 @@ async def declare_idcw(
 async def get_idcw_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_MODE_PATTERN),
     status: Optional[str] = None,
     scheme_id: Optional[str] = None,
     amc_id: Optional[str] = None,
@@ -200,26 +215,25 @@ async def get_idcw_transactions(
     if end_date:
         query = query.filter(Transaction.transaction_date <= end_date)
     
-    total = query.count()
+    try:
+        result = paginate(
+            query, (Transaction.transaction_date, Transaction.id),
+            page_size=page_size, page=page, cursor=cursor, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    transactions = query.order_by(desc(Transaction.transaction_date)).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+    investors = load_map(db, Investor.investor_id, (tx.investor_id for tx in result.items))
+    schemes = load_map(db, Scheme.scheme_id, (tx.scheme_id for tx in result.items))
+    amcs = load_map(db, AMC.amc_id, (tx.amc_id for tx in result.items))
+    folios = load_map(db, Folio.folio_number, (tx.folio_number for tx in result.items))
     
     idcw_list = []
-    for tx in transactions:
-        investor = db.query(Investor).filter(
-            Investor.investor_id == tx.investor_id
-        ).first()
-        scheme = db.query(Scheme).filter(
-            Scheme.scheme_id == tx.scheme_id
-        ).first()
-        amc = db.query(AMC).filter(
-            AMC.amc_id == tx.amc_id
-        ).first()
-        folio = db.query(Folio).filter(
-            Folio.folio_number == tx.folio_number
-        ).first()
+    for tx in result.items:
+        investor = investors.get(tx.investor_id)
+        scheme = schemes.get(tx.scheme_id)
+        amc = amcs.get(tx.amc_id)
+        folio = folios.get(tx.folio_number)
         
         idcw_list.append({
             "transaction_id": tx.transaction_id,
@@ -245,10 +259,7 @@ async def get_idcw_transactions(
     
     return {
         "idcw_transactions": idcw_list,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        **result.meta()
     }
 
 
@@ -287,6 +298,7 @@ async def process_idcw(
             folio.total_units += transaction.units
             folio.total_value = folio.total_units * folio.current_nav
             folio.total_investment += transaction.amount
+            LotService(db).open_lot(transaction)
     
     transaction.status = TransactionStatus.completed
     transaction.processed_by = current_user.email
@@ -9,50 +9,24 @@ from app.models.transaction import Transaction
 from app.models.user import User
 from app.core.permissions import has_permission
 from app.core.roles import AdminPermissions
+from app.services.investor_search_service import InvestorSearchService, MAX_SEARCH_RESULTS
 from app.schemas.admin_investor import InvestorSchema, InvestorDetailSchema, InvestorUpdate, FolioSchema
 from app.schemas.investor import BankAccountInDB, NomineeInDB
 from app.models.mandate import BankAccount, Nominee
 
 router = APIRouter(prefix="/admin/investors", tags=["admin-investors"])
 
-@router.get("/", response_model=dict)
-async def list_investors(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    search: Optional[str] = None,
-    kyc_status: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(has_permission(AdminPermissions.READ_ALL))
-):
-    """
-    List all investors with pagination and filtering.
-    """
-    query = db.query(Investor)
-
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Investor.full_name.ilike(search_filter)) |
-            (Investor.email.ilike(search_filter)) |
-            (Investor.pan_number.ilike(search_filter)) |
-            (Investor.investor_id.ilike(search_filter))
-        )
-
-    if kyc_status:
-        try:
-            status_enum = KYCStatus[kyc_status]
-            query = query.filter(Investor.kyc_status == status_enum)
-        except KeyError:
-             pass 
+def _investor_summaries(db: Session, investors: List[Investor]) -> List[InvestorSchema]:
+    # Total investment per investor on this page, aggregated in one query
+    investments = dict(
+        db.query(Folio.investor_id, func.sum(Folio.total_investment)).filter(
+            Folio.investor_id.in_([inv.investor_id for inv in investors])
+        ).group_by(Folio.investor_id).all()
+    ) if investors else {}
 
-    total = query.count()
-    investors = query.order_by(desc(Investor.created_at)).offset((page - 1) * page_size).limit(page_size).all()
-
-    # Calculate total investment per investor (simplified)
-    # Ideally should be a subquery or separate aggregation for performance
     investor_list = []
     for inv in investors:
-        total_inv = sum([f.total_investment for f in inv.folios]) if inv.folios else 0.0
+        total_inv = investments.get(inv.investor_id) or 0.0
         
         inv_data = InvestorSchema(
             investor_id=inv.investor_id,
@@ -68,15 +42,93 @@ async def list_investors(
             total_investment=float(total_inv)
         )
         investor_list.append(inv_data)
+    return investor_list
+
+
+def _kyc_statuses(kyc_status: Optional[str]) -> Optional[List[KYCStatus]]:
+    try:
+        return [KYCStatus[kyc_status]] if kyc_status else None
+    except KeyError:
+        return None
+
+
+@router.get("/", response_model=dict)
+async def list_investors(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    search: Optional[str] = None,
+    kyc_status: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(has_permission(AdminPermissions.READ_ALL))
+):
+    """
+    List all investors with pagination and filtering.
+
+    With `search` the results are ranked matches from the investor search
+    (see /admin/investors/search) and are not counted: total is null and
+    has_more says whether another page exists.
+    """
+    if search and search.strip():
+        result = InvestorSearchService(db).search(
+            search, limit=page_size, offset=(page - 1) * page_size, kyc_statuses=_kyc_statuses(kyc_status)
+        )
+        return {
+            "data": _investor_summaries(db, result["investors"]),
+            "total": None,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": None,
+            "has_more": result["has_more"],
+            "match": result["match"]
+        }
+
+    query = db.query(Investor)
+
+    statuses = _kyc_statuses(kyc_status)
+    if statuses:
+        query = query.filter(Investor.kyc_status.in_(statuses))
+
+    total = query.count()
+    investors = query.order_by(desc(Investor.created_at)).offset((page - 1) * page_size).limit(page_size).all()
 
     return {
-        "data": investor_list,
+        "data": _investor_summaries(db, investors),
         "total": total,
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size
     }
 
+
+@router.get("/search", response_model=dict)
+async def search_investors(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    kyc_status: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(has_permission(AdminPermissions.READ_ALL))
+):
+    """
+    Find investors by PAN, investor ID, email, mobile number or name.
+
+    The shape of `q` decides the lookup: a full or partial PAN, an investor
+    ID (I042 or 42), a 10 digit mobile number, an email or its start, or
+    else words of the name. Best matches come first; `match` reports which
+    lookup was used.
+    """
+    result = InvestorSearchService(db).search(q, limit=limit, kyc_statuses=_kyc_statuses(kyc_status))
+    summaries = _investor_summaries(db, result["investors"])
+
+    return {
+        "data": [
+            {**summary.model_dump(), "score": score}
+            for summary, score in zip(summaries, result["scores"])
+        ],
+        "match": result["match"],
+        "plan": result["plan"],
+        "has_more": result["has_more"]
+    }
+
 @router.get("/{investor_id}", response_model=InvestorDetailSchema)
 async def get_investor_details(
     investor_id: str = Path(..., title="The ID of the investor"),
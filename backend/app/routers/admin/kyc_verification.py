@@ -10,6 +10,7 @@ from app.core.permissions import has_permission
 from app.core.roles import AdminPermissions
 from app.models.user import User
 from app.models.admin import AdminUser
+from app.services.investor_search_service import InvestorSearchService
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin/kyc", tags=["admin"])
@@ -25,33 +26,44 @@ async def get_kyc_verifications(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     kyc_status: Optional[str] = None,
+    search: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(has_permission(AdminPermissions.READ_ALL)) # Basic read all includes KYC
 ):
-    """Get KYC verification requests"""
-    
-    query = db.query(Investor)
+    """Get KYC verification requests
+
+    `search` finds investors by PAN, investor ID, email, mobile or name
+    (ranked, not counted: total is null and has_more tells if there is more).
+    """
     
+    statuses = None
     if kyc_status:
         try:
-            status = KYCStatus[kyc_status]
-            query = query.filter(Investor.kyc_status == status)
+            statuses = [KYCStatus[kyc_status]]
         except KeyError:
             pass
     else:
         # Default to pending verifications
-        query = query.filter(
-            Investor.kyc_status.in_([
-                KYCStatus.pending_verification,
-                KYCStatus.in_progress
-            ])
+        statuses = [KYCStatus.pending_verification, KYCStatus.in_progress]
+
+    has_more = None
+    if search and search.strip():
+        result = InvestorSearchService(db).search(
+            search, limit=page_size, offset=(page - 1) * page_size, kyc_statuses=statuses
         )
-    
-    total = query.count()
-    
-    investors = query.order_by(desc(Investor.kyc_submitted_date)).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+        investors = result["investors"]
+        has_more = result["has_more"]
+        total = None
+    else:
+        query = db.query(Investor)
+        if statuses:
+            query = query.filter(Investor.kyc_status.in_(statuses))
+
+        total = query.count()
+
+        investors = query.order_by(desc(Investor.kyc_submitted_date)).offset(
+            (page - 1) * page_size
+        ).limit(page_size).all()
     
     kyc_list = []
     for investor in investors:
@@ -68,13 +80,16 @@ async def get_kyc_verifications(
             "kyc_documents_path": investor.kyc_documents_path
         })
     
-    return {
+    response = {
         "kyc_verifications": kyc_list,
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        "total_pages": (total + page_size - 1) // page_size if total is not None else None
     }
+    if has_more is not None:
+        response["has_more"] = has_more
+    return response
 
 
 @router.post("/{investor_id}/verify")
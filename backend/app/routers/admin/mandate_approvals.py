@@ -10,6 +10,7 @@ from app.models.admin import Approval, ApprovalType, ApprovalStatus
 from app.core.jwt import get_current_user
 from app.models.user import User
 from app.models.admin import AdminUser
+from app.db.loaders import load_map
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin/mandate-approvals", tags=["admin"])
@@ -43,11 +44,11 @@ async def get_mandate_approvals(
         (page - 1) * page_size
     ).limit(page_size).all()
     
+    investors = load_map(db, Investor.investor_id, (mandate.investor_id for mandate in mandates))
+    
     mandate_list = []
     for mandate in mandates:
-        investor = db.query(Investor).filter(
-            Investor.investor_id == mandate.investor_id
-        ).first()
+        investor = investors.get(mandate.investor_id)
         
         mandate_list.append({
             "account_id": mandate.id,
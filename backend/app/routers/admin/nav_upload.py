@@ -1,27 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from datetime import datetime, date
-from typing import List
+from datetime import datetime
 from app.db.session import get_db
-from app.db.session import get_db
-from app.models.scheme import Scheme, NAVHistory
-from app.models.admin import BatchJob, BatchJobType, BatchJobStatus
+from app.models.admin import AdminUser, BatchJob, BatchJobType, BatchJobStatus
+from app.core.config import settings
 from app.core.jwt import get_current_user
 from app.models.user import User
-import csv
-import io
+from app.services.sequence_service import SequenceService
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin/nav", tags=["admin"])
 
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_nav_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Upload NAV file (CSV or Excel) and update scheme NAVs"""
+    """Upload a NAV CSV file and queue a batch job that loads it.
+
+    Returns the job id immediately; a job worker loads the rows, applies the
+    latest NAVs and revalues folios. Poll /admin/batch-jobs/{job_id} for progress.
+    """
     
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -32,14 +38,25 @@ async def upload_nav_file(
             detail="File must be CSV or Excel format"
         )
     
-    # Create batch job record
-    # Create batch job record
-    job_id = f"NAV{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    # Guard against too long job_id just in case, though timestamp is fixed len
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=400,
+            detail="Excel file support coming soon. Please use CSV format."
+        )
     
+    input_path = None
     try:
-        # Look up admin_id corresponding to the current user
-        from app.models.admin import AdminUser
+        # Reserve the job ID first so no other upload can write to the same file
+        job_id = SequenceService(db).next_ids("nav_job", 1)[0]
+        path = os.path.join(settings.NAV_UPLOAD_DIRECTORY, f"{job_id}.csv")
+
+        # Keep the file for the worker; copy the spooled upload without reading it into memory
+        os.makedirs(settings.NAV_UPLOAD_DIRECTORY, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        input_path = path
+        with os.fdopen(fd, "wb") as target:
+            await run_in_threadpool(shutil.copyfileobj, file.file, target)
+        
         admin_rec = db.query(AdminUser).filter(AdminUser.user_id == current_user.id).first()
         executed_by_id = admin_rec.admin_id if admin_rec else None
 
@@ -48,129 +65,30 @@ async def upload_nav_file(
             job_type=BatchJobType.nav_upload,
             job_name=f"NAV Upload - {file.filename[:200]}", # truncate filename if needed
             scheduled_at=datetime.now(),
-            started_at=datetime.now(),
-            status=BatchJobStatus.running,
+            status=BatchJobStatus.pending,
+            input_file_path=input_path,
+            records_processed=0,
+            records_successful=0,
+            records_failed=0,
             executed_by=executed_by_id # Must be a valid admin_id or None
         )
         db.add(batch_job)
-        db.flush()
+        db.commit()
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.error(f"NAV upload queueing failed: {e}", exc_info=True)
         db.rollback()
+        if input_path:
+            try:
+                os.unlink(input_path)
+            except FileNotFoundError:
+                pass
         raise HTTPException(status_code=500, detail=f"Failed to start batch job: {str(e)}")
     
-    try:
-        # Read file content
-        content = await file.read()
-        
-        # Parse CSV
-        if file.filename.endswith('.csv'):
-            csv_content = content.decode('utf-8')
-            reader = csv.DictReader(io.StringIO(csv_content))
-            
-            records_processed = 0
-            records_successful = 0
-            records_failed = 0
-            errors = []
-            
-            for row in reader:
-                records_processed += 1
-                try:
-                    scheme_id = row.get('Scheme_ID', '').strip()
-                    nav_value = float(row.get('NAV', 0))
-                    nav_date_str = row.get('NAV_Date', '').strip()
-                    
-                    # Validate
-                    if not scheme_id:
-                        raise ValueError("Scheme_ID is required")
-                    if nav_value <= 0:
-                        raise ValueError("NAV must be positive")
-                    
-                    # Parse date
-                    try:
-                        nav_date = datetime.strptime(nav_date_str, '%Y-%m-%d').date()
-                    except ValueError:
-                        raise ValueError(f"Invalid date format: {nav_date_str}. Expected YYYY-MM-DD")
-                    
-                    # Update scheme NAV
-                    scheme = db.query(Scheme).filter(
-                        Scheme.scheme_id == scheme_id
-                    ).first()
-                    
-                    if not scheme:
-                         # Try alternative format (S001 <-> SCH001)
-                        alt_scheme_id = "SCH" + scheme_id[1:] if scheme_id.startswith("S") and len(scheme_id) == 4 else scheme_id.replace("SCH", "S")
-                        scheme = db.query(Scheme).filter(Scheme.scheme_id == alt_scheme_id).first()
-                        if scheme:
-                            scheme_id = scheme.scheme_id # Normalize to DB ID
-
-                    if not scheme:
-                        raise ValueError(f"Scheme {scheme_id} not found")
-                    
-                    # Create History Record
-                    # Check if history exists for this date to avoid duplicates
-                    existing_history = db.query(NAVHistory).filter(
-                        and_(
-                            NAVHistory.scheme_id == scheme_id,
-                            NAVHistory.nav_date == nav_date
-                        )
-                    ).first()
-                    
-                    if existing_history:
-                        existing_history.nav_value = nav_value
-                    else:
-                        new_history = NAVHistory(
-                            scheme_id=scheme_id,
-                            nav_date=nav_date,
-                            nav_value=nav_value,
-                            created_at=date.today()
-                        )
-                        db.add(new_history)
-
-                    # Update scheme NAV if date is newer or same
-                    if scheme.nav_date is None or nav_date >= scheme.nav_date:
-                        scheme.current_nav = nav_value
-                        scheme.nav_date = nav_date
-                    
-                    records_successful += 1
-                except Exception as e:
-                    records_failed += 1
-                    errors.append(f"Row {records_processed}: {str(e)}")
-            
-            # Update batch job
-            batch_job.records_processed = records_processed
-            batch_job.records_successful = records_successful
-            batch_job.records_failed = records_failed
-            batch_job.error_log = "\n".join(errors) if errors else None
-            batch_job.status = BatchJobStatus.completed if records_failed == 0 else BatchJobStatus.failed
-            batch_job.completed_at = datetime.now()
-            
-            db.commit()
-            
-            return {
-                "message": "NAV upload completed",
-                "job_id": batch_job.job_id,
-                "records_processed": records_processed,
-                "records_successful": records_successful,
-                "records_failed": records_failed,
-                "errors": errors[:10]  # First 10 errors
-            }
-            
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Excel file support coming soon. Please use CSV format."
-            )
-            
-    except Exception as e:
-        import traceback
-        traceback.print_exc() # Print full trace to console
-        batch_job.status = BatchJobStatus.failed
-        batch_job.error_log = str(e)
-        batch_job.completed_at = datetime.now()
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    return {
+        "message": "NAV upload queued",
+        "job_id": batch_job.job_id,
+        "status": batch_job.status.value
+    }
 
 
 @router.get("/history")
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.jwt import get_current_user
+from app.core.profiling import query_profiler
+from app.models.user import User
+
+router = APIRouter(prefix="/admin/perf", tags=["admin"])
+
+
+@router.get("/queries")
+async def get_query_profile(
+    current_user: User = Depends(get_current_user)
+):
+    """Queries and database time per route, plus recent slow statements.
+
+    Only collected when SQL_PROFILING_ENABLED is set; figures are for the
+    worker process that serves this request.
+    """
+
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return query_profiler.report()
+
+
+@router.delete("/queries")
+async def reset_query_profile(
+    current_user: User = Depends(get_current_user)
+):
+    """Clear the collected per-route figures and slow statements"""
+
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    query_profiler.reset()
+    return {"message": "Query profile cleared"}
@@ -1,88 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, func
-from datetime import datetime, date
+from datetime import date
 from typing import Optional
 from app.db.session import get_db
-from app.models.transaction import Transaction, TransactionStatus
-from app.models.folio import Folio
+from app.models.transaction import Transaction
 from app.models.investor import Investor
 from app.models.scheme import Scheme
 from app.models.amc import AMC
+from app.models.admin import AdminUser, ReconciliationResult, ReconciliationMatchStatus
 from app.models.admin import Reconciliation as ReconModel
+from app.services.reconciliation_service import ReconciliationService
+from app.core.config import settings
 from app.core.jwt import get_current_user
 from app.models.user import User
+import os
+import shutil
 
 router = APIRouter(prefix="/admin/reconciliation", tags=["admin"])
 
+MATCH_STATUS_LABELS = {
+    ReconciliationMatchStatus.matched: "Matched",
+    ReconciliationMatchStatus.amount_mismatch: "Discrepancy",
+    ReconciliationMatchStatus.missing_in_rta: "Missing in RTA",
+    ReconciliationMatchStatus.missing_in_feed: "Missing in Feed",
+}
 
-@router.post("/run")
+
+@router.post("/run", status_code=202)
 async def run_reconciliation(
     reconciliation_date: date,
+    file: UploadFile = File(...),
     amc_id: Optional[str] = None,
     scheme_id: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Run reconciliation for transactions"""
+    """Reconcile an AMC/bank settlement feed (CSV) against the day's completed transactions.
+
+    The feed needs an amount column and transaction_id and/or payment_reference
+    (units optional). Matching runs as a batch job; poll
+    /admin/batch-jobs/{job_id} and read the rows from /transactions.
+    """
     
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Create reconciliation record
-    recon = ReconModel(
-        reconciliation_id=f"REC{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        reconciliation_type="daily",
-        reconciliation_date=reconciliation_date,
-        start_date=reconciliation_date,
-        end_date=reconciliation_date,
-        amc_id=amc_id,
-        scheme_id=scheme_id,
-        status="in_progress",
-        performed_by=current_user.email,
-        performed_at=datetime.now()
-    )
-    db.add(recon)
-    db.flush()
-    
-    # Get transactions for the date
-    query = db.query(Transaction).filter(
-        and_(
-            Transaction.transaction_date == reconciliation_date,
-            Transaction.status == TransactionStatus.completed
-        )
-    )
-    
-    if amc_id:
-        query = query.filter(Transaction.amc_id == amc_id)
-    if scheme_id:
-        query = query.filter(Transaction.scheme_id == scheme_id)
-    
-    transactions = query.all()
-    
-    # Reconciliation logic (simplified - in real system, would compare with AMC data)
-    total_transactions = len(transactions)
-    matched_transactions = total_transactions  # Simplified - assume all match
-    unmatched_transactions = 0
-    discrepancy_amount = 0.00
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Feed file must be CSV format")
     
-    # Update reconciliation
-    recon.total_transactions = total_transactions
-    recon.matched_transactions = matched_transactions
-    recon.unmatched_transactions = unmatched_transactions
-    recon.discrepancy_amount = discrepancy_amount
-    recon.is_reconciled = True
-    recon.status = "completed"
+    service = ReconciliationService(db)
+    # Reserve the ID first so no other upload can write to the same feed file
+    reconciliation_id = service.next_reconciliation_id()
+    path = os.path.join(settings.RECONCILIATION_UPLOAD_DIRECTORY, f"{reconciliation_id}.csv")
     
-    db.commit()
+    os.makedirs(settings.RECONCILIATION_UPLOAD_DIRECTORY, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            await run_in_threadpool(shutil.copyfileobj, file.file, target)
+        
+        admin_rec = db.query(AdminUser).filter(AdminUser.user_id == current_user.id).first()
+        
+        job = service.create_job(
+            reconciliation_date,
+            path,
+            amc_id=amc_id,
+            scheme_id=scheme_id,
+            performed_by=admin_rec.admin_id if admin_rec else None,
+            reconciliation_id=reconciliation_id
+        )
+    except Exception:
+        db.rollback()
+        os.unlink(path)
+        raise
     
     return {
-        "message": "Reconciliation completed",
-        "reconciliation_id": recon.reconciliation_id,
-        "total_transactions": total_transactions,
-        "matched_transactions": matched_transactions,
-        "unmatched_transactions": unmatched_transactions,
-        "discrepancy_amount": float(discrepancy_amount)
+        "message": "Reconciliation queued",
+        "reconciliation_id": reconciliation_id,
+        "job_id": job.job_id,
+        "status": job.status.value
     }
 
 
@@ -148,77 +146,95 @@ async def get_reconciliation_records(
 
 @router.get("/transactions")
 async def get_reconciliation_transactions(
-    reconciliation_date: date,
-    amc_id: Optional[str] = None,
-    scheme_id: Optional[str] = None,
+    reconciliation_date: Optional[date] = None,
+    reconciliation_id: Optional[str] = None,
+    match_status: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get transactions for reconciliation comparison"""
+    """Matched and unmatched rows of a reconciliation (default: the latest one on the date)"""
     
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    query = db.query(Transaction).filter(
-        and_(
-            Transaction.transaction_date == reconciliation_date,
-            Transaction.status == TransactionStatus.completed
-        )
-    )
-    
-    if amc_id:
-        query = query.filter(Transaction.amc_id == amc_id)
-    if scheme_id:
-        query = query.filter(Transaction.scheme_id == scheme_id)
+    if not reconciliation_id:
+        if not reconciliation_date:
+            raise HTTPException(status_code=400, detail="reconciliation_id or reconciliation_date is required")
+        latest = db.query(ReconModel.reconciliation_id).filter(
+            ReconModel.reconciliation_date == reconciliation_date,
+            ReconModel.status == "completed"
+        ).order_by(desc(ReconModel.performed_at)).first()
+        if not latest:
+            return {"transactions": [], "total": 0, "page": page, "page_size": page_size, "total_pages": 0}
+        reconciliation_id = latest[0]
+    
+    query = db.query(
+        ReconciliationResult, Transaction, Investor.full_name, Investor.pan_number,
+        Scheme.scheme_name, AMC.amc_name
+    ).outerjoin(
+        Transaction, Transaction.transaction_id == ReconciliationResult.transaction_id
+    ).outerjoin(
+        Investor, Investor.investor_id == Transaction.investor_id
+    ).outerjoin(
+        Scheme, Scheme.scheme_id == Transaction.scheme_id
+    ).outerjoin(
+        AMC, AMC.amc_id == Transaction.amc_id
+    ).filter(ReconciliationResult.reconciliation_id == reconciliation_id)
+    
+    if match_status:
+        try:
+            query = query.filter(ReconciliationResult.match_status == ReconciliationMatchStatus[match_status])
+        except KeyError:
+            valid = ", ".join(status.name for status in ReconciliationMatchStatus)
+            raise HTTPException(status_code=400, detail=f"Invalid match_status; expected one of: {valid}")
     
     total = query.count()
     
-    transactions = query.order_by(Transaction.transaction_id).offset(
+    rows = query.order_by(ReconciliationResult.id).offset(
         (page - 1) * page_size
     ).limit(page_size).all()
     
     tx_list = []
-    for tx in transactions:
-        investor = db.query(Investor).filter(
-            Investor.investor_id == tx.investor_id
-        ).first()
-        scheme = db.query(Scheme).filter(
-            Scheme.scheme_id == tx.scheme_id
-        ).first()
-        amc = db.query(AMC).filter(
-            AMC.amc_id == tx.amc_id
-        ).first()
+    for result, tx, investor_name, pan, scheme_name, amc_name in rows:
+        amc_amount = float(result.feed_amount) if result.feed_amount is not None else None
+        rta_amount = float(result.rta_amount) if result.rta_amount is not None else None
+        status = MATCH_STATUS_LABELS[result.match_status]
         
-        # In real system, would fetch AMC amount from AMC system
-        amc_amount = float(tx.amount)  # Simplified - assume match
-        rta_amount = float(tx.amount)
-        status = "Matched" if amc_amount == rta_amount else "Discrepancy"
+        if result.match_status == ReconciliationMatchStatus.amount_mismatch:
+            remarks = f"Difference: ₹{abs(amc_amount - rta_amount):.2f}"
+        elif result.match_status == ReconciliationMatchStatus.matched:
+            remarks = ""
+        else:
+            remarks = status
         
         tx_list.append({
-            "transaction_id": tx.transaction_id,
-            "folio_number": tx.folio_number,
-            "investor_name": investor.full_name if investor else None,
-            "pan": investor.pan_number if investor else None,
-            "amc_name": amc.amc_name if amc else None,
-            "scheme_name": scheme.scheme_name if scheme else None,
-            "transaction_type": tx.transaction_type.value.replace("_", " "),
+            "transaction_id": result.transaction_id,
+            "folio_number": tx.folio_number if tx else None,
+            "investor_name": investor_name,
+            "pan": pan,
+            "amc_name": amc_name,
+            "scheme_name": scheme_name,
+            "transaction_type": tx.transaction_type.value.replace("_", " ") if tx else None,
             "amc_amount": amc_amount,
             "rta_amount": rta_amount,
-            "units": float(tx.units) if tx.units else 0,
-            "nav_per_unit": float(tx.nav_per_unit),
+            "units": float(result.rta_units if result.rta_units is not None else result.feed_units or 0),
+            "nav_per_unit": float(tx.nav_per_unit) if tx else None,
             "status": status,
-            "transaction_date": tx.transaction_date.isoformat() if tx.transaction_date else None,
-            "remarks": "" if status == "Matched" else f"Difference: ₹{abs(amc_amount - rta_amount)}"
+            "match_status": result.match_status.value,
+            "payment_reference": result.payment_reference,
+            "feed_line": result.feed_line,
+            "exception_id": result.exception_id,
+            "transaction_date": tx.transaction_date.isoformat() if tx and tx.transaction_date else None,
+            "remarks": remarks
         })
     
     return {
+        "reconciliation_id": reconciliation_id,
         "transactions": tx_list,
         "total": total,
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size
     }
-
-
@@ -11,6 +11,8 @@ from app.models.scheme import Scheme
 from app.models.amc import AMC
 from app.core.jwt import get_current_user
 from app.models.user import User
+from app.services.aum_service import AUMService
+from app.db.loaders import load_map
 
 router = APIRouter(prefix="/admin/reports", tags=["admin"])
 
@@ -58,8 +60,9 @@ async def get_transaction_summary(
     
     # Summary by AMC
     summary_by_amc = {}
+    amcs = load_map(db, AMC.amc_id, (tx.amc_id for tx in transactions))
     for tx in transactions:
-        amc = db.query(AMC).filter(AMC.amc_id == tx.amc_id).first()
+        amc = amcs.get(tx.amc_id)
         amc_name = amc.amc_name if amc else tx.amc_id
         if amc_name not in summary_by_amc:
             summary_by_amc[amc_name] = {
@@ -132,46 +135,49 @@ async def get_aum_report(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Generate Assets Under Management (AUM) report"""
+    """Generate Assets Under Management (AUM) report as of a date"""
     
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    query = db.query(Folio).filter(
-        and_(
-            Folio.status == "active",
-            Folio.total_units > 0
-        )
-    )
+    return AUMService(db).aum_as_of(as_on_date, amc_id)
+
+
+@router.get("/aum-trend")
+async def get_aum_trend(
+    as_on_date: date,
+    months: int = Query(24, ge=1, le=120),
+    amc_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Month-end AUM series for regulatory filings"""
     
-    if amc_id:
-        query = query.filter(Folio.amc_id == amc_id)
-    
-    folios = query.all()
-    
-    # AUM by AMC
-    aum_by_amc = {}
-    total_aum = 0.0
-    
-    for folio in folios:
-        amc = db.query(AMC).filter(AMC.amc_id == folio.amc_id).first()
-        amc_name = amc.amc_name if amc else folio.amc_id
-        
-        if amc_name not in aum_by_amc:
-            aum_by_amc[amc_name] = {
-                "folio_count": 0,
-                "total_aum": 0.0
-            }
-        
-        aum_by_amc[amc_name]["folio_count"] += 1
-        aum_by_amc[amc_name]["total_aum"] += float(folio.total_value)
-        total_aum += float(folio.total_value)
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
     return {
         "as_on_date": as_on_date.isoformat(),
-        "total_aum": total_aum,
-        "total_folios": len(folios),
-        "aum_by_amc": aum_by_amc
+        "months": months,
+        "series": AUMService(db).aum_trend(as_on_date, months, amc_id)
     }
 
 
+@router.post("/aum-snapshots")
+async def build_aum_snapshot(
+    snapshot_date: date,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Build the unit-balance checkpoint used for point-in-time AUM (run at month-end)"""
+    
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    folio_count = AUMService(db).build_unit_snapshot(snapshot_date)
+    
+    return {
+        "message": "Unit snapshot built successfully",
+        "snapshot_date": snapshot_date.isoformat(),
+        "folio_count": folio_count
+    }
@@ -20,6 +20,7 @@ from app.schemas.transaction import (
     SIPSetupRequest, SWPSetupRequest, STPSetupRequest
 )
 from app.services.transaction_service import TransactionService
+from app.db.pagination import paginate, COUNT_MODE_PATTERN
 
 router = APIRouter(prefix="/admin/transactions", tags=["admin"])
 
@@ -41,6 +42,8 @@ class TransactionFilter(BaseModel):
 async def get_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_MODE_PATTERN),
     status: Optional[str] = None,
     transaction_type: Optional[str] = None,
     investor_id: Optional[str] = None,
@@ -52,7 +55,12 @@ async def get_transactions(
     db: Session = Depends(get_db),
     current_user: User = Depends(has_permission(AdminPermissions.READ_TRANSACTIONS))
 ):
-    """Get paginated list of transactions with filters"""
+    """Get paginated list of transactions with filters.
+
+    Newest first by (transaction_date, id). Pass next_cursor/prev_cursor from a
+    response as cursor to move a page on; page numbers work for shallow pages.
+    count=approximate or count=none skips the exact total.
+    """
     print(f"DEBUG: get_transactions called. User: {current_user.email}, Role: {current_user.role}")
     
     from sqlalchemy.orm import joinedload
@@ -93,17 +101,17 @@ async def get_transactions(
     if end_date:
         query = query.filter(Transaction.transaction_date <= end_date)
     
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination and ordering
-    transactions = query.order_by(desc(Transaction.transaction_date)).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+    try:
+        result = paginate(
+            query, (Transaction.transaction_date, Transaction.id),
+            page_size=page_size, page=page, cursor=cursor, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Format response
     transaction_list = []
-    for tx in transactions:
+    for tx in result.items:
         transaction_list.append({
             "transaction_id": tx.transaction_id,
             "investor_id": tx.investor_id,
@@ -122,10 +130,7 @@ async def get_transactions(
     
     return {
         "transactions": transaction_list,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        **result.meta()
     }
 
 
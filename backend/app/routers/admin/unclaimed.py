@@ -10,6 +10,7 @@ from app.models.investor import Investor
 from app.models.folio import Folio
 from app.core.jwt import get_current_user
 from app.models.user import User
+from app.db.pagination import paginate, COUNT_MODE_PATTERN
 
 router = APIRouter(prefix="/admin/unclaimed", tags=["admin"])
 
@@ -18,6 +19,8 @@ router = APIRouter(prefix="/admin/unclaimed", tags=["admin"])
 async def get_unclaimed_amounts(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_MODE_PATTERN),
     investor_id: Optional[str] = None,
     folio_number: Optional[str] = None,
     claimed: Optional[bool] = None,
@@ -38,14 +41,16 @@ async def get_unclaimed_amounts(
     if claimed is not None:
         query = query.filter(UnclaimedAmount.claimed == claimed)
     
-    total = query.count()
-    
-    unclaimed = query.order_by(desc(UnclaimedAmount.unclaimed_date)).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+    try:
+        result = paginate(
+            query, (UnclaimedAmount.unclaimed_date, UnclaimedAmount.id),
+            page_size=page_size, page=page, cursor=cursor, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     unclaimed_list = []
-    for item in unclaimed:
+    for item in result.items:
         unclaimed_list.append({
             "id": item.id,
             "investor_id": item.investor_id,
@@ -64,10 +69,7 @@ async def get_unclaimed_amounts(
     
     return {
         "unclaimed_amounts": unclaimed_list,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        **result.meta()
     }
 
 
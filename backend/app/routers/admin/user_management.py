@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import and_, or_, desc
 from datetime import datetime
 from typing import Optional
@@ -8,6 +8,7 @@ from app.models.admin import AdminUser, AdminRole
 from app.models.user import User, UserStatus, UserRole
 from app.core.jwt import get_current_user
 from app.core.permissions import has_permission
+from app.core.principal import principal_cache
 from app.core.roles import AdminPermissions
 from pydantic import BaseModel
 
@@ -45,7 +46,9 @@ async def get_admin_users(
     """Get list of admin users"""
     
     
-    query = db.query(AdminUser).join(User, AdminUser.user_id == User.id)
+    query = db.query(AdminUser).join(User, AdminUser.user_id == User.id).options(
+        contains_eager(AdminUser.user)
+    )
     
     if role:
         try:
@@ -68,7 +71,7 @@ async def get_admin_users(
     
     user_list = []
     for admin_user in admin_users:
-        user = db.query(User).filter(User.id == admin_user.user_id).first()
+        user = admin_user.user
         user_list.append({
             "admin_id": admin_user.admin_id,
             "user_id": admin_user.user_id,
@@ -179,6 +182,7 @@ async def update_admin_user(
         admin_user.is_active = user_data.is_active
     
     db.commit()
+    principal_cache.invalidate_user(admin_user.user_id)
     
     return {
         "message": "Admin user updated successfully",
@@ -210,6 +214,7 @@ async def toggle_user_status(
         user.status = UserStatus.active if admin_user.is_active else UserStatus.inactive
     
     db.commit()
+    principal_cache.invalidate_user(admin_user.user_id)
     
     return {
         "message": f"User {'activated' if admin_user.is_active else 'deactivated'} successfully",
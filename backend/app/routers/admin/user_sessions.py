@@ -7,6 +7,7 @@ from app.db.session import get_db
 from app.models.admin import UserSession
 from app.models.user import User
 from app.core.jwt import get_current_user
+from app.db.loaders import load_map
 
 router = APIRouter(prefix="/admin/user-sessions", tags=["admin"])
 
@@ -39,9 +40,11 @@ async def get_user_sessions(
         (page - 1) * page_size
     ).limit(page_size).all()
     
+    users = load_map(db, User.id, (session.user_id for session in sessions))
+    
     session_list = []
     for session in sessions:
-        user = db.query(User).filter(User.id == session.user_id).first()
+        user = users.get(session.user_id)
         session_list.append({
             "session_id": session.session_id,
             "user_id": session.user_id,
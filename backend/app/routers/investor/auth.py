@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from typing import Dict, Any
@@ -11,6 +11,7 @@ from app.schemas.auth import (
 )
 from app.core.config import settings
 from app.core.jwt import get_current_investor
+from app.core.rate_limit import login_rate_limiter
 from app.models.user import User
 import logging
 
@@ -23,17 +24,19 @@ security = HTTPBearer()
 @router.post("/register", response_model=Dict[str, Any])
 async def register_investor(
     registration_data: InvestorRegistrationRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Register new investor"""
     try:
+        await login_rate_limiter.check(request)
         auth_service = AuthService(db)
 
         # Convert to dict and separate password
         investor_data = registration_data.dict(exclude={'password'})
         password = registration_data.password
 
-        result = auth_service.register_investor(investor_data, password)
+        result = await auth_service.register_investor(investor_data, password)
 
         return {
             "message": "Investor registered successfully",
@@ -45,6 +48,8 @@ async def register_investor(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Registration error: {e}")
         raise HTTPException(
@@ -56,12 +61,14 @@ async def register_investor(
 @router.post("/login", response_model=Dict[str, Any])
 async def login_investor(
     login_data: LoginRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Login investor"""
     try:
+        await login_rate_limiter.check(request, login_data.email)
         auth_service = AuthService(db)
-        result = auth_service.login_user(login_data.email, login_data.password)
+        result = await auth_service.login_user(login_data.email, login_data.password)
 
         if not result:
             raise HTTPException(
@@ -159,7 +166,7 @@ async def reset_password(
     try:
         auth_service = AuthService(db)
 
-        auth_service.reset_password(
+        await auth_service.reset_password(
             reset_data.email,
             reset_data.otp,
             reset_data.new_password
@@ -249,7 +256,7 @@ async def change_password(
     """Change user password"""
     try:
         auth_service = AuthService(db)
-        auth_service.change_password(
+        await auth_service.change_password(
             current_user,
             password_data.current_password,
             password_data.new_password
@@ -264,6 +271,8 @@ async def change_password(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         logger.error(f"Change password error: {str(e)}")
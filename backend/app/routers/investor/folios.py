@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
-from app.db.session import get_db
-from app.services.investor_service import InvestorService
+from app.db.session import get_db, get_async_db
+from app.services.investor_service import InvestorService, AsyncInvestorService
 from app.core.jwt import get_current_investor
 from app.models.user import User
 import logging
@@ -17,7 +18,7 @@ async def get_folios(
     active_only: bool = False,
     with_units_only: bool = False,
     current_user: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all folios for the investor
@@ -33,8 +34,8 @@ async def get_folios(
                 detail="User does not have an associated investor profile"
             )
             
-        investor_service = InvestorService(db)
-        folios = investor_service.get_folios(
+        investor_service = AsyncInvestorService(db)
+        folios = await investor_service.get_folios(
             investor_id=current_user.investor_id,
             active_only=active_only,
             with_units_only=with_units_only
@@ -65,12 +66,12 @@ async def get_folios(
 @router.get("/summary")
 async def get_folio_summary(
     current_user: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get folio summary for dashboard"""
     try:
-        investor_service = InvestorService(db)
-        summary = investor_service.get_folio_summary(current_user.investor_id)
+        investor_service = AsyncInvestorService(db)
+        summary = await investor_service.get_folio_summary(current_user.investor_id)
 
         return {
             "message": "Folio summary retrieved successfully",
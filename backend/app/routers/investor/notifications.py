@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.core.jwt import get_current_investor
 from app.models.user import User
-from app.services.notification_service import NotificationService
+from app.services.notification_service import AsyncNotificationService
 from app.schemas.notification import NotificationListResponse, SingleNotificationResponse
 import logging
 
@@ -16,12 +16,12 @@ router = APIRouter(tags=["Notifications"])
 @router.get("/", response_model=NotificationListResponse)
 async def get_notifications(
     current_investor: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all notifications for the investor"""
     try:
-        service = NotificationService(db)
-        notifications = service.get_investor_notifications(current_investor.investor_id)
+        service = AsyncNotificationService(db)
+        notifications = await service.get_investor_notifications(current_investor.investor_id)
         
         return {
             "status": "success",
@@ -36,16 +36,39 @@ async def get_notifications(
         )
 
 
+@router.get("/unread-count", response_model=Dict[str, Any])
+async def get_unread_count(
+    current_investor: User = Depends(get_current_investor),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Number of unread notifications (for the bell icon); a single-row read"""
+    try:
+        service = AsyncNotificationService(db)
+        count = await service.get_unread_count(current_investor.investor_id)
+
+        return {
+            "status": "success",
+            "message": "Unread count retrieved successfully",
+            "data": {"unread_count": count}
+        }
+    except Exception as e:
+        logger.error(f"Get unread count error: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve unread count"
+        )
+
+
 @router.put("/{notification_id}/read", response_model=SingleNotificationResponse)
 async def mark_notification_read(
     notification_id: int,
     current_investor: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark a specific notification as read"""
     try:
-        service = NotificationService(db)
-        notification = service.mark_as_read(notification_id, current_investor.investor_id)
+        service = AsyncNotificationService(db)
+        notification = await service.mark_as_read(notification_id, current_investor.investor_id)
         
         if not notification:
             raise HTTPException(
@@ -71,12 +94,12 @@ async def mark_notification_read(
 @router.post("/read-all", response_model=Dict[str, Any])
 async def mark_all_read(
     current_investor: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark all notifications as read"""
     try:
-        service = NotificationService(db)
-        count = service.mark_all_as_read(current_investor.investor_id)
+        service = AsyncNotificationService(db)
+        count = await service.mark_all_as_read(current_investor.investor_id)
         
         return {
             "status": "success",
@@ -94,12 +117,12 @@ async def mark_all_read(
 @router.post("/clear", response_model=Dict[str, Any])
 async def clear_all_notifications(
     current_investor: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Clear all notifications for the investor"""
     try:
-        service = NotificationService(db)
-        success = service.clear_all_notifications(current_investor.investor_id)
+        service = AsyncNotificationService(db)
+        success = await service.clear_all_notifications(current_investor.investor_id)
         
         if not success:
             raise Exception("Failed to delete notifications")
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional
-from app.db.session import get_db
-from app.services.investor_service import InvestorService
+from app.db.session import get_db, get_async_db
+from app.services.investor_service import InvestorService, AsyncInvestorService
 from app.schemas.investor import (
     BankAccountCreate, BankAccountUpdate, NomineeCreate, NomineeUpdate,
     InvestorUpdate, KYCUpdate
@@ -11,13 +12,14 @@ from app.schemas.investor import (
 from app.core.jwt import get_current_investor
 from app.models.user import User
 from app.models.document import Document, DocumentType, DocumentStatus
-from app.core.config import settings
+from app.core.downloads import file_download_response
+from app.core.uploads import receive_file_upload, UploadTooLarge
+from app.core.rate_limit import client_ip
+from app.services.document_storage_service import DocumentStorageService
 import logging
 import os
-import hashlib
 import shutil
 from pathlib import Path
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -416,7 +418,7 @@ async def delete_nominee(
 @router.get("/dashboard")
 async def get_dashboard_data(
     current_user: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get investor dashboard data"""
     try:
@@ -426,8 +428,8 @@ async def get_dashboard_data(
                 detail="User does not have an associated investor profile"
             )
             
-        investor_service = InvestorService(db)
-        dashboard_data = investor_service.get_investor_dashboard_data(current_user.investor_id)
+        investor_service = AsyncInvestorService(db)
+        dashboard_data = await investor_service.get_investor_dashboard_data(current_user.investor_id)
 
         return {
             "message": "Dashboard data retrieved successfully",
@@ -495,14 +497,31 @@ async def get_documents(
         )
 
 
-@router.post("/documents")
+@router.post(
+    "/documents",
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["file", "document_type"],
+        "properties": {
+            "file": {"type": "string", "format": "binary"},
+            "document_type": {"type": "string"}
+        }
+    }}}}}
+)
 async def upload_document(
-    file: UploadFile = File(...),
-    document_type: str = Form(...),
+    request: Request,
     current_user: User = Depends(get_current_investor),
     db: Session = Depends(get_db)
 ):
-    """Upload a document for the investor"""
+    """Upload a document for the investor (multipart form with file and document_type).
+
+    The body is parsed as it arrives and the file streamed into the document
+    store, so an upload over MAX_UPLOAD_SIZE is refused from its
+    Content-Length or cut off at the limit instead of being spooled first.
+    """
+    storage = DocumentStorageService(db)
+    upload = None
+    stored = None
     try:
         if not current_user.investor_id:
             raise HTTPException(
@@ -510,68 +529,67 @@ async def upload_document(
                 detail="User does not have an associated investor profile"
             )
         
-        # Validate document type (accept both enum name and value)
-        doc_type = None
-        for dt in DocumentType:
-            if dt.name == document_type or dt.value == document_type:
-                doc_type = dt
-                break
+        # Validate file type before any of the file is written
+        allowed_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.doc', '.docx']
         
-        if doc_type is None:
-            allowed_types = [f"{dt.name} ({dt.value})" for dt in DocumentType]
+        def open_file(filename: str, content_type: Optional[str]):
+            nonlocal upload
+            if Path(filename).suffix.lower() not in allowed_extensions:
+                raise ValueError(f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}")
+            upload = storage.begin_upload()
+            return upload
+        
+        # Size limit (10MB max) and checksum are checked as the body streams in
+        try:
+            form = await receive_file_upload(request, open_file, storage.max_size)
+        except UploadTooLarge as e:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid document type. Allowed types: {', '.join([dt.name for dt in DocumentType])}"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
             )
-        
-        # Validate file size (10MB max)
-        file_content = await file.read()
-        file_size = len(file_content)
-        if file_size > settings.MAX_UPLOAD_SIZE:
+        except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
+                detail=str(e)
             )
         
-        # Validate file type
-        allowed_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.doc', '.docx']
-        file_extension = Path(file.filename).suffix.lower()
-        if file_extension not in allowed_extensions:
+        if upload is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
+                detail="No file uploaded"
             )
         
-        # Create upload directory if it doesn't exist
-        upload_dir = Path(settings.UPLOAD_DIRECTORY) / current_user.investor_id
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{doc_type.value}_{timestamp}{file_extension}"
-        file_path = upload_dir / safe_filename
+        # Validate document type (accept both enum name and value)
+        document_type = form.fields.get("document_type", "")
+        doc_type = None
+        for dt in DocumentType:
+            if dt.name == document_type or dt.value == document_type:
+                doc_type = dt
+                break
         
-        # Save file
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        if doc_type is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid document type. Allowed types: {', '.join([dt.name for dt in DocumentType])}"
+            )
         
-        # Calculate checksum
-        checksum = hashlib.sha256(file_content).hexdigest()
+        # Into the content-addressed store; identical content is kept once
+        stored = await run_in_threadpool(storage.store_upload, upload)
         
         # Get MIME type
-        mime_type = file.content_type or "application/octet-stream"
+        mime_type = form.content_type or "application/octet-stream"
         
         # Create document record
         document = Document(
             investor_id=current_user.investor_id,
             document_type=doc_type,
-            document_name=file.filename,
-            file_path=str(file_path),
-            file_size=file_size,
+            document_name=form.filename,
+            file_path=stored.path,
+            file_size=stored.size,
             mime_type=mime_type,
             status=DocumentStatus.pending,
-            checksum=checksum,
-            upload_ip="0.0.0.0"  # In production, get from request
+            checksum=stored.checksum,
+            upload_ip=client_ip(request)
         )
         
         db.add(document)
@@ -595,16 +613,22 @@ async def upload_document(
         raise
     except Exception as e:
         db.rollback()
+        if stored:
+            await run_in_threadpool(storage.discard, stored)
         logger.error(f"Upload document error: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to upload document"
         )
+    finally:
+        if upload is not None and stored is None:
+            await run_in_threadpool(upload.discard)
 
 
 @router.get("/documents/{document_id}/download")
 async def download_document(
     document_id: int,
+    request: Request,
     current_user: User = Depends(get_current_investor),
     db: Session = Depends(get_db)
 ):
@@ -627,17 +651,21 @@ async def download_document(
                 detail="Document not found"
             )
         
-        file_path = Path(document.file_path)
-        if not file_path.exists():
+        try:
+            stat_result = await run_in_threadpool(os.stat, document.file_path)
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Document file not found"
             )
         
-        return FileResponse(
-            path=str(file_path),
+        return file_download_response(
+            request,
+            document.file_path,
+            stat_result,
             filename=document.document_name,
-            media_type=document.mime_type or "application/octet-stream"
+            media_type=document.mime_type or "application/octet-stream",
+            checksum=document.checksum
         )
     
     except HTTPException:
@@ -675,17 +703,14 @@ async def delete_document(
                 detail="Document not found"
             )
         
-        # Delete file from filesystem
-        file_path = Path(document.file_path)
-        if file_path.exists():
-            try:
-                file_path.unlink()
-            except Exception as e:
-                logger.warning(f"Failed to delete file {file_path}: {e}")
+        file_path, checksum = document.file_path, document.checksum
         
-        # Delete document record
+        # Delete document record, then the stored file unless another document has the same content
+        storage = DocumentStorageService(db)
         db.delete(document)
+        await run_in_threadpool(storage.release, file_path, checksum)
         db.commit()
+        await run_in_threadpool(storage.purge, file_path, checksum)
         
         return {
             "message": "Document deleted successfully"
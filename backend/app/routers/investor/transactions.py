@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
-from app.db.session import get_db
-from app.services.transaction_service import TransactionService
-from app.services.investor_service import InvestorService
+from app.db.session import get_db, get_async_db
+from app.services.transaction_service import TransactionService, AsyncTransactionService
+from app.services.investor_service import InvestorService, AsyncInvestorService
 from app.schemas.transaction import (
     PurchaseRequest, RedemptionRequest, SIPSetupRequest, SWPSetupRequest,
-    STPSetupRequest, SwitchRequest, TransactionResponse, PortfolioSummary,
+    STPSetupRequest, SwitchRequest, TransactionResponse,
     TransactionHistoryItem
 )
 from app.core.jwt import get_current_investor
@@ -457,16 +458,16 @@ async def switch_funds(
 @router.get("/portfolio")
 async def get_portfolio_summary(
     current_user: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get investor portfolio summary"""
     try:
-        transaction_service = TransactionService(db)
-        portfolio = transaction_service.get_portfolio_summary(current_user.investor_id)
+        transaction_service = AsyncTransactionService(db)
+        portfolio = await transaction_service.get_portfolio_summary(current_user.investor_id)
 
         return {
             "message": "Portfolio summary retrieved successfully",
-            "data": PortfolioSummary(**portfolio)
+            "data": portfolio
         }
 
     except Exception as e:
@@ -481,7 +482,7 @@ async def get_portfolio_summary(
 async def get_transaction_history(
     limit: int = 50,
     current_user: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get transaction history"""
     try:
@@ -491,20 +492,17 @@ async def get_transaction_history(
                 detail="User does not have an associated investor profile"
             )
         
-        transaction_service = TransactionService(db)
-        transactions = transaction_service.get_transaction_history(current_user.investor_id, limit)
+        transaction_service = AsyncTransactionService(db)
+        transactions = await transaction_service.get_transaction_history(current_user.investor_id, limit)
 
-        # Get scheme names for transactions
-        from app.models.scheme import Scheme
         transaction_items = []
         for txn in transactions:
-            # txn is a dictionary from the service
+            # txn is a dictionary from the service, scheme name already joined in
             scheme_id = txn.get("scheme_id")
             if not scheme_id:
                 continue  # Skip transactions without scheme_id
             
-            scheme = db.query(Scheme).filter(Scheme.scheme_id == scheme_id).first()
-            scheme_name = scheme.scheme_name if scheme else ""
+            scheme_name = txn.get("scheme_name") or ""
             
             try:
                 transaction_items.append(TransactionHistoryItem(
@@ -542,12 +540,12 @@ async def get_transaction_history(
 @router.get("/folios")
 async def get_investor_folios(
     current_user: User = Depends(get_current_investor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all folios for investor"""
     try:
-        investor_service = InvestorService(db)
-        folios = investor_service.get_investor_folios(current_user.investor_id)
+        investor_service = AsyncInvestorService(db)
+        folios = await investor_service.get_investor_folios(current_user.investor_id)
 
         return {
             "message": "Folios retrieved successfully",
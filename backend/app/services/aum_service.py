@@ -0,0 +1,257 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, select, insert, delete, union_all, literal
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import date, timedelta
+from decimal import Decimal
+import logging
+
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.folio import FolioUnitSnapshot
+from app.models.scheme import Scheme, NAVHistory
+from app.models.amc import AMC
+
+logger = logging.getLogger(__name__)
+
+
+def month_ends(as_on_date: date, months: int) -> List[date]:
+    """Month-end dates for the `months` months ending with as_on_date (capped at as_on_date)"""
+    ends = []
+    first = as_on_date.replace(day=1)
+    for _ in range(months):
+        next_first = (first + timedelta(days=32)).replace(day=1)
+        ends.append(min(next_first - timedelta(days=1), as_on_date))
+        first = (first - timedelta(days=1)).replace(day=1)
+    return sorted(ends)
+
+
+def invalidate_unit_snapshots(db, from_date: date) -> int:
+    """Drop the unit snapshots dated on or after from_date.
+
+    Called (from the rollup maintenance, which sees every transaction write)
+    when a completed transaction dated from_date is added, changed, cancelled
+    or back-dated: a snapshot taken after that date no longer matches the
+    ledger, and every later snapshot is derived from it. Point-in-time AUM
+    falls back to the previous snapshot until they are rebuilt. The check is
+    a plain read, so the usual case (no snapshot after a new transaction)
+    takes no locks. Runs in the caller's transaction.
+    """
+    stale = db.execute(
+        select(FolioUnitSnapshot.id).where(FolioUnitSnapshot.snapshot_date >= from_date).limit(1)
+    ).first()
+    if stale is None:
+        return 0
+    result = db.execute(delete(FolioUnitSnapshot).where(FolioUnitSnapshot.snapshot_date >= from_date))
+    logger.warning(f"Dropped unit snapshots from {from_date} on: completed transactions dated {from_date} changed")
+    return result.rowcount
+
+
+class AUMService:
+    """Point-in-time AUM from unit snapshots, transaction deltas and nav_history"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Holdings ledger
+    # ------------------------------------------------------------------
+
+    def latest_snapshot_date(self, as_on_date: date) -> Optional[date]:
+        """Most recent unit snapshot on or before as_on_date"""
+        return self.db.query(func.max(FolioUnitSnapshot.snapshot_date)).filter(
+            FolioUnitSnapshot.snapshot_date <= as_on_date
+        ).scalar()
+
+    def units_as_of(
+        self,
+        as_on_date: date,
+        amc_id: Optional[str] = None,
+        scheme_id: Optional[str] = None,
+        folio_range: Optional[Tuple[str, str]] = None
+    ):
+        """Subquery of (folio_number, scheme_id, amc_id, units) as of the end of as_on_date.
+
+        folio_range is an (exclusive, inclusive] bound on folio_number, applied to both
+        ledger sources so chunked callers only aggregate the folios of one chunk.
+        """
+        base_date = self.latest_snapshot_date(as_on_date)
+
+        deltas = select(
+            Transaction.folio_number.label("folio_number"),
+            Transaction.scheme_id.label("scheme_id"),
+            Transaction.amc_id.label("amc_id"),
+            Transaction.units.label("units")
+        ).where(
+            Transaction.status == TransactionStatus.completed,
+            Transaction.folio_number.isnot(None),
+            Transaction.transaction_date <= as_on_date
+        )
+        if base_date is not None:
+            deltas = deltas.where(Transaction.transaction_date > base_date)
+        if amc_id:
+            deltas = deltas.where(Transaction.amc_id == amc_id)
+        if scheme_id:
+            deltas = deltas.where(Transaction.scheme_id == scheme_id)
+        if folio_range:
+            deltas = deltas.where(
+                Transaction.folio_number > folio_range[0],
+                Transaction.folio_number <= folio_range[1]
+            )
+
+        sources = [deltas]
+        if base_date is not None:
+            base = select(
+                FolioUnitSnapshot.folio_number.label("folio_number"),
+                FolioUnitSnapshot.scheme_id.label("scheme_id"),
+                FolioUnitSnapshot.amc_id.label("amc_id"),
+                FolioUnitSnapshot.total_units.label("units")
+            ).where(FolioUnitSnapshot.snapshot_date == base_date)
+            if amc_id:
+                base = base.where(FolioUnitSnapshot.amc_id == amc_id)
+            if scheme_id:
+                base = base.where(FolioUnitSnapshot.scheme_id == scheme_id)
+            if folio_range:
+                base = base.where(
+                    FolioUnitSnapshot.folio_number > folio_range[0],
+                    FolioUnitSnapshot.folio_number <= folio_range[1]
+                )
+            sources.insert(0, base)
+
+        ledger = union_all(*sources).subquery() if len(sources) > 1 else sources[0].subquery()
+
+        return select(
+            ledger.c.folio_number,
+            ledger.c.scheme_id,
+            ledger.c.amc_id,
+            func.sum(ledger.c.units).label("units")
+        ).group_by(
+            ledger.c.folio_number, ledger.c.scheme_id, ledger.c.amc_id
+        ).subquery()
+
+    def build_unit_snapshot(self, snapshot_date: date) -> int:
+        """Write (or rebuild) the unit checkpoint for snapshot_date, then the ones after it.
+
+        Each checkpoint is one INSERT ... SELECT derived incrementally from the
+        previous snapshot plus the transactions in between, so monthly builds only
+        scan one month of history. Later snapshots are derived from this one and
+        are rebuilt in date order. Returns the folio count of snapshot_date.
+        """
+        later = [
+            row[0] for row in self.db.query(FolioUnitSnapshot.snapshot_date).filter(
+                FolioUnitSnapshot.snapshot_date > snapshot_date
+            ).distinct().order_by(FolioUnitSnapshot.snapshot_date).all()
+        ]
+        folio_count = self._write_unit_snapshot(snapshot_date)
+        for later_date in later:
+            self._write_unit_snapshot(later_date)
+        return folio_count
+
+    def _write_unit_snapshot(self, snapshot_date: date) -> int:
+        self.db.execute(
+            delete(FolioUnitSnapshot).where(FolioUnitSnapshot.snapshot_date == snapshot_date)
+        )
+        units = self.units_as_of(snapshot_date)
+
+        result = self.db.execute(
+            insert(FolioUnitSnapshot.__table__).from_select(
+                ["snapshot_date", "folio_number", "scheme_id", "amc_id", "total_units"],
+                select(
+                    literal(snapshot_date).label("snapshot_date"),
+                    units.c.folio_number,
+                    units.c.scheme_id,
+                    units.c.amc_id,
+                    units.c.units
+                ).where(units.c.units != 0)
+            )
+        )
+        self.db.commit()
+        logger.info(f"Built unit snapshot for {snapshot_date}: {result.rowcount} folios")
+        return result.rowcount
+
+    # ------------------------------------------------------------------
+    # Valuation
+    # ------------------------------------------------------------------
+
+    def navs_as_of(self, as_on_date: date):
+        """Subquery of (scheme_id, nav) using the NAV effective on as_on_date"""
+        effective = select(
+            NAVHistory.scheme_id,
+            func.max(NAVHistory.nav_date).label("nav_date")
+        ).where(NAVHistory.nav_date <= as_on_date).group_by(NAVHistory.scheme_id).subquery()
+
+        return select(
+            NAVHistory.scheme_id,
+            NAVHistory.nav_value.label("nav")
+        ).join(
+            effective,
+            and_(
+                NAVHistory.scheme_id == effective.c.scheme_id,
+                NAVHistory.nav_date == effective.c.nav_date
+            )
+        ).subquery()
+
+    def aum_as_of(self, as_on_date: date, amc_id: Optional[str] = None) -> Dict[str, Any]:
+        """AUM per AMC and scheme as of a date, aggregated in SQL"""
+        units = self.units_as_of(as_on_date, amc_id)
+        navs = self.navs_as_of(as_on_date)
+        # Schemes with no NAV on or before the date fall back to the master NAV
+        nav = func.coalesce(navs.c.nav, Scheme.current_nav)
+
+        rows = self.db.execute(
+            select(
+                units.c.amc_id,
+                AMC.amc_name,
+                units.c.scheme_id,
+                Scheme.scheme_name,
+                func.count().label("folio_count"),
+                func.sum(units.c.units).label("total_units"),
+                func.sum(units.c.units * nav).label("aum")
+            )
+            .select_from(units)
+            .join(Scheme, Scheme.scheme_id == units.c.scheme_id)
+            .outerjoin(navs, navs.c.scheme_id == units.c.scheme_id)
+            .outerjoin(AMC, AMC.amc_id == units.c.amc_id)
+            .where(units.c.units > 0)
+            .group_by(units.c.amc_id, AMC.amc_name, units.c.scheme_id, Scheme.scheme_name)
+        ).all()
+
+        aum_by_amc: Dict[str, Dict[str, Any]] = {}
+        aum_by_scheme = []
+        total_aum = Decimal('0')
+        total_folios = 0
+
+        for row in rows:
+            aum = row.aum or Decimal('0')
+            amc_name = row.amc_name or row.amc_id
+            bucket = aum_by_amc.setdefault(amc_name, {"folio_count": 0, "total_aum": 0.0})
+            bucket["folio_count"] += row.folio_count
+            bucket["total_aum"] += float(aum)
+            aum_by_scheme.append({
+                "amc_id": row.amc_id,
+                "scheme_id": row.scheme_id,
+                "scheme_name": row.scheme_name,
+                "folio_count": row.folio_count,
+                "total_units": float(row.total_units or 0),
+                "aum": float(aum)
+            })
+            total_aum += aum
+            total_folios += row.folio_count
+
+        return {
+            "as_on_date": as_on_date.isoformat(),
+            "total_aum": float(total_aum),
+            "total_folios": total_folios,
+            "aum_by_amc": aum_by_amc,
+            "aum_by_scheme": aum_by_scheme
+        }
+
+    def aum_trend(self, as_on_date: date, months: int = 24, amc_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Month-end AUM series; each point is a snapshot lookup plus bounded range scans"""
+        series = []
+        for month_end in month_ends(as_on_date, months):
+            report = self.aum_as_of(month_end, amc_id)
+            series.append({
+                "as_on_date": report["as_on_date"],
+                "total_aum": report["total_aum"],
+                "total_folios": report["total_folios"]
+            })
+        return series
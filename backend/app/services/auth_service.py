@@ -7,9 +7,10 @@ import logging
 from app.models.user import User, UserRole, UserStatus
 from app.models.investor import Investor
 from app.services.investor_service import InvestorService
-from app.services.email_service import email_service
+from app.services.email_outbox_service import EmailOutboxService
 from app.schemas.investor import InvestorCreate
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.security import create_access_token, password_hasher, PasswordHasherBusy
+from app.core.principal import principal_cache
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -23,7 +24,7 @@ class AuthService:
         self.investor_service = InvestorService(db)
         self._last_otp = {}  # For debugging OTP storage
 
-    def register_investor(self, investor_data: Dict[str, Any], password: str) -> Dict[str, Any]:
+    async def register_investor(self, investor_data: Dict[str, Any], password: str) -> Dict[str, Any]:
         """Register a new investor"""
         try:
             # Check if user already exists
@@ -31,6 +32,8 @@ class AuthService:
             if existing_user:
                 raise ValueError("User with this email already exists")
 
+            hashed_password = await password_hasher.hash(password)
+
             # Convert date_of_birth string to date object if it's a string
             if isinstance(investor_data.get('date_of_birth'), str):
                 from datetime import datetime as dt
@@ -41,7 +44,7 @@ class AuthService:
             investor = self.investor_service.create_investor(investor_create)
 
             # Create user account for investor
-            user = self.investor_service.create_user_for_investor(investor, password)
+            user = self.investor_service.create_user_for_investor(investor, hashed_password)
 
             # Commit the transaction
             self.db.commit()
@@ -71,7 +74,7 @@ class AuthService:
                 }
             }
 
-        except ValueError:
+        except (ValueError, PasswordHasherBusy):
             self.db.rollback()
             raise
         except Exception as e:
@@ -79,7 +82,7 @@ class AuthService:
             logger.error(f"Registration error: {e}", exc_info=True)
             raise ValueError(f"Registration failed: {str(e)}")
 
-    def login_user(self, email: str, password: str) -> Optional[Dict[str, Any]]:
+    async def login_user(self, email: str, password: str) -> Optional[Dict[str, Any]]:
         """Authenticate user and return access token"""
         try:
             user = self.db.query(User).filter(User.email == email).first()
@@ -98,9 +101,11 @@ class AuthService:
                 return None
 
             # Verify password
-            if not user.verify_password(password):
+            if not await password_hasher.verify(password, user.hashed_password):
                 user.increment_failed_attempts()
                 self.db.commit()
+                if user.is_account_locked:
+                    principal_cache.invalidate_user(user.id)
                 logger.warning(f"Failed login attempt for: {email}")
                 return None
 
@@ -126,6 +131,8 @@ class AuthService:
                 }
             }
 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             logger.error(f"Login error: {e}", exc_info=True)
             return None
@@ -145,18 +152,20 @@ class AuthService:
             
             # Store OTP for debugging
             self._last_otp[email] = otp
-            
+
+            # Queue the email in the same transaction as the OTP; run_email_sender.py delivers it
+            EmailOutboxService(self.db).enqueue(
+                "password_reset_otp",
+                email,
+                {"name": user.full_name or "User", "otp": otp}
+            )
             self.db.commit()
 
-            # Send OTP email
-            try:
-                email_service.send_otp_email(
-                    recipient_email=email,
-                    otp=otp,
-                    recipient_name=user.full_name or "User"
-                )
-            except Exception as e:
-                logger.error(f"Failed to send OTP email: {e}")
+            if not settings.EMAIL_FROM:
+                logger.warning("Email sender not configured (EMAIL_FROM). OTP logged to console.")
+                logger.info(f"============================================================")
+                logger.info(f"📧 OTP FOR {email}: {otp}")
+                logger.info(f"============================================================")
 
             logger.info(f"Password reset OTP generated for: {email}")
             return otp
@@ -204,7 +213,7 @@ class AuthService:
             logger.error(f"OTP verification error: {e}", exc_info=True)
             return False
 
-    def reset_password(self, email: str, otp: str, new_password: str) -> bool:
+    async def reset_password(self, email: str, otp: str, new_password: str) -> bool:
         """Reset password using OTP"""
         try:
             # Verify OTP first
@@ -215,7 +224,7 @@ class AuthService:
             if not user:
                 raise ValueError("User not found")
 
-            user.set_password(new_password)
+            user.hashed_password = await password_hasher.hash(new_password)
             user.password_reset_otp = None
             user.otp_expiry = None
             user.password_reset_token = None
@@ -225,7 +234,7 @@ class AuthService:
             logger.info(f"Password reset successful for: {email}")
             return True
 
-        except ValueError:
+        except (ValueError, PasswordHasherBusy):
             self.db.rollback()
             raise
         except Exception as e:
@@ -275,34 +284,46 @@ class AuthService:
     def update_user_profile(self, user: User, update_data: Dict[str, Any]) -> User:
         """Update user profile information"""
         try:
+            # current_user is a cached Principal shared by requests; only the ORM row is changed
+            db_user = self.db.query(User).filter(User.id == user.id).first()
+            if not db_user:
+                raise ValueError("User not found")
+
             for key, value in update_data.items():
-                if hasattr(user, key) and value is not None:
-                    setattr(user, key, value)
+                if hasattr(User, key) and value is not None:
+                    setattr(db_user, key, value)
 
             self.db.commit()
-            self.db.refresh(user)
-            return user
+            self.db.refresh(db_user)
+            # Cached principals still hold the old name and phone number
+            principal_cache.invalidate_user(db_user.id)
+            return db_user
 
         except Exception as e:
             self.db.rollback()
             logger.error(f"Update profile error: {e}", exc_info=True)
             raise ValueError(f"Failed to update profile: {str(e)}")
 
-    def change_password(self, user: User, current_password: str, new_password: str) -> bool:
+    async def change_password(self, user: User, current_password: str, new_password: str) -> bool:
         """Change user password"""
         try:
+            # current_user is a cached Principal; the password lives on the ORM row
+            db_user = self.db.query(User).filter(User.id == user.id).first()
+            if not db_user:
+                raise ValueError("User not found")
+
             # Verify current password
-            if not user.verify_password(current_password):
+            if not await password_hasher.verify(current_password, db_user.hashed_password):
                 raise ValueError("Current password is incorrect")
 
             # Set new password
-            user.set_password(new_password)
+            db_user.hashed_password = await password_hasher.hash(new_password)
             self.db.commit()
 
             logger.info(f"Password changed successfully for: {user.email}")
             return True
 
-        except ValueError:
+        except (ValueError, PasswordHasherBusy):
             self.db.rollback()
             raise
         except Exception as e:
@@ -0,0 +1,364 @@
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+import csv
+import io
+import json
+import logging
+import os
+import time
+
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.folio import Folio, FolioStatus
+from app.models.scheme import Scheme
+from app.models.investor import Investor
+from app.models.amc import AMC
+from app.models.admin import BatchJob, BatchJobType, BatchJobStatus
+from app.services.sequence_service import SequenceService
+from app.services.job_service import JobCancelled, JobLost, raise_if_cancelled
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+CAS_FORMATS = ("json", "csv")
+MAX_ERROR_LOG_LINES = 500
+
+
+# ----------------------------------------------------------------------
+# Rendering (module-level so worker processes can import it)
+# ----------------------------------------------------------------------
+
+def iter_cas_json(cas: Dict[str, Any]) -> Iterator[str]:
+    """Render a CAS as the {"message", "data"} JSON envelope, one scheme at a time"""
+    header = {key: value for key, value in cas.items() if key != "schemes"}
+    yield '{"message": "CAS generated successfully", "data": '
+    yield json.dumps(header)[:-1]
+    yield (', ' if header else '') + '"schemes": ['
+    for index, scheme in enumerate(cas["schemes"]):
+        yield (", " if index else "") + json.dumps(scheme)
+    yield "]}}"
+
+
+def iter_cas_csv(cas: Dict[str, Any]) -> Iterator[str]:
+    """Render a CAS as CSV, one scheme block at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    period = cas["statement_period"]
+    info = cas["investor_info"]
+    writer.writerow(["CONSOLIDATED ACCOUNT STATEMENT", f"{period['from_date']} to {period['to_date']}"])
+    writer.writerow([])
+    writer.writerow(["Name", info["name"]])
+    writer.writerow(["Email", info["email"]])
+    writer.writerow(["PAN", info["pan"]])
+    writer.writerow([])
+    yield flush()
+
+    for scheme in cas["schemes"]:
+        holdings = scheme["current_holdings"]
+        writer.writerow([f"SCHEME: {scheme['scheme_name']}"])
+        writer.writerow(["Folio", scheme["folio_number"], "AMC", scheme["amc_name"]])
+        writer.writerow(["Current Units", holdings["units"], "Value", holdings["value"]])
+        writer.writerow(["Date", "Trx ID", "Type", "Amount", "Units", "NAV"])
+        for txn in scheme["transactions"]:
+            writer.writerow([txn["date"], txn["transaction_id"], txn["type"], txn["amount"], txn["units"], txn["nav"]])
+        writer.writerow([])
+        yield flush()
+
+
+def iter_cas(cas: Dict[str, Any], fmt: str = "json") -> Iterator[str]:
+    if fmt == "csv":
+        return iter_cas_csv(cas)
+    return iter_cas_json(cas)
+
+
+def write_cas_files(spool_dir: str, fmt: str, statements: List[Dict[str, Any]]) -> Tuple[int, List[str]]:
+    """Render a chunk of statements into spool_dir; runs inside a worker process.
+
+    Each file is written under a temporary name and renamed into place, so a
+    resumed job can safely overwrite statements from an interrupted run.
+    """
+    written = 0
+    errors: List[str] = []
+    for cas in statements:
+        investor_id = cas["investor_info"]["investor_id"]
+        path = os.path.join(spool_dir, f"CAS_{investor_id}.{fmt}")
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8", newline="") as handle:
+                for part in iter_cas(cas, fmt):
+                    handle.write(part)
+            os.replace(path + ".tmp", path)
+            written += 1
+        except OSError as e:
+            errors.append(f"Investor {investor_id}: {str(e)}")
+    return written, errors
+
+
+class CASService:
+    """Consolidated Account Statement generation for one investor or the whole base.
+
+    Statements are assembled for a chunk of investors with a fixed number of batched
+    queries (investors, folios, transactions, schemes, AMCs), independent of how many
+    folios or transactions each investor has. Bulk runs walk investors in primary-key
+    order and hand each chunk to a process pool that renders files to a spool
+    directory, recording the last fully rendered investor as the job checkpoint.
+    """
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    # ------------------------------------------------------------------
+    # Statement assembly
+    # ------------------------------------------------------------------
+
+    def build_statements(self, investor_ids: List[str], from_date: date, to_date: date) -> List[Dict[str, Any]]:
+        """CAS data for a chunk of investors, in the order given"""
+        if not investor_ids:
+            return []
+
+        investors = {
+            row.investor_id: row
+            for row in self.db.query(
+                Investor.investor_id, Investor.full_name, Investor.email, Investor.pan_number
+            ).filter(Investor.investor_id.in_(investor_ids)).all()
+        }
+
+        folios = self.db.query(
+            Folio.investor_id, Folio.folio_number, Folio.scheme_id, Folio.amc_id,
+            Folio.total_units, Folio.total_value
+        ).filter(
+            Folio.investor_id.in_(investor_ids),
+            Folio.status == FolioStatus.active
+        ).order_by(Folio.investor_id, Folio.id).all()
+
+        transactions = self.db.query(
+            Transaction.investor_id, Transaction.scheme_id, Transaction.transaction_id,
+            Transaction.transaction_date, Transaction.transaction_type, Transaction.amount,
+            Transaction.units, Transaction.nav_per_unit, Transaction.status
+        ).filter(
+            Transaction.investor_id.in_(investor_ids),
+            Transaction.transaction_date >= from_date,
+            Transaction.transaction_date <= to_date,
+            Transaction.status == TransactionStatus.completed
+        ).order_by(Transaction.investor_id, Transaction.transaction_date, Transaction.id).all()
+
+        scheme_ids = {folio.scheme_id for folio in folios}
+        schemes = {
+            row.scheme_id: row
+            for row in self.db.query(
+                Scheme.scheme_id, Scheme.scheme_name, Scheme.current_nav
+            ).filter(Scheme.scheme_id.in_(scheme_ids)).all()
+        } if scheme_ids else {}
+
+        amc_ids = {folio.amc_id for folio in folios}
+        amc_names = dict(
+            self.db.query(AMC.amc_id, AMC.amc_name).filter(AMC.amc_id.in_(amc_ids)).all()
+        ) if amc_ids else {}
+
+        # (investor_id, scheme_id) -> rendered transaction rows
+        scheme_transactions: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for txn in transactions:
+            scheme_transactions.setdefault((txn.investor_id, txn.scheme_id), []).append({
+                "transaction_id": txn.transaction_id,
+                "date": txn.transaction_date.isoformat() if txn.transaction_date else None,
+                "type": txn.transaction_type.value if hasattr(txn.transaction_type, 'value') else str(txn.transaction_type),
+                "amount": float(txn.amount) if txn.amount else 0.0,
+                "units": float(txn.units) if txn.units else 0.0,
+                "nav": float(txn.nav_per_unit) if txn.nav_per_unit else 0.0,
+                "status": txn.status.value if hasattr(txn.status, 'value') else str(txn.status)
+            })
+
+        investor_schemes: Dict[str, List[Dict[str, Any]]] = {}
+        for folio in folios:
+            scheme = schemes.get(folio.scheme_id)
+            if not scheme:
+                continue
+            investor_schemes.setdefault(folio.investor_id, []).append({
+                "scheme_id": folio.scheme_id,
+                "scheme_name": scheme.scheme_name,
+                "amc_name": amc_names.get(folio.amc_id, ""),
+                "folio_number": folio.folio_number,
+                "current_holdings": {
+                    "units": float(folio.total_units) if folio.total_units else 0.0,
+                    "nav": float(scheme.current_nav) if scheme.current_nav else 0.0,
+                    "value": float(folio.total_value) if folio.total_value else 0.0
+                },
+                "transactions": scheme_transactions.get((folio.investor_id, folio.scheme_id), [])
+            })
+
+        statements = []
+        for investor_id in investor_ids:
+            investor = investors.get(investor_id)
+            statements.append({
+                "investor_info": {
+                    "investor_id": investor_id,
+                    "name": investor.full_name if investor else "",
+                    "email": investor.email if investor else "",
+                    "pan": investor.pan_number if investor else "",
+                },
+                "statement_period": {
+                    "from_date": from_date.isoformat(),
+                    "to_date": to_date.isoformat()
+                },
+                "schemes": investor_schemes.get(investor_id, [])
+            })
+        return statements
+
+    def build_statement(self, investor_id: str, from_date: date, to_date: date) -> Dict[str, Any]:
+        return self.build_statements([investor_id], from_date, to_date)[0]
+
+    # ------------------------------------------------------------------
+    # Bulk dispatch
+    # ------------------------------------------------------------------
+
+    def create_job(
+        self,
+        from_date: date,
+        to_date: date,
+        fmt: str = "json",
+        executed_by: Optional[str] = None
+    ) -> BatchJob:
+        """Create a pending statement generation job with its own spool directory"""
+        if fmt not in CAS_FORMATS:
+            raise ValueError(f"Unsupported CAS format: {fmt}")
+
+        job_id = SequenceService(self.db).next_ids("cas_job", 1)[0]
+        batch_job = BatchJob(
+            job_id=job_id,
+            job_type=BatchJobType.statement_generation,
+            job_name=f"CAS - {from_date.isoformat()} to {to_date.isoformat()}",
+            scheduled_at=datetime.now(),
+            status=BatchJobStatus.pending,
+            parameters={
+                "from_date": from_date.isoformat(),
+                "to_date": to_date.isoformat(),
+                "format": fmt,
+                "chunk_size": self.chunk_size,
+                "checkpoint": 0
+            },
+            output_file_path=os.path.join(settings.CAS_SPOOL_DIRECTORY, job_id),
+            records_processed=0,
+            records_successful=0,
+            records_failed=0,
+            executed_by=executed_by
+        )
+        self.db.add(batch_job)
+        self.db.commit()
+        return batch_job
+
+    def run(
+        self,
+        from_date: date,
+        to_date: date,
+        fmt: str = "json",
+        executed_by: Optional[str] = None
+    ) -> BatchJob:
+        """Create a new CAS job and generate statements for every investor"""
+        batch_job = self.create_job(from_date, to_date, fmt, executed_by)
+        return self.execute(batch_job)
+
+    def resume(self, job_id: str) -> BatchJob:
+        """Restart a failed or interrupted CAS job after its last rendered investor"""
+        batch_job = self.db.query(BatchJob).filter(BatchJob.job_id == job_id).first()
+        if not batch_job:
+            raise ValueError(f"Batch job {job_id} not found")
+        if batch_job.job_type != BatchJobType.statement_generation:
+            raise ValueError(f"Batch job {job_id} is not a statement generation job")
+        if batch_job.status == BatchJobStatus.completed:
+            raise ValueError(f"Batch job {job_id} is already completed")
+        return self.execute(batch_job)
+
+    def execute(self, batch_job: BatchJob, workers: Optional[int] = None) -> BatchJob:
+        """Stream investors in keyset order and render their statements in a process pool.
+
+        The next chunk is queried while earlier chunks render. Chunks are retired in
+        submission order, so the checkpoint only ever covers fully written chunks.
+        """
+        params = dict(batch_job.parameters or {})
+        from_date = date.fromisoformat(params["from_date"])
+        to_date = date.fromisoformat(params["to_date"])
+        fmt = params.get("format") or "json"
+        self.chunk_size = params.get("chunk_size") or self.chunk_size
+        checkpoint = params.get("checkpoint") or 0
+        workers = workers or settings.CAS_RENDER_WORKERS
+        spool_dir = batch_job.output_file_path
+        os.makedirs(spool_dir, exist_ok=True)
+
+        batch_job.status = BatchJobStatus.running
+        if not batch_job.started_at:
+            batch_job.started_at = datetime.now()
+        self.db.commit()
+
+        started = time.monotonic()
+        errors: List[str] = [batch_job.error_log] if batch_job.error_log else []
+        pending: deque = deque()
+
+        def retire(future, last_id: int, count: int) -> None:
+            nonlocal checkpoint
+            written, chunk_errors = future.result()
+            checkpoint = last_id
+            params["checkpoint"] = checkpoint
+            batch_job.parameters = dict(params)
+            batch_job.records_processed = (batch_job.records_processed or 0) + count
+            batch_job.records_successful = (batch_job.records_successful or 0) + written
+            batch_job.records_failed = (batch_job.records_failed or 0) + count - written
+            errors.extend(chunk_errors)
+            batch_job.error_log = "\n".join(errors[-MAX_ERROR_LOG_LINES:]) if errors else None
+            self.db.commit()
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                after_id = checkpoint
+                while True:
+                    raise_if_cancelled(self.db, batch_job)
+                    investors = self.db.query(Investor.id, Investor.investor_id).filter(
+                        Investor.id > after_id
+                    ).order_by(Investor.id).limit(self.chunk_size).all()
+                    if not investors:
+                        break
+                    after_id = investors[-1].id
+
+                    statements = self.build_statements(
+                        [row.investor_id for row in investors], from_date, to_date
+                    )
+                    # Release the read snapshot while workers render
+                    self.db.commit()
+                    pending.append((pool.submit(write_cas_files, spool_dir, fmt, statements), after_id, len(investors)))
+
+                    while len(pending) > workers:
+                        retire(*pending.popleft())
+
+                while pending:
+                    retire(*pending.popleft())
+
+            batch_job.status = BatchJobStatus.completed
+        except JobCancelled:
+            logger.info(f"CAS job {batch_job.job_id} cancelled after checkpoint {checkpoint}")
+        except JobLost:
+            raise
+        except Exception as e:
+            logger.error(f"CAS job {batch_job.job_id} failed: {e}", exc_info=True)
+            self.db.rollback()
+            errors.append(f"Job aborted after checkpoint {checkpoint}: {str(e)}")
+            batch_job.error_log = "\n".join(errors[-MAX_ERROR_LOG_LINES:])
+            batch_job.status = BatchJobStatus.failed
+
+        batch_job.completed_at = datetime.now()
+        batch_job.execution_time_seconds = (batch_job.execution_time_seconds or 0) + int(time.monotonic() - started)
+        self.db.commit()
+
+        logger.info(
+            f"CAS job {batch_job.job_id}: {batch_job.records_successful}/{batch_job.records_processed} "
+            f"statements written to {spool_dir}"
+        )
+        return batch_job
@@ -0,0 +1,206 @@
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional
+import hashlib
+import logging
+import os
+import tempfile
+
+from app.core.config import settings
+from app.core.uploads import UploadTooLarge
+from app.db.bulk import upsert
+from app.models.document import DocumentBlob
+
+logger = logging.getLogger(__name__)
+
+
+class StoredFile(NamedTuple):
+    path: str
+    checksum: str
+    size: int
+
+
+class PendingUpload:
+    """A file being received into the store's temp directory, hashed as it is written"""
+
+    def __init__(self, path: str, fd: int, max_size: int):
+        self.path = path
+        self.size = 0
+        self.max_size = max_size
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        """Append a chunk; raises UploadTooLarge once more than MAX_UPLOAD_SIZE bytes were written"""
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLarge(self.max_size)
+        self._digest.update(data)
+        self._file.write(data)
+
+    def finish(self) -> str:
+        """Flush the file to disk and return its SHA-256"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return self._digest.hexdigest()
+
+    def discard(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class DocumentStorageService:
+    """Content-addressed storage for uploaded documents.
+
+    A file is kept once under UPLOAD_DIRECTORY/ab/cd/<sha256>, however many
+    document rows refer to it: investors re-uploading the same PAN card or
+    cheque share one copy, counted in its document_blobs row. Uploads are
+    written to a temp file in the same directory tree and renamed into place,
+    so a stored path only ever holds complete content. A file is deleted only
+    after the release of its last reference has committed. Storing, releasing
+    and purging a file all lock its blob row, so none acts on a stale
+    reference count. The methods block and are meant to be run in the
+    threadpool.
+    """
+
+    def __init__(self, db: Session, root: str = None):
+        self.db = db
+        self.root = Path(root or settings.UPLOAD_DIRECTORY)
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.max_size = settings.MAX_UPLOAD_SIZE
+
+    def path_for(self, checksum: str) -> Path:
+        return self.root / checksum[:2] / checksum[2:4] / checksum
+
+    def begin_upload(self) -> PendingUpload:
+        """Temp file to write an upload to; pass it to store_upload() or discard() it"""
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        return PendingUpload(tmp_path, fd, self.max_size)
+
+    def store(self, source: BinaryIO) -> StoredFile:
+        """Copy `source` into the store chunk by chunk, then as store_upload().
+
+        Raises UploadTooLarge once more than MAX_UPLOAD_SIZE bytes have been
+        read; nothing is left behind in that case.
+        """
+        upload = self.begin_upload()
+        try:
+            while True:
+                chunk = source.read(self.chunk_size)
+                if not chunk:
+                    break
+                upload.write(chunk)
+        except BaseException:
+            upload.discard()
+            raise
+        return self.store_upload(upload)
+
+    def store_upload(self, upload: PendingUpload) -> StoredFile:
+        """Move a received upload into place and take a reference on its blob.
+
+        The caller adds the document row and commits, which also releases the
+        blob row lock taken here. If that transaction is rolled back instead,
+        call discard() with the returned StoredFile.
+        """
+        try:
+            checksum = upload.finish()
+            target = self.path_for(checksum)
+            blob = self._lock_blob(checksum, str(target), upload.size)
+            if target.exists():
+                # Same content is already stored; keep the existing copy
+                os.unlink(upload.path)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(upload.path, target)
+        except BaseException:
+            upload.discard()
+            raise
+
+        blob.ref_count += 1
+        self.db.flush()
+        return StoredFile(path=str(target), checksum=checksum, size=upload.size)
+
+    def release(self, file_path: str, checksum: str = None) -> None:
+        """Drop a document's reference to its file.
+
+        Call in the transaction that deletes the document row; the caller
+        commits and then calls purge() with the same arguments. Nothing is
+        removed from disk here, so a rolled back delete keeps its file.
+        """
+        blob = self._find_blob(checksum)
+        if blob is None or blob.file_path != file_path:
+            # Uploaded before content addressing: no count to drop, purge() deletes the file
+            return
+
+        blob.ref_count -= 1
+        self.db.flush()
+
+    def purge(self, file_path: str, checksum: str = None) -> None:
+        """Delete a released file once nothing refers to it, and commit.
+
+        Call after the release() has committed. The reference count is read
+        again under the blob row lock, so a file that an upload of the same
+        content has taken a reference on since is kept. Failures are logged
+        rather than raised: the document is gone either way.
+        """
+        try:
+            blob = self._find_blob(checksum)
+            if blob is not None and blob.file_path == file_path:
+                if blob.ref_count <= 0:
+                    self.db.delete(blob)
+                    self._unlink(file_path)
+            elif not checksum or Path(file_path).name != checksum:
+                # Uploaded before content addressing: the file belonged to that document alone
+                self._unlink(file_path)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.warning(f"Failed to purge file {file_path}: {e}")
+
+    def discard(self, stored: StoredFile) -> None:
+        """Undo store_upload() after its transaction was rolled back, and commit"""
+        blob = self._lock_blob(stored.checksum, stored.path, stored.size)
+        if blob.ref_count <= 0:
+            self.db.delete(blob)
+            self._unlink(stored.path)
+        self.db.commit()
+
+    def _find_blob(self, checksum: Optional[str]) -> Optional[DocumentBlob]:
+        """The blob row for a checksum, if any, locked for the rest of the transaction"""
+        if not checksum:
+            return None
+        return self.db.query(DocumentBlob)\
+            .filter(DocumentBlob.checksum == checksum)\
+            .with_for_update()\
+            .populate_existing()\
+            .first()
+
+    def _lock_blob(self, checksum: str, file_path: str, size: int) -> DocumentBlob:
+        """Create the blob row if missing and lock it for the rest of the transaction"""
+        upsert(
+            self.db, DocumentBlob.__table__,
+            [{"checksum": checksum, "file_path": file_path, "size": size, "ref_count": 0}],
+            key_columns=["checksum"],
+            update_columns=["checksum"]
+        )
+        return self.db.query(DocumentBlob)\
+            .filter(DocumentBlob.checksum == checksum)\
+            .with_for_update()\
+            .populate_existing()\
+            .one()
+
+    @staticmethod
+    def _unlink(file_path: str) -> None:
+        try:
+            Path(file_path).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to delete file {file_path}: {e}")
@@ -0,0 +1,238 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, update, and_, or_
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import time
+
+from app.core.config import settings
+from app.models.email_outbox import EmailOutbox, EmailStatus
+from app.services.email_service import EMAIL_TEMPLATES, EmailService, is_permanent_failure
+from app.services.job_service import default_worker_id
+
+logger = logging.getLogger(__name__)
+
+ENQUEUE_CHUNK_ROWS = 1000  # rows per INSERT when enqueueing for many recipients
+
+
+class ClaimedEmail(NamedTuple):
+    id: int
+    template: str
+    recipient_email: str
+    context: Optional[Dict[str, Any]]
+    attempts: int
+
+
+class EmailOutboxService:
+    """Email queue on the email_outbox table.
+
+    Requests enqueue inside their own transaction and never talk to SMTP:
+    the email exists exactly when the change that caused it is committed.
+    Senders (run_email_sender.py) claim due rows in batches with
+    SELECT ... FOR UPDATE SKIP LOCKED, deliver them and record the outcome.
+    Failed deliveries are retried with exponential backoff; delivery is at
+    least once, since a sender that dies mid-batch leaves its rows to be
+    claimed again after EMAIL_CLAIM_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+
+    def enqueue(self, template: str, recipient_email: str, context: Dict[str, Any] = None,
+                send_at: Optional[datetime] = None) -> EmailOutbox:
+        """Add an email to the caller's transaction; it is sent once the caller commits"""
+        if template not in EMAIL_TEMPLATES:
+            raise ValueError(f"Unknown email template {template}")
+        email = EmailOutbox(
+            template=template,
+            recipient_email=recipient_email,
+            context=context or {},
+            status=EmailStatus.pending,
+            attempts=0,
+            next_attempt_at=send_at or datetime.now()
+        )
+        self.db.add(email)
+        return email
+
+    def enqueue_many(self, template: str, recipients: Iterable[Tuple[str, Dict[str, Any]]],
+                     send_at: Optional[datetime] = None) -> int:
+        """Bulk insert one email per (recipient_email, context); the caller commits"""
+        if template not in EMAIL_TEMPLATES:
+            raise ValueError(f"Unknown email template {template}")
+        send_at = send_at or datetime.now()
+        queued = 0
+        chunk = []
+        for recipient_email, context in recipients:
+            chunk.append({
+                "template": template,
+                "recipient_email": recipient_email,
+                "context": context or {},
+                "status": EmailStatus.pending,
+                "attempts": 0,
+                "next_attempt_at": send_at
+            })
+            if len(chunk) >= ENQUEUE_CHUNK_ROWS:
+                self.db.execute(insert(EmailOutbox), chunk)
+                queued += len(chunk)
+                chunk = []
+        if chunk:
+            self.db.execute(insert(EmailOutbox), chunk)
+            queued += len(chunk)
+        return queued
+
+    def claim_batch(self, sender_id: str, limit: int = None) -> List[ClaimedEmail]:
+        """Lock up to `limit` due emails, mark them sending for this sender and commit"""
+        limit = limit or settings.EMAIL_BATCH_SIZE
+        now = datetime.now()
+        stale = now - timedelta(seconds=settings.EMAIL_CLAIM_TIMEOUT_SECONDS)
+
+        rows = self.db.execute(
+            select(
+                EmailOutbox.id, EmailOutbox.template, EmailOutbox.recipient_email,
+                EmailOutbox.context, EmailOutbox.attempts
+            )
+            .where(or_(
+                and_(EmailOutbox.status == EmailStatus.pending, EmailOutbox.next_attempt_at <= now),
+                and_(EmailOutbox.status == EmailStatus.sending, EmailOutbox.claimed_at < stale)
+            ))
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        if not rows:
+            self.db.rollback()
+            return []
+
+        self.db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_([row.id for row in rows]))
+            .values(
+                status=EmailStatus.sending,
+                claimed_by=sender_id,
+                claimed_at=now,
+                attempts=EmailOutbox.attempts + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return [
+            ClaimedEmail(row.id, row.template, row.recipient_email, row.context, row.attempts + 1)
+            for row in rows
+        ]
+
+    def record_results(self, results: List[Tuple[ClaimedEmail, Optional[Exception]]]) -> Dict[str, int]:
+        """Store the outcome of a delivered batch in one statement and commit.
+
+        A failure is retried after EMAIL_RETRY_BASE_SECONDS, doubling per
+        attempt, unless it is permanent or the email is out of attempts.
+        """
+        now = datetime.now()
+        counts = {"sent": 0, "retry": 0, "failed": 0}
+        params = []
+        for email, error in results:
+            row = {"id": email.id, "claimed_by": None, "claimed_at": None}
+            if error is None:
+                # The context can hold secrets such as OTPs; it is not needed once sent
+                row.update(status=EmailStatus.sent, sent_at=now, context=None, last_error=None,
+                           next_attempt_at=now)
+                counts["sent"] += 1
+            elif is_permanent_failure(error) or email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                row.update(status=EmailStatus.failed, sent_at=None, context=email.context,
+                           last_error=_describe(error), next_attempt_at=now)
+                counts["failed"] += 1
+            else:
+                delay = settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (email.attempts - 1)
+                row.update(status=EmailStatus.pending, sent_at=None, context=email.context,
+                           last_error=_describe(error), next_attempt_at=now + timedelta(seconds=delay))
+                counts["retry"] += 1
+            params.append(row)
+
+        if params:
+            self.db.execute(update(EmailOutbox), params)
+        self.db.commit()
+        return counts
+
+
+def _describe(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"[:2000]
+
+
+class EmailSender:
+    """Delivers claimed batches, one thread per pooled SMTP connection"""
+
+    def __init__(self, email_service: Optional[EmailService] = None, sender_id: Optional[str] = None):
+        self.email_service = email_service or EmailService()
+        self.sender_id = sender_id or default_worker_id()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.email_service.pool.size, thread_name_prefix="email-sender"
+        )
+
+    def _deliver(self, email: ClaimedEmail) -> Optional[Exception]:
+        try:
+            self.email_service.send(email.template, email.recipient_email, email.context or {})
+            return None
+        except Exception as e:
+            logger.warning(f"Email {email.id} to {email.recipient_email} not delivered: {e}")
+            return e
+
+    def send_batch(self, db: Session, batch_size: int = None) -> Dict[str, int]:
+        """Claim, deliver and record one batch; all zero counts when nothing is due"""
+        outbox = EmailOutboxService(db)
+        batch = outbox.claim_batch(self.sender_id, batch_size)
+        if not batch:
+            return {"sent": 0, "retry": 0, "failed": 0}
+        errors = list(self._executor.map(self._deliver, batch))
+        counts = outbox.record_results(list(zip(batch, errors)))
+        logger.info(f"Sender {self.sender_id}: {counts['sent']} sent, {counts['retry']} to retry, "
+                    f"{counts['failed']} failed")
+        return counts
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.email_service.close()
+
+
+def work(
+    session_factory: Callable[[], Session],
+    sender: Optional[EmailSender] = None,
+    batch_size: Optional[int] = None,
+    poll_seconds: Optional[float] = None,
+    should_stop: Callable[[], bool] = lambda: False,
+    once: bool = False
+) -> int:
+    """Sender loop: send batches back to back, sleeping poll_seconds when nothing is due.
+
+    Uses a fresh session per batch. With once=True it drains the due emails
+    and returns instead of polling. Returns the number of emails sent.
+    """
+    sender = sender or EmailSender()
+    poll_seconds = settings.EMAIL_SENDER_POLL_SECONDS if poll_seconds is None else poll_seconds
+    sent = 0
+
+    while not should_stop():
+        db = session_factory()
+        try:
+            counts = sender.send_batch(db, batch_size)
+        except Exception as e:
+            # Lost database connection or similar; back off and poll again
+            logger.error(f"Sender {sender.sender_id} could not send a batch: {e}", exc_info=True)
+            counts = None
+        finally:
+            db.close()
+
+        if counts and any(counts.values()):
+            sent += counts["sent"]
+            continue
+        if once:
+            break
+        deadline = time.monotonic() + poll_seconds
+        while time.monotonic() < deadline and not should_stop():
+            time.sleep(min(0.5, poll_seconds))
+
+    return sent
@@ -1,39 +1,68 @@
 import smtplib
+import ssl
+import html
+import queue
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email import policy
+from email.utils import formatdate, make_msgid
+from string import Template
+from textwrap import dedent
+from typing import Any, Dict, Optional, Tuple
 import logging
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
-class EmailService:
-    """Service for sending emails"""
+class EmailTemplate:
+    """Subject, plain text and HTML bodies, compiled once and filled with $name placeholders.
 
-    def __init__(self):
-        self.smtp_server = settings.SMTP_SERVER
-        self.smtp_port = settings.SMTP_PORT
-        self.sender_email = settings.EMAIL_FROM
-        self.sender_password = settings.SMTP_PASSWORD
+    Values are HTML-escaped for the HTML body only. A missing value raises
+    KeyError, so an email is never sent with a placeholder left in it.
+    """
 
-    def send_otp_email(self, recipient_email: str, otp: str, recipient_name: str = "User") -> bool:
-        """Send OTP email to recipient"""
-        try:
-            message = MIMEMultipart("alternative")
-            message["Subject"] = "Password Reset OTP - RTA System"
-            message["From"] = self.sender_email
-            message["To"] = recipient_email
+    def __init__(self, subject: str, text: str, html_body: str):
+        self.subject = Template(subject)
+        self.text = Template(dedent(text).strip() + "\n")
+        self.html = Template(dedent(html_body).strip())
+
+    def render(self, context: Dict[str, Any]) -> Tuple[str, str, str]:
+        values = {key: str(value) for key, value in context.items()}
+        escaped = {key: html.escape(value) for key, value in values.items()}
+        return self.subject.substitute(values), self.text.substitute(values), self.html.substitute(escaped)
+
+
+EMAIL_TEMPLATES: Dict[str, EmailTemplate] = {
+    "password_reset_otp": EmailTemplate(
+        subject="Password Reset OTP - RTA System",
+        text="""
+            Password Reset Request
+
+            Dear $name,
+
+            You have requested to reset your password. Please use the following OTP to complete the reset:
+
+            OTP: $otp
+
+            This OTP is valid for 10 minutes.
 
-            # Create HTML email body
-            html_body = f"""
+            If you did not request this password reset, please ignore this email.
+
+            Best regards,
+            RTA System Team
+        """,
+        html_body="""
             <html>
               <body>
                 <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
                   <h2 style="color: #2563eb;">Password Reset Request</h2>
-                  <p>Dear {recipient_name},</p>
+                  <p>Dear $name,</p>
                   <p>You have requested to reset your password. Please use the following OTP to complete the reset:</p>
                   <div style="background-color: #f3f4f6; border: 2px solid #2563eb; border-radius: 8px; padding: 20px; text-align: center; margin: 20px 0;">
-                    <h1 style="color: #2563eb; margin: 0; font-size: 32px; letter-spacing: 4px;">{otp}</h1>
+                    <h1 style="color: #2563eb; margin: 0; font-size: 32px; letter-spacing: 4px;">$otp</h1>
                   </div>
                   <p>This OTP is valid for 10 minutes.</p>
                   <p>If you did not request this password reset, please ignore this email.</p>
@@ -44,55 +73,165 @@ class EmailService:
                 </div>
               </body>
             </html>
-            """
+        """
+    ),
+}
 
-            # Create plain text version
-            text_body = f"""
-            Password Reset Request
-            
-            Dear {recipient_name},
-            
-            You have requested to reset your password. Please use the following OTP to complete the reset:
-            
-            OTP: {otp}
-            
-            This OTP is valid for 10 minutes.
-            
-            If you did not request this password reset, please ignore this email.
-            
-            Best regards,
-            RTA System Team
-            """
-
-            # Add both versions
-            part1 = MIMEText(text_body, "plain")
-            part2 = MIMEText(html_body, "html")
-            message.attach(part1)
-            message.attach(part2)
-
-            # Send email
-            if self.sender_email and self.sender_password:
-                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                    server.starttls()
-                    server.login(self.sender_email, self.sender_password)
-                    server.sendmail(self.sender_email, recipient_email, message.as_string())
-                logger.info(f"OTP email sent successfully to {recipient_email}")
-                return True
-            else:
-                logger.warning("Email credentials not configured. OTP logged to console.")
-                logger.info(f"============================================================")
-                logger.info(f"📧 OTP FOR {recipient_email}: {otp}")
-                logger.info(f"============================================================")
-                return False
-
-        except Exception as e:
-            logger.error(f"Failed to send OTP email to {recipient_email}: {e}", exc_info=True)
-            # Always log OTP for development
-            logger.info(f"============================================================")
-            logger.info(f"📧 OTP FOR {recipient_email}: {otp}")
-            logger.info(f"============================================================")
-            return False
-
-
-# Create singleton instance
-email_service = EmailService()
+
+def build_message(template: str, sender_email: str, recipient_email: str, context: Dict[str, Any]) -> bytes:
+    """Render an EMAIL_TEMPLATES entry into a multipart (text + HTML) message"""
+    if template not in EMAIL_TEMPLATES:
+        raise ValueError(f"Unknown email template {template}")
+    subject, text_body, html_body = EMAIL_TEMPLATES[template].render(context or {})
+
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = sender_email
+    message["To"] = recipient_email
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid(domain=sender_email.rpartition("@")[2] or None)
+    message.attach(MIMEText(text_body, "plain"))
+    message.attach(MIMEText(html_body, "html"))
+    return message.as_bytes(policy=policy.SMTP)  # CRLF line endings; smtplib sends bytes unchanged
+
+
+class _Connection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """Up to `size` authenticated SMTP connections, reused across messages.
+
+    Connecting, STARTTLS and login cost several round trips; a pooled
+    connection pays them once per EMAIL_SMTP_MESSAGES_PER_CONNECTION
+    messages. Connections idle for longer than EMAIL_SMTP_IDLE_SECONDS are
+    checked with NOOP, and one the server has dropped is replaced and the
+    message retried once. Thread-safe: send() blocks while all connections
+    are in use.
+    """
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        username: str = None,
+        password: str = None,
+        use_tls: bool = None,
+        size: int = None,
+        timeout: float = 30.0
+    ):
+        self.host = host or settings.SMTP_SERVER
+        self.port = port or settings.SMTP_PORT
+        self.username = username if username is not None else (settings.SMTP_USERNAME or settings.EMAIL_FROM)
+        self.password = password if password is not None else settings.SMTP_PASSWORD
+        self.use_tls = settings.SMTP_USE_TLS if use_tls is None else use_tls
+        self.size = size or settings.EMAIL_SMTP_CONNECTIONS
+        self.timeout = timeout
+        self.messages_per_connection = settings.EMAIL_SMTP_MESSAGES_PER_CONNECTION
+        self.idle_seconds = settings.EMAIL_SMTP_IDLE_SECONDS
+        self._idle: "queue.LifoQueue[_Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.connections_opened = 0
+
+    def _open(self) -> _Connection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+            if self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.connections_opened += 1
+        return _Connection(smtp)
+
+    def _checkout(self) -> _Connection:
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            if connection.messages >= self.messages_per_connection:
+                connection.close()
+                continue
+            if time.monotonic() - connection.last_used > self.idle_seconds:
+                try:
+                    if connection.smtp.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP refused")
+                except (smtplib.SMTPException, OSError):
+                    connection.close()
+                    continue
+            return connection
+
+    def _checkin(self, connection: _Connection) -> None:
+        connection.last_used = time.monotonic()
+        self._idle.put(connection)
+
+    def send(self, sender_email: str, recipient_email: str, message: bytes) -> None:
+        """Send one message; raises the smtplib error if the server rejects it"""
+        with self._slots:
+            for attempt in (1, 2):
+                connection = self._checkout()
+                try:
+                    connection.smtp.sendmail(sender_email, [recipient_email], message)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    # Rejected, but the connection is still usable (smtplib has sent RSET)
+                    self._checkin(connection)
+                    raise
+                except (smtplib.SMTPException, OSError):
+                    connection.close()
+                    if attempt == 2:
+                        raise
+                    logger.info(f"SMTP connection to {self.host} dropped, retrying on a new one")
+                    continue
+                connection.messages += 1
+                self._checkin(connection)
+                return
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Whether retrying cannot help: bad template data or a 5xx rejection of this message"""
+    if isinstance(error, (KeyError, ValueError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPDataError):
+        return error.smtp_code >= 500
+    return False
+
+
+class EmailService:
+    """Renders outbox emails and sends them over a shared SMTP connection pool"""
+
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None, sender_email: str = None):
+        self.sender_email = sender_email or settings.EMAIL_FROM
+        if not self.sender_email:
+            raise ValueError("EMAIL_FROM is not configured")
+        self.pool = pool or SMTPConnectionPool()
+
+    def send(self, template: str, recipient_email: str, context: Dict[str, Any]) -> None:
+        message = build_message(template, self.sender_email, recipient_email, context)
+        self.pool.send(self.sender_email, recipient_email, message)
+
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,528 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert, update, case, literal, and_
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import date, datetime
+from decimal import Decimal
+import logging
+import time
+
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.folio import Folio
+from app.models.scheme import Scheme, NAVHistory
+from app.models.admin import BatchJob, BatchJobType, BatchJobStatus
+from app.services.aum_service import AUMService
+from app.services.sequence_service import SequenceService
+from app.services.rollup_service import RollupService
+from app.services.lot_service import LotService
+from app.services.job_service import JobCancelled, JobLost, raise_if_cancelled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_ERROR_LOG_LINES = 500
+IDCW_TYPES = [TransactionType.idcw_payout, TransactionType.idcw_reinvestment]
+
+
+class IDCWService:
+    """Set-based IDCW declaration engine.
+
+    Entitlement is the folio's units as of the record date from the holdings
+    ledger (unit snapshots plus completed transactions). Folios are walked in
+    folio_number order in chunks; each chunk writes all of its payout and
+    reinvestment rows with one INSERT ... SELECT and commits together with the
+    job checkpoint, so a failed declaration resumes without duplicating rows.
+    Generated rows are pending and carry the job_id in transfer_request_id;
+    process() later completes them the same way, chunk by chunk.
+    """
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    # ------------------------------------------------------------------
+    # Job lifecycle
+    # ------------------------------------------------------------------
+
+    def create_job(
+        self,
+        scheme_id: str,
+        amc_id: str,
+        idcw_rate: Decimal,
+        idcw_amount_per_unit: Decimal,
+        declaration_date: date,
+        record_date: date,
+        payment_date: date,
+        description: Optional[str] = None,
+        executed_by: Optional[str] = None
+    ) -> BatchJob:
+        """Validate a declaration and create its pending IDCW batch job"""
+        scheme = self.db.query(Scheme).filter(Scheme.scheme_id == scheme_id).first()
+        if not scheme:
+            raise ValueError(f"Scheme {scheme_id} not found")
+        if scheme.amc_id != amc_id:
+            raise ValueError(f"Scheme {scheme_id} does not belong to AMC {amc_id}")
+        if Decimal(str(idcw_amount_per_unit)) <= 0:
+            raise ValueError("IDCW amount per unit must be positive")
+        if not (declaration_date <= record_date <= payment_date):
+            raise ValueError("Dates must satisfy declaration_date <= record_date <= payment_date")
+        self.payment_nav(scheme_id, payment_date)
+
+        batch_job = BatchJob(
+            job_id=SequenceService(self.db).next_ids("idcw_job", 1)[0],
+            job_type=BatchJobType.idcw_processing,
+            job_name=f"IDCW Declaration - {scheme.scheme_name}",
+            scheduled_at=datetime.now(),
+            status=BatchJobStatus.pending,
+            parameters={
+                "scheme_id": scheme_id,
+                "amc_id": amc_id,
+                "idcw_rate": str(idcw_rate),
+                "idcw_amount_per_unit": str(idcw_amount_per_unit),
+                "declaration_date": declaration_date.isoformat(),
+                "record_date": record_date.isoformat(),
+                "payment_date": payment_date.isoformat(),
+                "description": description,
+                "chunk_size": self.chunk_size,
+                "checkpoint": ""
+            },
+            records_processed=0,
+            records_successful=0,
+            records_failed=0,
+            executed_by=executed_by
+        )
+        self.db.add(batch_job)
+        self.db.commit()
+        return batch_job
+
+    def declare(self, executed_by: Optional[str] = None, **declaration) -> BatchJob:
+        """Create an IDCW declaration job and generate every folio's transaction"""
+        batch_job = self.create_job(executed_by=executed_by, **declaration)
+        return self.execute(batch_job)
+
+    def resume(self, job_id: str) -> BatchJob:
+        """Restart a failed or interrupted declaration from its last checkpoint"""
+        batch_job = self.get_job(job_id)
+        if batch_job.status == BatchJobStatus.completed:
+            raise ValueError(f"Batch job {job_id} is already completed")
+        return self.execute(batch_job)
+
+    def get_job(self, job_id: str) -> BatchJob:
+        batch_job = self.db.query(BatchJob).filter(BatchJob.job_id == job_id).first()
+        if not batch_job:
+            raise ValueError(f"Batch job {job_id} not found")
+        if batch_job.job_type != BatchJobType.idcw_processing:
+            raise ValueError(f"Batch job {job_id} is not an IDCW job")
+        return batch_job
+
+    def execute(self, batch_job: BatchJob) -> BatchJob:
+        """Generate declaration rows chunk by chunk, committing a checkpoint after each chunk"""
+        params = dict(batch_job.parameters or {})
+        self.chunk_size = params.get("chunk_size") or self.chunk_size
+        checkpoint = params.get("checkpoint") or ""
+
+        batch_job.status = BatchJobStatus.running
+        if not batch_job.started_at:
+            batch_job.started_at = datetime.now()
+        self.db.commit()
+
+        started = time.monotonic()
+        errors: List[str] = [batch_job.error_log] if batch_job.error_log else []
+
+        try:
+            payment_date = date.fromisoformat(params["payment_date"])
+            nav = self.payment_nav(params["scheme_id"], payment_date)
+
+            while True:
+                raise_if_cancelled(self.db, batch_job)
+                folio_numbers = self._next_folio_keys(params["scheme_id"], checkpoint)
+                if not folio_numbers:
+                    break
+
+                written = self._declare_chunk(batch_job.job_id, params, nav, checkpoint, folio_numbers[-1])
+                checkpoint = folio_numbers[-1]
+
+                # Record progress in the same transaction as the chunk's rows
+                params["checkpoint"] = checkpoint
+                batch_job.parameters = params
+                batch_job.records_processed = (batch_job.records_processed or 0) + written
+                batch_job.records_successful = (batch_job.records_successful or 0) + written
+                self.db.commit()
+
+                logger.info(f"IDCW {batch_job.job_id}: declared {written} rows up to folio {checkpoint}")
+
+            batch_job.status = BatchJobStatus.completed
+        except JobCancelled:
+            logger.info(f"IDCW declaration {batch_job.job_id} cancelled after folio {checkpoint or '(start)'}")
+        except JobLost:
+            raise
+        except Exception as e:
+            logger.error(f"IDCW declaration {batch_job.job_id} failed: {e}", exc_info=True)
+            self.db.rollback()
+            errors.append(f"Job aborted after folio {checkpoint or '(start)'}: {str(e)}")
+            batch_job.error_log = "\n".join(errors[-MAX_ERROR_LOG_LINES:])
+            batch_job.status = BatchJobStatus.failed
+
+        batch_job.completed_at = datetime.now()
+        batch_job.execution_time_seconds = (batch_job.execution_time_seconds or 0) + int(time.monotonic() - started)
+        self.db.commit()
+        return batch_job
+
+    # ------------------------------------------------------------------
+    # Declaration
+    # ------------------------------------------------------------------
+
+    def payment_nav(self, scheme_id: str, payment_date: date) -> Decimal:
+        """NAV published for the payment date; reinvestment units are allotted at this NAV"""
+        nav = self.db.query(NAVHistory.nav_value).filter(
+            NAVHistory.scheme_id == scheme_id,
+            NAVHistory.nav_date == payment_date
+        ).scalar()
+        if nav is None or nav <= 0:
+            raise ValueError(f"NAV for {scheme_id} on payment date {payment_date} has not been uploaded")
+        return nav
+
+    def _next_folio_keys(self, scheme_id: str, after: str) -> List[str]:
+        """Keyset-fetch the folio numbers of the next chunk (including folios closed since)"""
+        return self.db.execute(
+            select(Folio.folio_number)
+            .where(Folio.scheme_id == scheme_id, Folio.folio_number > after)
+            .order_by(Folio.folio_number)
+            .limit(self.chunk_size)
+        ).scalars().all()
+
+    def _declare_chunk(self, job_id: str, params: Dict[str, Any], nav: Decimal, after: str, through: str) -> int:
+        """INSERT ... SELECT the payout/reinvestment rows for folios in (after, through]"""
+        record_date = date.fromisoformat(params["record_date"])
+        payment_date = date.fromisoformat(params["payment_date"])
+        declaration_date = params["declaration_date"]
+        per_unit = Decimal(params["idcw_amount_per_unit"])
+        description = params.get("description")
+
+        units = AUMService(self.db).units_as_of(
+            record_date, scheme_id=params["scheme_id"], folio_range=(after, through)
+        )
+        eligible = and_(units.c.folio_number == Folio.folio_number, units.c.units > 0)
+
+        count = self.db.execute(
+            select(func.count()).select_from(units).join(Folio, eligible)
+        ).scalar() or 0
+        if count == 0:
+            return 0
+
+        first_number = SequenceService(self.db).next_values("transaction", count)[0]
+        reinvest = Folio.idcw_option == "reinvestment"
+        amount = func.round(units.c.units * per_unit, 2)
+        txn_type = Transaction.transaction_type.type
+
+        numbered = select(
+            units.c.folio_number,
+            units.c.scheme_id,
+            units.c.amc_id,
+            Folio.investor_id,
+            case(
+                (reinvest, literal(TransactionType.idcw_reinvestment, txn_type)),
+                else_=literal(TransactionType.idcw_payout, txn_type)
+            ).label("transaction_type"),
+            amount.label("amount"),
+            case((reinvest, func.round(amount / nav, 4)), else_=0).label("units"),
+            case(
+                (reinvest, description or f"IDCW Reinvestment - {declaration_date}"),
+                else_=description or f"IDCW Payout - {declaration_date}"
+            ).label("remarks"),
+            func.row_number().over(order_by=units.c.folio_number).label("seq")
+        ).select_from(units).join(Folio, eligible).subquery()
+
+        self.db.execute(
+            insert(Transaction.__table__).from_select(
+                [
+                    "transaction_id", "investor_id", "folio_number", "scheme_id", "amc_id",
+                    "transaction_type", "transaction_date", "amount", "nav_per_unit", "units",
+                    "status", "idcw_rate", "idcw_amount_per_unit", "remarks", "transfer_request_id"
+                ],
+                select(
+                    SequenceService.id_expression("transaction", numbered.c.seq + (first_number - 1)),
+                    numbered.c.investor_id,
+                    numbered.c.folio_number,
+                    numbered.c.scheme_id,
+                    numbered.c.amc_id,
+                    numbered.c.transaction_type,
+                    literal(payment_date),
+                    numbered.c.amount,
+                    literal(nav),
+                    numbered.c.units,
+                    literal(TransactionStatus.pending, Transaction.status.type),
+                    literal(Decimal(params["idcw_rate"])),
+                    literal(per_unit),
+                    numbered.c.remarks,
+                    literal(job_id)
+                # Never use more IDs than were reserved, even if holdings moved meanwhile
+                ).where(numbered.c.seq <= count)
+            )
+        )
+
+        # Bulk rows bypass the ORM, so fold them into the dashboard rollup explicitly
+        RollupService(self.db).record_totals(self._chunk_bucket_totals(job_id, after, through))
+        return count
+
+    def _chunk_bucket_totals(
+        self,
+        job_id: str,
+        after: str,
+        through: str,
+        status: TransactionStatus = TransactionStatus.pending
+    ) -> List[Dict[str, Any]]:
+        """Rollup bucket totals of a job's rows with the given status for folios in (after, through]"""
+        rows = self.db.execute(
+            select(
+                Transaction.transaction_date,
+                Transaction.scheme_id,
+                Transaction.amc_id,
+                Transaction.transaction_type,
+                Transaction.status,
+                func.count().label("txn_count"),
+                func.sum(Transaction.amount).label("total_amount"),
+                func.sum(Transaction.units).label("total_units")
+            ).where(
+                Transaction.transfer_request_id == job_id,
+                Transaction.status == status,
+                Transaction.folio_number > after,
+                Transaction.folio_number <= through
+            ).group_by(
+                Transaction.transaction_date, Transaction.scheme_id, Transaction.amc_id,
+                Transaction.transaction_type, Transaction.status
+            )
+        ).mappings().all()
+        return [dict(row) for row in rows]
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+
+    def process(self, job_id: str, processed_by: Optional[str] = None) -> BatchJob:
+        """Complete every pending transaction of a declaration in this process"""
+        batch_job = self.get_job(job_id)
+        self._start_processing(batch_job, processed_by)
+        return self.execute_processing(batch_job)
+
+    def queue_processing(self, job_id: str, processed_by: Optional[str] = None) -> BatchJob:
+        """Put the declaration back on the job queue for a worker to process"""
+        batch_job = self.get_job(job_id)
+        self._start_processing(batch_job, processed_by)
+        batch_job.status = BatchJobStatus.pending
+        batch_job.scheduled_at = datetime.now()
+        batch_job.completed_at = None
+        self.db.commit()
+        return batch_job
+
+    def _start_processing(self, batch_job: BatchJob, processed_by: Optional[str]) -> None:
+        params = dict(batch_job.parameters or {})
+        progress = dict(params.get("processing") or {})
+
+        if progress.get("status") == "completed":
+            raise ValueError(f"IDCW job {batch_job.job_id} has already been processed")
+        if batch_job.status in (BatchJobStatus.pending, BatchJobStatus.running):
+            raise ValueError(f"IDCW job {batch_job.job_id} is already {batch_job.status.value}")
+        if not progress and batch_job.status != BatchJobStatus.completed:
+            raise ValueError(f"IDCW declaration {batch_job.job_id} has not completed; resume it before processing")
+
+        progress["status"] = "queued"
+        progress["processed_by"] = processed_by
+        progress["chunk_size"] = self.chunk_size
+        params["processing"] = progress
+        batch_job.parameters = params
+
+    def execute_processing(self, batch_job: BatchJob) -> BatchJob:
+        """Complete the declaration's pending transactions chunk by chunk.
+
+        Progress is kept under parameters["processing"] and committed with each
+        chunk; running it again after a failure continues from the checkpoint.
+        Rows completed individually in the meantime are skipped.
+        """
+        job_id = batch_job.job_id
+        params = dict(batch_job.parameters or {})
+        progress = dict(params.get("processing") or {})
+        processed_by = progress.get("processed_by")
+
+        # Processing may use a different chunk size than the declaration did
+        self.chunk_size = progress.get("chunk_size") or params.get("chunk_size") or self.chunk_size
+        checkpoint = progress.get("checkpoint") or ""
+        progress.setdefault("completed", 0)
+        progress.setdefault("reinvested_folios", 0)
+        progress.setdefault("started_at", datetime.now().isoformat())
+        progress["status"] = "running"
+        params["processing"] = progress
+        batch_job.parameters = params
+        batch_job.status = BatchJobStatus.running
+        self.db.commit()
+
+        started = time.monotonic()
+        errors: List[str] = [batch_job.error_log] if batch_job.error_log else []
+
+        try:
+            while True:
+                raise_if_cancelled(self.db, batch_job)
+                folio_numbers = self._next_pending_keys(job_id, checkpoint)
+                if not folio_numbers:
+                    break
+
+                completed, reinvested = self._process_chunk(job_id, checkpoint, folio_numbers[-1], processed_by)
+                checkpoint = folio_numbers[-1]
+
+                # Record progress in the same transaction as the chunk's updates
+                progress["checkpoint"] = checkpoint
+                progress["completed"] += completed
+                progress["reinvested_folios"] += reinvested
+                params["processing"] = progress
+                batch_job.parameters = dict(params)
+                self.db.commit()
+
+                logger.info(f"IDCW {job_id}: completed {completed} rows up to folio {checkpoint}")
+
+            progress["status"] = "completed"
+            progress["completed_at"] = datetime.now().isoformat()
+            batch_job.status = BatchJobStatus.completed
+        except JobCancelled:
+            logger.info(f"IDCW processing {job_id} cancelled after folio {checkpoint or '(start)'}")
+            progress["status"] = "cancelled"
+        except JobLost:
+            raise
+        except Exception as e:
+            logger.error(f"IDCW processing {job_id} failed: {e}", exc_info=True)
+            self.db.rollback()
+            errors.append(f"Processing aborted after folio {checkpoint or '(start)'}: {str(e)}")
+            batch_job.error_log = "\n".join(errors[-MAX_ERROR_LOG_LINES:])
+            progress["status"] = "failed"
+            batch_job.status = BatchJobStatus.failed
+
+        params["processing"] = progress
+        batch_job.parameters = dict(params)
+        batch_job.completed_at = datetime.now()
+        batch_job.execution_time_seconds = (batch_job.execution_time_seconds or 0) + int(time.monotonic() - started)
+        self.db.commit()
+        return batch_job
+
+    def _next_pending_keys(self, job_id: str, after: str) -> List[str]:
+        """Lock and return the folio numbers of the next chunk of pending rows"""
+        return self.db.execute(
+            select(Transaction.folio_number)
+            .where(
+                Transaction.transfer_request_id == job_id,
+                Transaction.status == TransactionStatus.pending,
+                Transaction.folio_number > after
+            )
+            .order_by(Transaction.folio_number)
+            .limit(self.chunk_size)
+            .with_for_update()
+        ).scalars().all()
+
+    def _process_chunk(self, job_id: str, after: str, through: str, processed_by: Optional[str]) -> Tuple[int, int]:
+        """Complete the job's pending rows for folios in (after, through] with set-based updates"""
+        in_chunk = and_(
+            Transaction.transfer_request_id == job_id,
+            Transaction.status == TransactionStatus.pending,
+            Transaction.folio_number > after,
+            Transaction.folio_number <= through
+        )
+        reinvestments = and_(in_chunk, Transaction.transaction_type == TransactionType.idcw_reinvestment)
+        today = date.today()
+
+        reinvested_rows = [
+            dict(row) for row in self.db.execute(
+                select(
+                    Transaction.transaction_id, Transaction.folio_number, Transaction.investor_id,
+                    Transaction.scheme_id, Transaction.transaction_date, Transaction.nav_per_unit,
+                    Transaction.units
+                ).where(reinvestments)
+            ).mappings().all()
+        ]
+        pending_totals = self._chunk_bucket_totals(job_id, after, through)
+
+        if reinvested_rows:
+            # One joined UPDATE adds each reinvestment to its folio (one row per folio per job)
+            self.db.execute(
+                update(Folio)
+                .where(Folio.folio_number == Transaction.folio_number, reinvestments)
+                .values(
+                    total_units=Folio.total_units + Transaction.units,
+                    total_investment=Folio.total_investment + Transaction.amount,
+                    transaction_count=Folio.transaction_count + 1,
+                    last_transaction_date=case(
+                        (func.coalesce(Folio.last_transaction_date, Transaction.transaction_date)
+                         <= Transaction.transaction_date, Transaction.transaction_date),
+                        else_=Folio.last_transaction_date
+                    )
+                ),
+                execution_options={"synchronize_session": False}
+            )
+            # Revalue separately: assignment order inside a multi-table UPDATE is not defined
+            self.db.execute(
+                update(Folio)
+                .where(Folio.folio_number.in_([row["folio_number"] for row in reinvested_rows]))
+                .values(total_value=Folio.total_units * Folio.current_nav),
+                execution_options={"synchronize_session": False}
+            )
+            LotService(self.db).open_lots(reinvested_rows)
+
+        result = self.db.execute(
+            update(Transaction)
+            .where(in_chunk)
+            .values(
+                status=TransactionStatus.completed,
+                processing_date=today,
+                completion_date=today,
+                processed_by=processed_by
+            ),
+            execution_options={"synchronize_session": False}
+        )
+
+        # Bulk updates bypass the ORM, so move the rows between rollup buckets explicitly
+        rollup = RollupService(self.db)
+        rollup.record_totals([
+            dict(row, txn_count=-row["txn_count"],
+                 total_amount=-(row["total_amount"] or 0), total_units=-(row["total_units"] or 0))
+            for row in pending_totals
+        ])
+        rollup.record_totals([dict(row, status=TransactionStatus.completed) for row in pending_totals])
+
+        return result.rowcount, len(reinvested_rows)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def declaration_totals(self, job_id: str) -> Dict[str, Any]:
+        """Row counts, amounts and units of a declaration, aggregated in SQL"""
+        rows = self.db.query(
+            Transaction.transaction_type,
+            Transaction.status,
+            func.count(Transaction.id),
+            func.coalesce(func.sum(Transaction.amount), 0),
+            func.coalesce(func.sum(Transaction.units), 0)
+        ).filter(
+            Transaction.transfer_request_id == job_id,
+            Transaction.transaction_type.in_(IDCW_TYPES)
+        ).group_by(Transaction.transaction_type, Transaction.status).all()
+
+        totals = {
+            "transaction_count": 0,
+            "total_amount": Decimal('0'),
+            "payout_count": 0,
+            "payout_amount": Decimal('0'),
+            "reinvestment_count": 0,
+            "reinvestment_amount": Decimal('0'),
+            "reinvestment_units": Decimal('0'),
+            "pending_count": 0
+        }
+        for txn_type, status, count, amount, units in rows:
+            totals["transaction_count"] += count
+            totals["total_amount"] += Decimal(amount)
+            if status == TransactionStatus.pending:
+                totals["pending_count"] += count
+            if txn_type == TransactionType.idcw_payout:
+                totals["payout_count"] += count
+                totals["payout_amount"] += Decimal(amount)
+            else:
+                totals["reinvestment_count"] += count
+                totals["reinvestment_amount"] += Decimal(amount)
+                totals["reinvestment_units"] += Decimal(units)
+        return totals
@@ -0,0 +1,146 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import case, literal, or_
+from sqlalchemy.dialects.mysql import match
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+
+from app.models.investor import Investor, KYCStatus
+
+logger = logging.getLogger(__name__)
+
+MAX_SEARCH_RESULTS = 100
+
+PAN = re.compile(r"^[A-Z]{5}[0-9]{4}[A-Z]$")
+PAN_PREFIX = re.compile(r"^[A-Z]{5}[0-9]{2,4}$")  # shorter prefixes match too much of the table
+INVESTOR_ID = re.compile(r"^I?[0-9]+$")
+MIN_INVESTOR_ID_PREFIX = 3  # fewer digits only look up that exact ID
+MOBILE = re.compile(r"^(?:\+?91)?([6-9][0-9]{9})$")
+FULLTEXT_OPERATORS = re.compile(r"[+\-<>()~*\"@]")
+
+# Search kinds in the order the planner tries them, with what each predicate costs
+SEARCH_KINDS = {
+    "pan": "unique index lookup on pan_number",
+    "pan_prefix": "index range scan on pan_number",
+    "investor_id": "index lookup (or range scan from 3 digits) on investor_id",
+    "mobile": "index lookup on mobile_number",
+    "email": "index range scan on email",
+    "name": "FULLTEXT (ngram) match on full_name",
+}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def plan_search(term: str) -> Tuple[str, str]:
+    """Pick the cheapest predicate for the shape of a search term.
+
+    Returns (kind, normalised term). A full PAN is a unique lookup, a PAN
+    prefix, investor ID or email becomes an index range scan, a 10 digit
+    number is a mobile number and anything else is searched as a name.
+    Prefix scans need a few selective characters (5 letters and 2 digits of
+    a PAN, MIN_INVESTOR_ID_PREFIX digits of an ID), so one typed character
+    does not turn into a scan over a large share of the index.
+    """
+    term = " ".join(term.split())
+    compact = term.upper().replace(" ", "")
+
+    if PAN.match(compact):
+        return "pan", compact
+    if PAN_PREFIX.match(compact):
+        return "pan_prefix", compact
+    mobile = MOBILE.match(compact)
+    if mobile:
+        return "mobile", mobile.group(1)
+    if INVESTOR_ID.match(compact):
+        return "investor_id", compact.lstrip("I")
+    if "@" in term and " " not in term:
+        return "email", term.lower()
+    return "name", term
+
+
+class InvestorSearchService:
+    """Ranked investor search for the admin and KYC screens.
+
+    Each search runs one indexed predicate chosen by plan_search() instead of
+    OR-ing '%term%' scans over every column, and returns the best `limit`
+    matches without counting the rest: has_more tells the caller whether
+    another page exists.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(
+        self,
+        term: str,
+        limit: int = 20,
+        offset: int = 0,
+        kyc_statuses: Optional[List[KYCStatus]] = None
+    ) -> Dict[str, Any]:
+        limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+        kind, value = plan_search(term)
+        predicate, score = getattr(self, f"_{kind}")(value)
+
+        query = self.db.query(Investor, score.label("score")).filter(predicate)
+        if kyc_statuses:
+            query = query.filter(Investor.kyc_status.in_(kyc_statuses))
+
+        rows = query.order_by(score.desc(), Investor.id).offset(offset).limit(limit + 1).all()
+        return {
+            "match": kind,
+            "plan": SEARCH_KINDS[kind],
+            "investors": [row[0] for row in rows[:limit]],
+            "scores": [float(row[1] or 0) for row in rows[:limit]],
+            "has_more": len(rows) > limit
+        }
+
+    # ------------------------------------------------------------------
+    # Predicates: (filter, score expression)
+    # ------------------------------------------------------------------
+
+    def _pan(self, pan: str):
+        return Investor.pan_number == pan, literal(100)
+
+    def _pan_prefix(self, prefix: str):
+        return Investor.pan_number.like(f"{prefix}%"), literal(50)
+
+    def _investor_id(self, digits: str):
+        # IDs are issued as I001, I042, I1042; "42", "I42" and "I042" all find I042 first
+        exact = f"I{int(digits):03d}"
+        if len(digits) < MIN_INVESTOR_ID_PREFIX:
+            return Investor.investor_id == exact, literal(100)
+        predicate = or_(
+            Investor.investor_id == exact,
+            Investor.investor_id.like(f"I{_escape_like(digits)}%", escape="\\")
+        )
+        return predicate, case((Investor.investor_id == exact, 100), else_=50)
+
+    def _mobile(self, mobile: str):
+        return Investor.mobile_number.in_([mobile, f"+91{mobile}", f"91{mobile}"]), literal(100)
+
+    def _email(self, email: str):
+        predicate = Investor.email.like(f"{_escape_like(email)}%", escape="\\")
+        return predicate, case((Investor.email == email, 100), else_=50)
+
+    def _name(self, name: str):
+        if self.db.get_bind().dialect.name == "mysql":
+            words = FULLTEXT_OPERATORS.sub(" ", name).split()
+            if words:
+                relevance = match(Investor.full_name, against=" ".join(f"+{w}" for w in words)).in_boolean_mode()
+                # Exact names first, then by FULLTEXT relevance
+                return relevance, case((Investor.full_name == name, 1000), else_=0) + relevance
+
+        # Other databases (SQLite in development): name prefix or word prefix
+        escaped = _escape_like(name)
+        predicate = or_(
+            Investor.full_name.like(f"{escaped}%", escape="\\"),
+            Investor.full_name.like(f"% {escaped}%", escape="\\")
+        )
+        score = case(
+            (Investor.full_name == name, 100),
+            (Investor.full_name.like(f"{escaped}%", escape="\\"), 75),
+            else_=50
+        )
+        return predicate, score
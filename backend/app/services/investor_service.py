@@ -1,16 +1,18 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Optional, Dict, Any, List
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, Select
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import date, datetime
 from app.models.investor import Investor
 from app.models.user import User, UserRole
-from app.models.mandate import BankAccount, Nominee
+from app.models.mandate import BankAccount, Nominee, SIPRegistration, SIPStatus
 from app.models.folio import Folio, FolioStatus
 from app.models.transaction import Transaction
 from app.models.scheme import Scheme
 from app.core.security import get_password_hash
 from app.schemas.investor import InvestorCreate, BankAccountCreate, NomineeCreate, MandateRegistration
 from app.services.mandate_service import MandateService
+from app.services.sequence_service import SequenceService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,9 +26,7 @@ class InvestorService:
 
     def generate_investor_id(self) -> str:
         """Generate unique investor ID (I001, I002, etc.)"""
-        result = self.db.query(func.max(Investor.id)).scalar()
-        next_id = (result or 0) + 1
-        return f"I{next_id:03d}"
+        return SequenceService(self.db).next_id("investor")
 
     def create_investor(self, investor_data: InvestorCreate) -> Investor:
         """Create new investor profile"""
@@ -54,17 +54,17 @@ class InvestorService:
 
         return investor
 
-    def create_user_for_investor(self, investor: Investor, password: str) -> User:
-        """Create user account for investor"""
+    def create_user_for_investor(self, investor: Investor, hashed_password: str) -> User:
+        """Create user account for investor (hash the password with password_hasher first)"""
         # Create user
         user = User(
             email=investor.email,
+            hashed_password=hashed_password,
             full_name=investor.full_name,
             role=UserRole.investor,
             investor_id=investor.investor_id,
             is_active=True
         )
-        user.set_password(password)
 
         self.db.add(user)
         self.db.flush()
@@ -308,22 +308,48 @@ class InvestorService:
             Nominee.investor_id == investor_id
         ).all()
 
-    def get_investor_dashboard_data(self, investor_id: str) -> Dict[str, Any]:
-        """Get dashboard data for investor"""
-        # Optimize: EAGER LOAD Scheme relationship
-        from sqlalchemy.orm import joinedload
-        
-        folios_query = self.db.query(Folio).options(joinedload(Folio.scheme)).filter(
+    # ------------------------------------------------------------------
+    # Portfolio reads
+    #
+    # Each read is split into the statement(s) it runs and a pure function that
+    # shapes the rows, so AsyncInvestorService returns identical payloads.
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _dashboard_statements(investor_id: str) -> Tuple[Select, Select, Select]:
+        folios = select(Folio).options(joinedload(Folio.scheme)).where(
             Folio.investor_id == investor_id,
             Folio.status == FolioStatus.active
-        ).all()
+        )
+        recent_transactions = select(
+            Transaction.transaction_id,
+            Transaction.transaction_type,
+            Transaction.amount,
+            Transaction.transaction_date,
+            Transaction.status,
+            Transaction.scheme_id
+        ).where(
+            Transaction.investor_id == investor_id
+        ).order_by(Transaction.transaction_date.desc()).limit(5)
+        active_sips = select(
+            SIPRegistration.id,
+            SIPRegistration.scheme_id,
+            SIPRegistration.amount,
+            SIPRegistration.frequency,
+            SIPRegistration.next_installment_date
+        ).where(
+            SIPRegistration.investor_id == investor_id,
+            SIPRegistration.status == SIPStatus.active
+        ).limit(5)
+        return folios, recent_transactions, active_sips
 
-        # Get scheme details for each folio (now eager loaded)
+    @staticmethod
+    def _dashboard_data(folios: List[Folio], recent_transactions: List[Any], active_sips: List[Any]) -> Dict[str, Any]:
         portfolio_list = []
         total_investment = 0.0
         current_value = 0.0
         
-        for folio in folios_query:
+        for folio in folios:
             scheme = folio.scheme
             if scheme:
                 # Calculate current value from current NAV
@@ -345,18 +371,6 @@ class InvestorService:
                 total_investment += float(folio.total_investment) if folio.total_investment else 0.0
                 current_value += calculated_total_value
 
-        # Recent transactions
-        recent_transactions = self.db.query(
-            Transaction.transaction_id,
-            Transaction.transaction_type,
-            Transaction.amount,
-            Transaction.transaction_date,
-            Transaction.status,
-            Transaction.scheme_id
-        ).filter(
-            Transaction.investor_id == investor_id
-        ).order_by(Transaction.transaction_date.desc()).limit(5).all()
-
         # Convert transactions to dict
         transactions_list = []
         for txn in recent_transactions:
@@ -369,22 +383,9 @@ class InvestorService:
                 "scheme_id": txn.scheme_id
             })
 
-        # Active SIPs
-        from app.models.mandate import SIPRegistration, SIPStatus
-        active_sips_data = self.db.query(
-            SIPRegistration.id,
-            SIPRegistration.scheme_id,
-            SIPRegistration.amount,
-            SIPRegistration.frequency,
-            SIPRegistration.next_installment_date
-        ).filter(
-            SIPRegistration.investor_id == investor_id,
-            SIPRegistration.status == SIPStatus.active
-        ).limit(5).all()
-
         # Convert SIPs to dict
         sips_list = []
-        for sip in active_sips_data:
+        for sip in active_sips:
             sips_list.append({
                 "id": sip.id,
                 "scheme_id": sip.scheme_id,
@@ -405,10 +406,77 @@ class InvestorService:
             "active_sips": sips_list
         }
 
+    def get_investor_dashboard_data(self, investor_id: str) -> Dict[str, Any]:
+        """Get dashboard data for investor"""
+        folios, recent_transactions, active_sips = self._dashboard_statements(investor_id)
+        return self._dashboard_data(
+            self.db.execute(folios).scalars().all(),
+            self.db.execute(recent_transactions).all(),
+            self.db.execute(active_sips).all()
+        )
+
     def get_investor_folios(self, investor_id: str) -> List[Folio]:
         """Get all folios for investor"""
         return self.db.query(Folio).filter(Folio.investor_id == investor_id).all()
 
+    @staticmethod
+    def _folios_statement(investor_id: str, active_only: bool, with_units_only: bool) -> Select:
+        # Scheme and AMC are eager loaded in the same query (no per-folio lookups)
+        query = select(Folio).options(
+            joinedload(Folio.scheme), joinedload(Folio.amc)
+        ).where(Folio.investor_id == investor_id)
+        
+        # Apply status filter if needed
+        if active_only:
+            query = query.where(Folio.status == FolioStatus.active)
+        elif with_units_only:
+            query = query.where(Folio.total_units > 0)
+        return query
+
+    @staticmethod
+    def _folio_dicts(folios: List[Folio], investor_id: str) -> List[Dict[str, Any]]:
+        folio_list = []
+        for folio in folios:
+            try:
+                # Scheme is now already loaded on the folio object
+                scheme = folio.scheme
+                
+                if not scheme:
+                    logger.warning(f"Scheme {folio.scheme_id} not found for folio {folio.folio_number}")
+                    continue
+                
+                # Convert enum status to string
+                status_value = folio.status.value if hasattr(folio.status, 'value') else str(folio.status)
+                
+                # Calculate current value if NAV is available
+                current_value = float(folio.total_units * scheme.current_nav) if folio.total_units and scheme.current_nav else 0.0
+                
+                folio_dict = {
+                    "folio_number": folio.folio_number,
+                    "investor_id": folio.investor_id,
+                    "scheme_id": folio.scheme_id,
+                    "scheme_name": scheme.scheme_name,
+                    "scheme_type": scheme.scheme_type.value if hasattr(scheme.scheme_type, 'value') else str(scheme.scheme_type),
+                    "amc_id": folio.amc_id,
+                    "amc_name": folio.amc.amc_name if folio.amc else None,
+                    "total_units": float(folio.total_units) if folio.total_units else 0.0,
+                    "current_nav": float(scheme.current_nav) if scheme.current_nav else 0.0,
+                    "total_value": current_value,
+                    "total_investment": float(folio.total_investment) if folio.total_investment else 0.0,
+                    "average_cost_per_unit": float(folio.average_cost_per_unit) if folio.average_cost_per_unit else 0.0,
+                    "exit_load_percentage": float(scheme.exit_load_percentage) if scheme.exit_load_percentage else 0.0,
+                    "status": status_value,
+                    "last_transaction_date": folio.last_transaction_date.isoformat() if folio.last_transaction_date else None
+                }
+                folio_list.append(folio_dict)
+                
+            except Exception as e:
+                logger.error(f"Error processing folio {folio.folio_number}: {e}")
+                continue
+        
+        logger.info(f"Returning {len(folio_list)} folios for investor {investor_id}")
+        return folio_list
+
     def get_folios(self, investor_id: str, active_only: bool = False, with_units_only: bool = False) -> List[Dict[str, Any]]:
         """Get all folios for investor as dictionaries with eager loading"""
         if not investor_id:
@@ -418,98 +486,43 @@ class InvestorService:
         logger.info(f"Fetching folios for investor: {investor_id} (active_only={active_only}, with_units_only={with_units_only})")
         
         try:
-            # Optimize: EAGER LOAD Scheme relationship in a single query
-            # This fixes the N+1 query problem where we were querying Scheme for every Folio
-            from sqlalchemy.orm import joinedload
-            
-            query = self.db.query(Folio).options(joinedload(Folio.scheme)).filter(Folio.investor_id == investor_id)
-            
-            # Apply status filter if needed
-            if active_only:
-                query = query.filter(Folio.status == FolioStatus.active)
-            elif with_units_only:
-                query = query.filter(Folio.total_units > 0)
-            
-            folios = query.all()
-            
-            # Additional python-side filtering if needed (though DB filtering is better if possible)
-            if with_units_only:
-                folios = [f for f in folios if float(f.total_units or 0) > 0]
-            
-            folio_list = []
-            for folio in folios:
-                try:
-                    # Scheme is now already loaded on the folio object
-                    scheme = folio.scheme
-                    
-                    if not scheme:
-                        logger.warning(f"Scheme {folio.scheme_id} not found for folio {folio.folio_number}")
-                        continue
-                    
-                    # Convert enum status to string
-                    status_value = folio.status.value if hasattr(folio.status, 'value') else str(folio.status)
-                    
-                    # Calculate current value if NAV is available
-                    current_value = float(folio.total_units * scheme.current_nav) if folio.total_units and scheme.current_nav else 0.0
-                    
-                    folio_dict = {
-                        "folio_number": folio.folio_number,
-                        "investor_id": folio.investor_id,
-                        "scheme_id": folio.scheme_id,
-                        "scheme_name": scheme.scheme_name,
-                        "scheme_type": scheme.scheme_type.value if hasattr(scheme.scheme_type, 'value') else str(scheme.scheme_type),
-                        "amc_id": folio.amc_id,
-                        "amc_name": folio.amc.amc_name if folio.amc else None, # Assuming AMC can be lazy loaded or we add it to joinedload too
-                        "total_units": float(folio.total_units) if folio.total_units else 0.0,
-                        "current_nav": float(scheme.current_nav) if scheme.current_nav else 0.0,
-                        "total_value": current_value,
-                        "total_investment": float(folio.total_investment) if folio.total_investment else 0.0,
-                        "average_cost_per_unit": float(folio.average_cost_per_unit) if folio.average_cost_per_unit else 0.0,
-                        "exit_load_percentage": float(scheme.exit_load_percentage) if scheme.exit_load_percentage else 0.0,
-                        "status": status_value,
-                        "last_transaction_date": folio.last_transaction_date.isoformat() if folio.last_transaction_date else None
-                    }
-                    folio_list.append(folio_dict)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing folio {folio.folio_number}: {e}")
-                    continue
-            
-            logger.info(f"Returning {len(folio_list)} folios for investor {investor_id}")
-            return folio_list
+            folios = self.db.execute(
+                self._folios_statement(investor_id, active_only, with_units_only)
+            ).scalars().all()
+            return self._folio_dicts(folios, investor_id)
             
         except Exception as e:
             logger.error(f"Error fetching folios for investor {investor_id}: {e}", exc_info=True)
             return []
 
-    def get_folio_summary(self, investor_id: str) -> Dict[str, Any]:
-        """Get folio summary for investor"""
-        folios = self.db.query(Folio).filter(
+    @staticmethod
+    def _folio_summary_statement(investor_id: str) -> Select:
+        return select(Folio, Scheme).join(Scheme, Scheme.scheme_id == Folio.scheme_id).where(
             Folio.investor_id == investor_id,
             Folio.status == FolioStatus.active
-        ).all()
+        )
 
+    @staticmethod
+    def _folio_summary(rows: List[Any]) -> Dict[str, Any]:
         total_units = 0.0
         total_value = 0.0
         folio_list = []
 
-        for folio in folios:
-            scheme = self.db.query(Scheme).filter(Scheme.scheme_id == folio.scheme_id).first()
-            if scheme:
-                current_nav = float(scheme.current_nav) if scheme.current_nav else 0.0
-                units = float(folio.total_units) if folio.total_units else 0.0
-                value = units * current_nav
-
-                folio_list.append({
-                    "folio_number": folio.folio_number,
-                    "scheme_id": folio.scheme_id,
-                    "scheme_name": scheme.scheme_name,
-                    "total_units": units,
-                    "current_nav": current_nav,
-                    "total_value": value
-                })
-                total_units += units
-                total_value += value
+        for folio, scheme in rows:
+            current_nav = float(scheme.current_nav) if scheme.current_nav else 0.0
+            units = float(folio.total_units) if folio.total_units else 0.0
+            value = units * current_nav
+
+            folio_list.append({
+                "folio_number": folio.folio_number,
+                "scheme_id": folio.scheme_id,
+                "scheme_name": scheme.scheme_name,
+                "total_units": units,
+                "current_nav": current_nav,
+                "total_value": value
+            })
+            total_units += units
+            total_value += value
 
         return {
             "total_units": total_units,
@@ -517,6 +530,10 @@ class InvestorService:
             "folios": folio_list
         }
 
+    def get_folio_summary(self, investor_id: str) -> Dict[str, Any]:
+        """Get folio summary for investor"""
+        return self._folio_summary(self.db.execute(self._folio_summary_statement(investor_id)).all())
+
     def get_folio_transactions(self, investor_id: str, folio_number: str) -> List[Transaction]:
         """Get transactions for a specific folio"""
         folio = self.db.query(Folio).filter(
@@ -625,3 +642,49 @@ class InvestorService:
             "guardian_name": nominee.guardian_name,
             "guardian_relation": nominee.guardian_relation
         }
+
+
+class AsyncInvestorService:
+    """Async variant of InvestorService's read paths for async def routes.
+
+    Runs the same statements as InvestorService through an AsyncSession and
+    returns the same payloads, so the event loop is free while MySQL works.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_investor_dashboard_data(self, investor_id: str) -> Dict[str, Any]:
+        """Get dashboard data for investor"""
+        folios, recent_transactions, active_sips = InvestorService._dashboard_statements(investor_id)
+        return InvestorService._dashboard_data(
+            (await self.db.execute(folios)).scalars().all(),
+            (await self.db.execute(recent_transactions)).all(),
+            (await self.db.execute(active_sips)).all()
+        )
+
+    async def get_investor_folios(self, investor_id: str) -> List[Folio]:
+        """Get all folios for investor"""
+        result = await self.db.execute(select(Folio).where(Folio.investor_id == investor_id))
+        return result.scalars().all()
+
+    async def get_folios(self, investor_id: str, active_only: bool = False, with_units_only: bool = False) -> List[Dict[str, Any]]:
+        """Get all folios for investor as dictionaries with eager loading"""
+        if not investor_id:
+            logger.error("get_folios called with empty investor_id")
+            return []
+
+        try:
+            result = await self.db.execute(
+                InvestorService._folios_statement(investor_id, active_only, with_units_only)
+            )
+            return InvestorService._folio_dicts(result.scalars().all(), investor_id)
+
+        except Exception as e:
+            logger.error(f"Error fetching folios for investor {investor_id}: {e}", exc_info=True)
+            return []
+
+    async def get_folio_summary(self, investor_id: str) -> Dict[str, Any]:
+        """Get folio summary for investor"""
+        result = await self.db.execute(InvestorService._folio_summary_statement(investor_id))
+        return InvestorService._folio_summary(result.all())
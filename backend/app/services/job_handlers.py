@@ -0,0 +1,44 @@
+from sqlalchemy.orm import Session
+
+from app.models.admin import BatchJob, BatchJobType
+from app.services.job_service import register_handler
+from app.services.sip_batch_service import SIPBatchService
+from app.services.cas_service import CASService
+from app.services.idcw_service import IDCWService
+from app.services.nav_service import NAVService
+from app.services.reconciliation_service import ReconciliationService
+
+# Importing this module registers the handlers with the job queue. Each one
+# continues a claimed job from the checkpoint in its parameters, so first runs
+# and re-queued (failed or cancelled) jobs go through the same code.
+
+
+@register_handler(BatchJobType.sip_processing)
+def run_sip_batch(db: Session, batch_job: BatchJob) -> BatchJob:
+    return SIPBatchService(db).execute(batch_job)
+
+
+@register_handler(BatchJobType.statement_generation)
+def run_cas_batch(db: Session, batch_job: BatchJob) -> BatchJob:
+    return CASService(db).execute(batch_job)
+
+
+@register_handler(BatchJobType.idcw_processing)
+def run_idcw(db: Session, batch_job: BatchJob) -> BatchJob:
+    # One job covers the declaration and, once queued, its processing phase
+    service = IDCWService(db)
+    if (batch_job.parameters or {}).get("processing"):
+        return service.execute_processing(batch_job)
+    return service.execute(batch_job)
+
+
+@register_handler(BatchJobType.nav_upload)
+def run_nav_upload(db: Session, batch_job: BatchJob) -> BatchJob:
+    with open(batch_job.input_file_path, encoding="utf-8-sig", newline="") as stream:
+        NAVService(db).process_upload(batch_job, stream)
+    return batch_job
+
+
+@register_handler(BatchJobType.reconciliation)
+def run_reconciliation(db: Session, batch_job: BatchJob) -> BatchJob:
+    return ReconciliationService(db).execute(batch_job)
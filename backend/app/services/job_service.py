@@ -0,0 +1,302 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select, update, or_, and_, func
+from typing import Optional, Dict, Callable, List, Iterable
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import time
+import uuid
+
+from app.core.config import settings
+from app.models.admin import BatchJob, BatchJobType, BatchJobStatus
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LOG_LINES = 500
+
+JobHandler = Callable[[Session, BatchJob], BatchJob]
+
+# BatchJobType -> handler that executes (or continues) a claimed job
+_handlers: Dict[BatchJobType, JobHandler] = {}
+
+# Session.info key: batch job id -> claim token this session's worker holds
+_CLAIMS_KEY = "batch_job_claims"
+
+
+class JobCancelled(Exception):
+    """Raised by a job at a chunk boundary once the job has been cancelled"""
+
+
+class JobLost(Exception):
+    """Raised once another worker has reclaimed the job this session was running"""
+
+
+def register_handler(job_type: BatchJobType) -> Callable[[JobHandler], JobHandler]:
+    """Register the function that runs claimed jobs of a type"""
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[job_type] = handler
+        return handler
+    return decorator
+
+
+def registered_job_types() -> List[BatchJobType]:
+    return list(_handlers)
+
+
+def _check_claim(db: Session, batch_job: BatchJob) -> BatchJobStatus:
+    """Lock the job row and raise JobLost if it was reclaimed since this session claimed it.
+
+    The lock holds until the transaction ends, so a reclaim cannot slip in
+    before the caller's writes commit. Jobs run without a claim (e.g. a
+    synchronous resume) are not fenced. Returns the current status.
+    """
+    row = db.execute(
+        select(BatchJob.status, BatchJob.claim_token)
+        .where(BatchJob.id == batch_job.id)
+        .with_for_update()
+    ).one()
+    held = db.info.get(_CLAIMS_KEY, {}).get(batch_job.id)
+    if held is not None and row.claim_token != held:
+        raise JobLost(batch_job.job_id)
+    return row.status
+
+
+@event.listens_for(Session, "before_flush")
+def _fence_claimed_jobs(session, flush_context, instances):
+    """Refuse to write a claimed job that another worker has since reclaimed.
+
+    Handlers write their checkpoint in the same transaction as each chunk and
+    finish with a status write, so this stops both: the chunk rolls back with
+    the refused flush and the new owner redoes it.
+    """
+    claims = session.info.get(_CLAIMS_KEY)
+    if not claims:
+        return
+    for obj in session.dirty:
+        if isinstance(obj, BatchJob) and obj.id in claims:
+            _check_claim(session, obj)
+
+
+def raise_if_cancelled(db: Session, batch_job: BatchJob) -> None:
+    """Cooperative cancellation check and heartbeat, called by jobs between committed chunks.
+
+    Reads the status column directly so a cancel issued from another session
+    is seen even while this session still holds the job object. Otherwise it
+    stamps heartbeat_at and commits, so the job is not reclaimed as abandoned
+    (see JobService.claim) while it is making progress. Raises JobLost if it
+    already was.
+    """
+    status = _check_claim(db, batch_job)
+    if status == BatchJobStatus.cancelled:
+        raise JobCancelled(batch_job.job_id)
+    db.execute(
+        update(BatchJob)
+        .where(BatchJob.id == batch_job.id)
+        .values(heartbeat_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _stale_running():
+    """Running jobs whose worker has not sent a heartbeat within JOB_CLAIM_TIMEOUT_SECONDS"""
+    cutoff = datetime.now() - timedelta(seconds=settings.JOB_CLAIM_TIMEOUT_SECONDS)
+    return and_(
+        BatchJob.status == BatchJobStatus.running,
+        func.coalesce(BatchJob.heartbeat_at, BatchJob.started_at, BatchJob.scheduled_at) < cutoff
+    )
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobService:
+    """Persistent job queue on the batch_jobs table.
+
+    Endpoints create jobs as pending rows and return immediately. Workers
+    (run_job_worker.py) claim the oldest due pending job with
+    SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can poll the
+    same table without handing one job to two of them, and run it through the
+    handler registered for its job type. A running job whose worker died
+    stops sending heartbeats and is claimed again after
+    JOB_CLAIM_TIMEOUT_SECONDS, continuing from its last checkpoint. Every
+    claim stores a new claim_token; should the previous worker still be
+    alive, its next heartbeat, checkpoint or final status write sees the
+    token changed and stops with JobLost instead of running alongside the
+    new one.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+
+    def get_job(self, job_id: str, job_type: Optional[BatchJobType] = None) -> BatchJob:
+        batch_job = self.db.query(BatchJob).filter(BatchJob.job_id == job_id).first()
+        if not batch_job:
+            raise ValueError(f"Batch job {job_id} not found")
+        if job_type is not None and batch_job.job_type != job_type:
+            raise ValueError(f"Batch job {job_id} is not a {job_type.value} job")
+        return batch_job
+
+    def claim(self, worker_id: str, job_types: Optional[Iterable[BatchJobType]] = None) -> Optional[BatchJob]:
+        """Lock the oldest due pending (or abandoned running) job, mark it running for this worker and commit"""
+        job_types = list(job_types or registered_job_types())
+        if not job_types:
+            return None
+
+        batch_job = self.db.execute(
+            select(BatchJob)
+            .where(
+                or_(
+                    and_(BatchJob.status == BatchJobStatus.pending, BatchJob.scheduled_at <= datetime.now()),
+                    _stale_running()
+                ),
+                BatchJob.job_type.in_(job_types)
+            )
+            .order_by(BatchJob.scheduled_at, BatchJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalars().first()
+
+        if batch_job is None:
+            self.db.rollback()
+            return None
+
+        # A claim this session held earlier is superseded, not lost
+        self.db.info.get(_CLAIMS_KEY, {}).pop(batch_job.id, None)
+        if batch_job.status == BatchJobStatus.running:
+            previous = (batch_job.parameters or {}).get("worker")
+            logger.warning(f"Reclaiming batch job {batch_job.job_id} from unresponsive worker {previous}")
+
+        batch_job.status = BatchJobStatus.running
+        if not batch_job.started_at:
+            batch_job.started_at = datetime.now()
+        batch_job.heartbeat_at = datetime.now()
+        batch_job.claim_token = uuid.uuid4().hex
+        batch_job.parameters = {**(batch_job.parameters or {}), "worker": worker_id}
+        self.db.commit()
+        self.db.info.setdefault(_CLAIMS_KEY, {})[batch_job.id] = batch_job.claim_token
+        return batch_job
+
+    def requeue(self, job_id: str, job_type: Optional[BatchJobType] = None) -> BatchJob:
+        """Put a failed, cancelled or abandoned running job back on the queue; it continues from its checkpoint"""
+        batch_job = self.get_job(job_id, job_type)
+        if batch_job.status == BatchJobStatus.completed:
+            raise ValueError(f"Batch job {job_id} is already completed")
+        abandoned = self.db.execute(
+            select(BatchJob.id).where(BatchJob.id == batch_job.id, _stale_running())
+        ).first() is not None
+        if batch_job.status == BatchJobStatus.pending or (batch_job.status == BatchJobStatus.running and not abandoned):
+            raise ValueError(f"Batch job {job_id} is already {batch_job.status.value}")
+
+        batch_job.status = BatchJobStatus.pending
+        batch_job.scheduled_at = datetime.now()
+        batch_job.completed_at = None
+        self.db.commit()
+        return batch_job
+
+    def cancel(self, job_id: str) -> BatchJob:
+        """Cancel a pending or running job.
+
+        A pending job is never claimed afterwards. A running job stops at its
+        next chunk boundary, keeping the chunks it already committed.
+        """
+        batch_job = self.get_job(job_id)
+        if batch_job.status not in (BatchJobStatus.pending, BatchJobStatus.running):
+            raise ValueError("Only pending or running jobs can be cancelled")
+
+        if batch_job.status == BatchJobStatus.pending:
+            batch_job.completed_at = datetime.now()
+        batch_job.status = BatchJobStatus.cancelled
+        self.db.commit()
+        return batch_job
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def run(self, batch_job: BatchJob) -> BatchJob:
+        """Run a claimed job through its handler.
+
+        Handlers record their own progress and outcome; this only catches what
+        escapes them (e.g. a missing input file) so the job never stays running,
+        and lets a handler that lost its claim stop without writing anything.
+        """
+        handler = _handlers.get(batch_job.job_type)
+        started = time.monotonic()
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for {batch_job.job_type.value} jobs")
+            return handler(self.db, batch_job)
+        except JobLost:
+            # The new owner records the outcome; write nothing here
+            logger.warning(f"Batch job {batch_job.job_id} was reclaimed by another worker; stopping")
+            self.db.rollback()
+            return batch_job
+        except Exception as e:
+            logger.error(f"Batch job {batch_job.job_id} failed: {e}", exc_info=True)
+            self.db.rollback()
+            log = [batch_job.error_log] if batch_job.error_log else []
+            log.append(f"Job aborted: {str(e)}")
+            batch_job.error_log = "\n".join(log[-MAX_ERROR_LOG_LINES:])
+            batch_job.status = BatchJobStatus.failed
+            batch_job.completed_at = datetime.now()
+            batch_job.execution_time_seconds = (batch_job.execution_time_seconds or 0) + int(time.monotonic() - started)
+            self.db.commit()
+            return batch_job
+
+    def run_next(self, worker_id: str, job_types: Optional[Iterable[BatchJobType]] = None) -> Optional[BatchJob]:
+        """Claim and run one job; returns None when the queue has nothing due"""
+        batch_job = self.claim(worker_id, job_types)
+        if batch_job is None:
+            return None
+        logger.info(f"Worker {worker_id} running {batch_job.job_type.value} job {batch_job.job_id}")
+        batch_job = self.run(batch_job)
+        logger.info(f"Worker {worker_id} finished job {batch_job.job_id}: {batch_job.status.value}")
+        return batch_job
+
+
+def work(
+    session_factory: Callable[[], Session],
+    worker_id: Optional[str] = None,
+    job_types: Optional[Iterable[BatchJobType]] = None,
+    poll_seconds: Optional[float] = None,
+    should_stop: Callable[[], bool] = lambda: False,
+    once: bool = False
+) -> int:
+    """Worker loop: run jobs back to back, sleeping poll_seconds when the queue is empty.
+
+    Uses a fresh session per job. With once=True it drains the queue and
+    returns instead of polling. Returns the number of jobs run.
+    """
+    worker_id = worker_id or default_worker_id()
+    poll_seconds = settings.JOB_WORKER_POLL_SECONDS if poll_seconds is None else poll_seconds
+    job_types = list(job_types) if job_types else None
+    jobs_run = 0
+
+    while not should_stop():
+        db = session_factory()
+        try:
+            batch_job = JobService(db).run_next(worker_id, job_types)
+        except Exception as e:
+            # Lost connection or similar; back off and poll again
+            logger.error(f"Worker {worker_id} could not claim a job: {e}", exc_info=True)
+            batch_job = None
+        finally:
+            db.close()
+
+        if batch_job is not None:
+            jobs_run += 1
+            continue
+        if once:
+            break
+        deadline = time.monotonic() + poll_seconds
+        while time.monotonic() < deadline and not should_stop():
+            time.sleep(min(0.5, poll_seconds))
+
+    return jobs_run
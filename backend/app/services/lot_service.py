@@ -0,0 +1,374 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, update, delete, tuple_
+from typing import Optional, Dict, Any, List, Iterable
+from collections import deque
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+import logging
+
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.folio import Folio, UnitLot, UnitLotConsumption
+from app.models.scheme import Scheme, SchemeType
+
+logger = logging.getLogger(__name__)
+
+UNIT_QUANTUM = Decimal('0.0001')  # matches DECIMAL(15, 4) unit columns
+LOT_PAGE_SIZE = 500
+REBUILD_BATCH_SIZE = 500
+
+# Holding period (days) at which gains become long-term
+LONG_TERM_DAYS_EQUITY = 365
+LONG_TERM_DAYS_DEBT = 3 * 365
+
+
+def quantize_units(units: Decimal) -> Decimal:
+    return Decimal(units).quantize(UNIT_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def is_long_term(holding_days: int, is_equity: bool) -> bool:
+    """1 year for equity, 3 years for debt and other schemes"""
+    return holding_days >= (LONG_TERM_DAYS_EQUITY if is_equity else LONG_TERM_DAYS_DEBT)
+
+
+class LotService:
+    """FIFO unit lot ledger per folio.
+
+    Every completed transaction that adds units opens a lot; every one that removes
+    units consumes the oldest open lots and records one consumption row per lot
+    touched. Capital gains, exit load and holding-period queries read these tables
+    instead of replaying transaction history.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Ledger maintenance
+    # ------------------------------------------------------------------
+
+    def apply(self, transaction: Transaction, close_out: bool = False) -> List[Dict[str, Any]]:
+        """Open or consume lots for a completed transaction according to the sign of its units"""
+        if transaction.units is None or transaction.units == 0:
+            return []
+        if transaction.units > 0:
+            self.open_lot(transaction)
+            return []
+        return self.consume(transaction, close_out=close_out)
+
+    def open_lot(self, transaction: Transaction) -> Optional[UnitLot]:
+        """Open a lot for a purchase-side transaction"""
+        units = quantize_units(transaction.units or 0)
+        if units <= 0:
+            return None
+
+        lot = UnitLot(
+            transaction_id=transaction.transaction_id,
+            folio_number=transaction.folio_number,
+            investor_id=transaction.investor_id,
+            scheme_id=transaction.scheme_id,
+            acquisition_date=transaction.transaction_date,
+            cost_nav=transaction.nav_per_unit,
+            original_units=units,
+            open_units=units
+        )
+        self.db.add(lot)
+        self.db.flush()
+        return lot
+
+    def open_lots(self, transaction_rows: List[Dict[str, Any]]) -> int:
+        """Open lots for transaction rows written with a bulk INSERT (e.g. the SIP batch)"""
+        rows = []
+        for txn in transaction_rows:
+            units = quantize_units(txn["units"])
+            if units <= 0:
+                continue
+            rows.append({
+                "transaction_id": txn["transaction_id"],
+                "folio_number": txn["folio_number"],
+                "investor_id": txn["investor_id"],
+                "scheme_id": txn["scheme_id"],
+                "acquisition_date": txn["transaction_date"],
+                "cost_nav": txn["nav_per_unit"],
+                "original_units": units,
+                "open_units": units
+            })
+        if rows:
+            self.db.execute(insert(UnitLot), rows)
+        return len(rows)
+
+    def consume(self, transaction: Transaction, close_out: bool = False) -> List[Dict[str, Any]]:
+        """Consume open lots of the transaction's folio oldest-first.
+
+        Open lots are read a page at a time under a row lock, so a redemption only
+        touches the lots it actually matches. With close_out every open lot is
+        consumed, which absorbs rounding residue when a folio is fully redeemed.
+        Returns the matches as dicts (lot_transaction_id, units, acquisition_date, cost_nav).
+        """
+        remaining = quantize_units(abs(transaction.units))
+        self.db.flush()
+
+        matches: List[Dict[str, Any]] = []
+        lot_updates: List[Dict[str, Any]] = []
+        after = None
+
+        while remaining > 0 or close_out:
+            query = self.db.query(
+                UnitLot.id, UnitLot.transaction_id, UnitLot.acquisition_date,
+                UnitLot.cost_nav, UnitLot.open_units
+            ).filter(
+                UnitLot.folio_number == transaction.folio_number,
+                UnitLot.open_units > 0
+            )
+            if after is not None:
+                query = query.filter(tuple_(UnitLot.acquisition_date, UnitLot.id) > after)
+            lots = query.order_by(
+                UnitLot.acquisition_date, UnitLot.id
+            ).limit(LOT_PAGE_SIZE).with_for_update().all()
+
+            for lot in lots:
+                if remaining <= 0 and not close_out:
+                    break
+                units = lot.open_units if close_out else min(remaining, lot.open_units)
+                remaining -= units
+                lot_updates.append({"id": lot.id, "open_units": lot.open_units - units})
+                matches.append({
+                    "lot_transaction_id": lot.transaction_id,
+                    "units": units,
+                    "acquisition_date": lot.acquisition_date,
+                    "cost_nav": lot.cost_nav
+                })
+
+            if len(lots) < LOT_PAGE_SIZE:
+                break
+            after = (lots[-1].acquisition_date, lots[-1].id)
+
+        if remaining > UNIT_QUANTUM:
+            logger.warning(
+                f"Folio {transaction.folio_number}: {remaining} units of {transaction.transaction_id} "
+                f"not covered by open lots; run rebuild_unit_lots.py for this folio"
+            )
+
+        if lot_updates:
+            self.db.execute(update(UnitLot), lot_updates)
+            self.db.execute(insert(UnitLotConsumption), [
+                {
+                    "transaction_id": transaction.transaction_id,
+                    "lot_transaction_id": match["lot_transaction_id"],
+                    "folio_number": transaction.folio_number,
+                    "investor_id": transaction.investor_id,
+                    "scheme_id": transaction.scheme_id,
+                    "units": match["units"],
+                    "acquisition_date": match["acquisition_date"],
+                    "cost_nav": match["cost_nav"],
+                    "redemption_date": transaction.transaction_date,
+                    "redemption_nav": transaction.nav_per_unit
+                }
+                for match in matches
+            ])
+
+        return matches
+
+    @staticmethod
+    def exit_load_amount(matches: List[Dict[str, Any]], scheme: Scheme, nav: Decimal, as_of: date) -> Decimal:
+        """Exit load on the matched units still inside the scheme's exit load period"""
+        if not scheme.exit_load_percentage or not scheme.exit_load_period_days:
+            return Decimal('0.00')
+
+        loaded_units = sum(
+            (match["units"] for match in matches
+             if (as_of - match["acquisition_date"]).days < scheme.exit_load_period_days),
+            Decimal('0')
+        )
+        return (loaded_units * nav * scheme.exit_load_percentage / 100).quantize(Decimal('0.01'))
+
+    # ------------------------------------------------------------------
+    # Backfill
+    # ------------------------------------------------------------------
+
+    def rebuild_folios(self, folio_numbers: Iterable[str]) -> int:
+        """Rebuild the lots of the given folios by replaying their completed transactions.
+
+        Used to backfill history that predates the ledger. The caller commits.
+        """
+        folio_numbers = list(folio_numbers)
+        if not folio_numbers:
+            return 0
+
+        self.db.execute(delete(UnitLotConsumption).where(UnitLotConsumption.folio_number.in_(folio_numbers)))
+        self.db.execute(delete(UnitLot).where(UnitLot.folio_number.in_(folio_numbers)))
+
+        transactions = self.db.query(
+            Transaction.transaction_id, Transaction.folio_number, Transaction.investor_id,
+            Transaction.scheme_id, Transaction.transaction_date, Transaction.nav_per_unit,
+            Transaction.units
+        ).filter(
+            Transaction.folio_number.in_(folio_numbers),
+            Transaction.status == TransactionStatus.completed,
+            Transaction.units != 0
+        ).order_by(Transaction.folio_number, Transaction.transaction_date, Transaction.id).all()
+
+        lots: Dict[str, Dict[str, Any]] = {}
+        consumptions: List[Dict[str, Any]] = []
+        open_lots: Dict[str, deque] = {}
+
+        for txn in transactions:
+            units = quantize_units(txn.units)
+            queue = open_lots.setdefault(txn.folio_number, deque())
+            if units > 0:
+                lot = {
+                    "transaction_id": txn.transaction_id,
+                    "folio_number": txn.folio_number,
+                    "investor_id": txn.investor_id,
+                    "scheme_id": txn.scheme_id,
+                    "acquisition_date": txn.transaction_date,
+                    "cost_nav": txn.nav_per_unit,
+                    "original_units": units,
+                    "open_units": units
+                }
+                lots[txn.transaction_id] = lot
+                queue.append(lot)
+                continue
+
+            remaining = -units
+            while remaining > 0 and queue:
+                lot = queue[0]
+                matched = min(remaining, lot["open_units"])
+                lot["open_units"] -= matched
+                remaining -= matched
+                consumptions.append({
+                    "transaction_id": txn.transaction_id,
+                    "lot_transaction_id": lot["transaction_id"],
+                    "folio_number": txn.folio_number,
+                    "investor_id": txn.investor_id,
+                    "scheme_id": txn.scheme_id,
+                    "units": matched,
+                    "acquisition_date": lot["acquisition_date"],
+                    "cost_nav": lot["cost_nav"],
+                    "redemption_date": txn.transaction_date,
+                    "redemption_nav": txn.nav_per_unit
+                })
+                if lot["open_units"] <= 0:
+                    queue.popleft()
+            if remaining > UNIT_QUANTUM:
+                logger.warning(f"Folio {txn.folio_number}: {txn.transaction_id} redeems {remaining} units more than purchased")
+
+        if lots:
+            self.db.execute(insert(UnitLot), list(lots.values()))
+        if consumptions:
+            self.db.execute(insert(UnitLotConsumption), consumptions)
+        return len(lots)
+
+    def rebuild_all(self, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+        """Rebuild the whole ledger, committing after each batch of folios"""
+        total = 0
+        last_id = 0
+        while True:
+            batch = self.db.query(Folio.id, Folio.folio_number).filter(
+                Folio.id > last_id
+            ).order_by(Folio.id).limit(batch_size).all()
+            if not batch:
+                break
+            total += self.rebuild_folios([row.folio_number for row in batch])
+            self.db.commit()
+            last_id = batch[-1].id
+            logger.info(f"Rebuilt unit lots up to folio id {last_id} ({total} lots)")
+        return total
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def open_lots_for_investor(
+        self,
+        investor_id: str,
+        folio_number: Optional[str] = None,
+        as_of: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Open lots with holding period and exit-load status"""
+        as_of = as_of or date.today()
+        query = self.db.query(
+            UnitLot.transaction_id, UnitLot.folio_number, UnitLot.scheme_id,
+            UnitLot.acquisition_date, UnitLot.cost_nav, UnitLot.original_units, UnitLot.open_units,
+            Scheme.scheme_name, Scheme.scheme_type,
+            Scheme.exit_load_percentage, Scheme.exit_load_period_days
+        ).join(
+            Scheme, Scheme.scheme_id == UnitLot.scheme_id
+        ).filter(
+            UnitLot.investor_id == investor_id,
+            UnitLot.open_units > 0
+        )
+        if folio_number:
+            query = query.filter(UnitLot.folio_number == folio_number)
+
+        lots = []
+        for row in query.order_by(UnitLot.folio_number, UnitLot.acquisition_date, UnitLot.id).all():
+            holding_days = (as_of - row.acquisition_date).days
+            is_equity = row.scheme_type == SchemeType.equity
+            lots.append({
+                "transaction_id": row.transaction_id,
+                "folio_number": row.folio_number,
+                "scheme_id": row.scheme_id,
+                "scheme_name": row.scheme_name,
+                "acquisition_date": row.acquisition_date,
+                "cost_nav": float(row.cost_nav),
+                "original_units": float(row.original_units),
+                "open_units": float(row.open_units),
+                "holding_period_days": holding_days,
+                "is_long_term": is_long_term(holding_days, is_equity),
+                "exit_load_applicable": bool(
+                    row.exit_load_percentage and row.exit_load_period_days
+                    and holding_days < row.exit_load_period_days
+                )
+            })
+        return lots
+
+    def realized_gains(
+        self,
+        investor_id: str,
+        from_date: date,
+        to_date: date,
+        folio_number: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Realized gains per consumed lot for redemptions between from_date and to_date"""
+        query = self.db.query(
+            UnitLotConsumption.transaction_id, UnitLotConsumption.lot_transaction_id,
+            UnitLotConsumption.scheme_id, UnitLotConsumption.units,
+            UnitLotConsumption.acquisition_date, UnitLotConsumption.cost_nav,
+            UnitLotConsumption.redemption_date, UnitLotConsumption.redemption_nav,
+            Scheme.scheme_name, Scheme.scheme_type
+        ).outerjoin(
+            Scheme, Scheme.scheme_id == UnitLotConsumption.scheme_id
+        ).filter(
+            UnitLotConsumption.investor_id == investor_id,
+            UnitLotConsumption.redemption_date >= from_date,
+            UnitLotConsumption.redemption_date <= to_date
+        )
+        if folio_number:
+            query = query.filter(UnitLotConsumption.folio_number == folio_number)
+
+        gains = []
+        for row in query.order_by(UnitLotConsumption.redemption_date, UnitLotConsumption.id).all():
+            # Missing scheme rows default to equity treatment, as before
+            is_equity = row.scheme_type == SchemeType.equity if row.scheme_type else True
+            holding_days = (row.redemption_date - row.acquisition_date).days
+            cost_basis = row.units * row.cost_nav
+            sale_value = row.units * row.redemption_nav
+            gains.append({
+                'transaction_id': row.transaction_id,
+                'purchase_transaction_id': row.lot_transaction_id,
+                'scheme_id': row.scheme_id,
+                'scheme_name': row.scheme_name or row.scheme_id,
+                'purchase_date': row.acquisition_date,
+                'redemption_date': row.redemption_date,
+                'units': float(row.units),
+                'purchase_nav': float(row.cost_nav),
+                'redemption_nav': float(row.redemption_nav),
+                'cost_basis': float(cost_basis),
+                'sale_value': float(sale_value),
+                'gain_loss': float(sale_value - cost_basis),
+                'holding_period_days': holding_days,
+                'holding_period_years': round(holding_days / 365.0, 2),
+                'is_long_term': is_long_term(holding_days, is_equity),
+                'is_equity': is_equity
+            })
+        return gains
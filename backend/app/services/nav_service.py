@@ -0,0 +1,301 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_, select, update
+from typing import Optional, Dict, Any, List, Iterator, IO, Tuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import logging
+import time
+
+from app.models.scheme import Scheme, NAVHistory
+from app.models.folio import Folio, FolioStatus
+from app.models.admin import BatchJob, BatchJobStatus
+from app.db.bulk import upsert
+from app.services.job_service import JobCancelled, raise_if_cancelled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+REVALUATION_CHUNK_SIZE = 50000  # folio id range per UPDATE
+MAX_SCHEME_FILTER = 1000  # beyond this, rely on the NAV-changed predicate alone
+MAX_ERROR_LOG_LINES = 500
+
+
+class NAVChunk:
+    """Validated NAV rows for one chunk, held as parallel column arrays"""
+
+    __slots__ = ("scheme_ids", "nav_dates", "nav_values", "errors", "rows_read")
+
+    def __init__(self):
+        self.scheme_ids: List[str] = []
+        self.nav_dates: List[date] = []
+        self.nav_values: List[Decimal] = []
+        self.errors: List[str] = []
+        self.rows_read = 0
+
+    def __len__(self):
+        return len(self.scheme_ids)
+
+
+class NAVService:
+    """Set-based NAV file loading into nav_history and scheme_master"""
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def load_scheme_aliases(self) -> Dict[str, str]:
+        """Map every accepted spelling of a scheme ID (S001 <-> SCH001) to its DB scheme_id"""
+        scheme_ids = [row[0] for row in self.db.query(Scheme.scheme_id).all()]
+        aliases: Dict[str, str] = {}
+        for scheme_id in scheme_ids:
+            if scheme_id.startswith("SCH"):
+                aliases.setdefault("S" + scheme_id[3:], scheme_id)
+            elif scheme_id.startswith("S") and len(scheme_id) == 4:
+                aliases.setdefault("SCH" + scheme_id[1:], scheme_id)
+        # Exact IDs always win over alternate spellings
+        aliases.update({scheme_id: scheme_id for scheme_id in scheme_ids})
+        return aliases
+
+    def iter_chunks(self, stream: IO[str], aliases: Dict[str, str]) -> Iterator[NAVChunk]:
+        """Stream a Scheme_ID,NAV,NAV_Date CSV and yield validated chunks"""
+        reader = csv.DictReader(stream)
+        chunk = NAVChunk()
+        row_number = 0
+
+        for row in reader:
+            row_number += 1
+            chunk.rows_read += 1
+            try:
+                raw_scheme_id = (row.get('Scheme_ID') or '').strip()
+                if not raw_scheme_id:
+                    raise ValueError("Scheme_ID is required")
+
+                try:
+                    nav_value = Decimal((row.get('NAV') or '0').strip())
+                except InvalidOperation:
+                    raise ValueError(f"Invalid NAV: {row.get('NAV')}")
+                if not nav_value.is_finite() or nav_value <= 0:
+                    raise ValueError("NAV must be positive")
+
+                nav_date_str = (row.get('NAV_Date') or '').strip()
+                try:
+                    nav_date = datetime.strptime(nav_date_str, '%Y-%m-%d').date()
+                except ValueError:
+                    raise ValueError(f"Invalid date format: {nav_date_str}. Expected YYYY-MM-DD")
+
+                scheme_id = aliases.get(raw_scheme_id)
+                if not scheme_id:
+                    raise ValueError(f"Scheme {raw_scheme_id} not found")
+
+                chunk.scheme_ids.append(scheme_id)
+                chunk.nav_dates.append(nav_date)
+                chunk.nav_values.append(nav_value)
+            except ValueError as e:
+                chunk.errors.append(f"Row {row_number}: {str(e)}")
+
+            if chunk.rows_read >= self.chunk_size:
+                yield chunk
+                chunk = NAVChunk()
+
+        if chunk.rows_read:
+            yield chunk
+
+    def write_chunk(self, chunk: NAVChunk) -> None:
+        """Upsert a chunk into nav_history with one multi-row INSERT ... ON DUPLICATE KEY UPDATE"""
+        # Last occurrence of a (scheme, date) pair within the chunk wins
+        latest: Dict[Tuple[str, date], Decimal] = {}
+        for scheme_id, nav_date, nav_value in zip(chunk.scheme_ids, chunk.nav_dates, chunk.nav_values):
+            latest[(scheme_id, nav_date)] = nav_value
+
+        today = date.today()
+        rows = [
+            {"scheme_id": scheme_id, "nav_date": nav_date, "nav_value": nav_value, "created_at": today}
+            for (scheme_id, nav_date), nav_value in latest.items()
+        ]
+        upsert(
+            self.db, NAVHistory.__table__, rows,
+            key_columns=["scheme_id", "nav_date"],
+            update_columns=["nav_value"]
+        )
+
+    def apply_latest_navs(self, from_date: date, to_date: date) -> int:
+        """Set scheme_master.current_nav/nav_date from nav_history in one set-based UPDATE.
+
+        Only NAVs dated within the uploaded range are considered, and a scheme is only
+        moved forward (never back to an older NAV date).
+        """
+        latest_dates = select(
+            NAVHistory.scheme_id,
+            func.max(NAVHistory.nav_date).label("nav_date")
+        ).where(
+            NAVHistory.nav_date.between(from_date, to_date)
+        ).group_by(NAVHistory.scheme_id).subquery()
+
+        latest = select(
+            NAVHistory.scheme_id, NAVHistory.nav_date, NAVHistory.nav_value
+        ).join(
+            latest_dates,
+            and_(
+                NAVHistory.scheme_id == latest_dates.c.scheme_id,
+                NAVHistory.nav_date == latest_dates.c.nav_date
+            )
+        ).subquery()
+
+        result = self.db.execute(
+            update(Scheme)
+            .where(
+                Scheme.scheme_id == latest.c.scheme_id,
+                or_(Scheme.nav_date.is_(None), latest.c.nav_date >= Scheme.nav_date)
+            )
+            .values(current_nav=latest.c.nav_value, nav_date=latest.c.nav_date)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def revalue_folios(
+        self,
+        batch_job: Optional[BatchJob] = None,
+        scheme_ids: Optional[List[str]] = None,
+        chunk_size: int = REVALUATION_CHUNK_SIZE
+    ) -> int:
+        """Mark active folios to market at their scheme's current NAV.
+
+        Runs as UPDATE folio_holdings JOIN scheme_master over consecutive folio id
+        ranges, committing after each range. Only folios whose NAV actually changed
+        are touched. With a job, progress is merged into parameters["revaluation"]
+        and each range starts with a cancellation check, which also keeps the job's
+        heartbeat current; a cancel raises JobCancelled after recording progress.
+        """
+        bounds = self.db.query(func.min(Folio.id), func.max(Folio.id)).filter(
+            Folio.status == FolioStatus.active
+        ).first()
+        if not bounds or bounds[0] is None:
+            return 0
+        low, high = bounds
+
+        scheme_filter = scheme_ids if scheme_ids and len(scheme_ids) <= MAX_SCHEME_FILTER else None
+        progress = {"status": "running", "folios_revalued": 0, "last_folio_id": low - 1, "max_folio_id": high}
+        total = 0
+
+        try:
+            for range_start in range(low, high + 1, chunk_size):
+                if batch_job is not None:
+                    raise_if_cancelled(self.db, batch_job)
+                range_end = range_start + chunk_size - 1
+                stmt = update(Folio).where(
+                    Folio.scheme_id == Scheme.scheme_id,
+                    Folio.id.between(range_start, range_end),
+                    Folio.status == FolioStatus.active,
+                    Folio.current_nav != Scheme.current_nav
+                )
+                if scheme_filter:
+                    stmt = stmt.where(Folio.scheme_id.in_(scheme_filter))
+                result = self.db.execute(
+                    stmt.values(
+                        current_nav=Scheme.current_nav,
+                        total_value=Folio.total_units * Scheme.current_nav
+                    ).execution_options(synchronize_session=False)
+                )
+                total += result.rowcount
+
+                if batch_job is not None:
+                    progress.update(folios_revalued=total, last_folio_id=min(range_end, high))
+                    self._record_revaluation(batch_job, progress)
+                self.db.commit()
+        except JobCancelled:
+            progress["status"] = "cancelled"
+            self._record_revaluation(batch_job, progress)
+            self.db.commit()
+            raise
+
+        if batch_job is not None:
+            progress["status"] = "completed"
+            self._record_revaluation(batch_job, progress)
+            self.db.commit()
+
+        logger.info(f"Revalued {total} folios at current NAV")
+        return total
+
+    @staticmethod
+    def _record_revaluation(batch_job: BatchJob, progress: Dict[str, Any]) -> None:
+        # Merge, keeping the keys other code stores there (e.g. the claiming worker)
+        batch_job.parameters = {**(batch_job.parameters or {}), "revaluation": dict(progress)}
+
+    def process_upload(self, batch_job: BatchJob, stream: IO[str]) -> Dict[str, Any]:
+        """Load a NAV CSV stream chunk by chunk and record the outcome on the batch job"""
+        started = time.monotonic()
+        aliases = self.load_scheme_aliases()
+
+        records_processed = 0
+        records_successful = 0
+        error_count = 0
+        errors: List[str] = []
+        from_date: Optional[date] = None
+        to_date: Optional[date] = None
+        affected_schemes = set()
+        cancelled = False
+
+        try:
+            for chunk in self.iter_chunks(stream, aliases):
+                if len(chunk):
+                    self.write_chunk(chunk)
+                    chunk_min, chunk_max = min(chunk.nav_dates), max(chunk.nav_dates)
+                    from_date = chunk_min if from_date is None else min(from_date, chunk_min)
+                    to_date = chunk_max if to_date is None else max(to_date, chunk_max)
+                    affected_schemes.update(chunk.scheme_ids)
+
+                records_processed += chunk.rows_read
+                records_successful += len(chunk)
+                error_count += len(chunk.errors)
+                if len(errors) < MAX_ERROR_LOG_LINES:
+                    errors.extend(chunk.errors[:MAX_ERROR_LOG_LINES - len(errors)])
+
+                batch_job.records_processed = records_processed
+                batch_job.records_successful = records_successful
+                batch_job.records_failed = error_count
+                self.db.commit()
+                raise_if_cancelled(self.db, batch_job)
+        except JobCancelled:
+            # Stop reading, but still publish the NAVs already loaded below
+            cancelled = True
+            logger.info(f"NAV upload {batch_job.job_id} cancelled after {records_processed} rows")
+
+        folios_revalued = 0
+        if from_date is not None:
+            self.apply_latest_navs(from_date, to_date)
+            self.db.commit()
+            # Bring folio values (and therefore AUM) in line with the new NAVs
+            try:
+                folios_revalued = self.revalue_folios(batch_job, sorted(affected_schemes))
+            except JobCancelled:
+                cancelled = True
+                folios_revalued = batch_job.parameters["revaluation"]["folios_revalued"]
+                logger.info(f"NAV upload {batch_job.job_id} cancelled after revaluing {folios_revalued} folios")
+
+        batch_job.records_processed = records_processed
+        batch_job.records_successful = records_successful
+        batch_job.records_failed = error_count
+        batch_job.error_log = "\n".join(errors) if errors else None
+        if not cancelled:
+            batch_job.status = BatchJobStatus.completed if error_count == 0 else BatchJobStatus.failed
+        batch_job.completed_at = datetime.now()
+        batch_job.execution_time_seconds = int(time.monotonic() - started)
+        self.db.commit()
+
+        logger.info(
+            f"NAV upload {batch_job.job_id}: {records_successful}/{records_processed} rows loaded "
+            f"for {len(affected_schemes)} schemes"
+        )
+
+        return {
+            "records_processed": records_processed,
+            "records_successful": records_successful,
+            "records_failed": error_count,
+            "errors": errors,
+            "folios_revalued": folios_revalued,
+            "cancelled": cancelled,
+            "scheme_ids": sorted(affected_schemes),
+            "from_date": from_date,
+            "to_date": to_date
+        }
@@ -1,11 +1,55 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from datetime import datetime
-from typing import List, Optional
-from app.models.notification import Notification, NotificationType, NotificationPriority
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select, update, delete, insert, func, case, exists, literal, true
+from sqlalchemy.sql import Select
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+
+from app.core.config import settings
+from app.db.bulk import upsert
+from app.models.folio import Folio
+from app.models.notification import Notification, NotificationCounter, NotificationType, NotificationPriority
 from app.schemas.notification import NotificationCreate
 
+logger = logging.getLogger(__name__)
+
+
+def _increment_unread(db: Session, counts: Dict[str, int]) -> None:
+    """Add to the unread counters of several investors, creating missing counter rows"""
+    upsert(
+        db, NotificationCounter.__table__,
+        [{"investor_id": investor_id, "unread_count": count} for investor_id, count in counts.items() if count],
+        key_columns=["investor_id"],
+        increment_columns=["unread_count"]
+    )
+
+
+def _decrement_unread(investor_id: str, count: int):
+    """UPDATE taking `count` off an investor's unread counter, never below zero"""
+    return (
+        update(NotificationCounter)
+        .where(NotificationCounter.investor_id == investor_id)
+        .values(unread_count=case(
+            (NotificationCounter.unread_count > count, NotificationCounter.unread_count - count),
+            else_=0
+        ))
+    )
+
+
+def scheme_holders(scheme_id: str) -> Select:
+    """Investors currently holding units of a scheme, for fan_out()"""
+    return select(Folio.investor_id).where(Folio.scheme_id == scheme_id, Folio.total_units > 0)
+
+
 class NotificationService:
+    """Investor notifications and their per-investor unread counters.
+
+    Every write that changes the number of unread notifications adjusts
+    notification_counters by the same amount in the same transaction, so the
+    unread count is a single-row read.
+    """
+
     def __init__(self, db: Session):
         self.db = db
 
@@ -17,6 +61,12 @@ class NotificationService:
             .limit(limit)\
             .all()
 
+    def get_unread_count(self, investor_id: str) -> int:
+        count = self.db.query(NotificationCounter.unread_count)\
+            .filter(NotificationCounter.investor_id == investor_id)\
+            .scalar()
+        return max(count or 0, 0)
+
     def create_notification(self, investor_id: str, data: NotificationCreate) -> Notification:
         """Create a new notification for an investor"""
         new_notification = Notification(
@@ -28,41 +78,118 @@ class NotificationService:
             reference_id=data.reference_id
         )
         self.db.add(new_notification)
+        _increment_unread(self.db, {investor_id: 1})
         self.db.commit()
         self.db.refresh(new_notification)
         return new_notification
 
+    def fan_out(
+        self,
+        investors: Select,
+        title: str,
+        message: str,
+        notification_type: NotificationType = NotificationType.system,
+        priority: NotificationPriority = NotificationPriority.low,
+        reference_id: Optional[str] = None,
+        chunk_size: int = None
+    ) -> int:
+        """Notify every investor selected by `investors` (a SELECT of one investor_id column).
+
+        Works through the investors in investor_id order, chunk_size at a
+        time: each chunk is one INSERT ... SELECT into notifications plus two
+        set-based counter updates, committed together. No rows are loaded
+        into Python, so an event for all holders of a scheme (see
+        scheme_holders()) costs a few statements per chunk. Returns the number
+        of notifications created.
+        """
+        chunk_size = chunk_size or settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+        source = investors.distinct().subquery()
+        investor_id = source.c[0]
+        table = Notification.__table__
+        now = datetime.utcnow()
+        created = 0
+        last = None
+
+        while True:
+            after = investor_id > last if last is not None else true()
+            chunk = select(investor_id.label("investor_id")).where(after).order_by(investor_id).limit(chunk_size).subquery()
+            upper = self.db.execute(select(func.max(chunk.c.investor_id))).scalar()
+            if upper is None:
+                break
+            in_chunk = (after, investor_id <= upper)
+
+            result = self.db.execute(
+                insert(table).from_select(
+                    ["investor_id", "title", "message", "notification_type", "priority", "is_read",
+                     "reference_id", "created_at"],
+                    select(
+                        investor_id,
+                        literal(title, table.c.title.type),
+                        literal(message, table.c.message.type),
+                        literal(notification_type, table.c.notification_type.type),
+                        literal(priority, table.c.priority.type),
+                        literal(False, table.c.is_read.type),
+                        literal(reference_id, table.c.reference_id.type),
+                        literal(now, table.c.created_at.type)
+                    ).where(*in_chunk)
+                )
+            )
+            self.db.execute(
+                insert(NotificationCounter.__table__).from_select(
+                    ["investor_id", "unread_count"],
+                    select(investor_id, literal(0)).where(
+                        *in_chunk,
+                        ~exists().where(NotificationCounter.investor_id == investor_id)
+                    )
+                )
+            )
+            self.db.execute(
+                update(NotificationCounter)
+                .where(NotificationCounter.investor_id.in_(select(investor_id).where(*in_chunk)))
+                .values(unread_count=NotificationCounter.unread_count + 1)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+
+            created += result.rowcount
+            last = upper
+            logger.info(f"Notification fan-out '{title}': {created} created (up to investor {upper})")
+
+        return created
+
     def mark_as_read(self, notification_id: int, investor_id: str) -> Optional[Notification]:
         """Mark a specific notification as read"""
-        notification = self.db.query(Notification)\
+        result = self.db.execute(
+            update(Notification)
+            .where(
+                Notification.id == notification_id,
+                Notification.investor_id == investor_id,
+                Notification.is_read == False
+            )
+            .values(is_read=True, read_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            self.db.execute(_decrement_unread(investor_id, result.rowcount))
+            self.db.commit()
+
+        return self.db.query(Notification)\
             .filter(Notification.id == notification_id, Notification.investor_id == investor_id)\
+            .populate_existing()\
             .first()
-        
-        if notification and not notification.is_read:
-            notification.is_read = True
-            notification.read_at = datetime.utcnow()
-            self.db.commit()
-            self.db.refresh(notification)
-            
-        return notification
 
     def mark_all_as_read(self, investor_id: str) -> int:
         """Mark all unread notifications for an investor as read"""
-        unread = self.db.query(Notification)\
-            .filter(Notification.investor_id == investor_id, Notification.is_read == False)\
-            .all()
-        
-        count = 0
-        now = datetime.utcnow()
-        for note in unread:
-            note.is_read = True
-            note.read_at = now
-            count += 1
-            
-        if count > 0:
-            self.db.commit()
-            
-        return count
+        result = self.db.execute(
+            update(Notification)
+            .where(Notification.investor_id == investor_id, Notification.is_read == False)
+            .values(is_read=True, read_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            self.db.execute(_decrement_unread(investor_id, result.rowcount))
+        self.db.commit()
+        return result.rowcount
 
     def clear_all_notifications(self, investor_id: str) -> bool:
         """Delete all notifications for an investor"""
@@ -70,8 +197,164 @@ class NotificationService:
             self.db.query(Notification)\
                 .filter(Notification.investor_id == investor_id)\
                 .delete()
+            self.db.execute(
+                update(NotificationCounter)
+                .where(NotificationCounter.investor_id == investor_id)
+                .values(unread_count=0)
+            )
             self.db.commit()
             return True
         except Exception:
             self.db.rollback()
             return False
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def prune(self, retention_days: int = None, batch_size: int = None) -> int:
+        """Delete notifications older than the retention window, oldest first.
+
+        Deletes batch_size rows per statement and commits after each batch,
+        so locks stay short on a large table. Unread notifications that are
+        deleted are taken off their investors' counters in the same commit.
+        """
+        retention_days = settings.NOTIFICATION_RETENTION_DAYS if retention_days is None else retention_days
+        batch_size = batch_size or settings.NOTIFICATION_PRUNE_BATCH_SIZE
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        deleted = 0
+
+        while True:
+            rows = self.db.execute(
+                select(Notification.id, Notification.investor_id, Notification.is_read)
+                .where(Notification.created_at < cutoff)
+                .order_by(Notification.created_at, Notification.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            unread: Dict[str, int] = {}
+            for row in rows:
+                if not row.is_read:
+                    unread[row.investor_id] = unread.get(row.investor_id, 0) + 1
+
+            self.db.execute(
+                delete(Notification)
+                .where(Notification.id.in_([row.id for row in rows]))
+                .execution_options(synchronize_session=False)
+            )
+            for investor_id, count in unread.items():
+                self.db.execute(_decrement_unread(investor_id, count))
+            self.db.commit()
+
+            deleted += len(rows)
+            logger.info(f"Pruned {deleted} notifications older than {cutoff:%Y-%m-%d}")
+            if len(rows) < batch_size:
+                break
+
+        return deleted
+
+    def rebuild_unread_counts(self) -> int:
+        """Recompute every unread counter from the notifications table. The caller commits."""
+        self.db.execute(delete(NotificationCounter))
+        result = self.db.execute(
+            insert(NotificationCounter.__table__).from_select(
+                ["investor_id", "unread_count"],
+                select(Notification.investor_id, func.count(Notification.id))
+                .where(Notification.is_read == False)
+                .group_by(Notification.investor_id)
+            )
+        )
+        return result.rowcount
+
+
+class AsyncNotificationService:
+    """NotificationService for AsyncSession, used by the async investor routes"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_investor_notifications(self, investor_id: str, limit: int = 50) -> List[Notification]:
+        """Retrieve notifications for an investor, sorted by newest first"""
+        result = await self.db.execute(
+            select(Notification)
+            .where(Notification.investor_id == investor_id)
+            .order_by(desc(Notification.created_at))
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def get_unread_count(self, investor_id: str) -> int:
+        result = await self.db.execute(
+            select(NotificationCounter.unread_count).where(NotificationCounter.investor_id == investor_id)
+        )
+        return max(result.scalar() or 0, 0)
+
+    async def create_notification(self, investor_id: str, data: NotificationCreate) -> Notification:
+        """Create a new notification for an investor"""
+        new_notification = Notification(
+            investor_id=investor_id,
+            title=data.title,
+            message=data.message,
+            notification_type=data.notification_type,
+            priority=data.priority,
+            reference_id=data.reference_id
+        )
+        self.db.add(new_notification)
+        await self.db.run_sync(_increment_unread, {investor_id: 1})
+        await self.db.commit()
+        await self.db.refresh(new_notification)
+        return new_notification
+
+    async def mark_as_read(self, notification_id: int, investor_id: str) -> Optional[Notification]:
+        """Mark a specific notification as read"""
+        result = await self.db.execute(
+            update(Notification)
+            .where(
+                Notification.id == notification_id,
+                Notification.investor_id == investor_id,
+                Notification.is_read == False
+            )
+            .values(is_read=True, read_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            await self.db.execute(_decrement_unread(investor_id, result.rowcount))
+            await self.db.commit()
+
+        result = await self.db.execute(
+            select(Notification)
+            .where(Notification.id == notification_id, Notification.investor_id == investor_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
+
+    async def mark_all_as_read(self, investor_id: str) -> int:
+        """Mark all unread notifications for an investor as read"""
+        result = await self.db.execute(
+            update(Notification)
+            .where(Notification.investor_id == investor_id, Notification.is_read == False)
+            .values(is_read=True, read_at=datetime.utcnow())
+        )
+        if result.rowcount:
+            await self.db.execute(_decrement_unread(investor_id, result.rowcount))
+        await self.db.commit()
+        return result.rowcount
+
+    async def clear_all_notifications(self, investor_id: str) -> bool:
+        """Delete all notifications for an investor"""
+        try:
+            await self.db.execute(
+                delete(Notification).where(Notification.investor_id == investor_id)
+            )
+            await self.db.execute(
+                update(NotificationCounter)
+                .where(NotificationCounter.investor_id == investor_id)
+                .values(unread_count=0)
+            )
+            await self.db.commit()
+            return True
+        except Exception:
+            await self.db.rollback()
+            return False
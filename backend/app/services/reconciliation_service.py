@@ -0,0 +1,537 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert, delete
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Iterator, Callable, IO
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import logging
+import math
+import os
+import tempfile
+import time
+import zlib
+
+from app.core.config import settings
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.admin import (
+    BatchJob, BatchJobType, BatchJobStatus, Reconciliation, ReconciliationResult,
+    ReconciliationMatchStatus, Exception as ExceptionModel
+)
+from app.services.sequence_service import SequenceService
+from app.services.job_service import JobCancelled, JobLost, raise_if_cancelled
+
+logger = logging.getLogger(__name__)
+
+MAX_PARTITIONS = 256  # four spill files per partition are open during partitioning
+WRITE_BATCH_SIZE = 5000
+MAX_ERROR_LOG_LINES = 500
+AMOUNT_PLACES = Decimal("0.01")
+UNITS_PLACES = Decimal("0.0001")
+
+# Accepted header spellings per feed column (compared lower-cased)
+FEED_COLUMNS = {
+    "transaction_id": ("transaction_id", "txn_id", "rta_transaction_id"),
+    "payment_reference": ("payment_reference", "utr", "reference", "bank_reference"),
+    "amount": ("amount", "settlement_amount", "txn_amount"),
+    "units": ("units", "allotted_units"),
+}
+
+EXCEPTION_CODES = {
+    ReconciliationMatchStatus.amount_mismatch: "RECON_AMOUNT",
+    ReconciliationMatchStatus.missing_in_rta: "RECON_MISSING_RTA",
+    ReconciliationMatchStatus.missing_in_feed: "RECON_MISSING_FEED",
+}
+
+# Feed values longer than their reconciliation_results column are clipped there;
+# the exception raised for the row keeps them whole in exception_data
+FEED_ID_LENGTH = ReconciliationResult.__table__.c.transaction_id.type.length
+REFERENCE_LENGTH = ReconciliationResult.__table__.c.payment_reference.type.length
+
+# RTA side of the join: transaction_id, payment_reference, amount, units, investor_id, folio_number
+RTARow = Tuple[str, Optional[str], Decimal, Decimal, Optional[str], Optional[str]]
+
+
+def _partition(key: str, partitions: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % partitions
+
+
+def _decimal(value: Optional[str], places: Decimal) -> Decimal:
+    return Decimal((value or "0").strip() or "0").quantize(places)
+
+
+class FeedMatcher:
+    """Grace hash join of a settlement feed against RTA transactions in bounded memory.
+
+    Both inputs are streamed once into hash partitions on disk: RTA rows by
+    transaction_id (plus a payment_reference -> transaction_id side table) and
+    feed rows by the transaction_id they quote, or by payment_reference when
+    they quote none. Reference-only feed rows are first resolved to a
+    transaction_id partition by partition. The join then loads one RTA
+    partition at a time into a dict and streams the matching feed partition
+    past it, so memory is bounded by the partition size, not the file size.
+
+    Classified rows go to `sink` as ReconciliationResult dicts plus the RTA
+    row (or None) under "rta"; `on_partition` runs after each joined partition.
+    """
+
+    def __init__(self, partitions: int, work_dir: Optional[str] = None):
+        self.partitions = max(1, min(partitions, MAX_PARTITIONS))
+        self.work_dir = work_dir
+        self.feed_rows = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+
+    def run(
+        self,
+        rta_rows: Iterable[RTARow],
+        feed: IO[str],
+        sink: Callable[[List[Dict[str, Any]]], None],
+        on_partition: Callable[[int], None] = lambda index: None
+    ) -> None:
+        with tempfile.TemporaryDirectory(prefix="recon-", dir=self.work_dir) as spill_dir:
+            self._spill_dir = spill_dir
+            self._partition_rta(rta_rows)
+            self._partition_feed(feed)
+            self._resolve_references(sink)
+            for index in range(self.partitions):
+                self._join_partition(index, sink)
+                on_partition(index)
+
+    # ------------------------------------------------------------------
+    # Partitioning
+    # ------------------------------------------------------------------
+
+    def _path(self, side: str, index: int) -> str:
+        return os.path.join(self._spill_dir, f"{side}-{index}.csv")
+
+    def _writers(self, side: str, mode: str = "w"):
+        files = [open(self._path(side, i), mode, newline="") for i in range(self.partitions)]
+        return files, [csv.writer(f) for f in files]
+
+    def _read(self, side: str, index: int) -> Iterator[List[str]]:
+        path = self._path(side, index)
+        if not os.path.exists(path):
+            return
+        with open(path, newline="") as f:
+            yield from csv.reader(f)
+
+    def _partition_rta(self, rta_rows: Iterable[RTARow]) -> None:
+        txn_files, txn_out = self._writers("rta")
+        ref_files, ref_out = self._writers("rta-ref")
+        try:
+            for txn_id, reference, amount, units, investor_id, folio_number in rta_rows:
+                txn_out[_partition(txn_id, self.partitions)].writerow(
+                    (txn_id, reference or "", amount, units or 0, investor_id or "", folio_number or "")
+                )
+                if reference:
+                    ref_out[_partition(reference, self.partitions)].writerow((reference, txn_id, amount))
+        finally:
+            for f in txn_files + ref_files:
+                f.close()
+
+    def _partition_feed(self, feed: IO[str]) -> None:
+        reader = csv.reader(feed)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("Feed file is empty")
+        columns = self._feed_columns(header)
+
+        txn_files, txn_out = self._writers("feed")
+        ref_files, ref_out = self._writers("feed-ref")
+        try:
+            line = 1
+            for row in reader:
+                line += 1
+                if not any(cell.strip() for cell in row):
+                    continue
+                self.feed_rows += 1
+                try:
+                    values = {name: row[i].strip() if i is not None and i < len(row) else ""
+                              for name, i in columns.items()}
+                    amount = _decimal(values["amount"], AMOUNT_PLACES)
+                    units = _decimal(values["units"], UNITS_PLACES)
+                except InvalidOperation:
+                    self._error(f"Line {line}: invalid amount or units")
+                    continue
+
+                txn_id, reference = values["transaction_id"], values["payment_reference"]
+                record = (line, txn_id, reference, amount, units)
+                if txn_id:
+                    txn_out[_partition(txn_id, self.partitions)].writerow(record)
+                elif reference:
+                    ref_out[_partition(reference, self.partitions)].writerow(record)
+                else:
+                    self._error(f"Line {line}: transaction_id or payment_reference is required")
+        finally:
+            for f in txn_files + ref_files:
+                f.close()
+
+    @staticmethod
+    def _feed_columns(header: List[str]) -> Dict[str, Optional[int]]:
+        positions = {name.strip().lower(): i for i, name in enumerate(header)}
+        columns = {
+            column: next((positions[alias] for alias in aliases if alias in positions), None)
+            for column, aliases in FEED_COLUMNS.items()
+        }
+        if columns["amount"] is None:
+            raise ValueError("Feed file has no amount column")
+        if columns["transaction_id"] is None and columns["payment_reference"] is None:
+            raise ValueError("Feed file needs a transaction_id or payment_reference column")
+        return columns
+
+    def _error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_ERROR_LOG_LINES:
+            self.errors.append(message)
+
+    # ------------------------------------------------------------------
+    # Join
+    # ------------------------------------------------------------------
+
+    def _resolve_references(self, sink: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Move reference-only feed rows into the transaction_id partition they resolve to"""
+        txn_files, txn_out = self._writers("feed", "a")
+        try:
+            for index in range(self.partitions):
+                by_reference: Dict[str, List[Tuple[str, str]]] = {}
+                for reference, txn_id, amount in self._read("rta-ref", index):
+                    by_reference.setdefault(reference, []).append((txn_id, _decimal(amount, AMOUNT_PLACES)))
+
+                unresolved = []
+                for line, _, reference, amount, units in self._read("feed-ref", index):
+                    amount = Decimal(amount)
+                    candidates = by_reference.get(reference)
+                    if not candidates:
+                        unresolved.append(self._result(
+                            ReconciliationMatchStatus.missing_in_rta, int(line), None, reference, amount, units
+                        ))
+                        continue
+                    # One payment can fund several transactions; prefer the one with this amount
+                    txn_id = next((t for t, a in candidates if a == amount), candidates[0][0])
+                    txn_out[_partition(txn_id, self.partitions)].writerow((line, txn_id, reference, amount, units))
+                if unresolved:
+                    sink(unresolved)
+        finally:
+            for f in txn_files:
+                f.close()
+
+    def _join_partition(self, index: int, sink: Callable[[List[Dict[str, Any]]], None]) -> None:
+        # Build side: this partition's RTA rows; [row, matched]
+        table: Dict[str, List] = {}
+        for txn_id, reference, amount, units, investor_id, folio_number in self._read("rta", index):
+            table[txn_id] = [(txn_id, reference or None, _decimal(amount, AMOUNT_PLACES),
+                              _decimal(units, UNITS_PLACES), investor_id or None, folio_number or None), False]
+
+        batch: List[Dict[str, Any]] = []
+        for line, txn_id, reference, amount, units in self._read("feed", index):
+            amount, units = Decimal(amount), Decimal(units)
+            entry = table.get(txn_id)
+            if entry is None or entry[1]:
+                # Unknown transaction, or a second settlement for one already matched
+                status, rta = ReconciliationMatchStatus.missing_in_rta, None
+            else:
+                entry[1] = True
+                rta = entry[0]
+                # Feeds quote units unsigned and may omit them; amounts must agree exactly
+                same = rta[2] == amount and (not units or abs(rta[3]) == abs(units))
+                status = ReconciliationMatchStatus.matched if same else ReconciliationMatchStatus.amount_mismatch
+            batch.append(self._result(status, int(line), rta, reference or None, amount, units, txn_id))
+            if len(batch) >= WRITE_BATCH_SIZE:
+                sink(batch)
+                batch = []
+
+        for rta, matched in table.values():
+            if not matched:
+                batch.append(self._result(ReconciliationMatchStatus.missing_in_feed, None, rta, rta[1], None, None))
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    sink(batch)
+                    batch = []
+        if batch:
+            sink(batch)
+
+    @staticmethod
+    def _result(
+        status: ReconciliationMatchStatus,
+        feed_line: Optional[int],
+        rta: Optional[RTARow],
+        reference: Optional[str],
+        feed_amount,
+        feed_units,
+        quoted_txn_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        txn_id = rta[0] if rta else (quoted_txn_id or None)
+        return {
+            "match_status": status,
+            "feed_line": feed_line,
+            "payment_reference": reference[:REFERENCE_LENGTH] if reference else reference,
+            "feed_amount": Decimal(feed_amount) if feed_amount is not None else None,
+            "feed_units": Decimal(feed_units) if feed_units is not None else None,
+            "transaction_id": txn_id[:FEED_ID_LENGTH] if txn_id else txn_id,
+            "rta_amount": rta[2] if rta else None,
+            "rta_units": rta[3] if rta else None,
+            "rta": rta,
+            "quoted": (txn_id, reference),
+        }
+
+
+class ReconciliationService:
+    """Reconcile an AMC/bank settlement feed against completed RTA transactions.
+
+    Runs as a reconciliation batch job: the feed file is matched with
+    FeedMatcher and every classified row is written to reconciliation_results
+    in bulk, with an exceptions row for each one that did not match.
+    """
+
+    def __init__(self, db: Session, partition_rows: Optional[int] = None):
+        self.db = db
+        self.partition_rows = partition_rows or settings.RECONCILIATION_PARTITION_ROWS
+
+    # ------------------------------------------------------------------
+    # Job lifecycle
+    # ------------------------------------------------------------------
+
+    def next_reconciliation_id(self) -> str:
+        """Reserve a reconciliation ID (also used as its batch job_id and feed file name)"""
+        return SequenceService(self.db).next_ids("reconciliation", 1)[0]
+
+    def create_job(
+        self,
+        reconciliation_date: date,
+        input_file_path: str,
+        amc_id: Optional[str] = None,
+        scheme_id: Optional[str] = None,
+        performed_by: Optional[str] = None,
+        reconciliation_id: Optional[str] = None
+    ) -> BatchJob:
+        """Create the reconciliation record and its pending batch job"""
+        reconciliation_id = reconciliation_id or self.next_reconciliation_id()
+        recon = Reconciliation(
+            reconciliation_id=reconciliation_id,
+            reconciliation_type="daily",
+            reconciliation_date=reconciliation_date,
+            start_date=reconciliation_date,
+            end_date=reconciliation_date,
+            amc_id=amc_id,
+            scheme_id=scheme_id,
+            status="pending",
+            performed_by=performed_by
+        )
+        batch_job = BatchJob(
+            job_id=reconciliation_id,
+            job_type=BatchJobType.reconciliation,
+            job_name=f"Reconciliation - {reconciliation_date.isoformat()}",
+            scheduled_at=datetime.now(),
+            status=BatchJobStatus.pending,
+            parameters={
+                "reconciliation_id": reconciliation_id,
+                "reconciliation_date": reconciliation_date.isoformat(),
+                "amc_id": amc_id,
+                "scheme_id": scheme_id,
+                "partition_rows": self.partition_rows
+            },
+            input_file_path=input_file_path,
+            records_processed=0,
+            records_successful=0,
+            records_failed=0,
+            executed_by=performed_by
+        )
+        self.db.add(recon)
+        self.db.add(batch_job)
+        self.db.commit()
+        return batch_job
+
+    def execute(self, batch_job: BatchJob) -> BatchJob:
+        """Match the job's feed file and record results, replacing those of any earlier attempt"""
+        params = dict(batch_job.parameters or {})
+        reconciliation_id = params["reconciliation_id"]
+        recon = self.db.query(Reconciliation).filter(
+            Reconciliation.reconciliation_id == reconciliation_id
+        ).first()
+        if recon is None:
+            raise ValueError(f"Reconciliation {reconciliation_id} not found")
+
+        batch_job.status = BatchJobStatus.running
+        if not batch_job.started_at:
+            batch_job.started_at = datetime.now()
+        recon.status = "in_progress"
+        recon.performed_at = datetime.now()
+        self._clear_results(reconciliation_id)
+        batch_job.records_processed = 0
+        batch_job.records_successful = 0
+        batch_job.records_failed = 0
+        batch_job.error_log = None
+        self.db.commit()
+
+        started = time.monotonic()
+        recon_date = date.fromisoformat(params["reconciliation_date"])
+        scope = self._scope(recon_date, params.get("amc_id"), params.get("scheme_id"))
+        rta_count = self.db.execute(select(func.count()).select_from(scope.subquery())).scalar() or 0
+        partitions = math.ceil(rta_count / (params.get("partition_rows") or self.partition_rows)) or 1
+
+        matcher = FeedMatcher(partitions, settings.RECONCILIATION_WORK_DIRECTORY)
+        writer = _ResultWriter(self.db, reconciliation_id)
+
+        def on_partition(index: int) -> None:
+            batch_job.records_processed = writer.feed_rows
+            batch_job.records_successful = writer.counts[ReconciliationMatchStatus.matched]
+            self.db.commit()
+            raise_if_cancelled(self.db, batch_job)
+
+        try:
+            rta_rows = self.db.execute(scope.execution_options(yield_per=WRITE_BATCH_SIZE))
+            with open(batch_job.input_file_path, encoding="utf-8-sig", newline="") as feed:
+                matcher.run(rta_rows, feed, writer.write, on_partition)
+
+            counts = writer.counts
+            unmatched = sum(n for status, n in counts.items() if status != ReconciliationMatchStatus.matched)
+            recon.total_transactions = rta_count
+            recon.matched_transactions = counts[ReconciliationMatchStatus.matched]
+            recon.unmatched_transactions = unmatched
+            recon.discrepancy_amount = writer.discrepancy
+            recon.exception_count = writer.exceptions
+            recon.reconciliation_results = {
+                "feed_rows": matcher.feed_rows,
+                "invalid_feed_rows": matcher.error_count,
+                **{status.value: n for status, n in counts.items()}
+            }
+            recon.is_reconciled = unmatched == 0 and matcher.error_count == 0
+            recon.status = "completed"
+
+            batch_job.records_processed = matcher.feed_rows
+            batch_job.records_successful = counts[ReconciliationMatchStatus.matched]
+            batch_job.records_failed = matcher.feed_rows - counts[ReconciliationMatchStatus.matched]
+            batch_job.error_log = "\n".join(matcher.errors) if matcher.errors else None
+            batch_job.status = BatchJobStatus.completed
+        except JobCancelled:
+            logger.info(f"Reconciliation {reconciliation_id} cancelled")
+            recon.status = "cancelled"
+        except JobLost:
+            raise
+        except Exception as e:
+            logger.error(f"Reconciliation {reconciliation_id} failed: {e}", exc_info=True)
+            self.db.rollback()
+            batch_job.error_log = f"Job aborted: {str(e)}"
+            batch_job.status = BatchJobStatus.failed
+            recon.status = "failed"
+
+        batch_job.completed_at = datetime.now()
+        batch_job.execution_time_seconds = (batch_job.execution_time_seconds or 0) + int(time.monotonic() - started)
+        self.db.commit()
+
+        logger.info(
+            f"Reconciliation {reconciliation_id}: {matcher.feed_rows} feed rows against {rta_count} "
+            f"transactions in {matcher.partitions} partitions"
+        )
+        return batch_job
+
+    # ------------------------------------------------------------------
+    # Loading and persistence
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _scope(recon_date: date, amc_id: Optional[str], scheme_id: Optional[str]):
+        stmt = select(
+            Transaction.transaction_id, Transaction.payment_reference, Transaction.amount,
+            Transaction.units, Transaction.investor_id, Transaction.folio_number
+        ).where(
+            Transaction.transaction_date == recon_date,
+            Transaction.status == TransactionStatus.completed
+        )
+        if amc_id:
+            stmt = stmt.where(Transaction.amc_id == amc_id)
+        if scheme_id:
+            stmt = stmt.where(Transaction.scheme_id == scheme_id)
+        return stmt
+
+    def _clear_results(self, reconciliation_id: str) -> None:
+        """Drop results and exceptions written by an earlier attempt of this reconciliation"""
+        self.db.execute(
+            delete(ExceptionModel).where(ExceptionModel.exception_id.in_(
+                select(ReconciliationResult.exception_id).where(
+                    ReconciliationResult.reconciliation_id == reconciliation_id,
+                    ReconciliationResult.exception_id.isnot(None)
+                ).scalar_subquery()
+            )).execution_options(synchronize_session=False)
+        )
+        self.db.execute(
+            delete(ReconciliationResult).where(ReconciliationResult.reconciliation_id == reconciliation_id)
+        )
+
+
+class _ResultWriter:
+    """FeedMatcher sink: bulk-inserts result rows and an exception per unmatched row"""
+
+    def __init__(self, db: Session, reconciliation_id: str):
+        self.db = db
+        self.reconciliation_id = reconciliation_id
+        self.sequences = SequenceService(db)
+        self.counts = {status: 0 for status in ReconciliationMatchStatus}
+        self.discrepancy = Decimal("0")
+        self.exceptions = 0
+        self.feed_rows = 0
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        unmatched = [row for row in batch if row["match_status"] != ReconciliationMatchStatus.matched]
+        exception_ids = iter(self.sequences.next_ids("exception", len(unmatched)) if unmatched else [])
+        now = datetime.now()
+
+        results, exceptions = [], []
+        for row in batch:
+            status = row["match_status"]
+            rta = row.pop("rta")
+            quoted = row.pop("quoted")
+            self.counts[status] += 1
+            if row["feed_line"] is not None:
+                self.feed_rows += 1
+
+            if status != ReconciliationMatchStatus.matched:
+                row["exception_id"] = next(exception_ids)
+                exceptions.append(self._exception(row, rta, quoted, now))
+                self.discrepancy += abs((row["feed_amount"] or 0) - (row["rta_amount"] or 0))
+            else:
+                row["exception_id"] = None
+            row["reconciliation_id"] = self.reconciliation_id
+            results.append(row)
+
+        self.db.execute(insert(ReconciliationResult), results)
+        if exceptions:
+            self.db.execute(insert(ExceptionModel), exceptions)
+            self.exceptions += len(exceptions)
+        # Each batch commits on its own; a rerun clears the reconciliation's rows first
+        self.db.commit()
+
+    def _exception(
+        self, row: Dict[str, Any], rta: Optional[RTARow], quoted: Tuple[Optional[str], Optional[str]], now: datetime
+    ) -> Dict[str, Any]:
+        status = row["match_status"]
+        txn_id, reference = quoted
+        if status == ReconciliationMatchStatus.amount_mismatch:
+            message = (f"Feed amount {row['feed_amount']} / units {row['feed_units']} does not match "
+                       f"RTA amount {row['rta_amount']} / units {row['rta_units']}")
+        elif status == ReconciliationMatchStatus.missing_in_rta:
+            message = (f"Feed line {row['feed_line']} ({txn_id or reference}) has no matching RTA transaction "
+                       f"or repeats one already matched")
+        else:
+            message = f"Transaction {txn_id} is missing from the feed"
+
+        return {
+            "exception_id": row["exception_id"],
+            "exception_type": f"reconciliation_{status.value}",
+            # Only link transactions that exist; missing_in_rta quotes an unknown ID
+            "transaction_id": rta[0] if rta else None,
+            "investor_id": rta[4] if rta else None,
+            "folio_number": rta[5] if rta else None,
+            "error_code": EXCEPTION_CODES[status],
+            "error_message": message,
+            "exception_data": {
+                "reconciliation_id": self.reconciliation_id,
+                "feed_line": row["feed_line"],
+                "transaction_id": txn_id,
+                "payment_reference": reference,
+                "feed_amount": str(row["feed_amount"]) if row["feed_amount"] is not None else None,
+                "rta_amount": str(row["rta_amount"]) if row["rta_amount"] is not None else None,
+            },
+            "status": "open",
+            "priority": "high" if status == ReconciliationMatchStatus.amount_mismatch else "normal",
+            "occurred_at": now,
+        }
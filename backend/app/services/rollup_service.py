@@ -0,0 +1,274 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, func, case, select, insert, delete
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import date, timedelta
+from decimal import Decimal
+import logging
+
+from app.models.transaction import Transaction, TransactionType, TransactionStatus, DailyTxnRollup
+from app.db.bulk import upsert
+from app.services.aum_service import invalidate_unit_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Transaction attributes that place a row in a rollup bucket or feed its totals
+BUCKET_ATTRIBUTES = ("transaction_date", "scheme_id", "amc_id", "transaction_type", "status")
+MEASURE_ATTRIBUTES = ("amount", "units")
+REBUILD_CHUNK_DAYS = 31
+
+INFLOW_TYPES = [TransactionType.fresh_purchase, TransactionType.additional_purchase, TransactionType.sip]
+OUTFLOW_TYPES = [TransactionType.redemption, TransactionType.swp]
+
+BucketKey = Tuple[date, str, str, TransactionType, TransactionStatus]
+
+
+def _add_delta(deltas: Dict[BucketKey, List], values: Dict[str, Any], sign: int) -> None:
+    key = tuple(values.get(attr) for attr in BUCKET_ATTRIBUTES)
+    if any(part is None for part in key):
+        return
+    delta = deltas.setdefault(key, [0, Decimal('0'), Decimal('0')])
+    delta[0] += sign
+    delta[1] += sign * Decimal(values.get("amount") or 0)
+    delta[2] += sign * Decimal(values.get("units") or 0)
+
+
+def _transaction_deltas(session: Session) -> Dict[BucketKey, List]:
+    """Bucket deltas for the Transaction rows written by the current flush"""
+    deltas: Dict[BucketKey, List] = {}
+    attributes = BUCKET_ATTRIBUTES + MEASURE_ATTRIBUTES
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            _add_delta(deltas, {attr: getattr(obj, attr) for attr in attributes}, 1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Transaction):
+            continue
+        state = inspect(obj)
+        old, new, changed = {}, {}, False
+        for attr in attributes:
+            history = state.attrs[attr].history
+            new[attr] = getattr(obj, attr)
+            if history.deleted:
+                old[attr] = history.deleted[0]
+                changed = True
+            else:
+                old[attr] = new[attr]
+        if changed:
+            _add_delta(deltas, old, -1)
+            _add_delta(deltas, new, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            loaded = inspect(obj).dict
+            _add_delta(deltas, {attr: loaded.get(attr) for attr in attributes}, -1)
+
+    return {key: delta for key, delta in deltas.items() if delta[0] or delta[1] or delta[2]}
+
+
+def _delta_rows(deltas: Dict[BucketKey, List]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "rollup_date": key[0],
+            "scheme_id": key[1],
+            "amc_id": key[2],
+            "transaction_type": key[3],
+            "status": key[4],
+            "txn_count": delta[0],
+            "total_amount": delta[1],
+            "total_units": delta[2]
+        }
+        for key, delta in deltas.items()
+    ]
+
+
+def _apply_deltas(conn, deltas: Dict[BucketKey, List]) -> None:
+    upsert(
+        conn, DailyTxnRollup.__table__, _delta_rows(deltas),
+        key_columns=list(("rollup_date",) + BUCKET_ATTRIBUTES[1:]),
+        increment_columns=["txn_count", "total_amount", "total_units"]
+    )
+    # Completed units moved on these dates; unit snapshots taken since are stale
+    ledger_dates = [key[0] for key, delta in deltas.items() if key[4] == TransactionStatus.completed and delta[2]]
+    if ledger_dates:
+        invalidate_unit_snapshots(conn, min(ledger_dates))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_transaction_changes(session, flush_context):
+    """Fold every ORM write to transaction_history into daily_txn_rollup.
+
+    Runs inside the flushing transaction, so the rollup commits or rolls back
+    together with the transaction rows it describes.
+    """
+    deltas = _transaction_deltas(session)
+    if deltas:
+        _apply_deltas(session.connection(), deltas)
+
+
+# Load the previous value when these attributes are reassigned on a loaded or
+# expired row, so a status or type change can be moved between buckets
+for _attr in BUCKET_ATTRIBUTES + MEASURE_ATTRIBUTES:
+    event.listen(getattr(Transaction, _attr), "set", lambda *args: None, active_history=True)
+
+
+class RollupService:
+    """Read and maintain the daily_txn_rollup table behind the admin dashboards"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def record_rows(self, transaction_rows: List[Dict[str, Any]]) -> None:
+        """Fold transaction rows written with a bulk INSERT (bypassing the ORM) into the rollup"""
+        deltas: Dict[BucketKey, List] = {}
+        for row in transaction_rows:
+            _add_delta(deltas, row, 1)
+        if deltas:
+            _apply_deltas(self.db, deltas)
+
+    def record_totals(self, bucket_totals: List[Dict[str, Any]]) -> None:
+        """Fold pre-aggregated bucket totals (rows written by INSERT ... SELECT) into the rollup.
+
+        Each dict carries the bucket columns plus txn_count, total_amount and total_units.
+        """
+        deltas: Dict[BucketKey, List] = {}
+        for row in bucket_totals:
+            key = tuple(row[attr] for attr in BUCKET_ATTRIBUTES)
+            if any(part is None for part in key):
+                continue
+            delta = deltas.setdefault(key, [0, Decimal('0'), Decimal('0')])
+            delta[0] += row["txn_count"]
+            delta[1] += Decimal(row["total_amount"] or 0)
+            delta[2] += Decimal(row["total_units"] or 0)
+        if deltas:
+            _apply_deltas(self.db, deltas)
+
+    def rebuild(self, from_date: date, to_date: date) -> int:
+        """Recompute the rollup for a date range from transaction_history. The caller commits."""
+        self.db.execute(
+            delete(DailyTxnRollup).where(DailyTxnRollup.rollup_date.between(from_date, to_date))
+        )
+        result = self.db.execute(
+            insert(DailyTxnRollup.__table__).from_select(
+                ["rollup_date", "scheme_id", "amc_id", "transaction_type", "status",
+                 "txn_count", "total_amount", "total_units"],
+                select(
+                    Transaction.transaction_date,
+                    Transaction.scheme_id,
+                    Transaction.amc_id,
+                    Transaction.transaction_type,
+                    Transaction.status,
+                    func.count(Transaction.id),
+                    func.coalesce(func.sum(Transaction.amount), 0),
+                    func.coalesce(func.sum(Transaction.units), 0)
+                ).where(
+                    Transaction.transaction_date.between(from_date, to_date)
+                ).group_by(
+                    Transaction.transaction_date, Transaction.scheme_id, Transaction.amc_id,
+                    Transaction.transaction_type, Transaction.status
+                )
+            )
+        )
+        return result.rowcount
+
+    def rebuild_range(self, from_date: date, to_date: date, chunk_days: int = REBUILD_CHUNK_DAYS) -> int:
+        """Rebuild a (possibly long) range in chunks, committing after each chunk"""
+        buckets = 0
+        chunk_start = from_date
+        while chunk_start <= to_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), to_date)
+            buckets += self.rebuild(chunk_start, chunk_end)
+            self.db.commit()
+            logger.info(f"Rebuilt daily_txn_rollup for {chunk_start} to {chunk_end}")
+            chunk_start = chunk_end + timedelta(days=1)
+        return buckets
+
+    def rebuild_all(self) -> int:
+        """Rebuild the rollup over the full transaction history"""
+        bounds = self.db.query(
+            func.min(Transaction.transaction_date), func.max(Transaction.transaction_date)
+        ).first()
+        if not bounds or bounds[0] is None:
+            return 0
+        return self.rebuild_range(bounds[0], bounds[1])
+
+    # ------------------------------------------------------------------
+    # Dashboard queries
+    # ------------------------------------------------------------------
+
+    def count(
+        self,
+        status: Optional[TransactionStatus] = None,
+        on_date: Optional[date] = None
+    ) -> int:
+        query = self.db.query(func.coalesce(func.sum(DailyTxnRollup.txn_count), 0))
+        if status is not None:
+            query = query.filter(DailyTxnRollup.status == status)
+        if on_date is not None:
+            query = query.filter(DailyTxnRollup.rollup_date == on_date)
+        return int(query.scalar() or 0)
+
+    def fund_flow(self, from_date: date, to_date: date) -> List[Dict[str, Any]]:
+        """Completed inflow/outflow amounts per day, including days without activity"""
+        rows = self.db.query(
+            DailyTxnRollup.rollup_date,
+            func.sum(case(
+                (DailyTxnRollup.transaction_type.in_(INFLOW_TYPES), DailyTxnRollup.total_amount),
+                else_=0
+            )).label("inflow"),
+            func.sum(case(
+                (DailyTxnRollup.transaction_type.in_(OUTFLOW_TYPES), DailyTxnRollup.total_amount),
+                else_=0
+            )).label("outflow")
+        ).filter(
+            DailyTxnRollup.status == TransactionStatus.completed,
+            DailyTxnRollup.rollup_date.between(from_date, to_date)
+        ).group_by(DailyTxnRollup.rollup_date).all()
+
+        by_date = {row.rollup_date: row for row in rows}
+        flow = []
+        day = from_date
+        while day <= to_date:
+            row = by_date.get(day)
+            flow.append({
+                "day": day.strftime("%Y-%m-%d"),
+                "inflow": float(row.inflow or 0) if row else 0.0,
+                # Redemption amounts are stored net of exit load and are always positive
+                "outflow": float(row.outflow or 0) if row else 0.0
+            })
+            day += timedelta(days=1)
+        return flow
+
+    def daily_volume(self, from_date: date) -> List[Dict[str, Any]]:
+        """Completed transaction count and amount per day since from_date"""
+        rows = self.db.query(
+            DailyTxnRollup.rollup_date,
+            func.sum(DailyTxnRollup.txn_count).label("count"),
+            func.sum(DailyTxnRollup.total_amount).label("amount")
+        ).filter(
+            DailyTxnRollup.status == TransactionStatus.completed,
+            DailyTxnRollup.rollup_date >= from_date
+        ).group_by(DailyTxnRollup.rollup_date).order_by(DailyTxnRollup.rollup_date).all()
+
+        return [
+            {
+                "date": row.rollup_date.strftime("%Y-%m-%d"),
+                "count": int(row.count or 0),
+                "amount": float(row.amount or 0)
+            }
+            for row in rows
+        ]
+
+    def type_distribution(self, from_date: date) -> List[Tuple[TransactionType, int]]:
+        """Transaction count per type since from_date (all statuses)"""
+        rows = self.db.query(
+            DailyTxnRollup.transaction_type,
+            func.sum(DailyTxnRollup.txn_count).label("count")
+        ).filter(
+            DailyTxnRollup.rollup_date >= from_date
+        ).group_by(DailyTxnRollup.transaction_type).all()
+        return [(row.transaction_type, int(row.count or 0)) for row in rows]
@@ -0,0 +1,141 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert, update, case, cast, literal, String
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List
+import logging
+import os
+import threading
+
+from app.models.sequence import IdSequence
+from app.models.transaction import Transaction
+from app.models.folio import Folio
+from app.models.investor import Investor
+from app.models.mandate import SIPRegistration, SWPRegistration, STPRegistration
+from app.models.admin import BatchJob, Reconciliation, Exception as ExceptionModel
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# sequence name -> (ID prefix, model whose max(id) seeds a new counter row)
+SEQUENCES = {
+    "transaction": ("T", Transaction),
+    "folio": ("F", Folio),
+    "investor": ("I", Investor),
+    "sip_registration": ("SIP", SIPRegistration),
+    "swp_registration": ("SWP", SWPRegistration),
+    "stp_registration": ("STP", STPRegistration),
+    "exception": ("EXC", ExceptionModel),
+    "nav_job": ("NAV", BatchJob),
+    "idcw_job": ("IDCW", BatchJob),
+    "sip_job": ("SIPB", BatchJob),  # SIP is taken by registrations
+    "cas_job": ("CAS", BatchJob),
+    "reconciliation": ("REC", Reconciliation),  # also the reconciliation's batch job_id
+}
+
+# Blocks reserved by this process: name -> [next, end)
+_blocks: Dict[str, List[int]] = {}
+_blocks_pid = os.getpid()
+_lock = threading.Lock()
+
+
+class SequenceService:
+    """Block-allocated ID sequences backed by the id_sequences counter table.
+
+    Each process reserves a block of numbers (ID_SEQUENCE_BLOCK_SIZE at a time) in a
+    short transaction of its own, then hands them out from memory. Reservations are
+    never rolled back, so IDs are unique across uvicorn workers and batch processes
+    but not gap-free.
+    """
+
+    def __init__(self, db: Session, block_size: int = None):
+        self.db = db
+        self.block_size = block_size or settings.ID_SEQUENCE_BLOCK_SIZE
+
+    def next_value(self, name: str) -> int:
+        """Next number from the process-local block, reserving a new block when exhausted"""
+        global _blocks_pid
+        with _lock:
+            if _blocks_pid != os.getpid():
+                # Forked worker: blocks reserved by the parent must not be reused
+                _blocks.clear()
+                _blocks_pid = os.getpid()
+
+            block = _blocks.get(name)
+            if not block or block[0] >= block[1]:
+                start = self._reserve(name, self.block_size)
+                block = [start, start + self.block_size]
+                _blocks[name] = block
+
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def next_values(self, name: str, count: int) -> List[int]:
+        """Reserve `count` consecutive numbers in one round trip (for bulk jobs)"""
+        if count <= 0:
+            return []
+        start = self._reserve(name, count)
+        return list(range(start, start + count))
+
+    def next_id(self, name: str) -> str:
+        """Next formatted business ID for a sequence, e.g. T1042"""
+        prefix = SEQUENCES[name][0]
+        return f"{prefix}{self.next_value(name):03d}"
+
+    def next_ids(self, name: str, count: int) -> List[str]:
+        """Block of formatted business IDs for a sequence"""
+        prefix = SEQUENCES[name][0]
+        return [f"{prefix}{n:03d}" for n in self.next_values(name, count)]
+
+    @staticmethod
+    def id_expression(name: str, number):
+        """SQL expression formatting a sequence number like next_id (for INSERT ... SELECT)"""
+        prefix = literal(SEQUENCES[name][0], String)
+        digits = cast(number, String)
+        return case(
+            (number < 10, prefix + "00" + digits),
+            (number < 100, prefix + "0" + digits),
+            else_=prefix + digits
+        )
+
+    def _reserve(self, name: str, size: int) -> int:
+        """Advance the counter row by `size` and return the first reserved number.
+
+        Runs on its own connection so the reservation commits immediately and the
+        row lock is never held for the duration of the caller's transaction.
+        """
+        if name not in SEQUENCES:
+            raise ValueError(f"Unknown ID sequence: {name}")
+
+        engine = self.db.get_bind()
+        for _ in range(3):
+            try:
+                with engine.begin() as conn:
+                    current = conn.execute(
+                        select(IdSequence.next_value)
+                        .where(IdSequence.sequence_name == name)
+                        .with_for_update()
+                    ).scalar()
+
+                    if current is None:
+                        start = self._initial_value(conn, name)
+                        conn.execute(insert(IdSequence).values(sequence_name=name, next_value=start + size))
+                        return start
+
+                    conn.execute(
+                        update(IdSequence)
+                        .where(IdSequence.sequence_name == name)
+                        .values(next_value=current + size)
+                    )
+                    return current
+            except IntegrityError:
+                # Another worker created the counter row first; retry against it
+                logger.info(f"ID sequence {name} created concurrently, retrying reservation")
+        raise RuntimeError(f"Could not reserve IDs from sequence {name}")
+
+    @staticmethod
+    def _initial_value(conn, name: str) -> int:
+        """Continue numbering after the existing max(id) so legacy IDs are never reissued"""
+        model = SEQUENCES[name][1]
+        result = conn.execute(select(func.max(model.id))).scalar()
+        return (result or 0) + 1
@@ -0,0 +1,345 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import logging
+import time
+
+try:
+    from dateutil.relativedelta import relativedelta
+except ImportError:
+    # Fallback if dateutil is not installed
+    relativedelta = None
+
+from app.models.transaction import Transaction, TransactionType, TransactionStatus, PaymentMode
+from app.models.folio import Folio
+from app.models.scheme import Scheme, NAVHistory
+from app.models.mandate import BankAccount, MandateStatus, SIPRegistration, SIPFrequency, SIPStatus
+from app.models.admin import BatchJob, BatchJobType, BatchJobStatus
+from app.services.sequence_service import SequenceService
+from app.services.lot_service import LotService
+from app.services.rollup_service import RollupService
+from app.services.job_service import JobCancelled, JobLost, raise_if_cancelled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_ERROR_LOG_LINES = 500
+
+
+def next_installment_date(current: date, frequency: SIPFrequency) -> date:
+    """Advance an installment date by one period of the given frequency"""
+    if frequency == SIPFrequency.monthly:
+        return current + relativedelta(months=1) if relativedelta else current + timedelta(days=30)
+    if frequency == SIPFrequency.quarterly:
+        return current + relativedelta(months=3) if relativedelta else current + timedelta(days=90)
+    if frequency == SIPFrequency.weekly:
+        return current + timedelta(weeks=1)
+    if frequency == SIPFrequency.daily:
+        return current + timedelta(days=1)
+    return current
+
+
+class SIPBatchService:
+    """Bulk SIP installment engine that processes every due registration in one run.
+
+    Registrations are walked in primary-key order and handled in chunks. Each chunk
+    inserts its transactions and updates folios/registrations with bulk statements and
+    is committed together with the job checkpoint, so a failed run can be resumed from
+    the last committed chunk without double-processing any installment. A chunk's
+    registrations and folios are locked until that commit: a second run skips the
+    registrations this one holds (they are no longer due once it commits), and
+    purchases, redemptions or IDCW reinvestments on the same folios wait for the
+    new totals instead of being overwritten by them.
+    """
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    # ------------------------------------------------------------------
+    # Job lifecycle
+    # ------------------------------------------------------------------
+
+    def create_job(self, run_date: date, executed_by: Optional[str] = None) -> BatchJob:
+        """Create a pending SIP batch job for the given run date"""
+        batch_job = BatchJob(
+            job_id=SequenceService(self.db).next_ids("sip_job", 1)[0],
+            job_type=BatchJobType.sip_processing,
+            job_name=f"SIP Installments - {run_date.isoformat()}",
+            scheduled_at=datetime.now(),
+            status=BatchJobStatus.pending,
+            parameters={
+                "run_date": run_date.isoformat(),
+                "chunk_size": self.chunk_size,
+                "checkpoint": 0
+            },
+            records_processed=0,
+            records_successful=0,
+            records_failed=0,
+            executed_by=executed_by
+        )
+        self.db.add(batch_job)
+        self.db.commit()
+        return batch_job
+
+    def run(self, run_date: date, executed_by: Optional[str] = None) -> BatchJob:
+        """Create a new SIP batch job and process all installments due on or before run_date"""
+        batch_job = self.create_job(run_date, executed_by)
+        return self.execute(batch_job)
+
+    def resume(self, job_id: str) -> BatchJob:
+        """Restart a failed or interrupted SIP batch job from its last checkpoint"""
+        batch_job = self.db.query(BatchJob).filter(BatchJob.job_id == job_id).first()
+        if not batch_job:
+            raise ValueError(f"Batch job {job_id} not found")
+        if batch_job.job_type != BatchJobType.sip_processing:
+            raise ValueError(f"Batch job {job_id} is not a SIP processing job")
+        if batch_job.status == BatchJobStatus.completed:
+            raise ValueError(f"Batch job {job_id} is already completed")
+        return self.execute(batch_job)
+
+    def execute(self, batch_job: BatchJob) -> BatchJob:
+        """Process due registrations chunk by chunk, committing a checkpoint after each chunk"""
+        params = dict(batch_job.parameters or {})
+        run_date = date.fromisoformat(params["run_date"])
+        self.chunk_size = params.get("chunk_size") or self.chunk_size
+        checkpoint = params.get("checkpoint") or 0
+
+        batch_job.status = BatchJobStatus.running
+        if not batch_job.started_at:
+            batch_job.started_at = datetime.now()
+        self.db.commit()
+
+        started = time.monotonic()
+        errors: List[str] = [batch_job.error_log] if batch_job.error_log else []
+
+        try:
+            schemes = self._load_scheme_prices(run_date)
+
+            while True:
+                raise_if_cancelled(self.db, batch_job)
+                registrations = self._fetch_due_chunk(run_date, checkpoint)
+                if not registrations:
+                    break
+
+                successful, failed, chunk_errors = self._process_chunk(registrations, schemes, run_date)
+                checkpoint = registrations[-1].id
+
+                # Record progress in the same transaction as the chunk's writes
+                params["checkpoint"] = checkpoint
+                batch_job.parameters = params
+                batch_job.records_processed = (batch_job.records_processed or 0) + len(registrations)
+                batch_job.records_successful = (batch_job.records_successful or 0) + successful
+                batch_job.records_failed = (batch_job.records_failed or 0) + failed
+                errors.extend(chunk_errors)
+                batch_job.error_log = "\n".join(errors[-MAX_ERROR_LOG_LINES:]) if errors else None
+                self.db.commit()
+
+                logger.info(
+                    f"SIP batch {batch_job.job_id}: processed chunk up to id {checkpoint} "
+                    f"({successful} ok, {failed} failed)"
+                )
+
+            batch_job.status = BatchJobStatus.completed
+        except JobCancelled:
+            logger.info(f"SIP batch {batch_job.job_id} cancelled after checkpoint {checkpoint}")
+        except JobLost:
+            raise
+        except Exception as e:
+            logger.error(f"SIP batch {batch_job.job_id} failed: {e}", exc_info=True)
+            self.db.rollback()
+            errors.append(f"Job aborted after checkpoint {checkpoint}: {str(e)}")
+            batch_job.error_log = "\n".join(errors[-MAX_ERROR_LOG_LINES:])
+            batch_job.status = BatchJobStatus.failed
+
+        batch_job.completed_at = datetime.now()
+        batch_job.execution_time_seconds = (batch_job.execution_time_seconds or 0) + int(time.monotonic() - started)
+        self.db.commit()
+        return batch_job
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load_scheme_prices(self, run_date: date) -> Dict[str, Tuple[str, Decimal]]:
+        """Map scheme_id -> (amc_id, nav) priced at the run date's NAV where one was uploaded"""
+        day_navs = dict(
+            self.db.query(NAVHistory.scheme_id, NAVHistory.nav_value)
+            .filter(NAVHistory.nav_date == run_date)
+            .all()
+        )
+        schemes = {}
+        for scheme_id, amc_id, current_nav in self.db.query(Scheme.scheme_id, Scheme.amc_id, Scheme.current_nav).all():
+            schemes[scheme_id] = (amc_id, day_navs.get(scheme_id, current_nav))
+        return schemes
+
+    def _fetch_due_chunk(self, run_date: date, after_id: int) -> List[Any]:
+        """Keyset-fetch and lock the next chunk of active registrations due on or before run_date.
+
+        Rows locked by another run are skipped; that run advances or completes them.
+        """
+        return self.db.query(
+            SIPRegistration.id, SIPRegistration.registration_id, SIPRegistration.investor_id,
+            SIPRegistration.folio_number, SIPRegistration.scheme_id, SIPRegistration.bank_account_id,
+            SIPRegistration.amount, SIPRegistration.frequency, SIPRegistration.status,
+            SIPRegistration.end_date, SIPRegistration.number_of_installments,
+            SIPRegistration.next_installment_date, SIPRegistration.total_installments_completed,
+            SIPRegistration.total_amount_invested
+        ).filter(
+            SIPRegistration.id > after_id,
+            SIPRegistration.status == SIPStatus.active,
+            SIPRegistration.is_paused == False,
+            SIPRegistration.next_installment_date <= run_date
+        ).order_by(SIPRegistration.id).limit(self.chunk_size).with_for_update(skip_locked=True).all()
+
+    def _load_folios(self, folio_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Lock the folios and read their totals; the chunk writes them back as absolute values"""
+        rows = self.db.query(
+            Folio.id, Folio.folio_number, Folio.amc_id, Folio.total_units,
+            Folio.total_investment, Folio.transaction_count
+        ).filter(Folio.folio_number.in_(folio_numbers)).order_by(Folio.id).with_for_update().all()
+        return {
+            row.folio_number: {
+                "id": row.id,
+                "amc_id": row.amc_id,
+                "total_units": row.total_units or Decimal('0'),
+                "total_investment": row.total_investment or Decimal('0'),
+                "transaction_count": row.transaction_count or 0
+            }
+            for row in rows
+        }
+
+    def _load_mandates(self, bank_account_ids: List[int]) -> Dict[int, Any]:
+        rows = self.db.query(
+            BankAccount.id, BankAccount.mandate_status, BankAccount.mandate_amount_limit,
+            BankAccount.mandate_expiry_date
+        ).filter(BankAccount.id.in_(bank_account_ids)).all()
+        return {row.id: row for row in rows}
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _mandate_error(mandate, amount: Decimal, run_date: date) -> Optional[str]:
+        """Same rules as MandateService.is_mandate_ready, evaluated against the run date"""
+        if mandate is None:
+            return "bank account not found"
+        if mandate.mandate_status != MandateStatus.active:
+            return "bank mandate is not active"
+        if mandate.mandate_amount_limit and amount > mandate.mandate_amount_limit:
+            return f"amount {amount} exceeds mandate limit of {mandate.mandate_amount_limit}"
+        if mandate.mandate_expiry_date and run_date > mandate.mandate_expiry_date:
+            return "bank mandate has expired"
+        return None
+
+    def _process_chunk(
+        self,
+        registrations: List[Any],
+        schemes: Dict[str, Tuple[str, Decimal]],
+        run_date: date
+    ) -> Tuple[int, int, List[str]]:
+        folios = self._load_folios(list({r.folio_number for r in registrations}))
+        mandates = self._load_mandates(list({r.bank_account_id for r in registrations}))
+
+        errors: List[str] = []
+        accepted = []
+        for reg in registrations:
+            folio = folios.get(reg.folio_number)
+            price = schemes.get(reg.scheme_id)
+            error = None
+            if folio is None:
+                error = f"folio {reg.folio_number} not found"
+            elif price is None:
+                error = f"scheme {reg.scheme_id} not found"
+            elif not price[1] or price[1] <= 0:
+                error = f"no valid NAV for scheme {reg.scheme_id}"
+            else:
+                error = self._mandate_error(mandates.get(reg.bank_account_id), reg.amount, run_date)
+
+            if error:
+                errors.append(f"SIP {reg.registration_id}: {error}")
+            else:
+                accepted.append(reg)
+
+        if not accepted:
+            return 0, len(registrations), errors
+
+        transaction_ids = SequenceService(self.db).next_ids("transaction", len(accepted))
+        transaction_rows = []
+        registration_rows = []
+        today = date.today()
+
+        for reg, transaction_id in zip(accepted, transaction_ids):
+            nav = schemes[reg.scheme_id][1]
+            units = reg.amount / nav
+            folio = folios[reg.folio_number]
+
+            transaction_rows.append({
+                "transaction_id": transaction_id,
+                "investor_id": reg.investor_id,
+                "folio_number": reg.folio_number,
+                "scheme_id": reg.scheme_id,
+                "amc_id": folio["amc_id"],
+                "transaction_type": TransactionType.sip,
+                "transaction_date": run_date,
+                "amount": reg.amount,
+                "nav_per_unit": nav,
+                "units": units,
+                "status": TransactionStatus.completed,
+                "payment_mode": PaymentMode.debit_mandate,
+                "processing_date": today,
+                "completion_date": today,
+                "processed_by": "sip_batch"
+            })
+
+            # Several registrations may share a folio; accumulate before writing
+            folio["total_units"] += units
+            folio["total_investment"] += reg.amount
+            folio["transaction_count"] += 1
+            folio["current_nav"] = nav
+
+            completed = (reg.total_installments_completed or 0) + 1
+            next_date = next_installment_date(reg.next_installment_date, reg.frequency)
+            status = reg.status
+            if reg.number_of_installments and completed >= reg.number_of_installments:
+                status = SIPStatus.completed
+            if reg.end_date and next_date > reg.end_date:
+                status = SIPStatus.completed
+
+            registration_rows.append({
+                "id": reg.id,
+                "total_installments_completed": completed,
+                "total_amount_invested": (reg.total_amount_invested or Decimal('0')) + reg.amount,
+                "last_processed_date": run_date,
+                "last_transaction_id": transaction_id,
+                "next_installment_date": next_date,
+                "status": status
+            })
+
+        folio_rows = [
+            {
+                "id": folio["id"],
+                "total_units": folio["total_units"],
+                "total_investment": folio["total_investment"],
+                "current_nav": folio["current_nav"],
+                "total_value": folio["total_units"] * folio["current_nav"],
+                "average_cost_per_unit": (
+                    folio["total_investment"] / folio["total_units"] if folio["total_units"] > 0 else Decimal('0')
+                ),
+                "transaction_count": folio["transaction_count"],
+                "last_transaction_date": run_date
+            }
+            for folio in folios.values()
+            if "current_nav" in folio
+        ]
+
+        self.db.execute(insert(Transaction), transaction_rows)
+        LotService(self.db).open_lots(transaction_rows)
+        RollupService(self.db).record_rows(transaction_rows)
+        self.db.execute(update(Folio), folio_rows)
+        self.db.execute(update(SIPRegistration), registration_rows)
+
+        return len(accepted), len(registrations) - len(accepted), errors
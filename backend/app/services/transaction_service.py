@@ -1,5 +1,6 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, Select
 from typing import Optional, Dict, Any, List
 from datetime import date, datetime, timedelta
 from decimal import Decimal
@@ -22,6 +23,9 @@ from app.models.mandate import (
 from app.models.unclaimed import UnclaimedAmount
 from app.core.config import settings
 from app.services.mandate_service import MandateService
+from app.services.sequence_service import SequenceService
+from app.services.lot_service import LotService
+import app.services.rollup_service  # noqa: F401 - registers the daily_txn_rollup flush listener
 
 logger = logging.getLogger(__name__)
 
@@ -31,18 +35,16 @@ class TransactionService:
 
     def __init__(self, db: Session):
         self.db = db
+        self.sequences = SequenceService(db)
+        self.lots = LotService(db)
 
     def generate_transaction_id(self) -> str:
         """Generate unique transaction ID (T001, T002, etc.)"""
-        result = self.db.query(func.max(Transaction.id)).scalar()
-        next_id = (result or 0) + 1
-        return f"T{next_id:03d}"
+        return self.sequences.next_id("transaction")
 
     def generate_folio_number(self) -> str:
         """Generate unique folio number (F001, F002, etc.)"""
-        result = self.db.query(func.max(Folio.id)).scalar()
-        next_id = (result or 0) + 1
-        return f"F{next_id:03d}"
+        return self.sequences.next_id("folio")
 
     def get_or_create_folio(self, investor_id: str, scheme_id: str, lock: bool = False) -> Folio:
         """Get existing folio or create new one for investor-scheme combination"""
@@ -169,7 +171,7 @@ class TransactionService:
         folio.last_transaction_date = date.today()
         folio.transaction_count += 1
 
-        self.db.flush()
+        self.lots.open_lot(transaction)
         return transaction
 
     def process_redemption(
@@ -213,14 +215,6 @@ class TransactionService:
         nav = scheme.current_nav
         redeem_amount = redeem_units * nav
 
-        # Calculate exit load if applicable
-        exit_load_amount = Decimal('0.00')
-        if scheme.exit_load_percentage and scheme.exit_load_period_days:
-            # Simplified: assume exit load applies if holding period is less than required
-            exit_load_amount = (redeem_amount * scheme.exit_load_percentage) / 100
-
-        net_amount = redeem_amount - exit_load_amount
-
         # Generate transaction ID
         transaction_id = self.generate_transaction_id()
 
@@ -233,17 +227,23 @@ class TransactionService:
             amc_id=folio.amc_id,
             transaction_type=TransactionType.redemption,
             transaction_date=date.today(),
-            amount=net_amount,
+            amount=redeem_amount,
             nav_per_unit=nav,
             units=-redeem_units,  # Negative for redemption
             status=TransactionStatus.completed,
-            exit_load_amount=exit_load_amount,
             processing_date=date.today(),
             completion_date=date.today()
         )
         self.db.add(transaction)
         self.db.flush()
 
+        # Match the redeemed units against the oldest lots; exit load only applies
+        # to units still inside the scheme's exit load period
+        matches = self.lots.consume(transaction, close_out=redeem_units >= folio.total_units)
+        exit_load_amount = self.lots.exit_load_amount(matches, scheme, nav, transaction.transaction_date)
+        transaction.exit_load_amount = exit_load_amount
+        transaction.amount = redeem_amount - exit_load_amount
+
         # Update folio
         folio.current_nav = nav
         folio.total_units -= redeem_units
@@ -310,9 +310,7 @@ class TransactionService:
             raise ValueError(f"Invalid frequency: {frequency}")
 
         # Generate SIP registration ID
-        result = self.db.query(func.max(SIPRegistration.id)).scalar()
-        next_id = (result or 0) + 1
-        registration_id = f"SIP{next_id:03d}"
+        registration_id = self.sequences.next_id("sip_registration")
 
         # Calculate next installment date
         next_installment_date = start_date
@@ -372,9 +370,7 @@ class TransactionService:
             raise ValueError(f"Invalid frequency: {frequency}")
 
         # Generate SWP registration ID
-        result = self.db.query(func.max(SWPRegistration.id)).scalar()
-        next_id = (result or 0) + 1
-        registration_id = f"SWP{next_id:03d}"
+        registration_id = self.sequences.next_id("swp_registration")
 
         # Calculate next installment date
         next_installment_date = start_date
@@ -451,9 +447,7 @@ class TransactionService:
             raise ValueError(f"Invalid frequency: {frequency}")
 
         # Generate STP registration ID
-        result = self.db.query(func.max(STPRegistration.id)).scalar()
-        next_id = (result or 0) + 1
-        registration_id = f"STP{next_id:03d}"
+        registration_id = self.sequences.next_id("stp_registration")
 
         # Calculate next installment date
         next_installment_date = start_date
@@ -571,34 +565,38 @@ class TransactionService:
             "purchase_transaction": purchase_txn
         }
 
-    def get_portfolio_summary(self, investor_id: str) -> Dict[str, Any]:
-        """Get portfolio summary for investor"""
-        folios = self.db.query(Folio).filter(
+    # ------------------------------------------------------------------
+    # Portfolio reads (statements and row shaping shared with AsyncTransactionService)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _portfolio_statement(investor_id: str) -> Select:
+        return select(Folio, Scheme).join(Scheme, Scheme.scheme_id == Folio.scheme_id).where(
             Folio.investor_id == investor_id,
             Folio.status == FolioStatus.active
-        ).all()
+        )
 
+    @staticmethod
+    def _portfolio_summary(rows: List[Any]) -> Dict[str, Any]:
         total_investment = Decimal('0.00')
         current_value = Decimal('0.00')
         portfolio_list = []
 
-        for folio in folios:
-            scheme = self.db.query(Scheme).filter(Scheme.scheme_id == folio.scheme_id).first()
-            if scheme:
-                nav = scheme.current_nav
-                value = folio.total_units * nav
-
-                portfolio_list.append({
-                    "folio_number": folio.folio_number,
-                    "scheme_id": folio.scheme_id,
-                    "scheme_name": scheme.scheme_name,
-                    "total_units": float(folio.total_units),
-                    "current_nav": float(nav),
-                    "total_investment": float(folio.total_investment),
-                    "total_value": float(value)
-                })
-                total_investment += folio.total_investment
-                current_value += value
+        for folio, scheme in rows:
+            nav = scheme.current_nav
+            value = folio.total_units * nav
+
+            portfolio_list.append({
+                "folio_number": folio.folio_number,
+                "scheme_id": folio.scheme_id,
+                "scheme_name": scheme.scheme_name,
+                "total_units": float(folio.total_units),
+                "current_nav": float(nav),
+                "total_investment": float(folio.total_investment),
+                "total_value": float(value)
+            })
+            total_investment += folio.total_investment
+            current_value += value
 
         return {
             "portfolio": portfolio_list,
@@ -610,17 +608,20 @@ class TransactionService:
             }
         }
 
-    def get_transaction_history(self, investor_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get transaction history for investor with scheme details"""
-        # Optimize with eager loading
-        from sqlalchemy.orm import joinedload
-        
-        transactions = self.db.query(Transaction).options(
+    def get_portfolio_summary(self, investor_id: str) -> Dict[str, Any]:
+        """Get portfolio summary for investor"""
+        return self._portfolio_summary(self.db.execute(self._portfolio_statement(investor_id)).all())
+
+    @staticmethod
+    def _history_statement(investor_id: str, limit: int) -> Select:
+        return select(Transaction).options(
             joinedload(Transaction.scheme)
-        ).filter(
+        ).where(
             Transaction.investor_id == investor_id
-        ).order_by(Transaction.transaction_date.desc()).limit(limit).all()
+        ).order_by(Transaction.transaction_date.desc()).limit(limit)
 
+    @staticmethod
+    def _history_items(transactions: List[Transaction]) -> List[Dict[str, Any]]:
         transaction_list = []
         for txn in transactions:
             transaction_list.append({
@@ -639,6 +640,10 @@ class TransactionService:
 
         return transaction_list
 
+    def get_transaction_history(self, investor_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get transaction history for investor with scheme details"""
+        return self._history_items(self.db.execute(self._history_statement(investor_id, limit)).scalars().all())
+
     def process_sip_installment(self, registration_id: str) -> Transaction:
         """Process a single SIP installment"""
         sip_reg = self.db.query(SIPRegistration).filter(
@@ -701,6 +706,7 @@ class TransactionService:
         folio.average_cost_per_unit = folio.total_investment / folio.total_units if folio.total_units > 0 else Decimal('0')
         folio.last_transaction_date = date.today()
         folio.transaction_count += 1
+        self.lots.open_lot(transaction)
 
         # Update SIP registration
         sip_reg.total_installments_completed += 1
@@ -1067,6 +1073,7 @@ class TransactionService:
              self.db.flush()
         
         # Apply updates based on transaction type
+        holdings_changed = True
         if transaction.transaction_type in [TransactionType.fresh_purchase, TransactionType.additional_purchase, TransactionType.sip, TransactionType.switch_purchase]:
             # Purchase Logic
             folio.total_units += transaction.units
@@ -1096,6 +1103,8 @@ class TransactionService:
             folio.total_investment -= cost_of_redeemed
             if folio.total_investment < 0: 
                 folio.total_investment = Decimal('0.00')
+        else:
+            holdings_changed = False
                 
         # Update Folio Value
         folio.current_nav = transaction.nav_per_unit 
@@ -1112,6 +1121,29 @@ class TransactionService:
         transaction.completion_date = date.today()
         if approver_id:
             transaction.approved_by = approver_id
-            
+
+        if holdings_changed:
+            self.lots.apply(transaction, close_out=folio.status == FolioStatus.closed)
         self.db.flush()
         return transaction
+
+
+class AsyncTransactionService:
+    """Async variant of TransactionService's investor read paths.
+
+    Write paths (purchases, redemptions, installments) stay on TransactionService;
+    they hold row locks across several statements and run on the sync engine.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_portfolio_summary(self, investor_id: str) -> Dict[str, Any]:
+        """Get portfolio summary for investor"""
+        result = await self.db.execute(TransactionService._portfolio_statement(investor_id))
+        return TransactionService._portfolio_summary(result.all())
+
+    async def get_transaction_history(self, investor_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get transaction history for investor with scheme details"""
+        result = await self.db.execute(TransactionService._history_statement(investor_id, limit))
+        return TransactionService._history_items(result.scalars().all())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for email delivery through the outbox
+
+Queues --messages emails in email_outbox (configured database) and drains
+them with the outbox sender, twice: once opening a new SMTP connection per
+message as the old EmailService did, and once over the pooled connections.
+Both runs send to a local SMTP stand-in (aiosmtpd, `pip install aiosmtpd`)
+that adds --rtt-ms to every SMTP command to stand in for a remote server, so
+the cost of connection setup shows up as it would in production. Use
+--smtp-host/--smtp-port to send to another test server (e.g. MailHog)
+instead. The benchmark's rows are deleted afterwards.
+
+Usage:
+    python benchmark_email.py                                 # 2,000 emails, 20 ms RTT
+    python benchmark_email.py --messages 10000 --connections 8 --rtt-ms 40
+    python benchmark_email.py --skip-unpooled --smtp-host localhost --smtp-port 1025
+"""
+
+import argparse
+import asyncio
+import socket
+import sys
+import threading
+import time
+
+from app.db.session import SessionLocal, engine
+from app.models import *  # Import all models to ensure relationships resolve
+from app.models.email_outbox import EmailOutbox, EmailStatus
+from app.services.email_service import EmailService, SMTPConnectionPool
+from app.services.email_outbox_service import EmailOutboxService, EmailSender, work
+
+RECIPIENT_DOMAIN = "benchmark.invalid"
+SENDER_EMAIL = f"rta@{RECIPIENT_DOMAIN}"
+
+
+def start_stand_in(rtt_seconds):
+    """Local SMTP server answering every command after rtt_seconds; returns (controller, received counter)"""
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is not installed: pip install aiosmtpd (or pass --smtp-host)")
+
+    received = [0]
+    lock = threading.Lock()
+
+    class Handler:
+        async def handle_EHLO(self, server, session, envelope, hostname, responses):
+            await asyncio.sleep(rtt_seconds)
+            session.host_name = hostname
+            return responses
+
+        async def handle_MAIL(self, server, session, envelope, address, mail_options):
+            await asyncio.sleep(rtt_seconds)
+            envelope.mail_from = address
+            return "250 OK"
+
+        async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+            await asyncio.sleep(rtt_seconds)
+            envelope.rcpt_tos.append(address)
+            return "250 OK"
+
+        async def handle_DATA(self, server, session, envelope):
+            await asyncio.sleep(rtt_seconds)
+            with lock:
+                received[0] += 1
+            return "250 Message accepted for delivery"
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    controller = Controller(Handler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller, received
+
+
+def run(args, host, port, pooled):
+    pool = SMTPConnectionPool(
+        host=host, port=port, username="", password="", use_tls=False,
+        size=args.connections if pooled else 1
+    )
+    if not pooled:
+        # What the old EmailService did: connect, greet and quit for every message
+        pool.messages_per_connection = 1
+    sender = EmailSender(EmailService(pool, sender_email=SENDER_EMAIL), sender_id="benchmark")
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        EmailOutboxService(db).enqueue_many(
+            "password_reset_otp",
+            ((f"investor{n}@{RECIPIENT_DOMAIN}", {"name": f"Investor {n}", "otp": f"{n % 1000000:06d}"})
+             for n in range(args.messages))
+        )
+        db.commit()
+        enqueue_seconds = time.perf_counter() - started
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    sent = work(SessionLocal, sender=sender, batch_size=args.batch_size, once=True)
+    send_seconds = time.perf_counter() - started
+    sender.close()
+
+    db = SessionLocal()
+    try:
+        failed = db.query(EmailOutbox).filter(
+            EmailOutbox.recipient_email.like(f"%@{RECIPIENT_DOMAIN}"),
+            EmailOutbox.status != EmailStatus.sent
+        ).count()
+        db.query(EmailOutbox).filter(EmailOutbox.recipient_email.like(f"%@{RECIPIENT_DOMAIN}")).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "mode": f"pooled x{args.connections}" if pooled else "per message",
+        "sent": sent,
+        "unsent": failed,
+        "connections": pool.connections_opened,
+        "enqueue_rate": args.messages / enqueue_seconds if enqueue_seconds else 0.0,
+        "send_rate": sent / send_seconds if send_seconds else 0.0,
+        "seconds": send_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--connections", type=int, default=4, help="pooled SMTP connections")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="delay per SMTP command of the stand-in")
+    parser.add_argument("--smtp-host", help="send to this server instead of the local stand-in")
+    parser.add_argument("--smtp-port", type=int, default=1025)
+    parser.add_argument("--skip-unpooled", action="store_true", help="only run the pooled sender")
+    args = parser.parse_args()
+
+    EmailOutbox.__table__.create(bind=engine, checkfirst=True)
+
+    controller, received = None, None
+    if args.smtp_host:
+        host, port = args.smtp_host, args.smtp_port
+    else:
+        controller, received = start_stand_in(args.rtt_ms / 1000)
+        host, port = controller.hostname, controller.port
+
+    try:
+        modes = [True] if args.skip_unpooled else [False, True]
+        print(f"{'mode':<14} {'sent':>7} {'unsent':>7} {'conns':>6} {'queued/s':>10} {'sent/s':>9} {'seconds':>8}")
+        for pooled in modes:
+            result = run(args, host, port, pooled)
+            print(f"{result['mode']:<14} {result['sent']:>7} {result['unsent']:>7} {result['connections']:>6} "
+                  f"{result['enqueue_rate']:>10.0f} {result['send_rate']:>9.1f} {result['seconds']:>8.1f}")
+    finally:
+        if controller:
+            controller.stop()
+
+    if received is not None:
+        print(f"\nStand-in received {received[0]} messages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Load benchmark for the hot investor read endpoints
+
+Drives portfolio, folios, history and dashboard with an increasing number of
+concurrent clients against a running server, and reports requests/second and
+latency at each level. The headline number is the highest throughput reached
+while p99 stays under --p99-ms; run it once before and once after a change
+against the same data to compare.
+
+Usage:
+    python benchmark_investor_reads.py --email investor@example.com --password secret
+    python benchmark_investor_reads.py --base-url http://localhost:8000 --p99-ms 250 --duration 20
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ENDPOINTS = [
+    "/api/investor/transactions/portfolio",
+    "/api/investor/transactions/history",
+    "/api/investor/transactions/folios",
+    "/api/investor/folios/",
+    "/api/investor/profile/dashboard",
+]
+
+
+def login(base_url, email, password):
+    response = requests.post(
+        f"{base_url}/api/investor/auth/login",
+        json={"email": email, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["data"]["access_token"]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_level(base_url, token, concurrency, duration):
+    """Run `concurrency` closed-loop clients for `duration` seconds"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(worker):
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {token}"
+        local, failed, i = [], 0, worker
+        while time.monotonic() < deadline:
+            url = base_url + ENDPOINTS[i % len(ENDPOINTS)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            local.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True, help="investor login with some folios and history")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--p99-ms", type=float, default=200.0, help="latency budget for the headline number")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64", help="comma separated client counts")
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.email, args.password)
+
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    best = None
+    for level in [int(n) for n in args.levels.split(",")]:
+        result = run_level(args.base_url, token, level, args.duration)
+        print(f"{result['concurrency']:>8} {result['requests']:>9} {result['errors']:>7} "
+              f"{result['rps']:>9.1f} {result['p50']:>9.1f} {result['p99']:>9.1f}")
+        if result["p99"] <= args.p99_ms and result["errors"] == 0:
+            if best is None or result["rps"] > best["rps"]:
+                best = result
+
+    if best is None:
+        print(f"\nNo level met p99 <= {args.p99_ms:.0f} ms without errors")
+        return 1
+    print(f"\nBest throughput at p99 <= {args.p99_ms:.0f} ms: "
+          f"{best['rps']:.1f} req/s with {best['concurrency']} clients")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
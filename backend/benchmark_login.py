@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Login throughput benchmark
+
+Drives POST /api/investor/auth/login with an increasing number of concurrent
+clients and reports logins/second and login latency at each level. Alongside,
+a probe requests GET / every --probe-ms and records its latency. The probe
+does no work, so its p99 shows whether password hashing is stalling the event
+loop: it should stay at a few milliseconds however many logins are running.
+503 responses mean the password hash queue (PASSWORD_HASH_MAX_QUEUE) was full.
+
+Start the server with LOGIN_RATE_LIMIT_ENABLED=false, or the login rate
+limiter will answer most of the benchmark with 429.
+
+Usage:
+    python benchmark_login.py --email investor@example.com --password secret
+    python benchmark_login.py --manifest scale_data.json --levels 1,4,16,64 --duration 20
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def probe(base_url, interval, stop, latencies):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            session.get(f"{base_url}/", timeout=30)
+        except requests.RequestException:
+            pass
+        latencies.append((time.perf_counter() - started) * 1000)
+        stop.wait(interval)
+
+
+def run_level(base_url, credentials, concurrency, duration, probe_interval):
+    """Run `concurrency` closed-loop login clients for `duration` seconds"""
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(worker):
+        session = requests.Session()
+        email, password = credentials[worker % len(credentials)]
+        local, codes = [], {}
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                code = session.post(f"{base_url}/api/investor/auth/login",
+                                    json={"email": email, "password": password}, timeout=60).status_code
+            except requests.RequestException:
+                code = "error"
+            local.append((time.perf_counter() - started) * 1000)
+            codes[code] = codes.get(code, 0) + 1
+        with lock:
+            latencies.extend(local)
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    probe_latencies = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(base_url, probe_interval, stop, probe_latencies))
+    prober.start()
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.monotonic() - started
+    stop.set()
+    prober.join()
+
+    latencies.sort()
+    probe_latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "logins": statuses.get(200, 0),
+        "busy": statuses.get(503, 0),
+        "errors": sum(count for code, count in statuses.items() if code not in (200, 503)),
+        "rps": statuses.get(200, 0) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "probe_p99": percentile(probe_latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", help="investor login")
+    parser.add_argument("--password")
+    parser.add_argument("--manifest", help="spread logins over the accounts of generate_scale_data.py")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="comma separated client counts")
+    parser.add_argument("--probe-ms", type=float, default=50.0, help="interval between event loop probes")
+    args = parser.parse_args()
+
+    if args.manifest:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+        credentials = [(email, manifest["password"]) for email in manifest["investor_emails"]]
+    elif args.email and args.password:
+        credentials = [(args.email, args.password)]
+    else:
+        parser.error("give --email and --password, or --manifest")
+
+    print(f"{'clients':>8} {'logins':>7} {'503':>5} {'errors':>7} {'logins/s':>9} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'probe p99':>10}")
+    for level in [int(n) for n in args.levels.split(",")]:
+        result = run_level(args.base_url, credentials, level, args.duration, args.probe_ms / 1000)
+        print(f"{result['concurrency']:>8} {result['logins']:>7} {result['busy']:>5} {result['errors']:>7} "
+              f"{result['rps']:>9.1f} {result['p50']:>9.1f} {result['p99']:>9.1f} {result['probe_p99']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Benchmark for the reconciliation matcher on a synthetic daily settlement feed
+
+Generates --rows RTA transactions and a feed file of the same size with a
+known share of amount mismatches, reference-only rows, rows missing on either
+side, duplicates and IDs longer than the RTA's own. It then runs the partitioned hash join and reports
+throughput, peak memory and whether every category came out as expected. No
+database is needed; results go to a counting sink instead of the tables.
+Compare --partition-rows values (a value >= --rows is one in-memory join) to
+see memory stay flat as the file grows.
+
+Usage:
+    python benchmark_reconciliation.py                      # 1,000,000 rows
+    python benchmark_reconciliation.py --rows 200000 --partition-rows 20000
+"""
+
+import argparse
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from app.models.admin import ReconciliationMatchStatus
+from app.services.reconciliation_service import FeedMatcher, FEED_ID_LENGTH, REFERENCE_LENGTH
+
+
+def rta_rows(count):
+    for n in range(1, count + 1):
+        amount = Decimal(1000 + n % 9000).quantize(Decimal("0.01"))
+        yield (f"T{n}", f"UTR{n}", amount, (amount / 10).quantize(Decimal("0.0001")), f"I{n % 50000}", f"F{n}")
+
+
+def write_feed(path, count, seed):
+    """Write the feed and return the expected count per match status"""
+    rng = random.Random(seed)
+    expected = {status: 0 for status in ReconciliationMatchStatus}
+    with open(path, "w", newline="") as feed:
+        feed.write("transaction_id,payment_reference,amount,units\n")
+        for n in range(1, count + 1):
+            amount = Decimal(1000 + n % 9000).quantize(Decimal("0.01"))
+            units = (amount / 10).quantize(Decimal("0.0001"))
+            roll = rng.random()
+            if roll < 0.01:
+                expected[ReconciliationMatchStatus.missing_in_feed] += 1
+                continue
+            if roll < 0.02:
+                feed.write(f"T{n},,{amount + 1},{units}\n")
+                expected[ReconciliationMatchStatus.amount_mismatch] += 1
+            elif roll < 0.10:
+                feed.write(f",UTR{n},{amount},{units}\n")
+                expected[ReconciliationMatchStatus.matched] += 1
+            else:
+                feed.write(f"T{n},UTR{n},{amount},{units}\n")
+                expected[ReconciliationMatchStatus.matched] += 1
+            if roll > 0.995:
+                feed.write(f"T{n},,{amount},{units}\n")
+                expected[ReconciliationMatchStatus.missing_in_rta] += 1
+        for n in range(count // 200):
+            feed.write(f"X{n},,100.00,10\n")
+            expected[ReconciliationMatchStatus.missing_in_rta] += 1
+        # AMC and bank systems quote their own IDs, longer than any column they land in
+        for n in range(max(count // 10000, 1)):
+            feed.write(f"AMC-SETTLEMENT-{seed}-{n:08d}-{'9' * 80},UTR-{'0' * 120}{n},100.00,10\n")
+            expected[ReconciliationMatchStatus.missing_in_rta] += 1
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--partition-rows", type=int, default=50000, help="RTA rows held in memory per partition")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    counts = {status: 0 for status in ReconciliationMatchStatus}
+    oversized = [0]
+
+    def sink(batch):
+        for row in batch:
+            counts[row["match_status"]] += 1
+            # Would fail the bulk insert on a strict-mode MySQL
+            if len(row["transaction_id"] or "") > FEED_ID_LENGTH or len(row["payment_reference"] or "") > REFERENCE_LENGTH:
+                oversized[0] += 1
+
+    with tempfile.TemporaryDirectory(prefix="recon-bench-") as work_dir:
+        feed_path = os.path.join(work_dir, "feed.csv")
+        expected = write_feed(feed_path, args.rows, args.seed)
+        baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        matcher = FeedMatcher(math.ceil(args.rows / args.partition_rows), work_dir)
+        started = time.perf_counter()
+        with open(feed_path, newline="") as feed:
+            matcher.run(rta_rows(args.rows), feed, sink)
+        elapsed = time.perf_counter() - started
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"RTA rows:         {args.rows:,}")
+    print(f"Feed rows:        {matcher.feed_rows:,}")
+    print(f"Partitions:       {matcher.partitions}")
+    print(f"Elapsed:          {elapsed:.1f} s ({(args.rows + matcher.feed_rows) / elapsed:,.0f} rows/s)")
+    print(f"Peak RSS:         {peak_kb / 1024:.0f} MB (+{(peak_kb - baseline_kb) / 1024:.0f} MB during the join)")
+    print(f"Oversized values: {oversized[0]:,}")
+    ok = not oversized[0]
+    for status in ReconciliationMatchStatus:
+        flag = "" if counts[status] == expected[status] else f"  (expected {expected[status]:,})"
+        ok = ok and not flag
+        print(f"{status.value + ':':<18}{counts[status]:,}{flag}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""Generate a production-scale synthetic data set for load and performance tests
+
+Creates AMCs, schemes with a daily NAV history, and N investors with users,
+bank accounts, folios, SIP registrations and several years of transactions.
+Distributions are shaped after a real book rather than uniform: a few popular
+schemes hold most folios, most investors have one or two folios, lumpsum
+amounts are log-normal, SIPs run monthly until some are cancelled, and
+redemptions never exceed the units held. NAVs follow a random walk whose drift
+and volatility depend on the scheme type, and every transaction is priced at
+its day's NAV so folio holdings, unit lots and capital gains all reconcile.
+
+Rows are written with bulk INSERTs in chunks of --chunk-size investors, IDs
+come from the same sequences the API uses, the dashboard rollup is updated per
+chunk and the unit lot ledger is rebuilt at the end. The same --seed yields the
+same data on an empty database.
+
+Every investor logs in with --password; a manifest of logins and latest NAVs is
+written to --manifest for load_test.py, together with an admin login.
+
+Usage:
+    python generate_scale_data.py --investors 2000 --years 2             # quick local set
+    python generate_scale_data.py --investors 200000 --years 5 --chunk-size 2000
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import insert, select
+
+from app.core.security import get_password_hash
+from app.db.session import SessionLocal
+from app.models import *  # Import all models to ensure relationships resolve
+from app.models.admin import AdminUser, AdminRole
+from app.models.amc import AMC
+from app.models.folio import Folio, FolioStatus
+from app.models.investor import Investor, Gender, KYCStatus
+from app.models.mandate import BankAccount, SIPRegistration, SIPFrequency, SIPStatus, MandateType
+from app.models.scheme import Scheme, NAVHistory, SchemeType, PlanType, OptionType
+from app.models.transaction import Transaction, TransactionType, TransactionStatus, PaymentMode
+from app.models.user import User, UserRole, UserStatus
+from app.services.lot_service import LotService
+from app.services.rollup_service import RollupService
+from app.services.sequence_service import SequenceService
+
+MARKER_AMC_ID = "LTA01"  # first generated AMC; its presence means the data set already exists
+ADMIN_EMPLOYEE_ID = "LOADTEST-ADMIN"
+MANIFEST_SAMPLE_SIZE = 5000  # investor logins written to the manifest
+
+# scheme type -> (annual drift, annual volatility, share of schemes)
+SCHEME_PROFILES = {
+    SchemeType.equity: (0.12, 0.18, 0.55),
+    SchemeType.hybrid: (0.09, 0.10, 0.20),
+    SchemeType.debt: (0.065, 0.02, 0.17),
+    SchemeType.money_market: (0.05, 0.005, 0.08),
+}
+SIP_AMOUNTS = [500, 1000, 1500, 2000, 2500, 3000, 5000, 10000, 25000]
+SIP_AMOUNT_WEIGHTS = [14, 24, 6, 14, 8, 8, 15, 8, 3]
+CITIES = [
+    ("Mumbai", "Maharashtra", "400001"), ("Pune", "Maharashtra", "411001"),
+    ("Delhi", "Delhi", "110001"), ("Bengaluru", "Karnataka", "560001"),
+    ("Chennai", "Tamil Nadu", "600001"), ("Hyderabad", "Telangana", "500001"),
+    ("Kolkata", "West Bengal", "700001"), ("Ahmedabad", "Gujarat", "380001"),
+    ("Jaipur", "Rajasthan", "302001"), ("Lucknow", "Uttar Pradesh", "226001"),
+]
+CITY_WEIGHTS = [18, 8, 16, 15, 9, 9, 8, 7, 5, 5]
+BANKS = [("HDFC Bank", "HDFC"), ("ICICI Bank", "ICIC"), ("State Bank of India", "SBIN"),
+         ("Axis Bank", "UTIB"), ("Kotak Mahindra Bank", "KKBK")]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Arjun", "Rohan", "Karan", "Rahul", "Vikram", "Suresh", "Anil",
+               "Ananya", "Diya", "Priya", "Sneha", "Kavya", "Pooja", "Neha", "Meera", "Lakshmi", "Divya"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Patel", "Shah", "Gupta", "Nair", "Das", "Singh",
+              "Kumar", "Joshi", "Mehta", "Rao", "Menon", "Bose", "Chopra", "Kulkarni", "Pillai", "Agarwal"]
+
+CENT = Decimal("0.01")
+UNIT = Decimal("0.0001")
+
+
+def money(value) -> Decimal:
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def units_of(value) -> Decimal:
+    return Decimal(value).quantize(UNIT, rounding=ROUND_HALF_UP)
+
+
+def pan_for(number: int, rng: random.Random) -> str:
+    """Unique, well-formed PAN (AAAPA9999A) derived from the investor number"""
+    letters = []
+    n = number
+    for _ in range(4):
+        n, r = divmod(n, 26)
+        letters.append(chr(65 + r))
+    digits = n % 10000
+    return f"{letters[0]}{letters[1]}{letters[2]}P{letters[3]}{digits:04d}{chr(65 + rng.randrange(26))}"
+
+
+def add_months(day: date, months: int, day_of_month: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, day_of_month)
+
+
+class ScaleDataGenerator:
+    def __init__(self, db, args):
+        self.db = db
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.end_date = date.today() - timedelta(days=1)
+        self.start_date = self.end_date - timedelta(days=int(365.25 * args.years))
+        self.sequences = SequenceService(db)
+        self.rollups = RollupService(db)
+        self.password_hash = get_password_hash(args.password)
+        self.schemes = []  # (scheme_id, amc_id, scheme_type, minimum_investment)
+        self.scheme_weights = []
+        self.navs = {}  # scheme_id -> list of NAVs indexed by days since start_date
+        self.counts = {"investors": 0, "folios": 0, "sips": 0, "transactions": 0, "nav_rows": 0}
+        self.sample_emails = []
+
+    # ------------------------------------------------------------------
+    # Master data
+    # ------------------------------------------------------------------
+
+    def create_master_data(self) -> None:
+        amc_rows = []
+        for n in range(1, self.args.amcs + 1):
+            city, state, pincode = CITIES[n % len(CITIES)]
+            amc_rows.append({
+                "amc_id": f"LTA{n:02d}", "amc_name": f"Loadtest {LAST_NAMES[n % len(LAST_NAMES)]} Mutual Fund",
+                "registration_number": f"LT-ARN-{n:04d}", "address": f"{n} Fund House Road",
+                "city": city, "state": state, "pincode": pincode,
+                "email": f"amc{n}@{self.args.email_domain}", "phone": f"022{n:08d}"
+            })
+        self.db.execute(insert(AMC), amc_rows)
+
+        types = list(SCHEME_PROFILES)
+        type_weights = [SCHEME_PROFILES[t][2] for t in types]
+        scheme_rows = []
+        for n in range(1, self.args.schemes + 1):
+            scheme_type = self.rng.choices(types, type_weights)[0]
+            amc_id = amc_rows[(n - 1) % len(amc_rows)]["amc_id"]
+            minimum = Decimal(5000 if scheme_type == SchemeType.money_market else self.rng.choice([100, 500, 1000, 5000]))
+            scheme_id = f"LTS{n:03d}"
+            self.schemes.append((scheme_id, amc_id, scheme_type, minimum))
+            # Zipf-like popularity: the first schemes attract most folios
+            self.scheme_weights.append(1.0 / n ** 0.9)
+            navs = self._nav_series(scheme_type)
+            self.navs[scheme_id] = navs
+            scheme_rows.append({
+                "scheme_id": scheme_id, "amc_id": amc_id,
+                "scheme_name": f"Loadtest {scheme_type.value.title()} Fund {n}",
+                "scheme_type": scheme_type,
+                "plan_type": PlanType.direct if n % 2 else PlanType.regular,
+                "option_type": OptionType.growth if n % 5 else OptionType.idcw_payout,
+                "current_nav": navs[-1], "nav_date": self.end_date,
+                "minimum_investment": minimum, "additional_investment": min(minimum, Decimal(1000))
+            })
+        self.db.execute(insert(Scheme), scheme_rows)
+
+        nav_rows = []
+        for scheme_id, navs in self.navs.items():
+            for offset, nav in enumerate(navs):
+                day = self.start_date + timedelta(days=offset)
+                if day.weekday() < 5:
+                    nav_rows.append({"scheme_id": scheme_id, "nav_date": day, "nav_value": nav})
+            if len(nav_rows) >= 20000:
+                self.db.execute(insert(NAVHistory), nav_rows)
+                self.counts["nav_rows"] += len(nav_rows)
+                nav_rows = []
+        if nav_rows:
+            self.db.execute(insert(NAVHistory), nav_rows)
+            self.counts["nav_rows"] += len(nav_rows)
+        self.db.commit()
+
+    def _nav_series(self, scheme_type: SchemeType):
+        """Daily NAVs from start_date to end_date; weekends repeat Friday's NAV"""
+        drift, volatility, _ = SCHEME_PROFILES[scheme_type]
+        daily_drift = drift / 252 - volatility ** 2 / 504
+        daily_volatility = volatility / math.sqrt(252)
+        nav = self.rng.uniform(10, 12) if scheme_type == SchemeType.money_market else self.rng.uniform(10, 150)
+        if scheme_type == SchemeType.money_market:
+            nav *= 100  # money market funds usually trade in the thousands
+        navs = []
+        for offset in range((self.end_date - self.start_date).days + 1):
+            if (self.start_date + timedelta(days=offset)).weekday() < 5 and offset:
+                nav *= math.exp(daily_drift + daily_volatility * self.rng.gauss(0, 1))
+            navs.append(units_of(nav))
+        return navs
+
+    def nav_on(self, scheme_id: str, day: date) -> Decimal:
+        return self.navs[scheme_id][(day - self.start_date).days]
+
+    # ------------------------------------------------------------------
+    # Investors
+    # ------------------------------------------------------------------
+
+    def create_investors(self) -> None:
+        remaining = self.args.investors
+        while remaining > 0:
+            size = min(self.args.chunk_size, remaining)
+            started = time.perf_counter()
+            self._create_chunk(size)
+            self.db.commit()
+            remaining -= size
+            elapsed = time.perf_counter() - started
+            print(f"  {self.counts['investors']:>9} investors, {self.counts['transactions']:>10} transactions "
+                  f"({size / elapsed:.0f} investors/s)")
+
+    def _create_chunk(self, size: int) -> None:
+        rng = self.rng
+        investor_ids = self.sequences.next_ids("investor", size)
+        investor_rows, user_rows, bank_rows = [], [], []
+        for investor_id in investor_ids:
+            number = int(investor_id[1:])
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            city, state, pincode = rng.choices(CITIES, CITY_WEIGHTS)[0]
+            email = f"investor{number}@{self.args.email_domain}"
+            bank_name, ifsc_prefix = rng.choice(BANKS)
+            investor_rows.append({
+                "investor_id": investor_id, "pan_number": pan_for(number, rng),
+                "full_name": f"{first} {last}",
+                "date_of_birth": self.end_date - timedelta(days=int(365.25 * rng.triangular(21, 75, 34))),
+                "gender": Gender.female if FIRST_NAMES.index(first) >= 10 else Gender.male,
+                "email": email, "mobile_number": f"9{rng.randrange(10 ** 9):09d}",
+                "address_line1": f"{rng.randrange(1, 500)} {last} Nagar", "city": city, "state": state,
+                "pincode": pincode, "kyc_status": KYCStatus.verified, "created_by": "generate_scale_data"
+            })
+            user_rows.append({
+                "email": email, "hashed_password": self.password_hash, "full_name": f"{first} {last}",
+                "role": UserRole.investor, "investor_id": investor_id, "is_active": True,
+                "status": UserStatus.active
+            })
+            bank_rows.append({
+                "investor_id": investor_id, "account_number": f"{rng.randrange(10 ** 11, 10 ** 12)}",
+                "account_holder_name": f"{first} {last}", "bank_name": bank_name,
+                "ifsc_code": f"{ifsc_prefix}0{rng.randrange(10 ** 5, 10 ** 6)}", "is_primary": True,
+                "is_verified": True
+            })
+            if len(self.sample_emails) < MANIFEST_SAMPLE_SIZE:
+                self.sample_emails.append(email)
+
+
+        # Folios per investor: 1 + geometric, capped at 6
+        plans = []
+        for investor_id in investor_ids:
+            count = 1
+            while count < 6 and rng.random() < 0.45:
+                count += 1
+            schemes = set()
+            while len(schemes) < count:
+                schemes.add(rng.choices(range(len(self.schemes)), self.scheme_weights)[0])
+            plans.extend((investor_id, index) for index in schemes)
+
+        folio_ids = self.sequences.next_ids("folio", len(plans))
+        folio_rows, sip_rows, tx_rows = [], [], []
+        histories = []
+        for (investor_id, scheme_index), folio_number in zip(plans, folio_ids):
+            scheme_id, amc_id, scheme_type, minimum = self.schemes[scheme_index]
+            # Investor base grows over time: opening dates skew towards the recent end
+            span = (self.end_date - self.start_date).days - 30
+            opened = self.start_date + timedelta(days=int(span * math.sqrt(rng.random())))
+            events, sip = self._folio_events(scheme_id, scheme_type, minimum, opened)
+            histories.append((investor_id, folio_number, scheme_id, amc_id, events))
+            if sip is not None:
+                sip_rows.append({
+                    "investor_id": investor_id, "folio_number": folio_number, "scheme_id": scheme_id,
+                    "mandate_type": MandateType.debit_mandate,
+                    "frequency": SIPFrequency.monthly, **sip
+                })
+
+        tx_ids = iter(self.sequences.next_ids("transaction", sum(len(h[4]) for h in histories)))
+        sip_ids = iter(self.sequences.next_ids("sip_registration", len(sip_rows)))
+        for row in sip_rows:
+            row["registration_id"] = next(sip_ids)
+
+        for investor_id, folio_number, scheme_id, amc_id, events in histories:
+            units = invested = Decimal("0")
+            last_date = None
+            for day, tx_type, amount, status in events:
+                nav = self.nav_on(scheme_id, day)
+                if tx_type == TransactionType.redemption:
+                    tx_units = -units_of(units) if amount == 1 else -units_of(units * amount)
+                    amount = money(-tx_units * nav)
+                else:
+                    tx_units = units_of(amount / nav)
+                if tx_units == 0:
+                    continue
+                if status == TransactionStatus.completed:
+                    if tx_units > 0:
+                        invested += amount
+                    else:
+                        invested -= invested * (-tx_units / units) if units else 0
+                    units += tx_units
+                    last_date = day
+                tx_rows.append({
+                    "transaction_id": next(tx_ids), "investor_id": investor_id, "folio_number": folio_number,
+                    "scheme_id": scheme_id, "amc_id": amc_id, "transaction_type": tx_type,
+                    "transaction_date": day, "amount": money(amount), "nav_per_unit": nav, "units": tx_units,
+                    "status": status, "processing_date": day,
+                    "completion_date": day if status == TransactionStatus.completed else None,
+                    "payment_mode": (PaymentMode.debit_mandate if tx_type == TransactionType.sip
+                                     else None if tx_units < 0 else rng.choice([PaymentMode.net_banking, PaymentMode.upi])),
+                    "processed_by": "generate_scale_data"
+                })
+            current_nav = self.nav_on(scheme_id, self.end_date)
+            completed = sum(1 for e in events if e[3] == TransactionStatus.completed)
+            folio_rows.append({
+                "folio_number": folio_number, "investor_id": investor_id, "amc_id": amc_id, "scheme_id": scheme_id,
+                "total_units": units_of(units), "current_nav": current_nav,
+                "total_value": money(units * current_nav), "total_investment": money(invested),
+                "average_cost_per_unit": units_of(invested / units) if units > 0 else Decimal("0"),
+                "status": FolioStatus.active if units > 0 else FolioStatus.closed,
+                "transaction_count": completed, "last_transaction_date": last_date
+            })
+
+        # IDs are all reserved above, so the chunk's write transaction holds no sequence locks
+        self.db.execute(insert(Investor), investor_rows)
+        self.db.execute(insert(User), user_rows)
+        self.db.execute(insert(BankAccount), bank_rows)
+        bank_ids = dict(self.db.execute(
+            select(BankAccount.investor_id, BankAccount.id).where(BankAccount.investor_id.in_(investor_ids))
+        ).all())
+        for row in sip_rows:
+            row["bank_account_id"] = bank_ids[row["investor_id"]]
+        self.db.execute(insert(Folio), folio_rows)
+        if sip_rows:
+            self.db.execute(insert(SIPRegistration), sip_rows)
+        for start in range(0, len(tx_rows), 5000):
+            self.db.execute(insert(Transaction), tx_rows[start:start + 5000])
+        self.rollups.record_rows(tx_rows)
+
+        self.counts["investors"] += size
+        self.counts["folios"] += len(folio_rows)
+        self.counts["sips"] += len(sip_rows)
+        self.counts["transactions"] += len(tx_rows)
+
+    def _folio_events(self, scheme_id, scheme_type, minimum, opened):
+        """(date, type, amount, status) events of one folio in date order, plus its SIP registration.
+
+        Redemption amounts are the fraction of held units to redeem (1 redeems everything).
+        """
+        rng = self.rng
+        events = []
+        sip = None
+        if scheme_type != SchemeType.money_market and rng.random() < 0.45:
+            amount = Decimal(max(rng.choices(SIP_AMOUNTS, SIP_AMOUNT_WEIGHTS)[0], int(minimum)))
+            day_of_month = rng.randint(1, 28)
+            first = add_months(opened, 0 if opened.day <= day_of_month else 1, day_of_month)
+            last = self.end_date
+            status = SIPStatus.active
+            if rng.random() < 0.25:
+                status = SIPStatus.cancelled
+                last = first + timedelta(days=int(rng.expovariate(1 / 540)))
+            installments = 0
+            day = first
+            while day <= min(last, self.end_date):
+                tx_type = TransactionType.fresh_purchase if installments == 0 else TransactionType.sip
+                events.append((day, tx_type, amount, self._status(day)))
+                installments += 1
+                day = add_months(first, installments, day_of_month)
+            if events:
+                sip = {
+                    "amount": amount, "start_date": first, "status": status, "next_installment_date": day,
+                    "end_date": last if status == SIPStatus.cancelled else None
+                }
+        if not events:
+            amount = max(money(rng.lognormvariate(math.log(25000), 0.9)).quantize(Decimal("100")), minimum)
+            events.append((opened, TransactionType.fresh_purchase, money(amount), self._status(opened)))
+
+        # Top-ups arrive as a Poisson process, about one every 20 months
+        opened = day = events[0][0]
+        while True:
+            day += timedelta(days=int(rng.expovariate(1 / 600)) + 1)
+            if day > self.end_date:
+                break
+            amount = max(money(rng.lognormvariate(math.log(15000), 0.8)).quantize(Decimal("100")), Decimal(100))
+            events.append((day, TransactionType.additional_purchase, money(amount), self._status(day)))
+
+        # Partial redemptions about once every 3 years, occasionally a full exit
+        day = opened
+        while True:
+            day += timedelta(days=int(rng.expovariate(1 / 1100)) + 30)
+            if day > self.end_date:
+                break
+            if rng.random() < 0.1:
+                events.append((day, TransactionType.redemption, Decimal(1), self._status(day)))
+                break
+            events.append((day, TransactionType.redemption, Decimal(str(round(rng.uniform(0.1, 0.6), 2))),
+                           self._status(day)))
+
+        events.sort(key=lambda e: (e[0], e[1] == TransactionType.redemption))
+        if events[-1][1] == TransactionType.redemption and events[-1][2] == 1:
+            # Nothing is bought after a full exit
+            exit_day = events[-1][0]
+            events = [e for e in events if e[0] <= exit_day]
+            if sip is not None and sip["status"] == SIPStatus.active:
+                sip["status"] = SIPStatus.cancelled
+                sip["end_date"] = exit_day
+        if sip is not None:
+            installments = sum(1 for e in events if e[1] in (TransactionType.fresh_purchase, TransactionType.sip))
+            sip["total_installments_completed"] = installments
+            sip["total_amount_invested"] = sip["amount"] * installments
+        return events, sip
+
+    def _status(self, day: date) -> TransactionStatus:
+        """Recent days still have work in flight; a small share of everything fails"""
+        roll = self.rng.random()
+        if (self.end_date - day).days < 3 and roll < 0.3:
+            return TransactionStatus.pending
+        return TransactionStatus.failed if roll > 0.995 else TransactionStatus.completed
+
+    # ------------------------------------------------------------------
+    # Load-test admin
+    # ------------------------------------------------------------------
+
+    def create_admin(self) -> str:
+        email = f"loadtest-admin@{self.args.email_domain}"
+        self.db.execute(insert(User), [{
+            "email": email, "hashed_password": self.password_hash, "full_name": "Load Test Admin",
+            "role": UserRole.admin, "sub_role": AdminRole.rta_ceo.value, "admin_employee_id": ADMIN_EMPLOYEE_ID,
+            "is_active": True, "status": UserStatus.active
+        }])
+        user_id = self.db.execute(select(User.id).where(User.email == email)).scalar_one()
+        self.db.execute(insert(AdminUser), [{
+            "admin_id": ADMIN_EMPLOYEE_ID, "user_id": user_id, "employee_id": ADMIN_EMPLOYEE_ID,
+            "role": AdminRole.rta_ceo, "department": "Operations", "access_level": "full"
+        }])
+        self.db.commit()
+        return email
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--investors", type=int, default=10000)
+    parser.add_argument("--years", type=float, default=3.0, help="length of the transaction and NAV history")
+    parser.add_argument("--schemes", type=int, default=60)
+    parser.add_argument("--amcs", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="LoadTest@123", help="password of every generated login")
+    parser.add_argument("--email-domain", default="loadtest.example.com")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="investors written per transaction")
+    parser.add_argument("--manifest", default="scale_data.json", help="logins and latest NAVs for load_test.py")
+    parser.add_argument("--skip-lots", action="store_true", help="do not rebuild the unit lot ledger")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if db.execute(select(AMC.id).where(AMC.amc_id == MARKER_AMC_ID)).first():
+            print(f"Scale data already present (AMC {MARKER_AMC_ID}); generate into an empty database")
+            return 1
+
+        generator = ScaleDataGenerator(db, args)
+        started = time.perf_counter()
+        print(f"Generating {args.years:g} years of NAVs for {args.schemes} schemes...")
+        generator.create_master_data()
+        print(f"Generating {args.investors} investors...")
+        generator.create_investors()
+        admin_email = generator.create_admin()
+
+        if not args.skip_lots:
+            print("Rebuilding unit lots...")
+            LotService(db).rebuild_all()
+
+        elapsed = time.perf_counter() - started
+        counts = generator.counts
+        print(f"Done in {elapsed:.0f}s: " + ", ".join(f"{value} {name}" for name, value in counts.items())
+              + f" ({counts['transactions'] / elapsed:.0f} transactions/s)")
+
+        with open(args.manifest, "w") as f:
+            json.dump({
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "seed": args.seed,
+                "password": args.password,
+                "admin_email": admin_email,
+                "investor_emails": generator.sample_emails,
+                "latest_navs": {scheme_id: str(navs[-1]) for scheme_id, navs in generator.navs.items()},
+                "start_date": generator.start_date.isoformat(),
+                "end_date": generator.end_date.isoformat(),
+                "counts": counts
+            }, f, indent=2)
+        print(f"Wrote {args.manifest}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Mixed-workload load test against data from generate_scale_data.py
+
+Runs --users investor clients and --admin-users admin clients in a closed loop
+for --duration seconds against a running server:
+
+  investors  log in, then mostly read portfolio and history with the odd
+             capital gains report (weights in INVESTOR_ACTIONS), logging in
+             again every --session-requests requests
+  admins     the same with the admin dashboard and its metrics
+  NAV upload one CSV of the day's NAVs every --nav-interval seconds, so the
+             reads above run while a NAV job revalues folios
+
+For each endpoint it reports p50/p95/p99 latency, errors and, when the server
+runs with SQL_PROFILING_ENABLED, the average X-DB-Queries per request. Save a
+run with --output and compare later runs against it with --baseline: the exit
+status is 1 when an endpoint's p95 or query count has regressed beyond the
+tolerances, so the script can gate a change in CI. Raise the LOGIN_RATE_LIMIT_*
+settings on the server to match --users, since all clients share one address.
+
+Usage:
+    python load_test.py --manifest scale_data.json --users 50 --output baseline.json
+    python load_test.py --manifest scale_data.json --users 50 --baseline baseline.json
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+import requests
+
+# name -> (path, weight)
+INVESTOR_ACTIONS = {
+    "portfolio": ("/api/investor/transactions/portfolio", 45),
+    "history": ("/api/investor/transactions/history", 40),
+    "capital_gains": ("/api/investor/reports/capital-gains", 15),
+}
+ADMIN_ACTIONS = {
+    "admin_dashboard": ("/admin/admindashboard", 60),
+    "admin_dashboard_metrics": ("/admin/dashboard/metrics", 40),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latency, outcome and query count of every request, by endpoint name"""
+
+    def __init__(self):
+        self.samples = {}
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def add(self, name, latency_ms, ok, queries):
+        if not self.recording:
+            return
+        with self._lock:
+            self.samples.setdefault(name, []).append((latency_ms, ok, queries))
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for name, samples in sorted(self.samples.items()):
+            latencies = sorted(s[0] for s in samples)
+            queries = [s[2] for s in samples if s[2] is not None]
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": sum(1 for s in samples if not s[1]),
+                "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+            }
+        return endpoints
+
+
+class Client:
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.session = requests.Session()
+
+    def request(self, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=60, **kwargs)
+        except requests.RequestException:
+            self.recorder.add(name, (time.perf_counter() - started) * 1000, False, None)
+            return None
+        queries = response.headers.get("X-DB-Queries")
+        self.recorder.add(name, (time.perf_counter() - started) * 1000, response.ok,
+                          int(queries) if queries is not None else None)
+        return response
+
+    def login(self, name, path, email, password, token_of):
+        response = self.request(name, "POST", path, json={"email": email, "password": password})
+        if response is None or not response.ok:
+            return False
+        self.session.headers["Authorization"] = f"Bearer {token_of(response.json())}"
+        return True
+
+    def run(self, actions, deadline, think_seconds, session_requests, rng, relogin):
+        names = list(actions)
+        weights = [actions[name][1] for name in names]
+        made = 0
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            response = self.request(name, "GET", actions[name][0])
+            made += 1
+            # A new session every session_requests keeps logins in the measured mix;
+            # a 401 means the access token expired during a long run
+            if made % session_requests == 0 or (response is not None and response.status_code == 401):
+                relogin()
+            if think_seconds:
+                time.sleep(rng.expovariate(1 / think_seconds))
+
+
+def investor_client(args, manifest, recorder, worker, deadline):
+    rng = random.Random(args.seed + worker)
+    email = manifest["investor_emails"][worker % len(manifest["investor_emails"])]
+    client = Client(args.base_url, recorder)
+
+    def relogin():
+        return client.login("login", "/api/investor/auth/login", email, manifest["password"],
+                            lambda body: body["data"]["access_token"])
+
+    if relogin():
+        client.run(INVESTOR_ACTIONS, deadline, args.think_ms / 1000, args.session_requests, rng, relogin)
+
+
+def admin_client(args, manifest, recorder, worker, deadline):
+    rng = random.Random(args.seed - worker - 1)
+    client = Client(args.base_url, recorder)
+
+    def relogin():
+        return client.login("admin_login", "/api/admin/auth/login", manifest["admin_email"], manifest["password"],
+                            lambda body: body["access_token"])
+
+    if relogin():
+        client.run(ADMIN_ACTIONS, deadline, args.think_ms / 1000, args.session_requests, rng, relogin)
+
+
+def nav_uploader(args, manifest, recorder, deadline):
+    """Upload one NAV file per interval; prices move a little from the generated latest NAVs"""
+    rng = random.Random(args.seed)
+    client = Client(args.base_url, recorder)
+    if not client.login("admin_login", "/api/admin/auth/login", manifest["admin_email"], manifest["password"],
+                        lambda body: body["access_token"]):
+        return
+    navs = {scheme_id: Decimal(nav) for scheme_id, nav in manifest["latest_navs"].items()}
+    while time.monotonic() + args.nav_interval < deadline:
+        time.sleep(args.nav_interval)
+        lines = ["Scheme_ID,NAV,NAV_Date"]
+        for scheme_id, nav in navs.items():
+            navs[scheme_id] = (nav * Decimal(str(1 + rng.gauss(0, 0.005)))).quantize(Decimal("0.0001"))
+            lines.append(f"{scheme_id},{navs[scheme_id]},{date.today().isoformat()}")
+        csv_file = io.BytesIO("\n".join(lines).encode())
+        client.request("nav_upload", "POST", "/admin/nav/upload", files={"file": ("nav.csv", csv_file, "text/csv")})
+
+
+def run(args, manifest):
+    recorder = Recorder()
+    deadline = time.monotonic() + args.warmup + args.duration
+    workers = args.users + args.admin_users + (1 if args.nav_interval > 0 else 0)
+
+    with ThreadPoolExecutor(max_workers=workers + 1) as pool:
+        futures = [pool.submit(investor_client, args, manifest, recorder, n, deadline) for n in range(args.users)]
+        futures += [pool.submit(admin_client, args, manifest, recorder, n, deadline) for n in range(args.admin_users)]
+        if args.nav_interval > 0:
+            futures.append(pool.submit(nav_uploader, args, manifest, recorder, deadline))
+
+        # Logins and the first requests of each client land in the warm-up and are not measured
+        time.sleep(args.warmup)
+        recorder.recording = True
+        started = time.monotonic()
+        for future in futures:
+            future.result()
+        elapsed = time.monotonic() - started
+
+    endpoints = recorder.summary(elapsed)
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "data_set": manifest.get("counts", {}),
+        "users": args.users,
+        "admin_users": args.admin_users,
+        "duration": round(elapsed, 1),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def print_results(results):
+    print(f"{'endpoint':<26} {'requests':>9} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    for name, e in results["endpoints"].items():
+        queries = "-" if e["queries_per_request"] is None else f"{e['queries_per_request']:.1f}"
+        print(f"{name:<26} {e['requests']:>9} {e['errors']:>7} {e['rps']:>8.1f} "
+              f"{e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f} {queries:>8}")
+    print(f"\n{results['total_requests']} requests in {results['duration']}s "
+          f"({results['throughput_rps']} req/s)")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Regressions of `results` against `baseline`, one message each"""
+    regressions = []
+    for name, before in baseline["endpoints"].items():
+        after = results["endpoints"].get(name)
+        if after is None:
+            regressions.append(f"{name}: no requests in this run")
+            continue
+        limit = before["p95_ms"] * (1 + tolerance)
+        if after["p95_ms"] > limit and after["p95_ms"] - before["p95_ms"] > min_delta_ms:
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {after['p95_ms']:.1f} ms")
+        if before["queries_per_request"] is not None and after["queries_per_request"] is not None:
+            # Query counts are deterministic per request, so any real growth is a regression (an N+1)
+            if after["queries_per_request"] > before["queries_per_request"] + 0.5:
+                regressions.append(f"{name}: queries/request {before['queries_per_request']:.1f} -> "
+                                   f"{after['queries_per_request']:.1f}")
+        before_rate = before["errors"] / before["requests"] if before["requests"] else 0
+        after_rate = after["errors"] / after["requests"] if after["requests"] else 0
+        if after_rate > before_rate + 0.01:
+            regressions.append(f"{name}: error rate {before_rate:.1%} -> {after_rate:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--manifest", default="scale_data.json", help="written by generate_scale_data.py")
+    parser.add_argument("--users", type=int, default=20, help="concurrent investor clients")
+    parser.add_argument("--admin-users", type=int, default=2, help="concurrent admin dashboard clients")
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10.0, help="unmeasured seconds before the run")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a client's requests")
+    parser.add_argument("--session-requests", type=int, default=25, help="requests per login session")
+    parser.add_argument("--nav-interval", type=float, default=20.0, help="seconds between NAV uploads; 0 disables")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as a baseline JSON file")
+    parser.add_argument("--baseline", help="compare against a baseline written with --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 growth")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore p95 growth smaller than this")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    results = run(args, manifest)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\nRegressions against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
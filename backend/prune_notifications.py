@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Script to delete notifications past the retention window (schedule nightly)
+
+Deletes notifications older than NOTIFICATION_RETENTION_DAYS in batches of
+NOTIFICATION_PRUNE_BATCH_SIZE, committing after each batch, and keeps the
+unread counters in step. --rebuild-counters recomputes notification_counters
+from the notifications table instead: run it once to backfill the counters
+for existing notifications, or after rows were changed outside the application.
+
+Usage:
+    python prune_notifications.py                      # NOTIFICATION_RETENTION_DAYS
+    python prune_notifications.py --days 90
+    python prune_notifications.py --rebuild-counters
+"""
+
+import argparse
+import sys
+from app.db.session import SessionLocal
+from app.models import *  # Import all models to ensure relationships resolve
+from app.core.config import settings
+from app.services.notification_service import NotificationService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=settings.NOTIFICATION_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.NOTIFICATION_PRUNE_BATCH_SIZE)
+    parser.add_argument("--rebuild-counters", action="store_true", help="recompute unread counters and exit")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = NotificationService(db)
+        if args.rebuild_counters:
+            investors = service.rebuild_unread_counts()
+            db.commit()
+            print(f"Rebuilt unread counters for {investors} investors")
+            return 0
+
+        deleted = service.prune(args.days, args.batch_size)
+        print(f"Deleted {deleted} notifications older than {args.days} days")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
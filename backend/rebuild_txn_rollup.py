@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Script to rebuild the daily_txn_rollup table from transaction_history
+
+Transactions are folded into the rollup as they are written; schedule this nightly
+to pick up back-dated entries and any rows written outside the application.
+
+Usage:
+    python rebuild_txn_rollup.py                          # trailing ROLLUP_REBUILD_DAYS days
+    python rebuild_txn_rollup.py 2024-01-01 2024-03-31    # specific date range
+    python rebuild_txn_rollup.py --all                    # full history (initial backfill)
+"""
+
+import sys
+from datetime import date, timedelta
+from app.db.session import SessionLocal
+from app.models import *  # Import all models to ensure relationships resolve
+from app.core.config import settings
+from app.services.rollup_service import RollupService
+
+
+def main():
+    db = SessionLocal()
+    try:
+        service = RollupService(db)
+        if len(sys.argv) > 1 and sys.argv[1] == "--all":
+            buckets = service.rebuild_all()
+        elif len(sys.argv) == 3:
+            buckets = service.rebuild_range(date.fromisoformat(sys.argv[1]), date.fromisoformat(sys.argv[2]))
+        elif len(sys.argv) == 1:
+            today = date.today()
+            buckets = service.rebuild_range(today - timedelta(days=settings.ROLLUP_REBUILD_DAYS), today)
+        else:
+            print(__doc__)
+            return 1
+
+        print(f"Rebuilt {buckets} rollup buckets")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
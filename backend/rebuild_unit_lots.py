@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Script to (re)build the FIFO unit lot ledger from completed transactions
+
+Run once after deploying the unit_lots tables to backfill existing history, or for
+individual folios whose lots have drifted.
+
+Usage:
+    python rebuild_unit_lots.py              # rebuild every folio
+    python rebuild_unit_lots.py F001 F002    # rebuild specific folios
+"""
+
+import sys
+from app.db.session import SessionLocal
+from app.models import *  # Import all models to ensure relationships resolve
+from app.services.lot_service import LotService
+
+
+def main():
+    db = SessionLocal()
+    try:
+        service = LotService(db)
+        if len(sys.argv) > 1:
+            lots = service.rebuild_folios(sys.argv[1:])
+            db.commit()
+        else:
+            lots = service.rebuild_all()
+
+        print(f"Rebuilt {lots} unit lots")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
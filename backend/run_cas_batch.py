@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Script to generate the monthly CAS for every investor (schedule via cron after month-end)
+
+Usage:
+    python run_cas_batch.py 2024-01-01 2024-01-31          # JSON statements
+    python run_cas_batch.py 2024-01-01 2024-01-31 csv      # CSV statements
+    python run_cas_batch.py --resume CAS20240201060000
+"""
+
+import sys
+from datetime import date
+from app.db.session import SessionLocal
+from app.models import *  # Import all models to ensure relationships resolve
+from app.services.cas_service import CASService
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return 2
+
+    db = SessionLocal()
+    try:
+        service = CASService(db)
+        if sys.argv[1] == "--resume":
+            job = service.resume(sys.argv[2])
+        else:
+            fmt = sys.argv[3] if len(sys.argv) > 3 else "json"
+            job = service.run(date.fromisoformat(sys.argv[1]), date.fromisoformat(sys.argv[2]), fmt)
+
+        print(f"Job {job.job_id}: {job.status.value}")
+        print(f"Processed={job.records_processed}, Successful={job.records_successful}, Failed={job.records_failed}")
+        print(f"Statements: {job.output_file_path}")
+        print(f"Execution time: {job.execution_time_seconds}s")
+        return 0 if job.status.value == "completed" else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Script to run the email outbox sender (keep running under a process supervisor)
+
+Requests only queue emails in the email_outbox table. This sender claims due
+emails in batches with SELECT ... FOR UPDATE SKIP LOCKED, renders them and
+delivers them over a pool of authenticated SMTP connections (SMTP_* and
+EMAIL_* settings), retrying failures with backoff. Several senders can run
+against the same table. SIGTERM or Ctrl+C lets the current batch finish.
+
+Usage:
+    python run_email_sender.py
+    python run_email_sender.py --connections 8 --batch-size 500
+    python run_email_sender.py --once                 # send what is due and exit
+"""
+
+import argparse
+import logging
+import signal
+import sys
+import threading
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import *  # Import all models to ensure relationships resolve
+from app.services.email_service import EmailService, SMTPConnectionPool
+from app.services.email_outbox_service import EmailSender, work
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=settings.EMAIL_SMTP_CONNECTIONS)
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_BATCH_SIZE)
+    parser.add_argument("--poll-seconds", type=float, default=settings.EMAIL_SENDER_POLL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="exit when no email is due instead of polling")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(levelname)s %(message)s")
+    logger = logging.getLogger(__name__)
+
+    if not settings.EMAIL_FROM:
+        logger.error("EMAIL_FROM is not configured; nothing can be sent")
+        return 1
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+
+    sender = EmailSender(EmailService(SMTPConnectionPool(size=args.connections)))
+    try:
+        sent = work(
+            SessionLocal,
+            sender=sender,
+            batch_size=args.batch_size,
+            poll_seconds=args.poll_seconds,
+            should_stop=stopping.is_set,
+            once=args.once
+        )
+    finally:
+        sender.close()
+    logger.info(f"Sender {sender.sender_id} exiting after {sent} emails")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
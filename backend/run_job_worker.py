@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Script to run background batch-job workers (keep running under a process supervisor)
+
+Workers poll the batch_jobs table for pending jobs (NAV uploads, IDCW
+declarations and processing, SIP and CAS runs, reconciliations), claim them
+with SELECT ... FOR UPDATE SKIP LOCKED and run them chunk by chunk. SIGTERM
+or Ctrl+C lets every worker finish its current job and exit.
+
+Usage:
+    python run_job_worker.py                        # JOB_WORKER_PROCESSES workers
+    python run_job_worker.py --processes 4
+    python run_job_worker.py --types nav_upload,idcw_processing
+    python run_job_worker.py --once                 # drain the queue and exit
+"""
+
+import argparse
+import logging
+import multiprocessing
+import signal
+import sys
+import threading
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models import *  # Import all models to ensure relationships resolve
+from app.models.admin import BatchJobType
+from app.services.job_service import work, default_worker_id
+import app.services.job_handlers  # noqa: F401  (registers the job handlers)
+
+
+def run_worker(job_types, poll_seconds, once):
+    # Connections inherited from the parent must not be shared with it
+    engine.dispose(close=False)
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+
+    jobs_run = work(
+        SessionLocal,
+        worker_id=default_worker_id(),
+        job_types=job_types,
+        poll_seconds=poll_seconds,
+        should_stop=stopping.is_set,
+        once=once
+    )
+    logging.getLogger(__name__).info(f"Worker {default_worker_id()} exiting after {jobs_run} jobs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=settings.JOB_WORKER_PROCESSES)
+    parser.add_argument("--types", help="comma separated job types to run (default: all with a handler)")
+    parser.add_argument("--poll-seconds", type=float, default=settings.JOB_WORKER_POLL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="exit when no job is due instead of polling")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+    job_types = [BatchJobType[name.strip()] for name in args.types.split(",")] if args.types else None
+
+    workers = [
+        multiprocessing.Process(
+            target=run_worker, args=(job_types, args.poll_seconds, args.once), name=f"job-worker-{i + 1}"
+        )
+        for i in range(max(1, args.processes))
+    ]
+    for worker in workers:
+        worker.start()
+
+    def forward_stop(signum, frame):
+        # Each worker stops after its current job
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+    # Ctrl+C already reaches every worker through the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, forward_stop)
+    for worker in workers:
+        worker.join()
+
+    return 0 if all(worker.exitcode == 0 for worker in workers) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
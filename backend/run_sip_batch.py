@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Script to run the daily SIP installment batch (schedule via cron on SIP dates)
+
+Usage:
+    python run_sip_batch.py                 # process installments due today
+    python run_sip_batch.py 2024-01-05      # process installments due on or before a date
+    python run_sip_batch.py --resume SIP20240105060000
+"""
+
+import sys
+from datetime import date
+from app.db.session import SessionLocal
+from app.models import *  # Import all models to ensure relationships resolve
+from app.services.sip_batch_service import SIPBatchService
+
+
+def main():
+    db = SessionLocal()
+    try:
+        service = SIPBatchService(db)
+        if len(sys.argv) > 2 and sys.argv[1] == "--resume":
+            job = service.resume(sys.argv[2])
+        else:
+            run_date = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date.today()
+            job = service.run(run_date)
+
+        print(f"Job {job.job_id}: {job.status.value}")
+        print(f"Processed={job.records_processed}, Successful={job.records_successful}, Failed={job.records_failed}")
+        print(f"Execution time: {job.execution_time_seconds}s")
+        return 0 if job.status.value == "completed" else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import sys
+import os
+import asyncio
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import BaseModel
+from app.db.pagination import count_cache
+from app.models import *  # noqa: F401,F403 - registers every table
+from app.models.admin import (
+    AdminUser, AdminRole, Approval, ApprovalType, UserSession,
+    Reconciliation, ReconciliationResult, ReconciliationMatchStatus
+)
+from app.models.amc import AMC
+from app.models.folio import Folio
+from app.models.investor import Investor, Gender
+from app.models.scheme import Scheme, SchemeType, PlanType, OptionType
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.user import User, UserRole
+from app.routers.admin.approvals import get_approvals
+from app.routers.admin.idcw_management import get_idcw_transactions
+from app.routers.admin.investor_management import list_investors
+from app.routers.admin.reconciliation import get_reconciliation_transactions
+from app.routers.admin.reports import get_transaction_summary
+from app.routers.admin.user_management import get_admin_users
+from app.routers.admin.user_sessions import get_user_sessions
+
+DAY = date(2030, 1, 15)
+ADMIN = SimpleNamespace(id=1, email="admin@example.com", role=SimpleNamespace(value="admin"))
+
+
+def make_session(rows: int):
+    """In-memory database with `rows` investors and the same number of rows in each list"""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    # system_settings has a composite primary key SQLite cannot autoincrement; no list reads it
+    BaseModel.metadata.create_all(
+        engine, tables=[t for t in BaseModel.metadata.sorted_tables if t.name != "system_settings"]
+    )
+    db = sessionmaker(bind=engine, autoflush=False)()
+    now = datetime(2030, 1, 15, 10, 0)
+
+    db.add(AMC(amc_id="AMC001", amc_name="Test AMC", registration_number="R1", address="a",
+               city="c", state="s", pincode="1", email="amc@example.com", phone="1"))
+    db.add(Scheme(scheme_id="SCH001", amc_id="AMC001", scheme_name="Equity Fund",
+                  scheme_type=SchemeType.equity, plan_type=PlanType.direct, option_type=OptionType.growth,
+                  current_nav=Decimal("10"), nav_date=DAY))
+    db.add(Reconciliation(reconciliation_id="REC001", reconciliation_type="daily", reconciliation_date=DAY,
+                          start_date=DAY, end_date=DAY, status="completed"))
+
+    for n in range(1, rows + 1):
+        investor_id = f"I{n:04d}"
+        db.add(User(id=n, email=f"user{n}@example.com", hashed_password="x", full_name=f"User {n}",
+                    role=UserRole.admin))
+        db.add(AdminUser(admin_id=f"ADM{n:04d}", user_id=n, employee_id=f"E{n}", role=AdminRole.rta_ceo))
+        db.add(UserSession(session_id=f"S{n}", user_id=n, login_time=now, last_activity=now))
+        db.add(Approval(approval_id=f"APR{n:04d}", approval_type=ApprovalType.transaction,
+                        request_id=f"T{n:04d}", approver_id=f"ADM{n:04d}", created_at=now, updated_at=now))
+        db.add(Investor(investor_id=investor_id, pan_number=f"ABCDE{n:04d}F", full_name=f"Investor {n}",
+                        date_of_birth=date(1990, 1, 1), gender=Gender.male, email=f"inv{n}@example.com",
+                        mobile_number="1", address_line1="a", city="c", state="s", pincode="1"))
+        db.add(Folio(folio_number=f"F{n:04d}", investor_id=investor_id, amc_id="AMC001", scheme_id="SCH001",
+                     total_units=Decimal("10"), current_nav=Decimal("10"), total_value=Decimal("100"),
+                     total_investment=Decimal("100")))
+        for tx_type, prefix in ((TransactionType.fresh_purchase, "T"), (TransactionType.idcw_payout, "D")):
+            db.add(Transaction(transaction_id=f"{prefix}{n:04d}", investor_id=investor_id, folio_number=f"F{n:04d}",
+                               scheme_id="SCH001", amc_id="AMC001", transaction_type=tx_type, transaction_date=DAY,
+                               amount=Decimal("100"), nav_per_unit=Decimal("10"), units=Decimal("10"),
+                               status=TransactionStatus.completed))
+        db.add(ReconciliationResult(reconciliation_id="REC001", match_status=ReconciliationMatchStatus.matched,
+                                    transaction_id=f"T{n:04d}", feed_amount=Decimal("100"),
+                                    rta_amount=Decimal("100")))
+    db.commit()
+    return engine, db
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+# mandate_approvals is left out: its list filters on BankAccountStatus.pending_verification,
+# which the enum does not define yet
+LIST_ENDPOINTS = {
+    "reconciliation transactions": lambda db: get_reconciliation_transactions(
+        reconciliation_date=DAY, reconciliation_id=None, match_status=None, page=1, page_size=100,
+        db=db, current_user=ADMIN),
+    "idcw transactions": lambda db: get_idcw_transactions(
+        page=1, page_size=100, cursor=None, count="exact", status=None, scheme_id=None, amc_id=None,
+        start_date=None, end_date=None, db=db, current_user=ADMIN),
+    "transaction summary": lambda db: get_transaction_summary(
+        start_date=DAY, end_date=DAY, amc_id=None, scheme_id=None, db=db, current_user=ADMIN),
+    "user sessions": lambda db: get_user_sessions(
+        page=1, page_size=100, user_id=None, is_active=None, db=db, current_user=ADMIN),
+    "approvals": lambda db: get_approvals(
+        page=1, page_size=100, cursor=None, count="exact", status=None, approval_type=None, priority=None,
+        db=db, current_user=ADMIN),
+    "investors": lambda db: list_investors(
+        page=1, page_size=100, search=None, kyc_status=None, db=db, current_user=ADMIN),
+    "admin users": lambda db: get_admin_users(
+        page=1, page_size=100, role=None, status=None, db=db, current_user=ADMIN),
+}
+
+
+def query_counts(rows: int):
+    engine, db = make_session(rows)
+    counts = {}
+    for name, call in LIST_ENDPOINTS.items():
+        count_cache.clear()
+        db.expire_all()
+        with count_queries(engine) as statements:
+            asyncio.run(call(db))
+        counts[name] = len(statements)
+    db.close()
+    return counts
+
+
+def test_admin_lists_use_constant_queries():
+    print("Testing query counts of admin list endpoints...")
+    small = query_counts(3)
+    large = query_counts(60)
+
+    failures = []
+    for name in LIST_ENDPOINTS:
+        print(f"{name:<28} {small[name]:>3} queries for 3 rows, {large[name]:>3} for 60 rows")
+        if small[name] != large[name]:
+            failures.append(name)
+
+    if failures:
+        print(f"FAILURE: query count grows with page size for {', '.join(failures)}")
+    else:
+        print("SUCCESS: every list endpoint issues a constant number of queries.")
+    assert not failures
+
+
+if __name__ == "__main__":
+    test_admin_lists_use_constant_queries()
@@ -0,0 +1,68 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.core.security as security
+from app.core.principal import Principal, principal_cache
+from app.db.base import BaseModel
+from app.models import *  # noqa: F401,F403 - registers every table
+from app.models.user import User, UserRole
+from app.services.auth_service import AuthService
+
+# bcrypt is deliberately slow; the scheme does not matter for what is checked here
+security.pwd_context = CryptContext(schemes=["sha256_crypt"])
+
+
+def make_session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    # system_settings has a composite primary key SQLite cannot autoincrement
+    BaseModel.metadata.create_all(
+        engine, tables=[t for t in BaseModel.metadata.sorted_tables if t.name != "system_settings"]
+    )
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def test_writes_through_cached_principal():
+    print("Testing profile update and password change with a cached Principal as current_user...")
+    db = make_session()
+    user = User(email="investor@example.com", full_name="Old Name", phone_number="9000000000",
+                hashed_password=security.pwd_context.hash("old-secret"), role=UserRole.investor)
+    db.add(user)
+    db.commit()
+
+    # What get_current_user hands to the routes
+    principal = Principal(user)
+    principal_cache.clear()
+    principal_cache.put("token-1", principal)
+    db.expunge_all()
+
+    service = AuthService(db)
+    updated = service.update_user_profile(principal, {"full_name": "New Name", "phone_number": None})
+    stored = db.query(User).filter(User.id == principal.id).one()
+    assert updated.full_name == "New Name" and stored.full_name == "New Name", "profile change not saved"
+    assert stored.phone_number == "9000000000", "unset fields must be left alone"
+    assert principal.full_name == "Old Name", "the shared Principal must not be mutated"
+    assert principal_cache.get("token-1") is None, "cached principal not invalidated"
+    print("SUCCESS: profile update saved on the User row and the cached principal dropped.")
+
+    assert asyncio.run(service.change_password(principal, "old-secret", "new-secret"))
+    stored = db.query(User).filter(User.id == principal.id).one()
+    assert security.pwd_context.verify("new-secret", stored.hashed_password), "new password not saved"
+    try:
+        asyncio.run(service.change_password(principal, "wrong", "other-secret"))
+        raise AssertionError("wrong current password accepted")
+    except ValueError:
+        pass
+    print("SUCCESS: password change saved on the User row; wrong current password rejected.")
+
+
+if __name__ == "__main__":
+    test_writes_through_cached_principal()
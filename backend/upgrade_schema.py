@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Script to bring an existing MySQL database up to the current models
+
+create_tables.py (create_all) creates missing tables but never changes one
+that already exists. Each step below makes one such change to an existing
+table. It checks first whether the change is still needed, so the script can
+be rerun safely and does nothing on a database created from scratch.
+
+Usage:
+    python upgrade_schema.py              # apply the pending steps
+    python upgrade_schema.py --dry-run    # only list them
+"""
+
+import argparse
+import sys
+from sqlalchemy import exists, func, inspect, insert, select, text
+from app.db.session import engine
+from app.models import *  # Import all models to ensure relationships resolve
+from app.models.admin import BatchJob, ReconciliationResult
+from app.models.document import Document, DocumentBlob
+from app.models.investor import Investor
+from app.models.scheme import NAVHistory
+from app.models.transaction import Transaction
+
+
+def has_column(conn, table: str, column: str) -> bool:
+    return any(info["name"] == column for info in inspect(conn).get_columns(table))
+
+
+def missing_indexes(conn, table):
+    existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    return [index for index in table.indexes if index.name not in existing]
+
+
+def column_length(conn, table: str, column: str):
+    for info in inspect(conn).get_columns(table):
+        if info["name"] == column:
+            return getattr(info["type"], "length", None)
+    return None
+
+
+def has_unique_key(conn, table: str, name: str) -> bool:
+    inspector = inspect(conn)
+    return any(constraint["name"] == name for constraint in inspector.get_unique_constraints(table)) or \
+        any(index["name"] == name and index["unique"] for index in inspector.get_indexes(table))
+
+
+def unique_nav_per_scheme_and_date(conn, apply: bool) -> bool:
+    """nav_history gets one row per scheme and date, which the NAV upload upserts on"""
+    constraint = next(c for c in NAVHistory.__table__.constraints if c.name == "uq_nav_history_scheme_date")
+    if not inspect(conn).has_table("nav_history") or has_unique_key(conn, "nav_history", constraint.name):
+        return False
+    if apply:
+        # Keep the newest row of each duplicate group, as a re-upload would have
+        removed = conn.execute(text(
+            "DELETE older FROM nav_history older JOIN nav_history newer "
+            "ON newer.scheme_id = older.scheme_id AND newer.nav_date = older.nav_date AND newer.id > older.id"
+        )).rowcount
+        print(f"Removed {removed} duplicate nav_history rows")
+        columns = ", ".join(column.name for column in constraint.columns)
+        conn.execute(text(f"ALTER TABLE nav_history ADD CONSTRAINT {constraint.name} UNIQUE ({columns})"))
+    return True
+
+
+def widen_reconciliation_transaction_id(conn, apply: bool) -> bool:
+    """reconciliation_results.transaction_id holds IDs quoted by the feed, which can be longer than the RTA's"""
+    column = ReconciliationResult.__table__.c.transaction_id
+    current = column_length(conn, "reconciliation_results", "transaction_id")
+    if current is None or current >= column.type.length:
+        return False
+    if apply:
+        conn.execute(text(
+            f"ALTER TABLE reconciliation_results MODIFY transaction_id VARCHAR({column.type.length}) NULL"
+        ))
+    return True
+
+
+def batch_job_heartbeat(conn, apply: bool) -> bool:
+    """batch_jobs.heartbeat_at lets workers reclaim jobs whose worker died"""
+    if not inspect(conn).has_table("batch_jobs") or has_column(conn, "batch_jobs", "heartbeat_at"):
+        return False
+    if apply:
+        conn.execute(text("ALTER TABLE batch_jobs ADD COLUMN heartbeat_at DATETIME NULL AFTER completed_at"))
+    return True
+
+
+def batch_job_claim_token(conn, apply: bool) -> bool:
+    """batch_jobs.claim_token stops a reclaimed job's previous worker from writing to it"""
+    if not inspect(conn).has_table("batch_jobs") or has_column(conn, "batch_jobs", "claim_token"):
+        return False
+    if apply:
+        conn.execute(text("ALTER TABLE batch_jobs ADD COLUMN claim_token VARCHAR(32) NULL AFTER heartbeat_at"))
+    return True
+
+
+def investor_search_indexes(conn, apply: bool) -> bool:
+    """Indexes used by investor search, including the FULLTEXT ngram index on full_name"""
+    if not inspect(conn).has_table(Investor.__tablename__):
+        return False
+    indexes = missing_indexes(conn, Investor.__table__)
+    if apply:
+        # Emitted from the model, e.g. CREATE FULLTEXT INDEX ftx_investor_full_name
+        # ON investor_master (full_name) WITH PARSER ngram
+        for index in indexes:
+            index.create(conn)
+    return bool(indexes)
+
+
+def document_blob_rows(conn, apply: bool) -> bool:
+    """document_blobs rows (with reference counts) for files already in the content-addressed store"""
+    if not inspect(conn).has_table(DocumentBlob.__tablename__):
+        if not apply:
+            return True
+        DocumentBlob.__table__.create(conn)
+    # Stored files are named after their checksum; older uploads belong to one document each
+    missing = select(
+        Document.checksum, func.min(Document.file_path), func.max(func.coalesce(Document.file_size, 0)),
+        func.count(Document.id)
+    ).where(
+        Document.checksum.isnot(None),
+        Document.file_path.endswith(Document.checksum),
+        ~exists().where(DocumentBlob.checksum == Document.checksum)
+    ).group_by(Document.checksum)
+    if conn.execute(missing.limit(1)).first() is None:
+        return False
+    if apply:
+        conn.execute(insert(DocumentBlob).from_select(["checksum", "file_path", "size", "ref_count"], missing))
+    return True
+
+
+def transaction_completion_index(conn, apply: bool) -> bool:
+    """Index behind the admin dashboard's count of transactions completed today"""
+    if not inspect(conn).has_table(Transaction.__tablename__):
+        return False
+    indexes = [
+        index for index in missing_indexes(conn, Transaction.__table__)
+        if index.name == "idx_transaction_status_completion"
+    ]
+    if apply:
+        for index in indexes:
+            index.create(conn)
+    return bool(indexes)
+
+
+# Run in this order; each returns whether it was (or, with apply=False, would be) needed
+STEPS = [
+    unique_nav_per_scheme_and_date,
+    widen_reconciliation_transaction_id,
+    batch_job_heartbeat,
+    investor_search_indexes,
+    document_blob_rows,
+    batch_job_claim_token,
+    transaction_completion_index,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="list pending steps without changing anything")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "mysql" and not args.dry_run:
+        print(f"Upgrade steps are written for MySQL, not {engine.dialect.name}")
+        return 1
+
+    pending = 0
+    for step in STEPS:
+        # DDL commits implicitly in MySQL, so each step runs in its own transaction
+        with engine.begin() as conn:
+            needed = step(conn, apply=not args.dry_run)
+        if needed:
+            pending += 1
+            print(f"{'Pending' if args.dry_run else 'Applied'}: {step.__name__}")
+    print(f"{pending} step(s) {'pending' if args.dry_run else 'applied'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -68,7 +68,7 @@ export default function NAVUpload() {
 
       if (res.ok) {
         const data = await res.json();
-        alert("NAV uploaded successfully!");
+        alert(`NAV file queued for processing (job ${data.job_id})`);
         setFile(null);
         setPreview(null);
         fetchUploadHistory();
@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useAuth } from "../../services/AuthContext";
 import {
   Search,
@@ -18,6 +18,7 @@ export default function Reconciliation() {
   const [page, setPage] = useState(1);
   const [pageSize] = useState(20);
   const [search, setSearch] = useState("");
+  const feedInputRef = useRef(null);
 
   useEffect(() => {
     fetchReconciliationTransactions();
@@ -44,18 +45,26 @@ export default function Reconciliation() {
     }
   };
 
-  const runReconciliation = async () => {
+  const runReconciliation = async (e) => {
+    const feedFile = e.target.files?.[0];
+    e.target.value = "";
+    if (!feedFile) return;
+
     try {
-      const res = await fetchWithAuth("/admin/reconciliation/run", {
+      const params = new URLSearchParams({ reconciliation_date: reconciliationDate });
+      const formData = new FormData();
+      formData.append("file", feedFile);
+
+      const res = await fetchWithAuth(`/admin/reconciliation/run?${params}`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          reconciliation_date: reconciliationDate,
-        }),
+        body: formData,
       });
       if (res.ok) {
-        await fetchReconciliationTransactions();
-        alert("Reconciliation completed successfully");
+        const data = await res.json();
+        alert(`Reconciliation queued (${data.reconciliation_id}). Refresh once the job completes.`);
+      } else {
+        const error = await res.json();
+        alert(`Reconciliation failed: ${error.detail || "Unknown error"}`);
       }
     } catch (err) {
       console.error("Failed to run reconciliation", err);
@@ -78,6 +87,8 @@ export default function Reconciliation() {
       case "Pending":
         return "text-yellow-600 font-semibold";
       case "Discrepancy":
+      case "Missing in RTA":
+      case "Missing in Feed":
         return "text-red-600 font-semibold";
       default:
         return "";
@@ -129,8 +140,15 @@ export default function Reconciliation() {
               onChange={(e) => setReconciliationDate(e.target.value)}
               className="px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500"
             />
+            <input
+              ref={feedInputRef}
+              type="file"
+              accept=".csv"
+              onChange={runReconciliation}
+              className="hidden"
+            />
             <button
-              onClick={runReconciliation}
+              onClick={() => feedInputRef.current?.click()}
               className="flex items-center gap-2 px-4 py-2 bg-green-600 text-white rounded-lg hover:bg-green-700 transition-colors"
             >
               <Play className="w-4 h-4" />